@@ -1,13 +1,22 @@
-"""Embeddings service wrapper for Ollama (improved)"""
-import os
-"""Embeddings service wrapper for Ollama (improved)"""
+"""Embeddings service wrapper for Ollama (improved)
+
+Uses Ollama's multi-input ``/api/embed`` endpoint so a single request covers
+many texts, over a keep-alive ``requests.Session`` (sync) or
+``httpx.AsyncClient`` (async). Servers without ``/api/embed`` fall back to the
+legacy one-text ``/api/embeddings`` endpoint on the same pooled connection.
+"""
+import asyncio
 import os
+import threading
+import weakref
 import requests
+import httpx
 from typing import List, Optional
 import numpy as np
 import hashlib
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.services.chunking_service import chunk_text as _chunk_text
 
 # Basic logger
 logger = logging.getLogger(__name__)
@@ -23,6 +32,9 @@ USE_MOCK_EMB = _parse_bool_env("USE_MOCK_EMB", "false")
 # Default dimension (will be validated/updated from response when possible)
 DEFAULT_DIMENSION = 384
 
+# Texts per /api/embed request
+DEFAULT_BATCH_SIZE = int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", "64"))
+
 
 def _deterministic_seed_from_text(text: str) -> int:
     # Use hashlib to produce deterministic seed across processes/runs
@@ -34,13 +46,83 @@ def _deterministic_seed_from_text(text: str) -> int:
 class EmbeddingsClient:
     """Wrapper for Ollama embeddings (embeddinggemma by default)."""
 
-    def __init__(self, model: str = "embeddinggemma", timeout: int = 30, max_workers: int = 4):
+    def __init__(
+        self,
+        model: str = "embeddinggemma",
+        timeout: int = 30,
+        max_workers: int = 4,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        base_url: Optional[str] = None,
+    ):
         self.model = model
-        self.ollama_url = OLLAMA_URL.rstrip("/")
+        self.ollama_url = (base_url or OLLAMA_URL).rstrip("/")
         self.use_mock = USE_MOCK_EMB
         self.dimension = DEFAULT_DIMENSION
+        self.dimension_detected = False
         self.timeout = timeout
+        # Upper bound on pooled keep-alive connections
         self.max_workers = max_workers
+        self.batch_size = max(1, batch_size)
+
+        # None until probed; False once the server answers 404 on /api/embed
+        self._supports_batch: Optional[bool] = None
+        self._session: Optional[requests.Session] = None
+        # One async client per event loop (its connections are loop-bound)
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Connection pooling
+    # ------------------------------------------------------------------
+
+    def _get_session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=self.max_workers,
+                    pool_maxsize=self.max_workers,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    base_url=self.ollama_url,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_workers,
+                        max_keepalive_connections=self.max_workers,
+                    ),
+                )
+                self._async_clients[loop] = client
+            return client
+
+    def close(self) -> None:
+        """Close the pooled sync session."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    async def aclose(self) -> None:
+        """Close the pooled async client of the running event loop."""
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # ------------------------------------------------------------------
+    # Response handling
+    # ------------------------------------------------------------------
 
     def _mock_embedding(self, text: str) -> List[float]:
         seed = _deterministic_seed_from_text(text) % (2**32)
@@ -55,6 +137,10 @@ class EmbeddingsClient:
         # Common possibilities — adjust to your API contract
         if "embedding" in data and isinstance(data["embedding"], list):
             return data["embedding"]
+        if "embeddings" in data and isinstance(data["embeddings"], list) and data["embeddings"]:
+            first = data["embeddings"][0]
+            if isinstance(first, list):
+                return first
         if "data" in data and isinstance(data["data"], list):
             # e.g. {"data":[{"embedding":[...]}]} or similar
             first = data["data"][0]
@@ -63,6 +149,72 @@ class EmbeddingsClient:
         # No embedding found
         return None
 
+    def _extract_embeddings_from_batch_response(self, data: dict, count: int) -> List[Optional[List[float]]]:
+        """Extract a list of vectors (aligned with the request) from /api/embed."""
+        vectors = data.get("embeddings")
+        if not isinstance(vectors, list):
+            return [None] * count
+        return [
+            vectors[i] if i < len(vectors) and isinstance(vectors[i], list) and vectors[i] else None
+            for i in range(count)
+        ]
+
+    def _record_dimension(self, embedding: List[float]) -> None:
+        """Cache the embedding dimension the first time the server reports one."""
+        if self.dimension_detected:
+            return
+        if len(embedding) != self.dimension:
+            logger.info("Detected embedding dimension %d (was %d). Updating.", len(embedding), self.dimension)
+        self.dimension = len(embedding)
+        self.dimension_detected = True
+
+    def _finalize(self, texts: List[str], vectors: List[Optional[List[float]]]) -> List[List[float]]:
+        """Record the dimension and fill any missing vectors with mock fallbacks."""
+        results: List[List[float]] = []
+        for text, vector in zip(texts, vectors):
+            if vector:
+                self._record_dimension(vector)
+                results.append(vector)
+            else:
+                logger.warning("No embedding in response; falling back to mock embedding.")
+                results.append(self._mock_embedding(text))
+        return results
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        return [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+    # ------------------------------------------------------------------
+    # Sync API
+    # ------------------------------------------------------------------
+
+    def _post_embed_sync(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """One /api/embed request; returns None entries for failures."""
+        session = self._get_session()
+        if self._supports_batch is not False:
+            resp = session.post(
+                f"{self.ollama_url}/api/embed",
+                json={"model": self.model, "input": texts},
+                timeout=self.timeout,
+            )
+            if resp.status_code == 404:
+                logger.info("Ollama /api/embed not available; using legacy /api/embeddings.")
+                self._supports_batch = False
+            else:
+                resp.raise_for_status()
+                self._supports_batch = True
+                return self._extract_embeddings_from_batch_response(resp.json(), len(texts))
+
+        vectors: List[Optional[List[float]]] = []
+        for text in texts:
+            resp = session.post(
+                f"{self.ollama_url}/api/embeddings",
+                json={"model": self.model, "prompt": text},
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            vectors.append(self._extract_embedding_from_response(resp.json()))
+        return vectors
+
     def embed_text(self, text: str) -> List[float]:
         """
         Generate embedding for a single text.
@@ -70,112 +222,112 @@ class EmbeddingsClient:
         Returns:
             List[float] — embedding vector (length validated when possible).
         """
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str], parallel: bool = True) -> List[List[float]]:
+        """
+        Generate embeddings for a list of texts.
+
+        Texts are sent ``batch_size`` at a time to the multi-input endpoint over
+        a pooled keep-alive session. ``parallel`` is kept for backward
+        compatibility; batching replaces per-text threads.
+        """
+        if not texts:
+            return []
+
         if self.use_mock:
-            return self._mock_embedding(text)
+            return [self._mock_embedding(t) for t in texts]
+
+        results: List[List[float]] = []
+        for batch in self._batches(texts):
+            try:
+                vectors = self._post_embed_sync(batch)
+            except requests.RequestException as e:
+                logger.error("Network error while calling embeddings API: %s", e, exc_info=False)
+                vectors = [None] * len(batch)
+            except ValueError as e:
+                logger.error("Invalid JSON from embeddings API: %s", e, exc_info=False)
+                vectors = [None] * len(batch)
+            except Exception as e:
+                logger.exception("Unexpected error in embed_batch: %s", e)
+                vectors = [None] * len(batch)
+            results.extend(self._finalize(batch, vectors))
+        return results
+
+    def detect_dimension(self) -> int:
+        """Probe the server once for the embedding dimension and cache it."""
+        if not self.dimension_detected and not self.use_mock:
+            self.embed_batch(["dimension probe"])
+        return self.dimension
 
-        payload = {
-            "model": self.model,
-            # Some embed endpoints expect "input" or "prompt". Make this configurable if needed.
-            "prompt": text
-        }
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
 
-        try:
-            resp = requests.post(f"{self.ollama_url}/api/embeddings", json=payload, timeout=self.timeout)
+    async def _post_embed_async(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """One /api/embed request via httpx; returns None entries for failures."""
+        client = self._get_async_client()
+        if self._supports_batch is not False:
+            resp = await client.post("/api/embed", json={"model": self.model, "input": texts})
+            if resp.status_code == 404:
+                logger.info("Ollama /api/embed not available; using legacy /api/embeddings.")
+                self._supports_batch = False
+            else:
+                resp.raise_for_status()
+                self._supports_batch = True
+                return self._extract_embeddings_from_batch_response(resp.json(), len(texts))
+
+        vectors: List[Optional[List[float]]] = []
+        for text in texts:
+            resp = await client.post("/api/embeddings", json={"model": self.model, "prompt": text})
             resp.raise_for_status()
-            data = resp.json()
-            embedding = self._extract_embedding_from_response(data)
+            vectors.append(self._extract_embedding_from_response(resp.json()))
+        return vectors
 
-            if not embedding:
-                logger.warning("No embedding in response; falling back to mock embedding.")
-                return self._mock_embedding(text)
-
-            # update dimension if it's different (first time)
-            if len(embedding) != self.dimension:
-                logger.info("Detected embedding dimension %d (was %d). Updating.", len(embedding), self.dimension)
-                self.dimension = len(embedding)
-
-            return embedding
-        except requests.RequestException as e:
-            logger.error("Network error while calling embeddings API: %s", e, exc_info=False)
-            return self._mock_embedding(text)
-        except ValueError as e:
-            logger.error("Invalid JSON from embeddings API: %s", e, exc_info=False)
-            return self._mock_embedding(text)
-        except Exception as e:
-            logger.exception("Unexpected error in embed_text: %s", e)
-            return self._mock_embedding(text)
+    async def aembed_text(self, text: str) -> List[float]:
+        """Async variant of embed_text."""
+        return (await self.aembed_batch([text]))[0]
 
-    def embed_batch(self, texts: List[str], parallel: bool = True) -> List[List[float]]:
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
         """
-        Generate embeddings for a list of texts.
-        If parallel=True, uses threads (beware rate limits).
+        Async variant of embed_batch for use from async routes (no threads).
         """
+        if not texts:
+            return []
+
         if self.use_mock:
             return [self._mock_embedding(t) for t in texts]
 
-        if not texts:
-            return []
+        results: List[List[float]] = []
+        for batch in self._batches(texts):
+            try:
+                vectors = await self._post_embed_async(batch)
+            except httpx.HTTPError as e:
+                logger.error("Network error while calling embeddings API: %s", e, exc_info=False)
+                vectors = [None] * len(batch)
+            except ValueError as e:
+                logger.error("Invalid JSON from embeddings API: %s", e, exc_info=False)
+                vectors = [None] * len(batch)
+            except Exception as e:
+                logger.exception("Unexpected error in aembed_batch: %s", e)
+                vectors = [None] * len(batch)
+            results.extend(self._finalize(batch, vectors))
+        return results
+
+    async def adetect_dimension(self) -> int:
+        """Async variant of detect_dimension."""
+        if not self.dimension_detected and not self.use_mock:
+            await self.aembed_batch(["dimension probe"])
+        return self.dimension
+
 
-        if parallel and len(texts) > 1:
-            results = [None] * len(texts)
-            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(texts))) as ex:
-                futures = {ex.submit(self.embed_text, texts[i]): i for i in range(len(texts))}
-                for fut in as_completed(futures):
-                    i = futures[fut]
-                    try:
-                        results[i] = fut.result()
-                    except Exception:
-                        results[i] = self._mock_embedding(texts[i])
-            return results
-        else:
-            return [self.embed_text(t) for t in texts]
-
-
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+def chunk_text(text: str, max_tokens: int = 128, overlap_tokens: int = 16) -> List[str]:
     """
-    Split text into chunks (character-based) with overlap.
-    Tries to break at sentence boundaries (., ?, !, newline) within the last 100 chars.
+    Split text into sentence-bounded chunks of at most ``max_tokens`` tokens.
+    Delegates to the shared token-aware chunker used by document ingestion.
     """
-    if not text:
-        return []
-
-    if len(text) <= chunk_size:
-        return [text.strip()]
-
-    chunks = []
-    start = 0
-    text_len = len(text)
-
-    while start < text_len:
-        end = min(start + chunk_size, text_len)
-
-        if end < text_len:
-            window = text[start:end]
-            # search for last sentence boundary within the last 100 chars of window
-            search_window = window[-100:] if len(window) > 100 else window
-            # find last occurrence in the search_window and compute global index
-            candidates = [
-                idx for idx in (search_window.rfind('.'), search_window.rfind('!'),
-                                search_window.rfind('?'), search_window.rfind('\n')) if idx != -1
-            ]
-            if candidates:
-                last_rel = max(candidates)
-                # convert to absolute index + 1 (include punctuation)
-                abs_idx = start + (len(window) - len(search_window)) + last_rel + 1
-                # only use sentence break if it yields progress and not too small chunk
-                if abs_idx > start and (abs_idx - start) >= int(chunk_size * 0.25):
-                    end = abs_idx
-
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-
-        # advance start, ensure progress (avoid infinite loops)
-        next_start = end - overlap
-        if next_start <= start:  # fallback to force progress
-            next_start = end
-        start = next_start
-
-    return chunks
- # Global instance (optional)
+    return _chunk_text(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+
+# Global instance (optional)
 embeddings_client = EmbeddingsClient()
@@ -17,8 +17,9 @@ class EmbeddingRequest(BaseModel):
     user_id: str
     text: str
     metadata: Dict
-    chunk_size: int = 500
-    chunk_overlap: int = 50
+    # Token counts; defaults come from CHUNK_SIZE / CHUNK_OVERLAP
+    chunk_size: Optional[int] = None
+    chunk_overlap: Optional[int] = None
 
 
 class SearchRequest(BaseModel):
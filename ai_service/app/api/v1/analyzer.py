@@ -88,17 +88,12 @@ async def query(
             top_k=top_k,
             tags=None,
             document_id=None,
+            tracking_ids=tracking_ids or None,
             min_score=min_score,
         )
-        if tracking_ids:
-            # Use the existing query-by-tracking endpoint behavior via SearchService hybrid path
-            # We'll filter results post-search to those tracking_ids
-            search_resp = await search.search(sr)
-            filtered = [r for r in search_resp.results if r.tracking_id in tracking_ids]
-            results: List[SearchResult] = filtered[:top_k]
-        else:
-            search_resp = await search.search(sr)
-            results: List[SearchResult] = search_resp.results
+        # tracking_ids (if any) are filtered inside the search, not afterwards
+        search_resp = await search.search(sr)
+        results: List[SearchResult] = search_resp.results
 
         # Build a concise context from top chunks
         context_blocks = []
@@ -3,32 +3,27 @@ Document upload and management endpoints
 """
 
 import uuid
-import os
-import inspect
-from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, BackgroundTasks, Query
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query
 from app.api.dependencies import get_current_user_id
+from app.config import settings
 from app.models.document import (
+    BulkUploadFileResult,
+    BulkUploadResponse,
+    BulkUploadStatusResponse,
     DocumentUploadResponse,
     DocumentMetadata,
     DocumentListResponse,
     DocumentUpdateRequest,
-    DocumentChunk,
+    IngestionPriority,
     ProcessingStatus,
 )
-from app.services import (
-    DocumentProcessor,
-    OCRService,
-    ChunkingService,
-    EmbeddingService,
-)
+from app.database.blob_store import BlobStore
+from app.database.extracted_texts import ExtractedTextStore
+from app.database.ingestion_queue import IngestionQueue
 from app.database.mongodb import get_documents_collection
-from app.database.mongodb import get_gridfs_bucket
 from app.database.vector_db import VectorDatabase
-from app.services.gridfs_tempfile import gridfs_to_tempfile
 from app.utils import (
-    calculate_file_hash,
     validate_file_type,
     validate_file_size,
     save_upload_file,
@@ -40,273 +35,388 @@ from app.utils import (
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
 
-async def process_document_background(
-    storage_backend: str,
-    file_path: Optional[str],
-    gridfs_id: Optional[str],
-    file_hash: str,
-    document_id: str,
-    tracking_id: str,
+async def _accept_upload(
+    file: UploadFile,
     user_id: str,
-    filename: str,
-    file_type: str,
-    tags: List[str],
+    tag_list: List[str],
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Validate, hash and store an uploaded file and record its metadata
+
+    Args:
+        file: Uploaded file
+        user_id: Authenticated user ID
+        tag_list: Document tags
+        metadata: Additional document metadata
+
+    Returns:
+        Tuple of (document record, True if the user already had this file)
+    """
+    # Validate file type
+    validate_file_type(file.filename)
+
+    # Get file size and validate
+    file.file.seek(0, 2)
+    file_size = file.file.tell()
+    file.file.seek(0)
+    validate_file_size(file_size)
+
+    # Store file blob in Mongo GridFS (canonical storage), shared across users by
+    # hash; the hash is computed while the bytes are written
+    blob_store = BlobStore()
+    file_hash, gridfs_id = await blob_store.put(file, file.filename, file.content_type, file_size)
+
+    # Check for duplicate
+    docs_collection = get_documents_collection()
+    existing_doc = await docs_collection.find_one({
+        "user_id": user_id,
+        "file_hash": file_hash
+    })
+    if existing_doc:
+        await blob_store.release(gridfs_id)
+        return existing_doc, True
+
+    # Generate IDs
+    document_id = str(uuid.uuid4())
+    tracking_id = str(uuid.uuid4())
+
+    # Determine file type
+    from pathlib import Path
+    extension = Path(file.filename).suffix.lower().lstrip('.')
+    file_type = get_file_type_from_extension(extension)
+
+    # Create document metadata
+    doc_metadata = DocumentMetadata(
+        document_id=document_id,
+        tracking_id=tracking_id,
+        user_id=user_id,
+        filename=file.filename,
+        file_hash=file_hash,
+        file_type=file_type,
+        storage_backend="gridfs",
+        file_path=None,
+        gridfs_id=gridfs_id,
+        content_type=file.content_type,
+        file_size=file_size,
+        tags=tag_list,
+        total_chunks=0,
+        status=ProcessingStatus.PENDING,
+        progress={"stage": "queued", "attempt": 0},
+        metadata=metadata or {},
+    )
+
+    # Store metadata in database
+    record = doc_metadata.model_dump()
+    try:
+        await docs_collection.insert_one(dict(record))
+    except BaseException:
+        await blob_store.release(gridfs_id)
+        raise
+    return record, False
+
+
+def _ingestion_payload(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Arguments an ingestion worker needs to process a stored document"""
+    return {
+        "storage_backend": doc["storage_backend"],
+        "file_path": doc.get("file_path"),
+        "gridfs_id": doc.get("gridfs_id"),
+        "file_hash": doc["file_hash"],
+        "tracking_id": doc["tracking_id"],
+        "filename": doc["filename"],
+        "file_type": doc["file_type"],
+        "tags": doc.get("tags", []),
+    }
+
+
+@router.post("/upload", response_model=DocumentUploadResponse)
+async def upload_document(
+    file: UploadFile = File(...),
+    tags: str = Form(default="general"),
+    priority: IngestionPriority = Form(default=IngestionPriority.NORMAL),
+    user_id: str = Depends(get_current_user_id),
 ):
     """
-    Background task to process document
+    Upload a document and queue it for processing
 
     Args:
-        file_path: Path to uploaded file
-        file_hash: SHA-256 hash of file
-        document_id: Document identifier
-        tracking_id: Tracking identifier
-        user_id: User identifier
-        filename: Original filename
-        file_type: Type of file
-        tags: Document tags
+        file: Uploaded file
+        tags: Comma-separated tags
+        priority: Ingestion queue priority (0 low, 1 normal, 2 high)
+        user_id: Authenticated user ID
+
+    Returns:
+        DocumentUploadResponse with processing status
     """
     try:
-        logger.info(f"Processing document {document_id} in background")
+        # Parse tags
+        tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
 
-        # Initialize services
-        doc_processor = DocumentProcessor()
-        ocr_service = OCRService()
-        chunking_service = ChunkingService()
-        embedding_service = EmbeddingService()
-        vector_db = VectorDatabase(user_id)
-        docs_collection = get_documents_collection()
+        doc, duplicate = await _accept_upload(file, user_id, tag_list)
+        if duplicate:
+            return DocumentUploadResponse(
+                document_id=doc["document_id"],
+                tracking_id=doc["tracking_id"],
+                filename=doc["filename"],
+                file_hash=doc["file_hash"],
+                file_type=doc["file_type"],
+                status=ProcessingStatus(doc["status"]),
+                total_chunks=doc.get("total_chunks", 0),
+                message="Document already exists (duplicate detected)",
+                uploaded_at=doc["uploaded_at"],
+            )
 
-        # Materialize to a local path (processors expect file paths)
-        tmp_path: Optional[str] = None
-        try:
-            if storage_backend == "gridfs":
-                if not gridfs_id:
-                    raise ValueError("gridfs_id is required for gridfs backend")
-                from pathlib import Path
-                suffix = Path(filename).suffix
-                tmp = await gridfs_to_tempfile(gridfs_id, suffix=suffix)
-                tmp_path = tmp.path
-                local_path = tmp_path
-            else:
-                if not file_path:
-                    raise ValueError("file_path is required for disk backend")
-                local_path = file_path
-
-            # Extract text based on file type
-            if file_type == 'image':
-                ocr_result = await ocr_service.extract_text_from_image(local_path)
-                text = ocr_result["text"]
-            else:
-                text, _ = await doc_processor.process_document(local_path)
-        finally:
-            if tmp_path:
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
-
-        # Validate extracted text
-        if not doc_processor.validate_extracted_text(text):
-            raise ValueError("Extracted text is too short or empty")
-
-        # Chunk the document
-        chunks_data = chunking_service.chunk_text(
-            text,
-            metadata={
-                "document_id": document_id,
-                "tracking_id": tracking_id,
-                "filename": filename,
-                "tags": tags,
-            }
+        # Queue for an ingestion worker
+        document_id = doc["document_id"]
+        await IngestionQueue().enqueue(document_id, user_id, _ingestion_payload(doc), priority=priority)
+
+        logger.info(f"Document upload queued: {document_id}")
+
+        return DocumentUploadResponse(
+            document_id=document_id,
+            tracking_id=doc["tracking_id"],
+            filename=file.filename,
+            file_hash=doc["file_hash"],
+            file_type=doc["file_type"],
+            status=ProcessingStatus.PENDING,
+            total_chunks=0,
+            message="Document uploaded successfully and queued for processing",
         )
 
-        # Generate embeddings
-        chunk_texts = [chunk["text"] for chunk in chunks_data]
-        embeddings, _ = await embedding_service.generate_embeddings(chunk_texts)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error uploading document: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Create DocumentChunk objects
-        chunks = []
-        for idx, (chunk_data, embedding) in enumerate(zip(chunks_data, embeddings)):
-            chunk = DocumentChunk(
-                chunk_id=f"{document_id}_chunk_{idx}",
-                document_id=document_id,
-                tracking_id=tracking_id,
-                user_id=user_id,
-                text=chunk_data["text"],
-                embedding=embedding,
-                chunk_index=idx,
-                total_chunks=len(chunks_data),
-                metadata={
-                    "filename": filename,
-                    "tags": tags,
-                    "word_count": chunk_data.get("word_count", 0),
-                    "char_count": chunk_data.get("char_count", 0),
-                }
-            )
-            chunks.append(chunk)
 
-        # Store chunks in vector database
-        await vector_db.insert_chunks(chunks)
+@router.post("/upload/bulk", response_model=BulkUploadResponse)
+async def upload_documents_bulk(
+    files: List[UploadFile] = File(...),
+    tags: str = Form(default="general"),
+    priority: IngestionPriority = Form(default=IngestionPriority.NORMAL),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Upload many documents and process them as one pipelined ingestion job
 
-        # Create text index for keyword search
-        await vector_db.create_text_index()
+    Files are hashed and stored here; an ingestion worker then runs them
+    through overlapping extract, chunk, embed and insert stages, with
+    embedding batches spanning files. A rejected or duplicate file does not
+    affect the others. Poll GET /documents/batches/{batch_id} for per-file
+    progress.
 
-        # Update document status to completed
-        await docs_collection.update_one(
-            {"document_id": document_id},
-            {
-                "$set": {
-                    "status": ProcessingStatus.COMPLETED,
-                    "total_chunks": len(chunks),
-                    "indexed_at": datetime.utcnow(),
-                }
-            }
+    Args:
+        files: Uploaded files
+        tags: Comma-separated tags applied to every file
+        priority: Ingestion queue priority (0 low, 1 normal, 2 high)
+        user_id: Authenticated user ID
+
+    Returns:
+        BulkUploadResponse with the batch ID and per-file results
+    """
+    if len(files) > settings.bulk_upload_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files: at most {settings.bulk_upload_max_files} per bulk upload",
         )
 
-        logger.info(f"Successfully processed document {document_id} with {len(chunks)} chunks")
+    try:
+        batch_id = str(uuid.uuid4())
+        tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
+        results: List[BulkUploadFileResult] = []
+        queued: List[Dict[str, Any]] = []
+
+        for file in files:
+            try:
+                doc, duplicate = await _accept_upload(file, user_id, tag_list, {"batch_id": batch_id})
+            except HTTPException as e:
+                results.append(BulkUploadFileResult(filename=file.filename or "", message=str(e.detail)))
+                continue
+            except Exception as e:
+                logger.error(f"Error storing {file.filename} of bulk upload {batch_id}: {e}")
+                results.append(BulkUploadFileResult(filename=file.filename or "", message=str(e)))
+                continue
+
+            results.append(BulkUploadFileResult(
+                filename=file.filename,
+                document_id=doc["document_id"],
+                tracking_id=doc["tracking_id"],
+                file_hash=doc["file_hash"],
+                file_type=doc["file_type"],
+                status=ProcessingStatus(doc["status"]),
+                duplicate=duplicate,
+                message=(
+                    "Document already exists (duplicate detected)" if duplicate
+                    else "Document uploaded successfully and queued for processing"
+                ),
+            ))
+            if not duplicate:
+                queued.append({"document_id": doc["document_id"], **_ingestion_payload(doc)})
+
+        if queued:
+            await IngestionQueue().enqueue(batch_id, user_id, {"documents": queued}, priority=priority)
+
+        logger.info(f"Bulk upload {batch_id} queued: {len(queued)} of {len(files)} files")
+
+        return BulkUploadResponse(
+            batch_id=batch_id,
+            queued=len(queued),
+            duplicates=sum(1 for result in results if result.duplicate),
+            rejected=sum(1 for result in results if result.document_id is None),
+            files=results,
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        # Include stack trace to diagnose background processing failures
-        try:
-            logger.exception(f"Error processing document {document_id}: {e}")
-        except Exception:
-            logger.error(f"Error processing document {document_id}: {e}")
-
-        # Update document status to failed
-        try:
-            await docs_collection.update_one(
-                {"document_id": document_id},
-                {"$set": {"status": ProcessingStatus.FAILED}}
-            )
-        except:
-            pass
+        logger.error(f"Error in bulk upload: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/upload", response_model=DocumentUploadResponse)
-async def upload_document(
-    background_tasks: BackgroundTasks,
+@router.get("/batches/{batch_id}", response_model=BulkUploadStatusResponse)
+async def get_bulk_upload_status(
+    batch_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Get per-file progress of a bulk upload
+
+    Args:
+        batch_id: Bulk upload identifier
+        user_id: Authenticated user ID
+
+    Returns:
+        BulkUploadStatusResponse with each file's status and progress
+    """
+    try:
+        cursor = get_documents_collection().find(
+            {"user_id": user_id, "metadata.batch_id": batch_id},
+            {"_id": 0, "document_id": 1, "filename": 1, "status": 1, "total_chunks": 1, "progress": 1},
+        ).sort("uploaded_at", 1)
+        documents = await cursor.to_list(length=None)
+        if not documents:
+            raise HTTPException(status_code=404, detail="Bulk upload not found")
+
+        status_counts: Dict[str, int] = {}
+        for doc in documents:
+            status = ProcessingStatus(doc["status"]).value
+            status_counts[status] = status_counts.get(status, 0) + 1
+
+        return BulkUploadStatusResponse(batch_id=batch_id, status_counts=status_counts, documents=documents)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting bulk upload {batch_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/{document_id}/file", response_model=DocumentUploadResponse)
+async def replace_document_file(
+    document_id: str,
     file: UploadFile = File(...),
-    tags: str = Form(default="general"),
+    priority: IngestionPriority = Form(default=IngestionPriority.NORMAL),
     user_id: str = Depends(get_current_user_id),
 ):
     """
-    Upload and process a document
+    Replace a document's file with an edited version and re-index it
+
+    The document keeps its IDs and tags. Re-indexing diffs the new chunks
+    against the stored ones, so only new or changed chunks are embedded.
 
     Args:
-        file: Uploaded file
-        tags: Comma-separated tags
+        document_id: Document identifier
+        file: Uploaded replacement file
+        priority: Ingestion queue priority (0 low, 1 normal, 2 high)
         user_id: Authenticated user ID
 
     Returns:
         DocumentUploadResponse with processing status
     """
     try:
-        # Validate file type
+        docs_collection = get_documents_collection()
+        doc = await docs_collection.find_one({
+            "document_id": document_id,
+            "user_id": user_id,
+        })
+
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+
         validate_file_type(file.filename)
 
-        # Get file size and validate
         file.file.seek(0, 2)
         file_size = file.file.tell()
         file.file.seek(0)
         validate_file_size(file_size)
 
-        # Calculate file hash
-        file_hash = await calculate_file_hash(file)
-
-        # Check for duplicate
-        docs_collection = get_documents_collection()
-        existing_doc = await docs_collection.find_one({
-            "user_id": user_id,
-            "file_hash": file_hash
-        })
-
-        if existing_doc:
+        blob_store = BlobStore()
+        file_hash, gridfs_id = await blob_store.put(file, file.filename, file.content_type, file_size)
+        if file_hash == doc["file_hash"]:
+            await blob_store.release(gridfs_id)
             return DocumentUploadResponse(
-                document_id=existing_doc["document_id"],
-                tracking_id=existing_doc["tracking_id"],
-                filename=existing_doc["filename"],
+                document_id=document_id,
+                tracking_id=doc["tracking_id"],
+                filename=doc["filename"],
                 file_hash=file_hash,
-                file_type=existing_doc["file_type"],
-                status=ProcessingStatus(existing_doc["status"]),
-                total_chunks=existing_doc.get("total_chunks", 0),
-                message="Document already exists (duplicate detected)",
-                uploaded_at=existing_doc["uploaded_at"],
+                file_type=doc["file_type"],
+                status=ProcessingStatus(doc["status"]),
+                total_chunks=doc.get("total_chunks", 0),
+                message="File unchanged; nothing to re-index",
+                uploaded_at=doc["uploaded_at"],
             )
 
-        # Generate IDs
-        document_id = str(uuid.uuid4())
-        tracking_id = str(uuid.uuid4())
+        tracking_id = doc["tracking_id"]
 
-        # Store file blob in Mongo GridFS (canonical storage)
-        await file.seek(0)
-        bucket = get_gridfs_bucket(bucket_name="user_uploads")
-        grid_in = bucket.open_upload_stream(
-            filename=file.filename,
-            metadata={
-                "user_id": user_id,
-                "file_hash": file_hash,
-                "document_id": document_id,
-                "tracking_id": tracking_id,
-                "content_type": file.content_type,
-            },
-        )
-        try:
-            while chunk := await file.read(8192):
-                await grid_in.write(chunk)
-        finally:
-            close_result = grid_in.close()
-            if inspect.isawaitable(close_result):
-                await close_result
-            await file.seek(0)
-
-        gridfs_id = str(grid_in._id)
-        file_path = None
-
-        # Determine file type
         from pathlib import Path
         extension = Path(file.filename).suffix.lower().lstrip('.')
         file_type = get_file_type_from_extension(extension)
 
-        # Parse tags
-        tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
-
-        # Create document metadata
-        doc_metadata = DocumentMetadata(
-            document_id=document_id,
-            tracking_id=tracking_id,
-            user_id=user_id,
-            filename=file.filename,
-            file_hash=file_hash,
-            file_type=file_type,
-            storage_backend="gridfs",
-            file_path=file_path,
-            gridfs_id=gridfs_id,
-            content_type=file.content_type,
-            file_size=file_size,
-            tags=tag_list,
-            total_chunks=0,
-            status=ProcessingStatus.PROCESSING,
+        await docs_collection.update_one(
+            {"document_id": document_id},
+            {
+                "$set": {
+                    "filename": file.filename,
+                    "file_hash": file_hash,
+                    "file_type": file_type,
+                    "storage_backend": "gridfs",
+                    "file_path": None,
+                    "gridfs_id": gridfs_id,
+                    "content_type": file.content_type,
+                    "file_size": file_size,
+                    "status": ProcessingStatus.PENDING,
+                    "progress": {"stage": "queued", "attempt": 0},
+                }
+            }
         )
 
-        # Store metadata in database
-        await docs_collection.insert_one(doc_metadata.model_dump())
+        # The previous blob is no longer referenced
+        if doc.get("storage_backend") == "gridfs" and doc.get("gridfs_id"):
+            await blob_store.release(doc["gridfs_id"])
+        elif doc.get("file_path"):
+            await delete_file(doc["file_path"])
+        await ExtractedTextStore().discard_unreferenced(doc["file_hash"])
 
-        # Process document in background
-        background_tasks.add_task(
-            process_document_background,
-            storage_backend="gridfs",
-            file_path=None,
-            gridfs_id=gridfs_id,
-            file_hash=file_hash,
-            document_id=document_id,
-            tracking_id=tracking_id,
-            user_id=user_id,
-            filename=file.filename,
-            file_type=file_type,
-            tags=tag_list,
+        # Supersedes any re-index of the previous file still waiting in the queue
+        await IngestionQueue().enqueue(
+            document_id,
+            user_id,
+            {
+                "storage_backend": "gridfs",
+                "file_path": None,
+                "gridfs_id": gridfs_id,
+                "file_hash": file_hash,
+                "tracking_id": tracking_id,
+                "filename": file.filename,
+                "file_type": file_type,
+                "tags": doc.get("tags", []),
+            },
+            priority=priority,
         )
 
-        logger.info(f"Document upload initiated: {document_id}")
+        logger.info(f"Document re-index queued: {document_id}")
 
         return DocumentUploadResponse(
             document_id=document_id,
@@ -314,15 +424,15 @@ async def upload_document(
             filename=file.filename,
             file_hash=file_hash,
             file_type=file_type,
-            status=ProcessingStatus.PROCESSING,
-            total_chunks=0,
-            message="Document uploaded successfully and processing started",
+            status=ProcessingStatus.PENDING,
+            total_chunks=doc.get("total_chunks", 0),
+            message="Document replaced; re-indexing changed chunks",
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error uploading document: {e}")
+        logger.error(f"Error replacing document {document_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -501,6 +611,10 @@ async def update_document(
         if not result:
             raise HTTPException(status_code=404, detail="Document not found")
 
+        # Tag filters run inside the vector store, so its chunks are relabelled too
+        if update_data.tags is not None:
+            await VectorDatabase(user_id).set_document_tags(document_id, update_data.tags)
+
         return DocumentMetadata(**result)
 
     except HTTPException:
@@ -537,23 +651,22 @@ async def delete_document(
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
 
+        # Stop pending and running ingestion, then drop the record first: an
+        # ingestion still in flight checks it before inserting and rolls back
+        await IngestionQueue().cancel_document(document_id)
+        await docs_collection.delete_one({"document_id": document_id})
+
         # Delete chunks from vector database
         vector_db = VectorDatabase(user_id)
         deleted_chunks = await vector_db.delete_document_chunks(document_id)
 
         # Delete stored file (GridFS preferred, but keep disk backward compatibility)
         if doc.get("storage_backend") == "gridfs" and doc.get("gridfs_id"):
-            try:
-                from bson import ObjectId
-                bucket = get_gridfs_bucket(bucket_name="user_uploads")
-                await bucket.delete(ObjectId(doc["gridfs_id"]))
-            except Exception:
-                pass
+            await BlobStore().release(doc["gridfs_id"])
         elif doc.get("file_path"):
             await delete_file(doc["file_path"])
 
-        # Delete metadata
-        await docs_collection.delete_one({"document_id": document_id})
+        await ExtractedTextStore().discard_unreferenced(doc["file_hash"])
 
         logger.info(f"Deleted document {document_id} with {deleted_chunks} chunks")
 
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from app.api.dependencies import get_current_user_id
 from app.services.embedding_service import EmbeddingService
+from app.services.embedding_executor import EmbeddingBackpressureError
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/embeddings", tags=["Embeddings"])
@@ -15,7 +16,7 @@ router = APIRouter(prefix="/embeddings", tags=["Embeddings"])
 class EmbeddingRequest(BaseModel):
     """Request model for generating embeddings"""
     texts: List[str] = Field(..., description="List of texts to embed", min_length=1)
-    provider: str = Field(default="openai", description="Embedding provider (openai, cohere, huggingface)")
+    provider: str = Field(default="openai", description="Embedding provider (huggingface, huggingface-onnx, cohere)")
     model: Optional[str] = Field(None, description="Specific model to use")
 
 
@@ -55,13 +56,16 @@ async def generate_embeddings(
             model=request.model
         )
 
+        # Lists are only materialized here, at the JSON boundary
         return EmbeddingResponse(
-            embeddings=embeddings,
+            embeddings=embeddings.tolist(),
             dimensions=dimensions,
             provider=request.provider,
             count=len(embeddings),
         )
 
+    except EmbeddingBackpressureError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except ValueError as e:
         logger.error(f"Invalid embedding request: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -2,10 +2,15 @@
 Health check endpoints
 """
 
+import asyncio
 from fastapi import APIRouter
 from datetime import datetime
 from app.config import settings
 from app.database.mongodb import _client
+from app.services.embedding_model_registry import embedding_model_registry
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_executor import embedding_executor
+from app.services.embedding_batcher import query_embedding_batcher
 
 router = APIRouter(prefix="/health", tags=["Health"])
 
@@ -44,3 +49,20 @@ async def database_health():
             "error": str(e),
             "timestamp": datetime.utcnow().isoformat(),
         }
+
+
+@router.get("/embeddings")
+async def embedding_models_health():
+    """Report embedding registry, cache, executor and micro-batching counters"""
+    return {
+        "status": "healthy",
+        "registry": embedding_model_registry.stats(),
+        # Counts rows of the SQLite tier
+        "cache": await asyncio.to_thread(embedding_cache.stats),
+        "executor": embedding_executor.stats(),
+        "micro_batching": {
+            "enabled": settings.embedding_micro_batch_enabled,
+            **query_embedding_batcher.stats(),
+        },
+        "timestamp": datetime.utcnow().isoformat(),
+    }
@@ -15,6 +15,7 @@ from collections import defaultdict
 from app.models.search import (
     QueryRequest,
     QueryResponse,
+    SearchRequest,
     SearchResult,
     DocumentGroup,
     QueryScope,
@@ -23,7 +24,7 @@ from app.models.search import (
 from app.api.dependencies import get_current_user
 from app.services.search_service import SearchService
 from app.services.embedding_service import EmbeddingService
-from app.database.vector_db import VectorDatabase
+from app.services.embedding_executor import EmbeddingBackpressureError
 from app.database.mongodb import get_database
 from app.utils.logger import logger
 
@@ -97,80 +98,39 @@ async def query_documents(
         # Initialize services
         embedding_service = EmbeddingService()
         search_service = SearchService(user_id, embedding_service)
-        vector_db = VectorDatabase(user_id)
-
-        # Generate query embedding for semantic/hybrid search
-        query_embedding = None
-        if request.mode in [SearchMode.SEMANTIC, SearchMode.HYBRID]:
-            logger.info(f"Generating embedding for query: {request.query[:50]}...")
-            embeddings, dimensions = await embedding_service.generate_embeddings(
-                [request.query],
-                provider="openai"
-            )
-            query_embedding = embeddings[0]
-
-        # Build filter criteria based on scope
-        filters = {}
-
-        # Add tag filters if provided
-        if request.tags:
-            filters["tags"] = {"$in": request.tags}
 
-        # Apply scope-specific filters
+        # Scope filters are evaluated inside the vector store / keyword index
+        tracking_ids = None
         if request.scope == QueryScope.DOCUMENT:
-            filters["document_id"] = request.document_id
             logger.info(f"Querying document: {request.document_id}")
 
         elif request.scope == QueryScope.TRACKING_IDS:
-            filters["tracking_id"] = {"$in": request.tracking_ids}
+            tracking_ids = request.tracking_ids
             logger.info(f"Querying {len(request.tracking_ids)} tracking IDs")
 
         else:  # COLLECTION
             logger.info(f"Querying entire collection for user: {user_id}")
 
-        # Perform search based on mode
-        results = []
-
-        if request.mode == SearchMode.SEMANTIC:
-            # Vector similarity search
-            results = await vector_db.search_by_vector(
-                query_embedding=query_embedding,
-                top_k=request.top_k,
-                document_id=request.document_id,
-                tags=request.tags,
-                min_score=request.min_score
-            )
-
-        elif request.mode == SearchMode.KEYWORD:
-            # Keyword search
-            from app.models.search import SearchRequest
-            search_request = SearchRequest(
-                query=request.query,
-                mode=SearchMode.KEYWORD,
-                top_k=request.top_k,
-                tags=request.tags,
-                document_id=request.document_id,
-                min_score=request.min_score
-            )
-            search_response = await search_service.search(search_request)
-            results = search_response.results
-
-        elif request.mode == SearchMode.HYBRID:
-            # Hybrid search (combines semantic + keyword)
-            from app.models.search import SearchRequest
-            search_request = SearchRequest(
-                query=request.query,
-                mode=SearchMode.HYBRID,
-                top_k=request.top_k,
-                tags=request.tags,
-                document_id=request.document_id,
-                min_score=request.min_score
-            )
-            search_response = await search_service.search(search_request)
-            results = search_response.results
+        # Every mode goes through SearchService, which embeds the query at most
+        # once and serves repeated queries from the result cache
+        search_request = SearchRequest(
+            query=request.query,
+            mode=request.mode,
+            top_k=request.top_k,
+            tags=request.tags,
+            document_id=request.document_id,
+            tracking_ids=tracking_ids,
+            min_score=request.min_score,
+            fusion=request.fusion,
+            semantic_weight=request.semantic_weight,
+            keyword_weight=request.keyword_weight
+        )
+        search_response = await search_service.search(search_request)
+        results = search_response.results
 
-        # Filter by minimum score if specified
-        if request.min_score:
+        # Filter by minimum score if specified (hybrid applies it to the semantic
+        # leg; fused scores are not similarities)
+        if request.min_score and request.mode != SearchMode.HYBRID:
             results = [r for r in results if r.score >= request.min_score]
 
         # Results are already SearchResult objects, no conversion needed
@@ -196,6 +156,12 @@ async def query_documents(
             filters_applied["tracking_ids"] = request.tracking_ids
         if request.min_score:
             filters_applied["min_score"] = request.min_score
+        if request.mode == SearchMode.HYBRID:
+            filters_applied["fusion"] = request.fusion.value
+            filters_applied["weights"] = {
+                "semantic": request.semantic_weight,
+                "keyword": request.keyword_weight
+            }
 
         # Calculate processing time
         processing_time_ms = (time.time() - start_time) * 1000
@@ -212,11 +178,17 @@ async def query_documents(
             scope=request.scope,
             mode=request.mode,
             filters_applied=filters_applied,
-            processing_time_ms=processing_time_ms
+            processing_time_ms=processing_time_ms,
+            processing_breakdown=search_response.processing_breakdown
         )
 
     except HTTPException:
         raise
+    except EmbeddingBackpressureError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Query error: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from app.api.dependencies import get_current_user_id
 from app.models.search import SearchRequest, SearchResponse
 from app.services.search_service import SearchService
+from app.services.embedding_executor import EmbeddingBackpressureError
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/search", tags=["Search"])
@@ -32,6 +33,8 @@ async def search_documents(
 
         return results
 
+    except EmbeddingBackpressureError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         logger.error(f"Error performing search: {e}")
         raise HTTPException(status_code=500, detail=str(e))
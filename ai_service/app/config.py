@@ -32,6 +32,38 @@ class Settings(BaseSettings):
         env="HUGGINGFACE_MODEL"
     )
 
+    # ONNX Runtime backend for the "huggingface-onnx" provider
+    onnx_model_dir: str = Field(default="./cache/onnx", env="ONNX_MODEL_DIR")
+    onnx_quantize: bool = Field(default=False, env="ONNX_QUANTIZE")
+    onnx_intra_op_threads: int = Field(default=0, env="ONNX_INTRA_OP_THREADS", ge=0)
+    onnx_min_cosine_similarity: float = Field(default=0.999, env="ONNX_MIN_COSINE_SIMILARITY")
+    onnx_min_cosine_similarity_int8: float = Field(default=0.98, env="ONNX_MIN_COSINE_SIMILARITY_INT8")
+
+    # Embedding Cache Configuration
+    embedding_cache_enabled: bool = Field(default=True, env="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_max_items: int = Field(default=10000, env="EMBEDDING_CACHE_MAX_ITEMS")
+    embedding_cache_disk_enabled: bool = Field(default=True, env="EMBEDDING_CACHE_DISK_ENABLED")
+    embedding_cache_path: str = Field(
+        default="./cache/embeddings.sqlite3",
+        env="EMBEDDING_CACHE_PATH"
+    )
+
+    # Embedding Executor Configuration (encoding runs off the event loop)
+    embedding_executor_mode: str = Field(default="thread", env="EMBEDDING_EXECUTOR_MODE")
+    embedding_executor_workers: int = Field(default=2, env="EMBEDDING_EXECUTOR_WORKERS", ge=1)
+    embedding_max_pending: int = Field(default=8, env="EMBEDDING_MAX_PENDING", ge=1)
+    embedding_queue_timeout_seconds: float = Field(default=30.0, env="EMBEDDING_QUEUE_TIMEOUT_SECONDS")
+
+    # Query Embedding Micro-Batching (opt-in)
+    embedding_micro_batch_enabled: bool = Field(default=False, env="EMBEDDING_MICRO_BATCH_ENABLED")
+    embedding_micro_batch_window_ms: float = Field(default=5.0, env="EMBEDDING_MICRO_BATCH_WINDOW_MS")
+    embedding_micro_batch_max_size: int = Field(default=32, env="EMBEDDING_MICRO_BATCH_MAX_SIZE", ge=1)
+
+    # Stored Vector Precision (vectors we persist ourselves, e.g. faculty_embeddings)
+    embedding_storage_precision: str = Field(default="float32", env="EMBEDDING_STORAGE_PRECISION")
+    embedding_storage_keep_full: bool = Field(default=False, env="EMBEDDING_STORAGE_KEEP_FULL")
+    embedding_rerank_candidates: int = Field(default=50, env="EMBEDDING_RERANK_CANDIDATES", ge=0)
+
     # Firecrawl Configuration (for web scraping)
     firecrawl_api_key: Optional[str] = Field(default=None, env="FIRECRAWL_API_KEY")
 
@@ -81,15 +113,64 @@ class Settings(BaseSettings):
         env="ALLOWED_FILE_TYPES"
     )
     upload_dir: str = Field(default="./uploads", env="UPLOAD_DIR")
+    # Stored files up to this size are extracted fully in memory; larger ones spill to a temp file
+    extraction_spool_threshold_mb: int = Field(default=16, env="EXTRACTION_SPOOL_THRESHOLD_MB")
+    # PDF text extraction: PDFs with at least pdf_parallel_min_pages pages are split
+    # into page ranges extracted on a process pool
+    pdf_extraction_workers: int = Field(
+        default=min(4, os.cpu_count() or 1), env="PDF_EXTRACTION_WORKERS", ge=1
+    )
+    pdf_pages_per_task: int = Field(default=25, env="PDF_PAGES_PER_TASK", ge=1)
+    pdf_parallel_min_pages: int = Field(default=40, env="PDF_PARALLEL_MIN_PAGES", ge=1)
 
     # Processing Configuration
-    chunk_size: int = Field(default=1000, env="CHUNK_SIZE")
-    chunk_overlap: int = Field(default=200, env="CHUNK_OVERLAP")
-    max_concurrent_uploads: int = Field(default=5, env="MAX_CONCURRENT_UPLOADS")
+    # Chunk sizes are tokenizer tokens; all-MiniLM-L6-v2 truncates at 256
+    chunk_size: int = Field(default=250, env="CHUNK_SIZE")
+    chunk_overlap: int = Field(default=40, env="CHUNK_OVERLAP")
+    chunk_boundary_mode: str = Field(default="sentence", env="CHUNK_BOUNDARY_MODE")  # sentence | paragraph
+    chunk_tokenizer: str = Field(default="auto", env="CHUNK_TOKENIZER")  # auto | regex
+    chunk_embed_batch_size: int = Field(default=64, env="CHUNK_EMBED_BATCH_SIZE")
+    # Cross-document chunk dedup: off | exact (content hash) | near (hash + MinHash)
+    chunk_dedup_mode: str = Field(default="off", env="CHUNK_DEDUP_MODE")
+    chunk_dedup_near_threshold: float = Field(default=0.85, env="CHUNK_DEDUP_NEAR_THRESHOLD", ge=0.0, le=1.0)
+    # Ingestion queue: documents processed at once across all workers, and per user
+    max_concurrent_uploads: int = Field(default=5, env="MAX_CONCURRENT_UPLOADS", ge=1)
+    ingestion_per_user_limit: int = Field(default=2, env="INGESTION_PER_USER_LIMIT", ge=1)
+    ingestion_worker_concurrency: int = Field(default=2, env="INGESTION_WORKER_CONCURRENCY", ge=1)
+    ingestion_max_attempts: int = Field(default=3, env="INGESTION_MAX_ATTEMPTS", ge=1)
+    ingestion_retry_backoff_seconds: float = Field(default=30.0, env="INGESTION_RETRY_BACKOFF_SECONDS", ge=0)
+    ingestion_lease_seconds: float = Field(default=300.0, env="INGESTION_LEASE_SECONDS", gt=0)
+    ingestion_poll_interval_seconds: float = Field(default=1.0, env="INGESTION_POLL_INTERVAL_SECONDS", gt=0)
+    # Let identical uploads of different users reuse each other's chunk embeddings
+    # (requires the embedding cache)
+    blob_share_embeddings: bool = Field(default=False, env="BLOB_SHARE_EMBEDDINGS")
+    # Bulk upload: files per request, documents extracted at once, and the
+    # bound on items waiting between pipeline stages
+    bulk_upload_max_files: int = Field(default=20, env="BULK_UPLOAD_MAX_FILES", ge=1)
+    bulk_extract_concurrency: int = Field(default=3, env="BULK_EXTRACT_CONCURRENCY", ge=1)
+    bulk_pipeline_queue_size: int = Field(default=256, env="BULK_PIPELINE_QUEUE_SIZE", ge=1)
+    # BM25 keyword search: term-frequency saturation and length normalization
+    keyword_bm25_k1: float = Field(default=1.2, env="KEYWORD_BM25_K1", ge=0.0)
+    keyword_bm25_b: float = Field(default=0.75, env="KEYWORD_BM25_B", ge=0.0, le=1.0)
+    # Hybrid search: RRF rank constant and candidates fetched per leg (x top_k)
+    hybrid_rrf_k: int = Field(default=60, env="HYBRID_RRF_K", ge=1)
+    hybrid_candidate_multiplier: int = Field(default=2, env="HYBRID_CANDIDATE_MULTIPLIER", ge=1)
+    # Search result cache (per API process; invalidated by collection versions)
+    search_cache_enabled: bool = Field(default=True, env="SEARCH_CACHE_ENABLED")
+    search_cache_max_items: int = Field(default=1000, env="SEARCH_CACHE_MAX_ITEMS", ge=0)
+    search_cache_ttl_seconds: float = Field(default=300.0, env="SEARCH_CACHE_TTL_SECONDS", gt=0)
 
     # OCR Configuration
     tesseract_path: str = Field(default="/usr/bin/tesseract", env="TESSERACT_PATH")
     ocr_languages: str = Field(default="eng", env="OCR_LANGUAGES")
+    # Scanned PDFs are rasterized at ocr_pdf_dpi by ocr_raster_threads pdftoppm
+    # processes, then pages are OCRed in parallel on ocr_workers processes
+    ocr_pdf_dpi: int = Field(default=300, env="OCR_PDF_DPI", ge=72)
+    ocr_raster_threads: int = Field(default=2, env="OCR_RASTER_THREADS", ge=1)
+    ocr_workers: int = Field(default=min(4, os.cpu_count() or 1), env="OCR_WORKERS", ge=1)
+    ocr_binarize: bool = Field(default=False, env="OCR_BINARIZE")
+    # Preprocessed (grayscale/binarized) images kept for reuse, e.g. by layout OCR
+    ocr_image_cache_size: int = Field(default=16, env="OCR_IMAGE_CACHE_SIZE", ge=0)
 
     # Logging Configuration
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
@@ -187,6 +268,11 @@ class Settings(BaseSettings):
         """Convert max file size from MB to bytes"""
         return self.max_file_size_mb * 1024 * 1024
 
+    @property
+    def extraction_spool_threshold_bytes(self) -> int:
+        """Convert the extraction spool threshold from MB to bytes"""
+        return self.extraction_spool_threshold_mb * 1024 * 1024
+
     @property
     def is_production(self) -> bool:
         """Check if running in production environment"""
@@ -21,16 +21,25 @@ class ChromaManager:
         self._collections: Dict[str, Any] = {}
 
     def initialize(self):
-        """Initialize ChromaDB client with persistent storage"""
+        """Initialize ChromaDB client (embedded persistent storage or a Chroma server)"""
         try:
-            self._client = chromadb.PersistentClient(
-                path=settings.CHROMA_PERSIST_DIRECTORY,
-                settings=ChromaSettings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
+            chroma_settings = ChromaSettings(
+                anonymized_telemetry=False,
+                allow_reset=True
             )
-            logger.info(f"ChromaDB initialized at {settings.CHROMA_PERSIST_DIRECTORY}")
+            if settings.CHROMA_CLIENT_MODE == "http":
+                self._client = chromadb.HttpClient(
+                    host=settings.CHROMA_HOST,
+                    port=settings.CHROMA_PORT,
+                    settings=chroma_settings
+                )
+                logger.info(f"ChromaDB connected at {settings.CHROMA_HOST}:{settings.CHROMA_PORT}")
+            else:
+                self._client = chromadb.PersistentClient(
+                    path=settings.CHROMA_PERSIST_DIRECTORY,
+                    settings=chroma_settings
+                )
+                logger.info(f"ChromaDB initialized at {settings.CHROMA_PERSIST_DIRECTORY}")
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB: {e}")
             raise
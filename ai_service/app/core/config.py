@@ -17,6 +17,10 @@ class Settings(BaseSettings):
     GROQ_API_KEY: Optional[str] = Field(default=None, env="GROQ_API_KEY")
 
     # ChromaDB Configuration
+    # "embedded" opens CHROMA_PERSIST_DIRECTORY in-process; "http" connects to a
+    # Chroma server at CHROMA_HOST:CHROMA_PORT (needed when a standalone
+    # ingestion worker and the API share the same collections)
+    CHROMA_CLIENT_MODE: str = Field(default="embedded", env="CHROMA_CLIENT_MODE")
     CHROMA_PERSIST_DIRECTORY: str = Field(default="./chroma_db", env="CHROMA_PERSIST_DIRECTORY")
     CHROMA_HOST: str = Field(default="localhost", env="CHROMA_HOST")
     CHROMA_PORT: int = Field(default=8000, env="CHROMA_PORT")
@@ -75,6 +79,11 @@ class Settings(BaseSettings):
     ENABLE_ADMISSION_MODEL_LOAD: bool = Field(default=True, env="ENABLE_ADMISSION_MODEL_LOAD")
     ENABLE_MULTI_AGENT: bool = Field(default=True, env="ENABLE_MULTI_AGENT")
     ENABLE_ROADMAP: bool = Field(default=True, env="ENABLE_ROADMAP")
+    ENABLE_EMBEDDING_PREWARM: bool = Field(default=False, env="ENABLE_EMBEDDING_PREWARM")
+    # Run an ingestion worker inside the API process. Unset means: inline with
+    # the embedded Chroma store (only one process may open it), otherwise
+    # expect a standalone `python -m app.workers.ingestion_worker`
+    ENABLE_INLINE_INGESTION_WORKER: Optional[bool] = Field(default=None, env="ENABLE_INLINE_INGESTION_WORKER")
 
     # Additional MongoDB Configuration
     MONGODB_DB_NAME: str = Field(default="edulens", env="MONGODB_DB_NAME")
@@ -154,6 +163,13 @@ class Settings(BaseSettings):
         """Alias for MONGODB_DB_NAME for compatibility."""
         return self.MONGODB_DB_NAME
 
+    @property
+    def inline_ingestion_worker(self) -> bool:
+        """Whether the API process runs the ingestion worker itself."""
+        if self.ENABLE_INLINE_INGESTION_WORKER is not None:
+            return self.ENABLE_INLINE_INGESTION_WORKER
+        return self.CHROMA_CLIENT_MODE == "embedded"
+
 
 # Global settings instance
 settings = Settings()
@@ -0,0 +1,167 @@
+"""
+Content-addressed, reference-counted file blobs
+
+Uploaded bytes are stored in the ``user_uploads`` GridFS bucket once per
+SHA-256 hash, however many users upload them. A record in the ``blobs``
+collection maps the hash to the GridFS file and counts the documents that
+point at it; per-user document metadata keeps only the ``gridfs_id``. The
+GridFS file is deleted when the last reference is released.
+
+Uploads are hashed while they are written to GridFS, so the bytes are read
+once; when the finished hash turns out to exist already, the fresh copy is
+deleted and the existing blob is referenced.
+
+Because extracted text is cached per hash too (see ``extracted_texts``), a
+shared blob is also extracted only once.
+"""
+
+import hashlib
+import inspect
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.database.mongodb import get_database, get_gridfs_bucket
+from app.utils.logger import logger
+
+# Size of each read from the upload (and write into GridFS)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class BlobStore:
+    """Shared file blobs in GridFS, tracked in the ``blobs`` collection"""
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection = None,
+        bucket: AsyncIOMotorGridFSBucket = None
+    ):
+        """
+        Initialize the store
+
+        Args:
+            collection: Optional collection (default: blobs in the app database)
+            bucket: Optional GridFS bucket (default: user_uploads)
+        """
+        self.collection = collection if collection is not None else get_database()["blobs"]
+        self.bucket = bucket if bucket is not None else get_gridfs_bucket(bucket_name="user_uploads")
+
+    async def _acquire(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one_and_update(
+            {"file_hash": file_hash},
+            {"$inc": {"ref_count": 1}, "$set": {"last_referenced_at": datetime.utcnow()}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _upload(self, file: Any, filename: str, content_type: Optional[str]) -> Tuple[str, Any]:
+        """Write the upload to a new GridFS file, hashing it on the way; one read pass"""
+        sha256 = hashlib.sha256()
+        await file.seek(0)
+        grid_in = self.bucket.open_upload_stream(filename=filename)
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                sha256.update(chunk)
+                await grid_in.write(chunk)
+            file_hash = sha256.hexdigest()
+            # Not closed yet, so this is written along with the file document
+            await grid_in.set("metadata", {"file_hash": file_hash, "content_type": content_type})
+        except BaseException:
+            abort_result = grid_in.abort()
+            if inspect.isawaitable(abort_result):
+                await abort_result
+            raise
+        finally:
+            await file.seek(0)
+        close_result = grid_in.close()
+        if inspect.isawaitable(close_result):
+            await close_result
+        return file_hash, grid_in._id
+
+    async def _delete_file(self, gridfs_id: Any) -> None:
+        try:
+            await self.bucket.delete(ObjectId(gridfs_id))
+        except Exception as e:
+            logger.warning(f"Could not delete GridFS file {gridfs_id}: {e}")
+
+    async def put(
+        self,
+        file: Any,
+        filename: str,
+        content_type: Optional[str] = None,
+        size: Optional[int] = None
+    ) -> Tuple[str, str]:
+        """
+        Store an upload and take a reference to the blob with its hash
+
+        The bytes are hashed while they are written, in a single pass. If a
+        blob with the same hash already exists the new copy is deleted again
+        and the existing blob is referenced instead.
+
+        Args:
+            file: Upload with async ``read``/``seek`` (e.g. FastAPI UploadFile)
+            filename: Name recorded on the GridFS file
+            content_type: MIME type
+            size: File size in bytes
+
+        Returns:
+            Tuple of (SHA-256 hash of the file, GridFS id of the shared blob)
+        """
+        file_hash, gridfs_id = await self._upload(file, filename, content_type)
+        while True:
+            blob = await self._acquire(file_hash)
+            if blob is not None:
+                await self._delete_file(gridfs_id)
+                return file_hash, blob["gridfs_id"]
+
+            now = datetime.utcnow()
+            try:
+                await self.collection.insert_one({
+                    "file_hash": file_hash,
+                    "gridfs_id": str(gridfs_id),
+                    "size": size,
+                    "content_type": content_type,
+                    "ref_count": 1,
+                    "created_at": now,
+                    "last_referenced_at": now,
+                })
+                return file_hash, str(gridfs_id)
+            except DuplicateKeyError:
+                # Someone stored the same bytes meanwhile; reference theirs
+                continue
+
+    async def release(self, gridfs_id: str) -> bool:
+        """
+        Drop one reference to a blob, deleting it after the last one
+
+        Files stored before blobs were shared have no blob record and are
+        deleted directly.
+
+        Args:
+            gridfs_id: GridFS id held by the document
+
+        Returns:
+            True if the GridFS file was deleted
+        """
+        blob = await self.collection.find_one_and_update(
+            {"gridfs_id": gridfs_id},
+            {"$inc": {"ref_count": -1}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if blob is None:
+            await self._delete_file(gridfs_id)
+            return True
+        if blob["ref_count"] > 0:
+            return False
+
+        # A concurrent put may have revived it in the meantime
+        deleted = await self.collection.find_one_and_delete(
+            {"gridfs_id": gridfs_id, "ref_count": {"$lte": 0}}
+        )
+        if deleted is None:
+            return False
+        await self._delete_file(gridfs_id)
+        return True
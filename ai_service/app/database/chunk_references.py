@@ -0,0 +1,113 @@
+"""
+Storage for deduplicated chunks
+
+When chunk deduplication is enabled, a chunk whose text duplicates (exactly
+or nearly) a chunk already in the user's Chroma collection is not given a
+vector of its own. Instead a reference record is stored here, pointing at the
+canonical chunk. Searches that hit the canonical chunk fan back out to every
+document that references it.
+"""
+
+from typing import Any, Dict, List
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from app.database.mongodb import get_database
+
+
+class ChunkReferenceStore:
+    """Per-user reference records in the ``chunk_references`` collection"""
+
+    def __init__(self, user_id: str, collection: AsyncIOMotorCollection = None):
+        """
+        Initialize the store
+
+        Args:
+            user_id: User identifier (every query is scoped to it)
+            collection: Optional collection (default: chunk_references in the app database)
+        """
+        self.user_id = user_id
+        self.collection = collection if collection is not None else get_database()["chunk_references"]
+
+    async def _find(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        cursor = self.collection.find({"user_id": self.user_id, **query}, {"_id": 0})
+        return await cursor.to_list(length=None)
+
+    async def add(self, references: List[Dict[str, Any]]) -> int:
+        """
+        Insert or replace reference records
+
+        Args:
+            references: Chunk metadata plus chunk_id, canonical_id and text
+
+        Returns:
+            Number of records written
+        """
+        if not references:
+            return 0
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"user_id": self.user_id, "chunk_id": ref["chunk_id"]},
+                {"$set": {**ref, "user_id": self.user_id}},
+                upsert=True,
+            )
+            for ref in references
+        ])
+        return len(references)
+
+    async def by_ids(self, chunk_ids: List[str]) -> List[Dict[str, Any]]:
+        """References with the given chunk IDs"""
+        if not chunk_ids:
+            return []
+        return await self._find({"chunk_id": {"$in": list(chunk_ids)}})
+
+    async def by_canonical(self, canonical_ids: List[str]) -> List[Dict[str, Any]]:
+        """References pointing at any of the given canonical chunks"""
+        if not canonical_ids:
+            return []
+        return await self._find({"canonical_id": {"$in": list(canonical_ids)}})
+
+    async def by_document(self, document_id: str) -> List[Dict[str, Any]]:
+        """References owned by a document"""
+        return await self._find({"document_id": document_id})
+
+    async def all(self, include_text: bool = False) -> List[Dict[str, Any]]:
+        """Every reference of the user (without chunk text unless asked for)"""
+        cursor = self.collection.find(
+            {"user_id": self.user_id}, {"_id": 0} if include_text else {"_id": 0, "text": 0}
+        )
+        return await cursor.to_list(length=None)
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Overwrite metadata fields of existing references
+
+        Args:
+            updates: Mapping of chunk ID to metadata fields to set
+
+        Returns:
+            Number of references updated
+        """
+        if not updates:
+            return 0
+        result = await self.collection.bulk_write([
+            UpdateOne({"user_id": self.user_id, "chunk_id": chunk_id}, {"$set": fields})
+            for chunk_id, fields in updates.items()
+        ])
+        return result.matched_count
+
+    async def repoint(self, old_canonical_id: str, new_canonical_id: str) -> int:
+        """Move every reference of one canonical chunk to another"""
+        result = await self.collection.update_many(
+            {"user_id": self.user_id, "canonical_id": old_canonical_id},
+            {"$set": {"canonical_id": new_canonical_id}},
+        )
+        return result.modified_count
+
+    async def delete(self, chunk_ids: List[str]) -> int:
+        """Delete references by chunk ID"""
+        if not chunk_ids:
+            return 0
+        result = await self.collection.delete_many(
+            {"user_id": self.user_id, "chunk_id": {"$in": list(chunk_ids)}}
+        )
+        return result.deleted_count
@@ -0,0 +1,55 @@
+"""
+Per-user search collection version counters
+
+Every write to a user's searchable chunks (vector collection, keyword index
+or chunk metadata) bumps the user's counter in ``search_collection_versions``.
+Cached search results are keyed by the version they were computed at, so a
+write invalidates them in every API process at once.
+
+The same document records which one-off migrations of the user's chunks
+have run (``migrations.<name>``).
+"""
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.database.mongodb import get_database
+
+
+class CollectionVersions:
+    """Version counter of one user's searchable chunks"""
+
+    def __init__(self, user_id: str, collection: AsyncIOMotorCollection = None):
+        """
+        Initialize the counter
+
+        Args:
+            user_id: User identifier
+            collection: Optional collection (default: search_collection_versions)
+        """
+        self.user_id = user_id
+        self.collection = collection if collection is not None else get_database()["search_collection_versions"]
+
+    async def current(self) -> int:
+        """Current version (0 before the first write)"""
+        doc = await self.collection.find_one({"user_id": self.user_id}, {"_id": 0, "version": 1})
+        return doc["version"] if doc else 0
+
+    async def bump(self) -> None:
+        """Mark the user's chunks as changed"""
+        await self.collection.update_one(
+            {"user_id": self.user_id},
+            {"$inc": {"version": 1}},
+            upsert=True,
+        )
+
+    async def is_migrated(self, name: str) -> bool:
+        """Whether the named migration has run for the user's chunks"""
+        doc = await self.collection.find_one({"user_id": self.user_id}, {"_id": 0, f"migrations.{name}": 1})
+        return bool(doc and doc.get("migrations", {}).get(name))
+
+    async def mark_migrated(self, name: str) -> None:
+        """Record that the named migration has run for the user's chunks"""
+        await self.collection.update_one(
+            {"user_id": self.user_id},
+            {"$set": {f"migrations.{name}": True}},
+            upsert=True,
+        )
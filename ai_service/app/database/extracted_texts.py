@@ -0,0 +1,112 @@
+"""
+Cache of extracted document text
+
+Text extracted from an uploaded file is stored once per ``file_hash`` in the
+``extracted_texts`` collection and reused by SOP generation, LOR and the
+analyzer instead of re-reading the blob and re-parsing it. Entries are keyed by
+content, so a replaced file (new hash) never sees stale text; an entry is
+dropped once no document references its hash.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.database.mongodb import get_database, get_documents_collection
+
+
+class ExtractedTextStore:
+    """Extracted text records in the ``extracted_texts`` collection"""
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection = None,
+        documents: AsyncIOMotorCollection = None
+    ):
+        """
+        Initialize the store
+
+        Args:
+            collection: Optional collection (default: extracted_texts in the app database)
+            documents: Optional documents collection (default: documents metadata)
+        """
+        self.collection = collection if collection is not None else get_database()["extracted_texts"]
+        self.documents = documents if documents is not None else get_documents_collection()
+
+    async def get(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Cached extraction for a file hash, if any"""
+        return await self.collection.find_one({"file_hash": file_hash}, {"_id": 0})
+
+    async def get_for_document(self, user_id: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a user's document together with its cached extraction
+
+        Both come back in one round trip (the documents lookup joined to
+        ``extracted_texts`` on the file hash).
+
+        Args:
+            user_id: Owner of the document
+            document_id: Document identifier
+
+        Returns:
+            The document, with the cached extraction under ``extracted``
+            (None on a cache miss), or None if the document does not exist
+        """
+        cursor = self.documents.aggregate([
+            {"$match": {"document_id": document_id, "user_id": user_id}},
+            {"$limit": 1},
+            {"$lookup": {
+                "from": self.collection.name,
+                "localField": "file_hash",
+                "foreignField": "file_hash",
+                "as": "extracted",
+            }},
+            {"$project": {"_id": 0, "extracted._id": 0}},
+        ])
+        docs = await cursor.to_list(length=1)
+        if not docs:
+            return None
+        doc = docs[0]
+        doc["extracted"] = doc["extracted"][0] if doc.get("extracted") else None
+        return doc
+
+    async def put(
+        self,
+        file_hash: str,
+        text: str,
+        file_type: Optional[str] = None,
+        page_offsets: Optional[List[int]] = None
+    ) -> None:
+        """
+        Store the extracted text of a file
+
+        Args:
+            file_hash: SHA-256 hash of the file
+            text: Extracted text
+            file_type: Detected file type (pdf, docx, txt, image)
+            page_offsets: Character offset in ``text`` where each PDF page
+                with text begins
+        """
+        await self.collection.update_one(
+            {"file_hash": file_hash},
+            {"$set": {
+                "file_hash": file_hash,
+                "text": text,
+                "file_type": file_type,
+                "page_offsets": page_offsets,
+                "char_count": len(text),
+                "extracted_at": datetime.utcnow(),
+            }},
+            upsert=True,
+        )
+
+    async def discard_unreferenced(self, file_hash: str) -> bool:
+        """
+        Drop the cached text of a hash no document uses any more
+
+        Returns:
+            True if an entry was deleted
+        """
+        if await self.documents.find_one({"file_hash": file_hash}, {"_id": 1}):
+            return False
+        result = await self.collection.delete_one({"file_hash": file_hash})
+        return result.deleted_count > 0
@@ -0,0 +1,319 @@
+"""
+Durable document ingestion queue
+
+Jobs live in the ``ingestion_jobs`` collection, so they survive API and worker
+restarts. Workers claim jobs atomically, highest priority first, while a global
+cap (MAX_CONCURRENT_UPLOADS) and a per-user cap (INGESTION_PER_USER_LIMIT)
+bound how many documents are processed at once, and a document is never
+processed by two jobs at the same time.
+
+A claimed job holds a lease that its worker renews while it runs. If the
+worker dies the lease expires and the job is queued again. Failed jobs are
+retried with exponential backoff up to INGESTION_MAX_ATTEMPTS.
+"""
+
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from app.config import settings
+from app.database.mongodb import get_database
+from app.models.document import IngestionPriority
+
+
+class IngestionJobStatus(str, Enum):
+    """Ingestion job status"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class IngestionQueue:
+    """Priority job queue in the ``ingestion_jobs`` collection"""
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection = None,
+        global_limit: Optional[int] = None,
+        per_user_limit: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        retry_backoff_seconds: Optional[float] = None
+    ):
+        """
+        Initialize the queue
+
+        Args:
+            collection: Optional collection (default: ingestion_jobs in the app database)
+            global_limit: Jobs running at once across all workers
+            per_user_limit: Jobs running at once per user
+            max_attempts: Attempts before a job fails for good
+            lease_seconds: How long a claim lasts without renewal
+            retry_backoff_seconds: Delay before the first retry (doubles per attempt)
+        """
+        self.collection = collection if collection is not None else get_database()["ingestion_jobs"]
+        self.global_limit = global_limit or settings.max_concurrent_uploads
+        self.per_user_limit = per_user_limit or settings.ingestion_per_user_limit
+        self.max_attempts = max_attempts or settings.ingestion_max_attempts
+        self.lease_seconds = lease_seconds or settings.ingestion_lease_seconds
+        self.retry_backoff_seconds = (
+            retry_backoff_seconds if retry_backoff_seconds is not None
+            else settings.ingestion_retry_backoff_seconds
+        )
+
+    async def enqueue(
+        self,
+        document_id: str,
+        user_id: str,
+        payload: Dict[str, Any],
+        priority: int = IngestionPriority.NORMAL
+    ) -> str:
+        """
+        Queue a document for ingestion
+
+        A job still waiting for the same document is cancelled, since the new
+        one supersedes it.
+
+        Args:
+            document_id: Document to process
+            user_id: Owner of the document
+            payload: Arguments for the ingestion handler
+            priority: Higher priorities are claimed first
+
+        Returns:
+            Job ID
+        """
+        now = datetime.utcnow()
+        await self.collection.update_many(
+            {"document_id": document_id, "status": IngestionJobStatus.QUEUED.value},
+            {"$set": {"status": IngestionJobStatus.CANCELLED.value, "finished_at": now}},
+        )
+        job_id = str(uuid.uuid4())
+        await self.collection.insert_one({
+            "job_id": job_id,
+            "document_id": document_id,
+            "user_id": user_id,
+            "payload": payload,
+            "priority": int(priority),
+            "status": IngestionJobStatus.QUEUED.value,
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "lease_until": None,
+            "worker_id": None,
+            "last_error": None,
+        })
+        return job_id
+
+    async def _running(self, now: datetime) -> List[Dict[str, Any]]:
+        cursor = self.collection.find(
+            {"status": IngestionJobStatus.RUNNING.value, "lease_until": {"$gt": now}},
+            {"_id": 0, "job_id": 1, "user_id": 1, "document_id": 1, "started_at": 1},
+        )
+        return await cursor.to_list(length=None)
+
+    def _admitted(self, running: List[Dict[str, Any]]) -> List[str]:
+        """Job IDs that fit the caps, earliest claim first"""
+        admitted: List[str] = []
+        per_user: Counter = Counter()
+        documents = set()
+        for job in sorted(running, key=lambda j: (j["started_at"], j["job_id"])):
+            if (
+                len(admitted) < self.global_limit
+                and per_user[job["user_id"]] < self.per_user_limit
+                and job["document_id"] not in documents
+            ):
+                admitted.append(job["job_id"])
+                per_user[job["user_id"]] += 1
+                documents.add(job["document_id"])
+        return admitted
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim the next runnable job, if the concurrency caps allow one
+
+        Args:
+            worker_id: Identifier of the claiming worker
+
+        Returns:
+            The claimed job, or None if nothing can run now
+        """
+        now = datetime.utcnow()
+        running = await self._running(now)
+        if len(running) >= self.global_limit:
+            return None
+        per_user = Counter(job["user_id"] for job in running)
+
+        job = await self.collection.find_one_and_update(
+            {
+                "status": IngestionJobStatus.QUEUED.value,
+                "available_at": {"$lte": now},
+                "user_id": {"$nin": [user for user, n in per_user.items() if n >= self.per_user_limit]},
+                "document_id": {"$nin": [job["document_id"] for job in running]},
+            },
+            {
+                "$set": {
+                    "status": IngestionJobStatus.RUNNING.value,
+                    "worker_id": worker_id,
+                    "started_at": now,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", -1), ("created_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return None
+
+        # Another worker may have claimed at the same time. Every claimer ranks
+        # the running jobs the same way, so exactly the jobs that fit are kept.
+        if job["job_id"] not in self._admitted(await self._running(now)):
+            await self.collection.update_one(
+                {"job_id": job["job_id"], "worker_id": worker_id},
+                {
+                    "$set": {
+                        "status": IngestionJobStatus.QUEUED.value,
+                        "worker_id": None,
+                        "started_at": None,
+                        "lease_until": None,
+                    },
+                    "$inc": {"attempts": -1},
+                },
+            )
+            return None
+        return job
+
+    async def cancel_document(self, document_id: str) -> int:
+        """
+        Cancel a document's waiting and running jobs, e.g. because it was deleted
+
+        A running job's worker loses its lease on the next renewal and stops
+        the job.
+
+        Args:
+            document_id: Document whose jobs are cancelled
+
+        Returns:
+            Number of jobs cancelled
+        """
+        result = await self.collection.update_many(
+            {
+                "document_id": document_id,
+                "status": {"$in": [IngestionJobStatus.QUEUED.value, IngestionJobStatus.RUNNING.value]},
+            },
+            {"$set": {
+                "status": IngestionJobStatus.CANCELLED.value,
+                "finished_at": datetime.utcnow(),
+                "lease_until": None,
+            }},
+        )
+        return result.modified_count
+
+    async def renew(self, job_id: str, worker_id: str) -> bool:
+        """Extend a running job's lease; False if the worker no longer holds it"""
+        result = await self.collection.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": IngestionJobStatus.RUNNING.value},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.matched_count > 0
+
+    async def complete(self, job_id: str, worker_id: str) -> bool:
+        """Mark a job as done; False if the worker no longer holds it"""
+        result = await self.collection.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": IngestionJobStatus.RUNNING.value},
+            {"$set": {
+                "status": IngestionJobStatus.COMPLETED.value,
+                "finished_at": datetime.utcnow(),
+                "lease_until": None,
+            }},
+        )
+        return result.matched_count > 0
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds to wait before the next attempt"""
+        return self.retry_backoff_seconds * 2 ** max(0, attempts - 1)
+
+    async def fail(self, job: Dict[str, Any], error: str) -> Optional[bool]:
+        """
+        Record a failed attempt
+
+        Args:
+            job: The claimed job
+            error: Error message
+
+        Returns:
+            True if the job was queued for another attempt, False if it failed
+            for good, None if the worker no longer holds it (lease reclaimed)
+        """
+        now = datetime.utcnow()
+        held = {
+            "job_id": job["job_id"],
+            "worker_id": job["worker_id"],
+            "status": IngestionJobStatus.RUNNING.value,
+        }
+        if job["attempts"] < self.max_attempts:
+            result = await self.collection.update_one(held, {"$set": {
+                "status": IngestionJobStatus.QUEUED.value,
+                "available_at": now + timedelta(seconds=self.retry_delay(job["attempts"])),
+                "worker_id": None,
+                "lease_until": None,
+                "last_error": error,
+            }})
+            return True if result.matched_count else None
+
+        result = await self.collection.update_one(held, {"$set": {
+            "status": IngestionJobStatus.FAILED.value,
+            "finished_at": now,
+            "lease_until": None,
+            "last_error": error,
+        }})
+        return False if result.matched_count else None
+
+    async def recover_expired(self) -> List[Dict[str, Any]]:
+        """
+        Requeue jobs whose worker stopped renewing the lease
+
+        Returns:
+            Jobs that ran out of attempts and were marked failed instead
+        """
+        now = datetime.utcnow()
+        cursor = self.collection.find(
+            {"status": IngestionJobStatus.RUNNING.value, "lease_until": {"$lte": now}},
+            {"_id": 0},
+        )
+        failed = []
+        for job in await cursor.to_list(length=None):
+            error = job.get("last_error") or "Worker lease expired"
+            # Guarded on the expired lease, so only one worker recovers each job
+            expired = {
+                "job_id": job["job_id"],
+                "status": IngestionJobStatus.RUNNING.value,
+                "lease_until": {"$lte": now},
+            }
+            if job["attempts"] < self.max_attempts:
+                await self.collection.update_one(expired, {"$set": {
+                    "status": IngestionJobStatus.QUEUED.value,
+                    "available_at": now,
+                    "worker_id": None,
+                    "lease_until": None,
+                    "last_error": error,
+                }})
+            else:
+                result = await self.collection.update_one(expired, {"$set": {
+                    "status": IngestionJobStatus.FAILED.value,
+                    "finished_at": now,
+                    "lease_until": None,
+                    "last_error": error,
+                }})
+                if result.modified_count:
+                    failed.append(job)
+        return failed
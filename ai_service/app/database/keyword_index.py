@@ -0,0 +1,274 @@
+"""
+Per-user BM25 keyword index
+
+Every chunk in a user's vector collection (including deduplicated reference
+chunks) has a posting record in the ``keyword_postings`` collection with its
+distinct terms and their frequencies. Keyword queries find candidate chunks
+through the multikey ``terms`` index and score them with BM25, so they need
+no embedding and match exact terms such as course codes or names.
+
+``VectorDatabase`` keeps the index in step with ``insert_chunks`` and
+``delete_chunks``. Chunk count and total length per user, which BM25 needs,
+live in ``keyword_index_stats``.
+"""
+
+import asyncio
+import heapq
+import math
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from app.config import settings
+from app.database.mongodb import get_database
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Too common to help ranking; dropping them keeps posting lists short
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+# Posting fields returned with search hits
+_RESULT_FIELDS = ("chunk_id", "document_id", "tracking_id", "chunk_index", "filename", "tags", "text")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms of a text, without stopwords"""
+    return [term for term in _TOKEN_RE.findall(text.lower()) if term not in STOPWORDS]
+
+
+class KeywordIndex:
+    """BM25 inverted index over one user's chunks"""
+
+    # Users whose index is known to be built, so searches skip the check
+    _built_users: Set[str] = set()
+
+    def __init__(
+        self,
+        user_id: str,
+        collection: AsyncIOMotorCollection = None,
+        stats: AsyncIOMotorCollection = None
+    ):
+        """
+        Initialize the index
+
+        Args:
+            user_id: User identifier (every query is scoped to it)
+            collection: Optional postings collection (default: keyword_postings)
+            stats: Optional stats collection (default: keyword_index_stats)
+        """
+        self.user_id = user_id
+        self.collection = collection if collection is not None else get_database()["keyword_postings"]
+        self.stats = stats if stats is not None else get_database()["keyword_index_stats"]
+
+    async def _lengths(self, chunk_ids: List[str]) -> Dict[str, int]:
+        cursor = self.collection.find(
+            {"user_id": self.user_id, "chunk_id": {"$in": list(chunk_ids)}},
+            {"_id": 0, "chunk_id": 1, "length": 1},
+        )
+        return {p["chunk_id"]: p["length"] for p in await cursor.to_list(length=None)}
+
+    async def _update_stats(self, chunks: int, length: int) -> None:
+        if chunks or length:
+            await self.stats.update_one(
+                {"user_id": self.user_id},
+                {"$inc": {"chunk_count": chunks, "total_length": length}},
+                upsert=True,
+            )
+
+    async def add(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        Index chunks, replacing the postings of chunks already indexed
+
+        Args:
+            entries: Dicts with chunk_id, text, document_id, tracking_id,
+                chunk_index, filename and tags (a list)
+
+        Returns:
+            Number of chunks indexed
+        """
+        if not entries:
+            return 0
+
+        previous = await self._lengths([entry["chunk_id"] for entry in entries])
+        operations = []
+        added_chunks = added_length = 0
+        for entry in entries:
+            terms = tokenize(entry["text"])
+            tf: Dict[str, int] = {}
+            for term in terms:
+                tf[term] = tf.get(term, 0) + 1
+            operations.append(UpdateOne(
+                {"user_id": self.user_id, "chunk_id": entry["chunk_id"]},
+                {"$set": {
+                    "document_id": entry.get("document_id", ""),
+                    "tracking_id": entry.get("tracking_id", ""),
+                    "chunk_index": entry.get("chunk_index", 0),
+                    "filename": entry.get("filename", ""),
+                    "tags": list(entry.get("tags") or []),
+                    "text": entry["text"],
+                    "terms": list(tf),
+                    "tf": tf,
+                    "length": len(terms),
+                }},
+                upsert=True,
+            ))
+            if entry["chunk_id"] in previous:
+                added_length += len(terms) - previous[entry["chunk_id"]]
+            else:
+                added_chunks += 1
+                added_length += len(terms)
+
+        await self.collection.bulk_write(operations, ordered=False)
+        await self._update_stats(added_chunks, added_length)
+        return len(entries)
+
+    async def remove(self, chunk_ids: List[str]) -> int:
+        """
+        Drop the postings of chunks
+
+        Args:
+            chunk_ids: Chunk identifiers
+
+        Returns:
+            Number of postings removed
+        """
+        if not chunk_ids:
+            return 0
+        previous = await self._lengths(chunk_ids)
+        if not previous:
+            return 0
+        await self.collection.delete_many(
+            {"user_id": self.user_id, "chunk_id": {"$in": list(previous)}}
+        )
+        await self._update_stats(-len(previous), -sum(previous.values()))
+        return len(previous)
+
+    async def update_metadata(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Rewrite the filter fields of indexed chunks (text is unchanged)
+
+        Args:
+            updates: Mapping of chunk ID to fields to set (tags as a list)
+
+        Returns:
+            Number of postings matched
+        """
+        if not updates:
+            return 0
+        result = await self.collection.bulk_write([
+            UpdateOne({"user_id": self.user_id, "chunk_id": chunk_id}, {"$set": fields})
+            for chunk_id, fields in updates.items()
+        ], ordered=False)
+        return result.matched_count
+
+    async def is_built(self) -> bool:
+        """Whether the index has been built from the user's stored chunks"""
+        if self.user_id in self._built_users:
+            return True
+        stats = await self.stats.find_one({"user_id": self.user_id}, {"_id": 0, "built_at": 1})
+        if stats and stats.get("built_at"):
+            self._built_users.add(self.user_id)
+            return True
+        return False
+
+    async def rebuild(self, entries: List[Dict[str, Any]]) -> int:
+        """
+        Index every stored chunk of the user and mark the index built
+
+        Chunks indexed since (or before) are simply re-indexed, so this is
+        safe to run while documents are being ingested.
+
+        Args:
+            entries: One entry per stored chunk, as for ``add``
+
+        Returns:
+            Number of chunks indexed
+        """
+        count = await self.add(entries)
+        await self.stats.update_one(
+            {"user_id": self.user_id},
+            {"$set": {"built_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        self._built_users.add(self.user_id)
+        return count
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        document_id: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tracking_ids: Optional[List[str]] = None,
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Rank the user's chunks against a query with BM25
+
+        Document frequencies and length statistics cover the whole
+        collection; the filters only restrict which chunks are returned.
+
+        Args:
+            query: Search query
+            top_k: Number of results to return
+            document_id: Optional document to search within
+            tags: Optional tags; chunks with any of them match
+            tracking_ids: Optional tracking IDs to search within
+
+        Returns:
+            (posting, BM25 score) pairs, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        base = {"user_id": self.user_id}
+        stats, *frequencies = await asyncio.gather(
+            self.stats.find_one(base, {"_id": 0, "chunk_count": 1, "total_length": 1}),
+            *(self.collection.count_documents({**base, "terms": term}) for term in terms),
+        )
+        document_frequency = {term: df for term, df in zip(terms, frequencies) if df}
+        if not document_frequency:
+            return []
+
+        chunk_count = max((stats or {}).get("chunk_count", 0), max(document_frequency.values()))
+        avg_length = max((stats or {}).get("total_length", 0), 1) / max(chunk_count, 1)
+        idf = {
+            term: math.log(1 + (chunk_count - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+        criteria: Dict[str, Any] = {**base, "terms": {"$in": list(idf)}}
+        if document_id:
+            criteria["document_id"] = document_id
+        if tags:
+            criteria["tags"] = {"$in": list(tags)}
+        if tracking_ids:
+            criteria["tracking_id"] = {"$in": list(tracking_ids)}
+        projection = {"_id": 0, "chunk_id": 1, "length": 1, **{f"tf.{term}": 1 for term in idf}}
+        candidates = await self.collection.find(criteria, projection).to_list(length=None)
+
+        k1, b = settings.keyword_bm25_k1, settings.keyword_bm25_b
+        scores = {}
+        for posting in candidates:
+            norm = k1 * (1 - b + b * posting.get("length", 0) / avg_length)
+            score = 0.0
+            for term, tf in posting.get("tf", {}).items():
+                if term in idf:
+                    score += idf[term] * tf * (k1 + 1) / (tf + norm)
+            scores[posting["chunk_id"]] = score
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        if not best:
+            return []
+
+        # Only the winners' text and metadata are read
+        cursor = self.collection.find(
+            {**base, "chunk_id": {"$in": [chunk_id for chunk_id, _ in best]}},
+            {"_id": 0, **{field: 1 for field in _RESULT_FIELDS}},
+        )
+        postings = {p["chunk_id"]: p for p in await cursor.to_list(length=None)}
+        return [(postings[chunk_id], score) for chunk_id, score in best if chunk_id in postings]
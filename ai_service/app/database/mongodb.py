@@ -142,6 +142,36 @@ async def create_indexes():
     await docs_collection.create_index([("user_id", 1), ("status", 1), ("uploaded_at", -1)])
     await docs_collection.create_index([("user_id", 1), ("file_hash", 1)])
     await docs_collection.create_index("gridfs_id")
+    await docs_collection.create_index([("user_id", 1), ("metadata.batch_id", 1)], sparse=True)
+
+    # Deduplicated chunk references
+    references_collection = get_database()["chunk_references"]
+    await references_collection.create_index([("user_id", 1), ("chunk_id", 1)], unique=True)
+    await references_collection.create_index([("user_id", 1), ("canonical_id", 1)])
+    await references_collection.create_index([("user_id", 1), ("document_id", 1)])
+
+    # BM25 keyword index
+    postings = get_database()["keyword_postings"]
+    await postings.create_index([("user_id", 1), ("chunk_id", 1)], unique=True)
+    await postings.create_index([("user_id", 1), ("terms", 1)])
+    await get_database()["keyword_index_stats"].create_index("user_id", unique=True)
+    await get_database()["search_collection_versions"].create_index("user_id", unique=True)
+
+    # Shared, reference-counted file blobs
+    blobs = get_database()["blobs"]
+    await blobs.create_index("file_hash", unique=True)
+    await blobs.create_index("gridfs_id", unique=True)
+
+    # Extracted text cache
+    await get_database()["extracted_texts"].create_index("file_hash", unique=True)
+
+    # Durable ingestion queue
+    ingestion_jobs = get_database()["ingestion_jobs"]
+    await ingestion_jobs.create_index("job_id", unique=True)
+    await ingestion_jobs.create_index([("status", 1), ("priority", -1), ("created_at", 1)])
+    await ingestion_jobs.create_index([("status", 1), ("lease_until", 1)])
+    await ingestion_jobs.create_index("document_id")
+    await ingestion_jobs.create_index("user_id")
 
     # Admission data indexes
     admission_collection = get_admission_data_collection()
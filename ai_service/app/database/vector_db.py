@@ -2,23 +2,102 @@
 Vector database operations using ChromaDB for storing and searching embeddings
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
+import asyncio
+import hashlib
 import uuid
+import numpy as np
+from app.config import settings
 from app.core.chroma_client import chroma_manager
+from app.database.chunk_references import ChunkReferenceStore
+from app.database.collection_versions import CollectionVersions
+from app.database.keyword_index import KeywordIndex
 from app.models.document import DocumentChunk
 from app.models.search import SearchResult
 from app.utils.logger import logger
+from app.utils.minhash import MinHasher
+
+
+DEDUP_MODES = ("off", "exact", "near")
+
+# Reference-record fields that are not chunk metadata
+_REFERENCE_FIELDS = ("chunk_id", "canonical_id", "text")
+
+# Chroma metadata is flat, so each tag is also stored as a boolean flag
+# (``tag:<name>: True``) that where-clauses can test natively
+TAG_FLAG_PREFIX = "tag:"
+
+# Migration marker of chunks stored before tag flags existed
+TAG_FLAG_MIGRATION = "tag_flags"
+
+
+def tag_flags(tags: List[str]) -> Dict[str, bool]:
+    """Metadata flags marking a chunk's tags"""
+    return {f"{TAG_FLAG_PREFIX}{tag}": True for tag in tags}
+
+
+def build_where(
+    document_id: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    tracking_ids: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Chroma where-clause for the search filters
+
+    Args:
+        document_id: Optional document to search within
+        tags: Optional tags; chunks with any of them match
+        tracking_ids: Optional tracking IDs to search within
+
+    Returns:
+        Where-clause, or None when nothing is filtered
+    """
+    conditions = []
+    if document_id:
+        conditions.append({"document_id": document_id})
+    if tags:
+        flags = [{flag: True} for flag in tag_flags(tags)]
+        conditions.append(flags[0] if len(flags) == 1 else {"$or": flags})
+    if tracking_ids:
+        tracking_ids = list(tracking_ids)
+        conditions.append(
+            {"tracking_id": tracking_ids[0]} if len(tracking_ids) == 1
+            else {"tracking_id": {"$in": tracking_ids}}
+        )
+    if not conditions:
+        return None
+    # Chroma wants one key per clause; several conditions go under $and
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
 
 
 class VectorDatabase:
     """Vector database operations using ChromaDB"""
 
-    def __init__(self, user_id: str):
+    # Deduplication is off unless enabled in __init__
+    dedup_mode = "off"
+    references: Optional[ChunkReferenceStore] = None
+    minhasher: Optional[MinHasher] = None
+    keyword_index: Optional[KeywordIndex] = None
+    versions: Optional[CollectionVersions] = None
+
+    # Users whose chunks are known to carry tag flags (per process)
+    _tag_flag_users: Set[str] = set()
+
+    def __init__(
+        self,
+        user_id: str,
+        dedup_mode: Optional[str] = None,
+        references: Optional[ChunkReferenceStore] = None,
+        keyword_index: Optional[KeywordIndex] = None
+    ):
         """
         Initialize VectorDatabase for a specific user
 
         Args:
             user_id: User identifier
+            dedup_mode: Cross-document chunk dedup ("off", "exact", "near"; default from settings)
+            references: Optional reference store for deduplicated chunks
+            keyword_index: Optional BM25 keyword index (default: the user's)
         """
         self.user_id = user_id
         self.collection = chroma_manager.create_user_collection(
@@ -27,6 +106,59 @@ class VectorDatabase:
             metadata={"user_id": user_id, "type": "documents"}
         )
 
+        self.dedup_mode = dedup_mode or settings.chunk_dedup_mode
+        if self.dedup_mode not in DEDUP_MODES:
+            raise ValueError(f"Unsupported chunk dedup mode: {self.dedup_mode}")
+        if self.dedup_mode != "off":
+            self.references = references or ChunkReferenceStore(user_id)
+        if self.dedup_mode == "near":
+            self.minhasher = MinHasher()
+        self.keyword_index = keyword_index or KeywordIndex(user_id)
+        self.versions = CollectionVersions(user_id)
+
+    def chunk_metadata(self, chunk: DocumentChunk) -> Dict[str, Any]:
+        """
+        Metadata stored in ChromaDB for a chunk
+
+        Args:
+            chunk: DocumentChunk to describe
+
+        Returns:
+            Flat metadata dict (ChromaDB only accepts str, int, float, bool)
+        """
+        tags = chunk.metadata.get("tags", [])
+        return {
+            "document_id": chunk.document_id,
+            "tracking_id": chunk.tracking_id,
+            "chunk_index": chunk.chunk_index,
+            "filename": chunk.metadata.get("filename", ""),
+            "tags": ",".join(tags) if tags else "",  # Convert list to comma-separated string
+            **tag_flags(tags),
+            "word_count": chunk.metadata.get("word_count", 0),
+            "char_count": chunk.metadata.get("char_count", 0),
+            "content_hash": chunk.metadata.get("content_hash", ""),
+            "user_id": self.user_id
+        }
+
+    async def _bump_version(self) -> None:
+        """Invalidate cached search results after a write"""
+        if self.versions is not None:
+            await self.versions.bump()
+
+    @staticmethod
+    def _keyword_entry(chunk_id: str, text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Keyword index entry of a chunk from its stored metadata"""
+        tags = metadata.get("tags", "")
+        return {
+            "chunk_id": chunk_id,
+            "text": text,
+            "document_id": metadata.get("document_id", ""),
+            "tracking_id": metadata.get("tracking_id", ""),
+            "chunk_index": metadata.get("chunk_index", 0),
+            "filename": metadata.get("filename", ""),
+            "tags": [t.strip() for t in tags.split(",") if t.strip()] if isinstance(tags, str) else list(tags),
+        }
+
     async def insert_chunk(self, chunk: DocumentChunk) -> str:
         """
         Insert a document chunk with embedding into the database
@@ -38,18 +170,7 @@ class VectorDatabase:
             Inserted chunk ID
         """
         try:
-            # Prepare metadata for ChromaDB (ChromaDB only accepts str, int, float, bool)
-            tags = chunk.metadata.get("tags", [])
-            metadata = {
-                "document_id": chunk.document_id,
-                "tracking_id": chunk.tracking_id,
-                "chunk_index": chunk.chunk_index,
-                "filename": chunk.metadata.get("filename", ""),
-                "tags": ",".join(tags) if tags else "",  # Convert list to comma-separated string
-                "word_count": chunk.metadata.get("word_count", 0),
-                "char_count": chunk.metadata.get("char_count", 0),
-                "user_id": self.user_id
-            }
+            metadata = self.chunk_metadata(chunk)
 
             # Add chunk to ChromaDB collection
             self.collection.add(
@@ -58,6 +179,9 @@ class VectorDatabase:
                 documents=[chunk.text],
                 metadatas=[metadata]
             )
+            if self.keyword_index is not None:
+                await self.keyword_index.add([self._keyword_entry(chunk.chunk_id, chunk.text, metadata)])
+            await self._bump_version()
 
             logger.info(f"Inserted chunk {chunk.chunk_id} for document {chunk.document_id}")
             return chunk.chunk_id
@@ -66,12 +190,19 @@ class VectorDatabase:
             logger.error(f"Error inserting chunk {chunk.chunk_id}: {e}")
             raise
 
-    async def insert_chunks(self, chunks: List[DocumentChunk]) -> int:
+    async def insert_chunks(
+        self,
+        chunks: List[DocumentChunk],
+        embeddings: Optional[np.ndarray] = None
+    ) -> int:
         """
         Insert multiple document chunks in batch
 
         Args:
             chunks: List of DocumentChunk objects
+            embeddings: Optional float32 array with one row per chunk. When given it
+                is handed to ChromaDB as-is and ``chunk.embedding`` is ignored, which
+                avoids materializing the vectors as Python lists.
 
         Returns:
             Number of chunks inserted
@@ -79,123 +210,209 @@ class VectorDatabase:
         if not chunks:
             return 0
 
+        if embeddings is not None and len(embeddings) != len(chunks):
+            raise ValueError(
+                f"Got {len(embeddings)} embeddings for {len(chunks)} chunks"
+            )
+
         try:
-            # Prepare data for batch insertion
-            ids = []
-            embeddings = []
-            documents = []
-            metadatas = []
-
-            for chunk in chunks:
-                ids.append(chunk.chunk_id)
-                embeddings.append(chunk.embedding)
-                documents.append(chunk.text)
-                
-                tags = chunk.metadata.get("tags", [])
-                metadata = {
-                    "document_id": chunk.document_id,
-                    "tracking_id": chunk.tracking_id,
-                    "chunk_index": chunk.chunk_index,
-                    "filename": chunk.metadata.get("filename", ""),
-                    "tags": ",".join(tags) if tags else "",  # Convert list to comma-separated string
-                    "word_count": chunk.metadata.get("word_count", 0),
-                    "char_count": chunk.metadata.get("char_count", 0),
-                    "user_id": self.user_id
+            if embeddings is None:
+                embeddings = np.asarray([chunk.embedding for chunk in chunks], dtype=np.float32)
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+
+            metadatas = [self.chunk_metadata(chunk) for chunk in chunks]
+            canonical_ids: List[Optional[str]] = [None] * len(chunks)
+            if self.references is not None:
+                canonical_ids = self._find_canonical_chunks(chunks, metadatas)
+
+            keep = [i for i, canonical_id in enumerate(canonical_ids) if canonical_id is None]
+            references = [
+                {
+                    **metadatas[i],
+                    "chunk_id": chunks[i].chunk_id,
+                    "canonical_id": canonical_ids[i],
+                    "text": chunks[i].text,
                 }
-                metadatas.append(metadata)
+                for i, canonical_id in enumerate(canonical_ids) if canonical_id is not None
+            ]
 
             # Batch insert to ChromaDB
-            self.collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=documents,
-                metadatas=metadatas
-            )
+            if keep:
+                self.collection.add(
+                    ids=[chunks[i].chunk_id for i in keep],
+                    embeddings=embeddings[keep] if len(keep) < len(chunks) else embeddings,
+                    documents=[chunks[i].text for i in keep],
+                    metadatas=[metadatas[i] for i in keep]
+                )
+
+            # Duplicates are stored as references to the canonical chunk, without a vector
+            if references:
+                await self.references.add(references)
+
+            # Every chunk, deduplicated or not, is searchable by its own terms
+            if self.keyword_index is not None:
+                await self.keyword_index.add([
+                    self._keyword_entry(chunk.chunk_id, chunk.text, metadata)
+                    for chunk, metadata in zip(chunks, metadatas)
+                ])
+            await self._bump_version()
 
             count = len(chunks)
-            logger.info(f"Inserted {count} chunks for user {self.user_id}")
+            logger.info(
+                f"Inserted {count} chunks for user {self.user_id}"
+                + (f" ({len(references)} deduplicated)" if references else "")
+            )
             return count
 
         except Exception as e:
             logger.error(f"Error inserting {len(chunks)} chunks: {e}")
             raise
 
+    def _find_canonical_chunks(
+        self,
+        chunks: List[DocumentChunk],
+        metadatas: List[Dict[str, Any]]
+    ) -> List[Optional[str]]:
+        """
+        Find the stored (or earlier in-batch) chunk each chunk duplicates
+
+        Fills in content hashes and, in near mode, MinHash metadata of the
+        chunks that will be stored.
+
+        Returns:
+            Canonical chunk ID per chunk, or None for chunks that need a vector
+        """
+        for chunk, metadata in zip(chunks, metadatas):
+            if not metadata["content_hash"]:
+                metadata["content_hash"] = hashlib.sha256(chunk.text.encode("utf-8")).hexdigest()
+
+        hashes = list({metadata["content_hash"] for metadata in metadatas})
+        existing = self.collection.get(where={"content_hash": {"$in": hashes}}, include=["metadatas"])
+        by_hash: Dict[str, str] = {}
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"] or []):
+            by_hash.setdefault(metadata["content_hash"], chunk_id)
+
+        canonical_ids: List[Optional[str]] = []
+        # Signatures and band keys of chunks kept in this batch, for in-batch near matches
+        batch_signatures: Dict[str, np.ndarray] = {}
+        batch_bands: Dict[tuple, List[str]] = {}
+
+        for chunk, metadata in zip(chunks, metadatas):
+            canonical_id = by_hash.get(metadata["content_hash"])
+            if canonical_id == chunk.chunk_id:
+                # Re-insert of the same chunk, not a duplicate of another
+                canonical_id = None
+
+            if canonical_id is None and self.minhasher is not None:
+                signature = self.minhasher.signature(chunk.text)
+                keys = self.minhasher.band_keys(signature)
+                canonical_id = self._find_near_duplicate(chunk, signature, keys, batch_signatures, batch_bands)
+                if canonical_id is None:
+                    metadata["minhash"] = MinHasher.encode(signature)
+                    for band, key in enumerate(keys):
+                        metadata[f"lsh_{band}"] = key
+                        batch_bands.setdefault((band, key), []).append(chunk.chunk_id)
+                    batch_signatures[chunk.chunk_id] = signature
+
+            if canonical_id is None:
+                by_hash.setdefault(metadata["content_hash"], chunk.chunk_id)
+            canonical_ids.append(canonical_id)
+
+        return canonical_ids
+
+    def _find_near_duplicate(
+        self,
+        chunk: DocumentChunk,
+        signature: np.ndarray,
+        keys: List[int],
+        batch_signatures: Dict[str, np.ndarray],
+        batch_bands: Dict[tuple, List[str]]
+    ) -> Optional[str]:
+        """Most similar stored or in-batch chunk above the near-duplicate threshold"""
+        threshold = settings.chunk_dedup_near_threshold
+        candidates: Dict[str, np.ndarray] = {}
+
+        # Candidates share at least one LSH band with the chunk
+        stored = self.collection.get(
+            where={"$or": [{f"lsh_{band}": key} for band, key in enumerate(keys)]},
+            include=["metadatas"]
+        )
+        for chunk_id, metadata in zip(stored["ids"], stored["metadatas"] or []):
+            if chunk_id != chunk.chunk_id and metadata.get("minhash"):
+                candidates[chunk_id] = MinHasher.decode(metadata["minhash"])
+        for band, key in enumerate(keys):
+            for chunk_id in batch_bands.get((band, key), []):
+                candidates[chunk_id] = batch_signatures[chunk_id]
+
+        best_id, best_score = None, threshold
+        for chunk_id, candidate in candidates.items():
+            score = MinHasher.similarity(signature, candidate)
+            if score >= best_score:
+                best_id, best_score = chunk_id, score
+        return best_id
+
     async def search_by_vector(
         self,
-        query_embedding: List[float],
+        query_embedding: Union[np.ndarray, List[float]],
         top_k: int = 5,
         document_id: Optional[str] = None,
         tags: Optional[List[str]] = None,
         min_score: Optional[float] = None,
+        tracking_ids: Optional[List[str]] = None,
     ) -> List[SearchResult]:
         """
         Perform semantic search using vector similarity
 
+        Document, tag and tracking ID filters are evaluated inside ChromaDB,
+        so exactly top_k matching chunks are fetched. With deduplication a
+        canonical vector also stands in for references that carry their own
+        tags and tracking IDs, so those filters apply after fan-out and the
+        fetch doubles until top_k results pass them or the candidates run out.
+
         Args:
             query_embedding: Query vector embedding
             top_k: Number of results to return
             document_id: Optional document ID to search within
-            tags: Optional tags to filter by
+            tags: Optional tags to filter by (any of them)
             min_score: Minimum similarity score threshold
+            tracking_ids: Optional tracking IDs to search within
 
         Returns:
             List of SearchResult objects
         """
         try:
-            # Build where clause for filtering
-            where_clause = {"user_id": self.user_id}
-            if document_id:
-                where_clause["document_id"] = document_id
-            # Note: ChromaDB doesn't support complex tag filtering, so we'll filter after retrieval
-
-            # Perform vector search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k * 2,  # Get more results to account for tag filtering
-                where=where_clause if where_clause != {"user_id": self.user_id} else None
-            )
-
-            # Convert ChromaDB results to SearchResult objects
-            search_results = []
-            if results["ids"] and results["ids"][0]:
-                for i, chunk_id in enumerate(results["ids"][0]):
-                    score = results["distances"][0][i] if results["distances"] else 0.0
-                    
-                    # Convert distance to similarity score (ChromaDB returns distances, not similarities)
-                    # For cosine distance: similarity = 1 - distance
-                    similarity_score = 1.0 - score if score <= 1.0 else 0.0
-                    
-                    # Apply min_score filter
-                    if min_score and similarity_score < min_score:
-                        continue
-
-                    metadata = results["metadatas"][0][i] if results["metadatas"] else {}
-                    document = results["documents"][0][i] if results["documents"] else ""
-
-                    # Convert comma-separated tags string back to list
-                    tags_str = metadata.get("tags", "")
-                    tags_list = [tag.strip() for tag in tags_str.split(",") if tag.strip()] if tags_str else []
-
-                    # Apply tags filter if specified
-                    if tags and not any(tag in tags_list for tag in tags):
-                        continue
-
-                    search_results.append(
-                        SearchResult(
-                            chunk_id=chunk_id,
-                            document_id=metadata.get("document_id", ""),
-                            tracking_id=metadata.get("tracking_id", ""),
-                            text=document,
-                            score=similarity_score,
-                            chunk_index=metadata.get("chunk_index", 0),
-                            filename=metadata.get("filename", ""),
-                            tags=tags_list,
-                            metadata={
-                                "word_count": metadata.get("word_count", 0),
-                                "char_count": metadata.get("char_count", 0)
-                            }
-                        )
-                    )
+            if tags:
+                # Chunks stored before tag flags existed get them once
+                await self._ensure_tag_flags()
+
+            where_clause = build_where(document_id, tags, tracking_ids)
+            fetch_k = top_k
+            if self.references is not None:
+                # A canonical vector stands in for duplicates in other documents,
+                # which may carry other tags, so those filters apply after fan-out
+                where_clause = build_where(document_id)
+                fetch_k = top_k * 2
+                # A document with deduplicated chunks owns references to other
+                # documents' vectors, so search unscoped and keep its results after fan-out
+                if document_id and await self._has_references(document_id):
+                    where_clause = None
+                    fetch_k = top_k * 10
+
+            while True:
+                # Perform vector search in ChromaDB, off the event loop so other
+                # work (e.g. the keyword leg of a hybrid search) can proceed
+                results = await asyncio.to_thread(
+                    self.collection.query,
+                    query_embeddings=[query_embedding],
+                    n_results=fetch_k,
+                    where=where_clause
+                )
+                hits, exhausted = self._to_search_results(results, fetch_k, min_score)
+                search_results = await self._fan_out(hits, document_id, tags, tracking_ids)
+                if self.references is None or exhausted or len(search_results) >= top_k:
+                    break
+                # Filters after fan-out left too few; look further down the ranking
+                fetch_k *= 2
 
             # Limit to requested top_k after filtering
             search_results = search_results[:top_k]
@@ -213,82 +430,53 @@ class VectorDatabase:
         top_k: int = 5,
         document_id: Optional[str] = None,
         tags: Optional[List[str]] = None,
-        query_embedding: Optional[List[float]] = None,
+        tracking_ids: Optional[List[str]] = None,
     ) -> List[SearchResult]:
         """
-        Perform keyword-based text search using ChromaDB's text search
+        Perform BM25 keyword search over the user's keyword index
+
+        No embedding is computed. Scores are BM25 scores scaled so the best
+        hit is 1.0; the raw score is kept in the result metadata.
 
         Args:
             query: Search query
             top_k: Number of results to return
             document_id: Optional document ID to search within
             tags: Optional tags to filter by
+            tracking_ids: Optional tracking IDs to search within
 
         Returns:
             List of SearchResult objects
         """
-        try:
-            # Build where clause for filtering
-            where_clause = {"user_id": self.user_id}
-            if document_id:
-                where_clause["document_id"] = document_id
-            # Note: ChromaDB doesn't support complex tag filtering, so we'll filter after retrieval
-
-            # Perform text search in ChromaDB
-            if query_embedding:
-                # Use provided embedding to ensure dimension consistency
-                results = self.collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=top_k * 2,  # Get more results to account for tag filtering
-                    where=where_clause if where_clause != {"user_id": self.user_id} else None
-                )
-            else:
-                # Fallback to text search (may cause dimension mismatch)
-                results = self.collection.query(
-                    query_texts=[query],
-                    n_results=top_k * 2,  # Get more results to account for tag filtering
-                    where=where_clause if where_clause != {"user_id": self.user_id} else None
-                )
-
-            # Convert ChromaDB results to SearchResult objects
-            search_results = []
-            if results["ids"] and results["ids"][0]:
-                for i, chunk_id in enumerate(results["ids"][0]):
-                    score = results["distances"][0][i] if results["distances"] else 0.0
-                    
-                    # Convert distance to similarity score
-                    similarity_score = 1.0 - score if score <= 1.0 else 0.0
-
-                    metadata = results["metadatas"][0][i] if results["metadatas"] else {}
-                    document = results["documents"][0][i] if results["documents"] else ""
-
-                    # Convert comma-separated tags string back to list
-                    tags_str = metadata.get("tags", "")
-                    tags_list = [tag.strip() for tag in tags_str.split(",") if tag.strip()] if tags_str else []
-
-                    # Apply tags filter if specified
-                    if tags and not any(tag in tags_list for tag in tags):
-                        continue
+        if self.keyword_index is None:
+            return []
 
-                    search_results.append(
-                        SearchResult(
-                            chunk_id=chunk_id,
-                            document_id=metadata.get("document_id", ""),
-                            tracking_id=metadata.get("tracking_id", ""),
-                            text=document,
-                            score=similarity_score,
-                            chunk_index=metadata.get("chunk_index", 0),
-                            filename=metadata.get("filename", ""),
-                            tags=tags_list,
-                            metadata={
-                                "word_count": metadata.get("word_count", 0),
-                                "char_count": metadata.get("char_count", 0)
-                            }
-                        )
-                    )
+        try:
+            # Collections indexed before the keyword index existed are built once
+            await self.create_text_index()
+            hits = await self.keyword_index.search(
+                query,
+                top_k=top_k,
+                document_id=document_id,
+                tags=tags,
+                tracking_ids=tracking_ids,
+            )
 
-            # Limit to requested top_k after filtering
-            search_results = search_results[:top_k]
+            best = hits[0][1] if hits else 0.0
+            search_results = [
+                SearchResult(
+                    chunk_id=posting["chunk_id"],
+                    document_id=posting.get("document_id", ""),
+                    tracking_id=posting.get("tracking_id", ""),
+                    text=posting.get("text", ""),
+                    score=score / best if best > 0 else 0.0,
+                    chunk_index=posting.get("chunk_index", 0),
+                    filename=posting.get("filename", ""),
+                    tags=posting.get("tags", []),
+                    metadata={"bm25": score}
+                )
+                for posting, score in hits
+            ]
 
             logger.info(f"Found {len(search_results)} keyword results for user {self.user_id}")
             return search_results
@@ -297,6 +485,120 @@ class VectorDatabase:
             logger.error(f"Error performing keyword search: {e}")
             raise
 
+    async def _has_references(self, document_id: str) -> bool:
+        if self.references is None:
+            return False
+        return bool(await self.references.by_document(document_id))
+
+    @staticmethod
+    def _to_search_results(
+        results: Dict[str, Any],
+        fetch_k: int,
+        min_score: Optional[float] = None
+    ) -> Tuple[List[SearchResult], bool]:
+        """
+        Convert a ChromaDB query result to SearchResult objects
+
+        Returns:
+            Results above min_score, and whether no further candidates rank
+            above it (fewer than fetch_k returned, or the score cut reached)
+        """
+        search_results = []
+        ids = results["ids"][0] if results["ids"] else []
+        exhausted = len(ids) < fetch_k
+        for i, chunk_id in enumerate(ids):
+            score = results["distances"][0][i] if results["distances"] else 0.0
+
+            # Convert distance to similarity score (ChromaDB returns distances, not similarities)
+            # For cosine distance: similarity = 1 - distance
+            similarity_score = 1.0 - score if score <= 1.0 else 0.0
+
+            # Apply min_score filter; results are ranked, so the rest score lower
+            if min_score and similarity_score < min_score:
+                exhausted = True
+                continue
+
+            metadata = results["metadatas"][0][i] if results["metadatas"] else {}
+            document = results["documents"][0][i] if results["documents"] else ""
+
+            # Convert comma-separated tags string back to list
+            tags_str = metadata.get("tags", "")
+            tags_list = [tag.strip() for tag in tags_str.split(",") if tag.strip()] if tags_str else []
+
+            search_results.append(
+                SearchResult(
+                    chunk_id=chunk_id,
+                    document_id=metadata.get("document_id", ""),
+                    tracking_id=metadata.get("tracking_id", ""),
+                    text=document,
+                    score=similarity_score,
+                    chunk_index=metadata.get("chunk_index", 0),
+                    filename=metadata.get("filename", ""),
+                    tags=tags_list,
+                    metadata={
+                        "word_count": metadata.get("word_count", 0),
+                        "char_count": metadata.get("char_count", 0)
+                    }
+                )
+            )
+        return search_results, exhausted
+
+    async def _fan_out(
+        self,
+        results: List[SearchResult],
+        document_id: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        tracking_ids: Optional[List[str]] = None
+    ) -> List[SearchResult]:
+        """
+        Expand canonical hits to every document referencing them
+
+        Each reference is listed right after its canonical chunk with the same
+        score, which is where its own vector would have ranked. Tag and
+        tracking ID filters apply to canonical chunks and references alike.
+        """
+        if self.references is None or not results:
+            return results
+
+        def wanted(item_tags: List[str], tracking_id: str) -> bool:
+            if tags and not any(tag in item_tags for tag in tags):
+                return False
+            return not tracking_ids or tracking_id in tracking_ids
+
+        by_canonical: Dict[str, List[Dict[str, Any]]] = {}
+        for reference in await self.references.by_canonical([r.chunk_id for r in results]):
+            by_canonical.setdefault(reference["canonical_id"], []).append(reference)
+
+        expanded = []
+        for result in results:
+            if wanted(result.tags, result.tracking_id):
+                expanded.append(result)
+            for reference in by_canonical.get(result.chunk_id, []):
+                tags_list = [t.strip() for t in reference.get("tags", "").split(",") if t.strip()]
+                if not wanted(tags_list, reference.get("tracking_id", "")):
+                    continue
+                expanded.append(
+                    SearchResult(
+                        chunk_id=reference["chunk_id"],
+                        document_id=reference.get("document_id", ""),
+                        tracking_id=reference.get("tracking_id", ""),
+                        text=reference.get("text", ""),
+                        score=result.score,
+                        chunk_index=reference.get("chunk_index", 0),
+                        filename=reference.get("filename", ""),
+                        tags=tags_list,
+                        metadata={
+                            "word_count": reference.get("word_count", 0),
+                            "char_count": reference.get("char_count", 0),
+                            "canonical_chunk_id": result.chunk_id,
+                        }
+                    )
+                )
+
+        if document_id:
+            expanded = [r for r in expanded if r.document_id == document_id]
+        return expanded
+
     async def delete_document_chunks(self, document_id: str) -> int:
         """
         Delete all chunks for a specific document
@@ -311,17 +613,19 @@ class VectorDatabase:
             # Get all chunk IDs for the document
             results = self.collection.get(
                 # Collection is already scoped per user; keep filter single-key for Chroma.
-                where={"document_id": document_id}
+                where={"document_id": document_id},
+                include=[]
             )
-            
-            if not results["ids"]:
+            chunk_ids = list(results["ids"])
+            if self.references is not None:
+                chunk_ids += [ref["chunk_id"] for ref in await self.references.by_document(document_id)]
+
+            if not chunk_ids:
                 logger.info(f"No chunks found for document {document_id}")
                 return 0
 
             # Delete chunks by IDs
-            self.collection.delete(ids=results["ids"])
-            
-            count = len(results["ids"])
+            count = await self.delete_chunks(chunk_ids)
             logger.info(f"Deleted {count} chunks for document {document_id}")
             return count
 
@@ -329,6 +633,201 @@ class VectorDatabase:
             logger.error(f"Error deleting chunks for document {document_id}: {e}")
             raise
 
+    @staticmethod
+    def _reference_metadata(reference: Dict[str, Any]) -> Dict[str, Any]:
+        """Chunk metadata of a reference record"""
+        return {k: v for k, v in reference.items() if k not in _REFERENCE_FIELDS}
+
+    async def _promote_references(self, canonical_ids: List[str]) -> int:
+        """
+        Give each canonical chunk about to be deleted a successor
+
+        The first reference of each canonical chunk becomes a stored chunk
+        carrying the canonical vector (no re-embedding), and the remaining
+        references are repointed to it.
+
+        Returns:
+            Number of references promoted
+        """
+        if not canonical_ids:
+            return 0
+
+        by_canonical: Dict[str, List[Dict[str, Any]]] = {}
+        for reference in await self.references.by_canonical(canonical_ids):
+            by_canonical.setdefault(reference["canonical_id"], []).append(reference)
+        if not by_canonical:
+            return 0
+
+        stored = self.collection.get(ids=list(by_canonical), include=["embeddings"])
+        vectors = dict(zip(stored["ids"], stored["embeddings"]))
+
+        heirs = [references[0] for canonical_id, references in by_canonical.items() if canonical_id in vectors]
+        metadatas = []
+        for heir in heirs:
+            metadata = {**self._reference_metadata(heir), "user_id": self.user_id}
+            if self.minhasher is not None:
+                signature = self.minhasher.signature(heir["text"])
+                metadata["minhash"] = MinHasher.encode(signature)
+                for band, key in enumerate(self.minhasher.band_keys(signature)):
+                    metadata[f"lsh_{band}"] = key
+            metadatas.append(metadata)
+
+        if heirs:
+            self.collection.add(
+                ids=[heir["chunk_id"] for heir in heirs],
+                embeddings=np.asarray([vectors[heir["canonical_id"]] for heir in heirs], dtype=np.float32),
+                documents=[heir["text"] for heir in heirs],
+                metadatas=metadatas
+            )
+            await self.references.delete([heir["chunk_id"] for heir in heirs])
+            for heir in heirs:
+                await self.references.repoint(heir["canonical_id"], heir["chunk_id"])
+
+        logger.info(f"Promoted {len(heirs)} deduplicated chunks to canonical for user {self.user_id}")
+        return len(heirs)
+
+    async def get_chunk_fingerprints(self, document_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the stored metadata (including content hashes) of a document's chunks
+
+        Only metadata is read, never documents or embeddings, so this is cheap
+        enough to run before every re-ingest.
+
+        Args:
+            document_id: Document identifier
+
+        Returns:
+            Mapping of chunk ID to chunk metadata
+        """
+        try:
+            results = self.collection.get(
+                where={"document_id": document_id},
+                include=["metadatas"]
+            )
+            fingerprints = dict(zip(results["ids"], results["metadatas"] or [{}] * len(results["ids"])))
+            if self.references is not None:
+                for reference in await self.references.by_document(document_id):
+                    fingerprints[reference["chunk_id"]] = self._reference_metadata(reference)
+            return fingerprints
+
+        except Exception as e:
+            logger.error(f"Error reading chunk hashes for document {document_id}: {e}")
+            raise
+
+    async def update_chunk_metadata(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Rewrite the metadata of existing chunks without touching their embeddings
+
+        Args:
+            updates: Mapping of chunk ID to its full new metadata
+
+        Returns:
+            Number of chunks updated
+        """
+        if not updates:
+            return 0
+
+        try:
+            if self.keyword_index is not None:
+                await self.keyword_index.update_metadata({
+                    chunk_id: {k: v for k, v in self._keyword_entry(chunk_id, "", metadata).items() if k in metadata}
+                    for chunk_id, metadata in updates.items()
+                })
+
+            if self.references is not None:
+                reference_ids = {ref["chunk_id"] for ref in await self.references.by_ids(list(updates))}
+                if reference_ids:
+                    await self.references.update_metadata(
+                        {chunk_id: updates[chunk_id] for chunk_id in reference_ids}
+                    )
+                    updates = {k: v for k, v in updates.items() if k not in reference_ids}
+                    if not updates:
+                        await self._bump_version()
+                        return len(reference_ids)
+                    self._update_stored_metadata(updates)
+                    await self._bump_version()
+                    return len(updates) + len(reference_ids)
+
+            self._update_stored_metadata(updates)
+            await self._bump_version()
+            return len(updates)
+
+        except Exception as e:
+            logger.error(f"Error updating metadata of {len(updates)} chunks: {e}")
+            raise
+
+    def _update_stored_metadata(self, updates: Dict[str, Dict[str, Any]]) -> None:
+        """Update Chroma metadata, clearing tag flags the new metadata drops"""
+        # Chroma merges updated metadata into the stored one and rejects None
+        # values, so stale flags are set to False (build_where matches True)
+        updates = dict(updates)
+        stored = self.collection.get(ids=list(updates), include=["metadatas"])
+        for chunk_id, metadata in zip(stored["ids"], stored["metadatas"] or []):
+            stale = [
+                key for key in (metadata or {})
+                if key.startswith(TAG_FLAG_PREFIX) and key not in updates[chunk_id]
+            ]
+            if stale:
+                updates[chunk_id] = {**updates[chunk_id], **{key: False for key in stale}}
+        self.collection.update(ids=list(updates), metadatas=list(updates.values()))
+
+    async def set_document_tags(self, document_id: str, tags: List[str]) -> int:
+        """
+        Relabel every chunk of a document with new tags
+
+        Args:
+            document_id: Document identifier
+            tags: The document's new tags
+
+        Returns:
+            Number of chunks updated
+        """
+        fingerprints = await self.get_chunk_fingerprints(document_id)
+        return await self.update_chunk_metadata({
+            chunk_id: {
+                **{k: v for k, v in metadata.items() if not k.startswith(TAG_FLAG_PREFIX)},
+                "tags": ",".join(tags),
+                **tag_flags(tags),
+            }
+            for chunk_id, metadata in fingerprints.items()
+        })
+
+    async def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        Delete chunks by ID
+
+        Args:
+            chunk_ids: Chunk identifiers
+
+        Returns:
+            Number of chunks deleted
+        """
+        if not chunk_ids:
+            return 0
+
+        try:
+            chunk_ids = list(chunk_ids)
+            if self.references is not None:
+                reference_ids = {ref["chunk_id"] for ref in await self.references.by_ids(chunk_ids)}
+                await self.references.delete(list(reference_ids))
+                canonical_ids = [chunk_id for chunk_id in chunk_ids if chunk_id not in reference_ids]
+                # Vectors still referenced by other documents are handed over, not dropped
+                await self._promote_references(canonical_ids)
+            else:
+                canonical_ids = chunk_ids
+
+            if canonical_ids:
+                self.collection.delete(ids=canonical_ids)
+            if self.keyword_index is not None:
+                await self.keyword_index.remove(chunk_ids)
+            await self._bump_version()
+            logger.info(f"Deleted {len(chunk_ids)} chunks for user {self.user_id}")
+            return len(chunk_ids)
+
+        except Exception as e:
+            logger.error(f"Error deleting {len(chunk_ids)} chunks: {e}")
+            raise
+
     async def get_document_chunks(
         self,
         document_id: str,
@@ -363,11 +862,35 @@ class VectorDatabase:
                         "metadata": results["metadatas"][i] if results["metadatas"] else {}
                     }
                     
-                    if include_embeddings and results["embeddings"]:
+                    if include_embeddings and results["embeddings"] is not None:
                         chunk_data["embedding"] = results["embeddings"][i]
                     
                     chunks.append(chunk_data)
 
+            # Deduplicated chunks keep their own text; the vector is the canonical one
+            if self.references is not None:
+                references = await self.references.by_document(document_id)
+                vectors = {}
+                if include_embeddings and references:
+                    canonical = self.collection.get(
+                        ids=list({ref["canonical_id"] for ref in references}),
+                        include=["embeddings"]
+                    )
+                    vectors = dict(zip(canonical["ids"], canonical["embeddings"]))
+                for reference in references:
+                    chunk_data = {
+                        "chunk_id": reference["chunk_id"],
+                        "document_id": document_id,
+                        "text": reference.get("text", ""),
+                        "metadata": {
+                            **self._reference_metadata(reference),
+                            "canonical_chunk_id": reference["canonical_id"],
+                        }
+                    }
+                    if reference["canonical_id"] in vectors:
+                        chunk_data["embedding"] = vectors[reference["canonical_id"]]
+                    chunks.append(chunk_data)
+
             # Sort by chunk_index
             chunks.sort(key=lambda x: x["metadata"].get("chunk_index", 0))
             
@@ -378,10 +901,55 @@ class VectorDatabase:
             logger.error(f"Error retrieving chunks for document {document_id}: {e}")
             raise
 
+    async def _ensure_tag_flags(self) -> None:
+        """
+        Give chunks stored before tag flags existed their ``tag:<name>`` metadata, once
+
+        Runs independently of the keyword index, so users whose index was
+        built before tag flags existed are migrated too.
+        """
+        if self.user_id in self._tag_flag_users:
+            return
+        if self.versions is not None and await self.versions.is_migrated(TAG_FLAG_MIGRATION):
+            self._tag_flag_users.add(self.user_id)
+            return
+
+        stored = self.collection.get(include=["metadatas"])
+        flagged = {}
+        for chunk_id, metadata in zip(stored["ids"], stored["metadatas"] or []):
+            metadata = metadata or {}
+            tags = [t.strip() for t in metadata.get("tags", "").split(",") if t.strip()]
+            flags = tag_flags(tags)
+            if any(flag not in metadata for flag in flags):
+                flagged[chunk_id] = flags
+        if flagged:
+            self.collection.update(ids=list(flagged), metadatas=list(flagged.values()))
+            await self._bump_version()
+            logger.info(f"Added tag flags to {len(flagged)} chunks for user {self.user_id}")
+
+        if self.versions is not None:
+            await self.versions.mark_migrated(TAG_FLAG_MIGRATION)
+        self._tag_flag_users.add(self.user_id)
+
     async def create_text_index(self):
-        """Create text index for keyword search (ChromaDB handles this automatically)"""
-        # ChromaDB automatically creates text indexes for search
-        logger.info(f"Text index ready for user {self.user_id} (ChromaDB auto-managed)")
+        """Build the user's keyword index from the stored chunks, once"""
+        if self.keyword_index is None or await self.keyword_index.is_built():
+            return
+
+        stored = self.collection.get(include=["documents", "metadatas"])
+        entries = [
+            self._keyword_entry(chunk_id, text or "", metadata or {})
+            for chunk_id, text, metadata in zip(
+                stored["ids"], stored["documents"] or [], stored["metadatas"] or []
+            )
+        ]
+        if self.references is not None:
+            entries += [
+                self._keyword_entry(reference["chunk_id"], reference.get("text", ""), reference)
+                for reference in await self.references.all(include_text=True)
+            ]
+        count = await self.keyword_index.rebuild(entries)
+        logger.info(f"Keyword index built for user {self.user_id} ({count} chunks)")
 
     async def list_user_documents(self) -> List[Dict[str, Any]]:
         """List unique documents for the current user from vector store.
@@ -406,6 +974,20 @@ class VectorDatabase:
                         }
                     docs[tracking_id]["chunk_count"] += 1
 
+            if self.references is not None:
+                for md in await self.references.all():
+                    tracking_id = md.get("tracking_id", "")
+                    if not tracking_id:
+                        continue
+                    if tracking_id not in docs:
+                        docs[tracking_id] = {
+                            "tracking_id": tracking_id,
+                            "document_id": md.get("document_id", ""),
+                            "filename": md.get("filename", ""),
+                            "chunk_count": 0,
+                        }
+                    docs[tracking_id]["chunk_count"] += 1
+
             return list(docs.values())
         except Exception as e:
             logger.error(f"Error listing documents for user {self.user_id}: {e}")
@@ -16,6 +16,13 @@ class ProcessingStatus(str, Enum):
     FAILED = "failed"
 
 
+class IngestionPriority(int, Enum):
+    """Ingestion queue priority (higher runs first)"""
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
 class DocumentUploadResponse(BaseModel):
     """Response model for document upload"""
     document_id: str = Field(..., description="Unique document identifier")
@@ -29,6 +36,37 @@ class DocumentUploadResponse(BaseModel):
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class BulkUploadFileResult(BaseModel):
+    """Outcome of one file of a bulk upload"""
+    filename: str = Field(..., description="Original filename")
+    document_id: Optional[str] = Field(None, description="Document identifier (unset if rejected)")
+    tracking_id: Optional[str] = Field(None, description="Tracking ID for all chunks of this document")
+    file_hash: Optional[str] = Field(None, description="SHA-256 hash of the file")
+    file_type: Optional[str] = Field(None, description="File type (pdf, docx, txt, image)")
+    status: Optional[ProcessingStatus] = Field(None, description="Processing status (unset if rejected)")
+    duplicate: bool = Field(False, description="The user already had this file")
+    message: str = Field(..., description="Status or error message")
+
+
+class BulkUploadResponse(BaseModel):
+    """Response model for bulk upload"""
+    batch_id: str = Field(..., description="Identifier of this bulk upload")
+    queued: int = Field(..., description="Files queued for processing")
+    duplicates: int = Field(..., description="Files the user had already uploaded")
+    rejected: int = Field(..., description="Files that could not be accepted")
+    files: List[BulkUploadFileResult] = Field(..., description="Per-file results, in upload order")
+    uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class BulkUploadStatusResponse(BaseModel):
+    """Per-file progress of a bulk upload"""
+    batch_id: str = Field(..., description="Identifier of the bulk upload")
+    status_counts: Dict[str, int] = Field(..., description="Number of files in each processing status")
+    documents: List[Dict[str, Any]] = Field(
+        ..., description="document_id, filename, status, total_chunks and progress of each file"
+    )
+
+
 class DocumentMetadata(BaseModel):
     """Document metadata model"""
     document_id: str = Field(..., description="Unique document identifier")
@@ -48,6 +86,15 @@ class DocumentMetadata(BaseModel):
     status: ProcessingStatus = Field(..., description="Processing status")
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
     indexed_at: Optional[datetime] = None
+    index_stats: Optional[Dict[str, int]] = Field(
+        default=None,
+        description="Chunk counts from the latest indexing run (total, embedded, skipped, updated, deleted)"
+    )
+    embedding_model: Optional[str] = Field(default=None, description="Model the chunks were embedded with")
+    progress: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Ingestion progress (stage, attempt, chunk counts, last error)"
+    )
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
 
@@ -60,7 +107,7 @@ class DocumentChunk(BaseModel):
     text: str = Field(..., description="Chunk text content")
     embedding: Optional[List[float]] = Field(None, description="Vector embedding")
     chunk_index: int = Field(..., description="Index of this chunk")
-    total_chunks: int = Field(..., description="Total chunks in document")
+    total_chunks: Optional[int] = Field(None, description="Total chunks in document (unknown while streaming)")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Chunk metadata")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -14,6 +14,12 @@ class SearchMode(str, Enum):
     HYBRID = "hybrid"      # Combined semantic + keyword
 
 
+class FusionMethod(str, Enum):
+    """How hybrid search combines its semantic and keyword rankings"""
+    RRF = "rrf"            # Weighted reciprocal rank fusion
+    WEIGHTED = "weighted"  # Weighted sum of scores
+
+
 class QueryScope(str, Enum):
     """Query scope options"""
     COLLECTION = "collection"    # Query entire user collection
@@ -42,12 +48,30 @@ class SearchRequest(BaseModel):
         None,
         description="Search within specific document only"
     )
+    tracking_ids: Optional[List[str]] = Field(
+        None,
+        description="Search within documents with these tracking IDs only"
+    )
     min_score: Optional[float] = Field(
         None,
         ge=0.0,
         le=1.0,
         description="Minimum similarity score threshold"
     )
+    fusion: FusionMethod = Field(
+        default=FusionMethod.RRF,
+        description="Hybrid mode: how semantic and keyword results are fused"
+    )
+    semantic_weight: float = Field(
+        default=0.7,
+        ge=0.0,
+        description="Hybrid mode: weight of the semantic ranking"
+    )
+    keyword_weight: float = Field(
+        default=0.3,
+        ge=0.0,
+        description="Hybrid mode: weight of the keyword ranking"
+    )
 
 
 class QueryRequest(BaseModel):
@@ -98,6 +122,22 @@ class QueryRequest(BaseModel):
         description="Minimum similarity score threshold"
     )
 
+    # Hybrid fusion options
+    fusion: FusionMethod = Field(
+        default=FusionMethod.RRF,
+        description="Hybrid mode: how semantic and keyword results are fused"
+    )
+    semantic_weight: float = Field(
+        default=0.7,
+        ge=0.0,
+        description="Hybrid mode: weight of the semantic ranking"
+    )
+    keyword_weight: float = Field(
+        default=0.3,
+        ge=0.0,
+        description="Hybrid mode: weight of the keyword ranking"
+    )
+
     # Grouping options
     group_by_document: bool = Field(
         default=False,
@@ -144,6 +184,10 @@ class SearchResponse(BaseModel):
     query: str = Field(..., description="Original query")
     mode: SearchMode = Field(..., description="Search mode used")
     processing_time_ms: float = Field(..., description="Processing time in milliseconds")
+    processing_breakdown: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Time per step and result cache statistics"
+    )
 
 
 class QueryResponse(BaseModel):
@@ -162,3 +206,7 @@ class QueryResponse(BaseModel):
         description="Filters that were applied"
     )
     processing_time_ms: float = Field(..., description="Processing time in milliseconds")
+    processing_breakdown: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Time per step and result cache statistics"
+    )
@@ -43,7 +43,7 @@ from pypdf import PdfReader
 import chromadb
 from chromadb.config import Settings
 
-from app.services.embedding_functions import gemini_embedding_function
+from app.services.embedding_functions import GeminiRequestError, gemini_embedding_function
 from app.SOP_Generator.services.embeddings import chunk_text
 from app.SOP_Generator.db import db_client
 
@@ -174,13 +174,18 @@ def ingest_folder(folder: str, collection_name: str, reindex: bool = False) -> N
             continue
 
         meta = _infer_metadata(text)
-        chunks = chunk_text(text, chunk_size=1100, overlap=120)
+        chunks = chunk_text(text, max_tokens=280, overlap_tokens=30)
         if not chunks:
             logger.warning("No chunks derived for %s; skipping", fname)
             continue
 
-        # Embed
-        embeddings = gemini_embedding_function(chunks)
+        # Embed; a persistent rate limit or outage skips the file, and since
+        # nothing is stored for it a later run picks it up again
+        try:
+            embeddings = gemini_embedding_function(chunks)
+        except GeminiRequestError as e:
+            logger.error("Embedding failed for %s; skipping (re-run to retry): %s", fname, e)
+            continue
         ids = [f"{file_hash}_{i}" for i in range(len(chunks))]
         flat_meta = _flatten_metadata(meta)
         metadatas = [
@@ -2,8 +2,11 @@
 
 from .document_processor import DocumentProcessor
 from .embedding_service import EmbeddingService
+from .embedding_model_registry import EmbeddingModelRegistry, embedding_model_registry
+from .embedding_cache import EmbeddingCache, embedding_cache
+from .vector_quantization import VectorCodec, vector_codec
 from .ocr_service import OCRService
-from .chunking_service import ChunkingService
+from .chunking_service import ChunkingService, TextChunk
 from .search_service import SearchService
 from .faculty_matching_service import FacultyMatchingService
 from .faculty_scraping_service import FacultyScrapingService, faculty_scraping_service
@@ -14,8 +17,15 @@ from .sop_template_service import SOPTemplateService, sop_template_service
 __all__ = [
     "DocumentProcessor",
     "EmbeddingService",
+    "EmbeddingModelRegistry",
+    "embedding_model_registry",
+    "EmbeddingCache",
+    "embedding_cache",
+    "VectorCodec",
+    "vector_codec",
     "OCRService",
     "ChunkingService",
+    "TextChunk",
     "SearchService",
     "FacultyMatchingService",
     "FacultyScrapingService",
@@ -0,0 +1,368 @@
+"""
+Pipelined ingestion of a bulk upload
+
+The files of one bulk upload are processed as a single ingestion job by a
+staged pipeline: extract/OCR -> chunk -> embed -> insert. The stages run
+concurrently and are linked by bounded queues, so one document is embedded
+while the next is still being extracted, and embedding batches are filled
+with chunks from whichever documents are ready (spanning document boundaries)
+instead of one short batch per document.
+
+Each file reports its own stage and chunk counts on its document record. A
+file that fails does not stop the others; its chunks are rolled back and the
+job is retried for the failed files only. A file deleted meanwhile is
+dropped: its record is checked before each insert and before it completes.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.config import settings
+from app.database.extracted_texts import ExtractedTextStore
+from app.database.mongodb import get_documents_collection
+from app.database.vector_db import VectorDatabase
+from app.models.document import DocumentChunk, ProcessingStatus
+from app.services.chunking_service import ChunkingService
+from app.services.document_processor import DocumentProcessor
+from app.services.document_ingestion import existing_documents, reuse_shared_embeddings
+from app.services.document_text_service import TextRecorder, open_stored_document
+from app.services.embedding_service import EmbeddingService
+from app.services.incremental_indexing import IndexingStats, make_chunk_id, to_document_chunk
+from app.services.ocr_service import OCRService
+from app.utils.logger import logger
+
+
+async def _segments(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+@dataclass
+class BulkDocument:
+    """One file of a bulk ingestion job and how far it got"""
+    document_id: str
+    tracking_id: str
+    filename: str
+    file_type: str
+    file_hash: str
+    storage_backend: str = "gridfs"
+    file_path: Optional[str] = None
+    gridfs_id: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+    chunks: int = 0
+    inserted: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    deleted: bool = False
+
+
+# Queue items: (document, chunk) with chunk None marking the document's last chunk
+ChunkItem = Tuple[BulkDocument, Optional[DocumentChunk]]
+
+
+class BulkIngestionPipeline:
+    """Staged, concurrent ingestion of many documents of one user"""
+
+    def __init__(
+        self,
+        user_id: str,
+        vector_db: Optional[VectorDatabase] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        chunking_service: Optional[ChunkingService] = None,
+        documents: AsyncIOMotorCollection = None,
+        text_store: Optional[ExtractedTextStore] = None,
+        extract_concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        attempt: int = 1
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            user_id: Owner of the documents
+            vector_db: The user's vector database
+            embedding_service: Service used to embed chunks
+            chunking_service: Service used to chunk extracted text
+            documents: Documents collection for status and progress
+            text_store: Extracted-text cache
+            extract_concurrency: Documents extracted at once
+            queue_size: Chunks waiting to be embedded before chunking pauses
+            batch_size: Chunks per embedding call
+            attempt: Job attempt number, for progress reporting
+        """
+        self.user_id = user_id
+        self.vector_db = vector_db or VectorDatabase(user_id)
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.chunking_service = chunking_service or ChunkingService()
+        self.documents = documents if documents is not None else get_documents_collection()
+        self.text_store = text_store or ExtractedTextStore()
+        self.doc_processor = DocumentProcessor()
+        self.extract_concurrency = extract_concurrency or settings.bulk_extract_concurrency
+        self.queue_size = queue_size or settings.bulk_pipeline_queue_size
+        self.batch_size = batch_size or settings.chunk_embed_batch_size
+        self.attempt = attempt
+        self.batches = 0
+
+    async def _update(self, doc: BulkDocument, fields: Dict[str, Any]) -> None:
+        await self.documents.update_one({"document_id": doc.document_id}, {"$set": fields})
+
+    async def _progress(self, doc: BulkDocument, stage: str, **fields: Any) -> None:
+        await self._update(doc, {"progress": {
+            "stage": stage,
+            "attempt": self.attempt,
+            **fields,
+            "updated_at": datetime.utcnow(),
+        }})
+
+    async def _fail(self, doc: BulkDocument, error: Exception) -> None:
+        """Mark a document failed; its chunks are rolled back when its end marker arrives"""
+        if doc.error is not None:
+            return
+        doc.error = str(error) or type(error).__name__
+        logger.error(f"Bulk ingestion of document {doc.document_id} failed: {doc.error}")
+        await self._update(doc, {
+            "status": ProcessingStatus.FAILED,
+            "progress": {
+                "stage": "failed",
+                "attempt": self.attempt,
+                "error": doc.error,
+                "updated_at": datetime.utcnow(),
+            },
+        })
+
+    def _drop(self, doc: BulkDocument) -> None:
+        """Stop a document whose record was deleted; its chunks are rolled back like a failure's"""
+        if doc.error is None:
+            logger.info(f"Document {doc.document_id} was deleted during bulk ingestion; dropping it")
+            doc.error = "Document was deleted"
+        doc.deleted = True
+
+    async def _extract_text(self, doc: BulkDocument) -> str:
+        # Identical bytes (this user's or anyone's) are extracted only once
+        cached = await self.text_store.get(doc.file_hash)
+        if cached is not None:
+            if not self.doc_processor.validate_extracted_text(cached["text"]):
+                raise ValueError("Extracted text is too short or empty")
+            return cached["text"]
+
+        recorder = TextRecorder()
+        async with open_stored_document(
+            doc.storage_backend, file_path=doc.file_path, gridfs_id=doc.gridfs_id
+        ) as source:
+            if doc.file_type == "image":
+                ocr_result = await OCRService().extract_text_from_image(source)
+                recorder.segments.append(ocr_result["text"])
+            else:
+                segments = self.doc_processor.iter_document_text(source, filename=doc.filename)
+                async for _ in recorder.record(segments):
+                    pass
+
+        text = recorder.text
+        if not self.doc_processor.validate_extracted_text(text):
+            raise ValueError("Extracted text is too short or empty")
+
+        try:
+            await self.text_store.put(
+                doc.file_hash,
+                text,
+                file_type=doc.file_type,
+                page_offsets=recorder.page_offsets if doc.file_type == "pdf" else None,
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache extracted text for document {doc.document_id}: {e}")
+        return text
+
+    async def _extract(self, pending: "asyncio.Queue[BulkDocument]", texts: asyncio.Queue) -> None:
+        """Stage 1: extract text (or OCR) of documents, several at a time"""
+        while True:
+            try:
+                doc = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await self._update(doc, {"status": ProcessingStatus.PROCESSING})
+                await self._progress(doc, "extracting")
+                if self.attempt > 1:
+                    # A previous attempt may have died part-way through inserting
+                    await self.vector_db.delete_document_chunks(doc.document_id)
+                text = await self._extract_text(doc)
+                await reuse_shared_embeddings(doc.file_hash, self.user_id, self.embedding_service, self.documents)
+            except Exception as e:
+                await self._fail(doc, e)
+                continue
+            await texts.put((doc, text))
+
+    async def _chunk(self, texts: asyncio.Queue, chunks: "asyncio.Queue[Optional[ChunkItem]]") -> None:
+        """Stage 2: split extracted text into chunks, pausing while the embed queue is full"""
+        while (item := await texts.get()) is not None:
+            doc, text = item
+            await self._progress(doc, "chunking")
+            occurrences: Dict[str, int] = {}
+            try:
+                # Tokenize on the chunker's helper thread, not the event loop
+                async for chunk in self.chunking_service.aiter_chunks(_segments(text)):
+                    content_hash = chunk.content_hash
+                    occurrence = occurrences.get(content_hash, 0)
+                    occurrences[content_hash] = occurrence + 1
+                    await chunks.put((doc, to_document_chunk(
+                        chunk,
+                        make_chunk_id(doc.document_id, content_hash, occurrence),
+                        doc.document_id,
+                        doc.tracking_id,
+                        self.user_id,
+                        {"filename": doc.filename, "tags": doc.tags},
+                        content_hash,
+                    )))
+                    doc.chunks += 1
+            except Exception as e:
+                await self._fail(doc, e)
+            await chunks.put((doc, None))
+        await chunks.put(None)
+
+    async def _embed(self, chunks: "asyncio.Queue[Optional[ChunkItem]]", embedded: asyncio.Queue) -> None:
+        """Stage 3: embed whatever chunks are ready, up to batch_size, across documents"""
+        finished = False
+        while not finished:
+            items: List[Optional[ChunkItem]] = [await chunks.get()]
+            size = int(items[0] is not None and items[0][1] is not None)
+            # Take whatever else is ready, up to a full batch of chunks
+            while items[-1] is not None and size < self.batch_size and not chunks.empty():
+                items.append(chunks.get_nowait())
+                size += int(items[-1] is not None and items[-1][1] is not None)
+            if items[-1] is None:
+                finished = True
+                items.pop()
+
+            work = [(doc, chunk) for doc, chunk in items if chunk is not None and doc.error is None]
+            ended = [doc for doc, chunk in items if chunk is None]
+            embeddings = None
+            if work:
+                try:
+                    embeddings, _ = await self.embedding_service.generate_embeddings(
+                        [chunk.text for _, chunk in work]
+                    )
+                    self.batches += 1
+                except Exception as e:
+                    for doc in {id(doc): doc for doc, _ in work}.values():
+                        await self._fail(doc, e)
+                    work = []
+            if work or ended:
+                await embedded.put((work, embeddings, ended))
+        await embedded.put(None)
+
+    async def _insert(self, embedded: asyncio.Queue) -> None:
+        """Stage 4: insert embedded batches; finish each document after its last chunk"""
+        while (item := await embedded.get()) is not None:
+            work, embeddings, ended = item
+            pending = {doc.document_id: doc for doc, _ in work if doc.error is None}
+            pending.update({doc.document_id: doc for doc in ended if doc.error is None})
+            if pending:
+                alive = await existing_documents(self.documents, list(pending))
+                for document_id, doc in pending.items():
+                    if document_id not in alive:
+                        self._drop(doc)
+            keep = [i for i, (doc, _) in enumerate(work) if doc.error is None]
+            batch_docs = {id(work[i][0]): work[i][0] for i in keep}.values()
+            if keep:
+                try:
+                    await self.vector_db.insert_chunks(
+                        [work[i][1] for i in keep],
+                        embeddings=embeddings[keep] if len(keep) < len(work) else embeddings,
+                    )
+                except Exception as e:
+                    for doc in batch_docs:
+                        await self._fail(doc, e)
+                else:
+                    for i in keep:
+                        doc, chunk = work[i]
+                        doc.inserted.append(chunk.chunk_id)
+                    for doc in batch_docs:
+                        await self._progress(
+                            doc, "indexing", chunks_processed=doc.chunks, chunks_embedded=len(doc.inserted)
+                        )
+
+            for doc in ended:
+                if doc.error is None:
+                    await self._complete(doc)
+                elif doc.inserted:
+                    # Leave no partial document behind
+                    try:
+                        await self.vector_db.delete_chunks(doc.inserted)
+                    except Exception as e:
+                        logger.error(f"Could not roll back chunks of document {doc.document_id}: {e}")
+                    doc.inserted = []
+
+    async def _complete(self, doc: BulkDocument) -> None:
+        stats = IndexingStats(total=doc.chunks, embedded=len(doc.inserted))
+        await self._update(doc, {
+            "status": ProcessingStatus.COMPLETED,
+            "total_chunks": doc.chunks,
+            "index_stats": stats.to_dict(),
+            "embedding_model": self.embedding_service._resolve_model_name("huggingface"),
+            "indexed_at": datetime.utcnow(),
+            "progress": {
+                "stage": "completed",
+                "attempt": self.attempt,
+                "chunks_processed": doc.chunks,
+                "chunks_embedded": len(doc.inserted),
+                "updated_at": datetime.utcnow(),
+            },
+        })
+
+    async def run(self, documents: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Ingest documents through the pipeline
+
+        Documents already completed (by an earlier attempt) are skipped.
+
+        Args:
+            documents: BulkDocument fields of each file
+
+        Returns:
+            Error message of each document that failed, by document ID
+        """
+        docs = [BulkDocument(**{k: v for k, v in d.items() if k in BulkDocument.__dataclass_fields__})
+                for d in documents]
+        cursor = self.documents.find(
+            {"document_id": {"$in": [d.document_id for d in docs]}, "status": ProcessingStatus.COMPLETED},
+            {"_id": 0, "document_id": 1},
+        )
+        completed = {d["document_id"] for d in await cursor.to_list(length=None)}
+        alive = await existing_documents(self.documents, [d.document_id for d in docs])
+        docs = [d for d in docs if d.document_id not in completed and d.document_id in alive]
+
+        pending: "asyncio.Queue[BulkDocument]" = asyncio.Queue()
+        for doc in docs:
+            pending.put_nowait(doc)
+        texts: asyncio.Queue = asyncio.Queue(maxsize=self.extract_concurrency)
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        embedded: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.queue_size // self.batch_size))
+
+        async def extract() -> None:
+            await asyncio.gather(*(self._extract(pending, texts) for _ in range(self.extract_concurrency)))
+            await texts.put(None)
+
+        logger.info(f"Bulk ingestion of {len(docs)} documents for user {self.user_id} started")
+        stages = [
+            asyncio.create_task(extract()),
+            asyncio.create_task(self._chunk(texts, chunks)),
+            asyncio.create_task(self._embed(chunks, embedded)),
+            asyncio.create_task(self._insert(embedded)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            for stage in stages:
+                stage.cancel()
+            raise
+
+        if any(doc.error is None for doc in docs):
+            await self.vector_db.create_text_index()
+
+        failed = {doc.document_id: doc.error for doc in docs if doc.error is not None and not doc.deleted}
+        logger.info(
+            f"Bulk ingestion for user {self.user_id} finished: {len(docs) - len(failed)} completed, "
+            f"{len(failed)} failed, {self.batches} embedding batches"
+        )
+        return failed
@@ -1,185 +1,558 @@
 """
 Text chunking service for splitting documents into processable chunks
+
+One engine serves every ingestion path. Chunks are produced lazily by a
+generator and sized by tokenizer token count, so no chunk exceeds the
+embedding model's window (and gets silently truncated), and a document can be
+streamed straight into batched embedding without materializing every chunk.
 """
 
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import asyncio
+import hashlib
+import queue
 import re
+import threading
 from app.config import settings
 from app.utils.logger import logger
 
 
+BOUNDARY_MODES = ("sentence", "paragraph")
+
+# Blank line(s) between paragraphs
+PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+# Whitespace after terminal punctuation (and any closing quote or bracket);
+# single line breaks are usually hard wraps, so they do not end a sentence
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+# Text held back waiting for a paragraph break before whole sentences are
+# released anyway, so a streamed source without blank lines stays streaming
+STREAM_BUFFER_CHARS = 16384
+
+TextSource = Union[str, Iterable[str]]
+
+# End-of-stream marker passed between aiter_chunks and its chunker thread
+_END = object()
+
+
+class RegexTokenCounter:
+    """
+    Tokenizer-free approximation of subword token counts
+
+    Words are counted in pieces of at most six characters and punctuation
+    marks count individually, which slightly over-estimates WordPiece/BPE
+    counts for English text, so chunks stay within the model window.
+    """
+
+    TOKEN = re.compile(r"\w{1,6}|[^\w\s]")
+
+    # No model window to respect
+    window: Optional[int] = None
+
+    def offsets(self, text: str) -> List[Tuple[int, int]]:
+        """Character span of every token"""
+        return [m.span() for m in self.TOKEN.finditer(text)]
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        return sum(1 for _ in self.TOKEN.finditer(text))
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        """Token counts for several texts"""
+        return [self.count(text) for text in texts]
+
+
+class HuggingFaceTokenCounter:
+    """Exact token counts from the embedding model's own tokenizer"""
+
+    def __init__(self, tokenizer: Any, max_seq_length: Optional[int] = None):
+        """
+        Initialize the counter
+
+        Args:
+            tokenizer: HuggingFace tokenizer (a fast tokenizer enables exact splits)
+            max_seq_length: Truncation length of the embedding model in tokens
+                (default: the tokenizer's model_max_length)
+        """
+        self.tokenizer = tokenizer
+        limit = max_seq_length or getattr(tokenizer, "model_max_length", None)
+        # Tokenizers without a limit report a huge sentinel value
+        if not limit or limit > 100_000:
+            self.window = None
+        else:
+            self.window = limit - tokenizer.num_special_tokens_to_add()
+        self._fallback = RegexTokenCounter()
+
+    def offsets(self, text: str) -> List[Tuple[int, int]]:
+        """Character span of every token"""
+        try:
+            encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        except NotImplementedError:
+            # Slow (pure Python) tokenizers cannot report offsets
+            return self._fallback.offsets(text)
+        return [tuple(span) for span in encoded["offset_mapping"]]
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        """Token counts for several texts in one tokenizer call"""
+        if not texts:
+            return []
+        return [len(ids) for ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+
+_token_counters: Dict[str, Any] = {}
+_token_counters_lock = threading.Lock()
+
+
+def get_token_counter(model_name: Optional[str] = None) -> Any:
+    """
+    Get the process-wide token counter for an embedding model
+
+    Uses the model's HuggingFace tokenizer when available and falls back to
+    RegexTokenCounter (once, not per document) when it cannot be loaded or
+    CHUNK_TOKENIZER=regex.
+
+    Args:
+        model_name: HuggingFace model name (default from settings)
+
+    Returns:
+        Token counter exposing offsets(), count(), count_many() and window
+    """
+    model_name = model_name or settings.huggingface_model
+    if settings.chunk_tokenizer == "regex":
+        return RegexTokenCounter()
+
+    with _token_counters_lock:
+        counter = _token_counters.get(model_name)
+        if counter is None:
+            from app.services.embedding_model_registry import embedding_model_registry
+            try:
+                tokenizer, max_seq_length = embedding_model_registry.get_tokenizer(model_name)
+                counter = HuggingFaceTokenCounter(tokenizer, max_seq_length)
+            except Exception as e:
+                logger.warning(
+                    f"Tokenizer for {model_name} unavailable ({e}); "
+                    "chunking with approximate token counts"
+                )
+                counter = RegexTokenCounter()
+            _token_counters[model_name] = counter
+        return counter
+
+
+@dataclass
+class TextChunk:
+    """A chunk of source text with its position and token count"""
+    text: str
+    index: int
+    start_char: int
+    end_char: int
+    token_count: int
+
+    @property
+    def char_count(self) -> int:
+        return len(self.text)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.text.split())
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the chunk text, used to detect unchanged chunks on re-ingest"""
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dictionary form"""
+        return {
+            "text": self.text,
+            "chunk_index": self.index,
+            "start_index": self.start_char,
+            "end_index": self.end_char,
+            "char_count": self.char_count,
+            "word_count": self.word_count,
+            "token_count": self.token_count,
+            "content_hash": self.content_hash,
+        }
+
+
+@dataclass
+class _Unit:
+    """Smallest piece the packer places whole (paragraph, sentence or token run)"""
+    text: str
+    start: int
+    end: int
+    tokens: int
+    # Joiner placed before this unit when it follows another in a chunk
+    separator: str
+
+
 class ChunkingService:
     """Service for chunking text documents"""
 
     def __init__(
         self,
         chunk_size: int = None,
-        chunk_overlap: int = None
+        chunk_overlap: int = None,
+        mode: str = None,
+        token_counter: Any = None
     ):
         """
         Initialize chunking service
 
         Args:
-            chunk_size: Size of each chunk in characters
-            chunk_overlap: Overlap between chunks in characters
+            chunk_size: Maximum tokens per chunk (capped to the model window)
+            chunk_overlap: Tokens of trailing context repeated at the start of the next chunk
+            mode: Boundary mode, "sentence" or "paragraph"
+            token_counter: Optional token counter (default: embedding model tokenizer)
         """
         self.chunk_size = chunk_size or settings.chunk_size
-        self.chunk_overlap = chunk_overlap or settings.chunk_overlap
-
-    def chunk_text(
-        self,
-        text: str,
-        metadata: Dict[str, Any] = None
-    ) -> List[Dict[str, Any]]:
+        self.chunk_overlap = settings.chunk_overlap if chunk_overlap is None else chunk_overlap
+        self.mode = mode or settings.chunk_boundary_mode
+        if self.mode not in BOUNDARY_MODES:
+            raise ValueError(f"Unsupported chunk boundary mode: {self.mode}")
+        self._token_counter = token_counter
+
+    @property
+    def token_counter(self) -> Any:
+        # Resolved lazily so constructing the service never loads a tokenizer
+        if self._token_counter is None:
+            self._token_counter = get_token_counter()
+        return self._token_counter
+
+    @property
+    def max_tokens(self) -> int:
+        """Effective chunk size after capping to the model window"""
+        window = self.token_counter.window
+        return min(self.chunk_size, window) if window else self.chunk_size
+
+    def iter_chunks(self, source: TextSource, mode: str = None) -> Iterator[TextChunk]:
         """
-        Split text into overlapping chunks
+        Lazily split text into token-bounded, overlapping chunks
 
         Args:
-            text: Text to chunk
-            metadata: Optional metadata to attach to each chunk
+            source: Text, or an iterable of text segments (e.g. pages) read as
+                one continuous document
+            mode: Override the boundary mode for this call
 
-        Returns:
-            List of chunk dictionaries
+        Yields:
+            TextChunk objects in document order
         """
-        if not text or not text.strip():
-            return []
-
-        # Clean text
-        text = self._clean_text(text)
-
-        # Split into chunks
-        chunks = []
-        start = 0
-
-        while start < len(text):
-            # Calculate end position
-            end = start + self.chunk_size
+        mode = mode or self.mode
+        if mode not in BOUNDARY_MODES:
+            raise ValueError(f"Unsupported chunk boundary mode: {mode}")
+
+        max_tokens = self.max_tokens
+        overlap = min(self.chunk_overlap, max_tokens // 2)
+
+        current: List[_Unit] = []
+        current_tokens = 0
+        fresh = False
+        index = 0
+
+        for unit in self._iter_units(source, mode, max_tokens, overlap):
+            if current and current_tokens + unit.tokens > max_tokens:
+                if fresh:
+                    yield self._make_chunk(current, index)
+                    index += 1
+                current, current_tokens = self._overlap_tail(current, overlap, max_tokens - unit.tokens)
+            current.append(unit)
+            current_tokens += unit.tokens
+            fresh = True
+
+        if fresh:
+            yield self._make_chunk(current, index)
+            index += 1
+
+        logger.info(f"Created {index} {mode}-bounded chunks (max {max_tokens} tokens)")
+
+    async def aiter_chunks(
+        self,
+        source: AsyncIterable[str],
+        mode: str = None
+    ) -> AsyncIterator[TextChunk]:
+        """
+        Chunk text segments that are produced asynchronously (e.g. PDF pages)
 
-            # Find the last sentence boundary before end
-            if end < len(text):
-                # Look for sentence endings
-                last_period = text.rfind('.', start, end)
-                last_newline = text.rfind('\n', start, end)
-                last_boundary = max(last_period, last_newline)
+        iter_chunks runs on a helper thread that is fed one segment at a time,
+        so chunks come out while later segments are still being produced, and
+        tokenization stays off the event loop.
 
-                # Use boundary if found, otherwise use chunk_size
-                if last_boundary > start:
-                    end = last_boundary + 1
+        Args:
+            source: Async iterable of text segments read as one continuous document
+            mode: Override the boundary mode for this call
 
-            # Extract chunk
-            chunk_text = text[start:end].strip()
+        Yields:
+            TextChunk objects in document order
+        """
+        loop = asyncio.get_running_loop()
+        segments: "queue.Queue[Any]" = queue.Queue()
+        results: "asyncio.Queue[Any]" = asyncio.Queue()
+
+        def post(item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(results.put_nowait, item)
+            except RuntimeError:
+                pass  # Event loop already closed; nobody is listening
+
+        def feed() -> Iterator[str]:
+            while (segment := segments.get()) is not _END:
+                yield segment
+
+        def run() -> None:
+            try:
+                for chunk in self.iter_chunks(feed(), mode):
+                    post(chunk)
+                post(_END)
+            except BaseException as error:
+                post(error)
+
+        async def pump() -> None:
+            try:
+                async for segment in source:
+                    segments.put(segment)
+            finally:
+                segments.put(_END)
+
+        pump_task = asyncio.ensure_future(pump())
+        threading.Thread(target=run, name="chunker", daemon=True).start()
+        try:
+            while (item := await results.get()) is not _END:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+            # Surface errors raised by the source itself
+            await pump_task
+        finally:
+            if not pump_task.done():
+                pump_task.cancel()
+
+    def iter_batches(
+        self,
+        source: TextSource,
+        batch_size: int,
+        mode: str = None
+    ) -> Iterator[List[TextChunk]]:
+        """
+        Group iter_chunks output into lists of at most batch_size chunks
 
-            if chunk_text:
-                chunk_data = {
-                    "text": chunk_text,
-                    "start_index": start,
-                    "end_index": end,
-                    "char_count": len(chunk_text),
-                    "word_count": len(chunk_text.split()),
-                }
+        Args:
+            source: Text or iterable of text segments
+            batch_size: Chunks per batch
+            mode: Override the boundary mode for this call
 
-                # Add metadata if provided
-                if metadata:
-                    chunk_data.update(metadata)
+        Yields:
+            Lists of TextChunk objects
+        """
+        batch: List[TextChunk] = []
+        for chunk in self.iter_chunks(source, mode):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def chunk_text(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Split text into overlapping sentence-bounded chunks
 
-                chunks.append(chunk_data)
+        Document metadata is not copied into each chunk; attach it once when
+        the chunks are stored, as the ingestion pipeline does for iter_chunks.
 
-            # Move to next chunk with overlap
-            start = end - self.chunk_overlap if end < len(text) else end
+        Args:
+            text: Text to chunk
 
-        logger.info(f"Created {len(chunks)} chunks from text of length {len(text)}")
-        return chunks
+        Returns:
+            List of chunk dictionaries
+        """
+        return [chunk.to_dict() for chunk in self.iter_chunks(text, mode="sentence")]
 
     def chunk_by_paragraphs(
         self,
         text: str,
-        max_chunk_size: int = None,
-        metadata: Dict[str, Any] = None
+        max_chunk_size: int = None
     ) -> List[Dict[str, Any]]:
         """
         Split text into chunks based on paragraph boundaries
 
         Args:
             text: Text to chunk
-            max_chunk_size: Maximum size for each chunk
-            metadata: Optional metadata
+            max_chunk_size: Maximum tokens for each chunk
 
         Returns:
             List of chunk dictionaries
         """
-        max_size = max_chunk_size or self.chunk_size
+        chunker = self
+        if max_chunk_size:
+            chunker = ChunkingService(max_chunk_size, self.chunk_overlap, "paragraph", self.token_counter)
+        return [chunk.to_dict() for chunk in chunker.iter_chunks(text, mode="paragraph")]
 
-        # Split by double newlines (paragraphs)
-        paragraphs = re.split(r'\n\s*\n', text)
-
-        chunks = []
-        current_chunk = ""
-
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-
-            # If paragraph alone exceeds max size, split it
-            if len(paragraph) > max_size:
-                if current_chunk:
-                    chunks.append({
-                        "text": current_chunk.strip(),
-                        "char_count": len(current_chunk),
-                        "word_count": len(current_chunk.split()),
-                        **(metadata or {})
-                    })
-                    current_chunk = ""
-
-                # Split large paragraph
-                sub_chunks = self.chunk_text(paragraph, metadata)
-                chunks.extend(sub_chunks)
-
-            # If adding paragraph exceeds max size, save current chunk
-            elif len(current_chunk) + len(paragraph) > max_size:
-                if current_chunk:
-                    chunks.append({
-                        "text": current_chunk.strip(),
-                        "char_count": len(current_chunk),
-                        "word_count": len(current_chunk.split()),
-                        **(metadata or {})
-                    })
-                current_chunk = paragraph
-
-            # Add paragraph to current chunk
-            else:
-                current_chunk += "\n\n" + paragraph if current_chunk else paragraph
-
-        # Add remaining chunk
-        if current_chunk:
-            chunks.append({
-                "text": current_chunk.strip(),
-                "char_count": len(current_chunk),
-                "word_count": len(current_chunk.split()),
-                **(metadata or {})
-            })
-
-        logger.info(f"Created {len(chunks)} paragraph-based chunks")
-        return chunks
+    def _iter_units(
+        self,
+        source: TextSource,
+        mode: str,
+        max_tokens: int,
+        overlap: int
+    ) -> Iterator[_Unit]:
+        """Yield packable units, splitting anything longer than max_tokens"""
+        counter = self.token_counter
+        piece_tokens = overlap or max_tokens
+        first = True
+
+        for paragraph, start, continued in self._iter_paragraphs(source):
+            separator = "" if first else (" " if continued else "\n\n")
+            first = False
+
+            if mode == "paragraph":
+                tokens = counter.count(paragraph)
+                if tokens <= max_tokens:
+                    yield _Unit(paragraph, start, start + len(paragraph), tokens, separator)
+                    continue
+
+            sentences = self._split_sentences(paragraph, start)
+            counts = counter.count_many([text for text, _ in sentences])
+            for (sentence, sentence_start), tokens in zip(sentences, counts):
+                if tokens <= max_tokens:
+                    yield _Unit(sentence, sentence_start, sentence_start + len(sentence), tokens, separator)
+                else:
+                    # Cut at token boundaries into overlap-sized pieces so the
+                    # packer can still carry context across the split
+                    for position, unit in enumerate(self._split_tokens(sentence, sentence_start, piece_tokens)):
+                        if position == 0:
+                            unit.separator = separator
+                        yield unit
+                separator = " "
 
     @staticmethod
-    def _clean_text(text: str) -> str:
+    def _iter_paragraphs(source: TextSource) -> Iterator[Tuple[str, int, bool]]:
         """
-        Clean text by removing excessive whitespace
-
-        Args:
-            text: Text to clean
+        Yield (paragraph, start offset, continued), reading segments incrementally
 
-        Returns:
-            Cleaned text
+        ``continued`` marks text that carries on the previous paragraph because
+        it was released at a sentence break once the buffer grew too large.
         """
-        # Replace multiple spaces with single space
-        text = re.sub(r' +', ' ', text)
+        segments = [source] if isinstance(source, str) else source
+        buffer = ""
+        base = 0
+        continued = False
 
-        # Replace multiple newlines with double newline
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+        for segment in segments:
+            if not segment:
+                continue
+            buffer += segment
+            last = 0
+            for match in PARAGRAPH_BREAK.finditer(buffer):
+                # A break touching the end may continue into the next segment
+                if match.end() == len(buffer):
+                    break
+                for item in ChunkingService._clean_paragraph(buffer[last:match.start()], base + last):
+                    yield (*item, continued)
+                last = match.end()
+                continued = False
+
+            if len(buffer) - last > STREAM_BUFFER_CHARS:
+                breaks = list(SENTENCE_BREAK.finditer(buffer, last))
+                if breaks:
+                    cut = breaks[-1].start() + len(breaks[-1].group(0).rstrip())
+                    for item in ChunkingService._clean_paragraph(buffer[last:cut], base + last):
+                        yield (*item, continued)
+                        continued = True
+                    last = breaks[-1].end()
+
+            buffer = buffer[last:]
+            base += last
+
+        for item in ChunkingService._clean_paragraph(buffer, base):
+            yield (*item, continued)
+
+    @staticmethod
+    def _clean_paragraph(raw: str, offset: int) -> Iterator[Tuple[str, int]]:
+        stripped = raw.lstrip()
+        offset += len(raw) - len(stripped)
+        stripped = stripped.rstrip()
+        if stripped:
+            yield stripped, offset
 
-        return text.strip()
+    @staticmethod
+    def _split_sentences(paragraph: str, offset: int) -> List[Tuple[str, int]]:
+        sentences = []
+        last = 0
+        for match in SENTENCE_BREAK.finditer(paragraph):
+            sentence = paragraph[last:match.start() + len(match.group(0).rstrip())].strip()
+            if sentence:
+                sentences.append((sentence, offset + last))
+            last = match.end()
+        tail = paragraph[last:].strip()
+        if tail:
+            sentences.append((tail, offset + last))
+        return sentences
+
+    def _split_tokens(self, text: str, offset: int, piece_tokens: int) -> Iterator[_Unit]:
+        """Cut an over-long sentence into runs of at most piece_tokens tokens"""
+        spans = self.token_counter.offsets(text)
+        cuts = [0]
+        i = 0
+        while len(spans) - i > piece_tokens:
+            cut = i + piece_tokens
+            # Prefer cutting where a token starts a new word
+            back = cut
+            while back > i + piece_tokens // 2 and not text[spans[back][0] - 1:spans[back][0]].isspace():
+                back -= 1
+            if back > i + piece_tokens // 2:
+                cut = back
+            cuts.append(spans[cut][0])
+            i = cut
+        cuts.append(len(text))
+
+        for position, (start, end) in enumerate(zip(cuts, cuts[1:])):
+            raw = text[start:end]
+            piece = raw.strip()
+            if not piece:
+                continue
+            # Keep sub-word pieces glued back together when re-joined
+            joined = position > 0 and not text[start - 1:start].isspace() and not raw[:1].isspace()
+            yield _Unit(
+                piece,
+                offset + start + (len(raw) - len(raw.lstrip())),
+                offset + start + len(raw.rstrip()),
+                self.token_counter.count(piece),
+                "" if joined else " ",
+            )
+
+    @staticmethod
+    def _overlap_tail(
+        units: List[_Unit],
+        overlap: int,
+        budget: int
+    ) -> Tuple[List[_Unit], int]:
+        """Trailing units to repeat in the next chunk"""
+        tail: List[_Unit] = []
+        tokens = 0
+        limit = min(overlap, budget)
+        for unit in reversed(units):
+            if tokens + unit.tokens > limit:
+                break
+            tail.insert(0, unit)
+            tokens += unit.tokens
+        return tail, tokens
+
+    def _make_chunk(self, units: List[_Unit], index: int) -> TextChunk:
+        parts = [units[0].text]
+        for unit in units[1:]:
+            parts.append(unit.separator)
+            parts.append(unit.text)
+        text = "".join(parts)
+        return TextChunk(
+            text=text,
+            index=index,
+            start_char=units[0].start,
+            end_char=units[-1].end,
+            token_count=self.token_counter.count(text),
+        )
 
     def estimate_chunks(self, text: str) -> int:
         """
@@ -194,5 +567,33 @@ class ChunkingService:
         if not text:
             return 0
 
-        effective_chunk_size = self.chunk_size - self.chunk_overlap
-        return max(1, (len(text) + effective_chunk_size - 1) // effective_chunk_size)
+        max_tokens = self.max_tokens
+        effective_chunk_size = max(1, max_tokens - min(self.chunk_overlap, max_tokens // 2))
+        tokens = RegexTokenCounter().count(text)
+        return max(1, (tokens + effective_chunk_size - 1) // effective_chunk_size)
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = None,
+    overlap_tokens: int = None,
+    mode: str = "sentence"
+) -> List[str]:
+    """
+    Split text into token-bounded chunk strings
+
+    Convenience wrapper for callers that only need the chunk texts.
+
+    Args:
+        text: Text to chunk
+        max_tokens: Maximum tokens per chunk (default from settings)
+        overlap_tokens: Overlap between chunks in tokens (default from settings)
+        mode: Boundary mode, "sentence" or "paragraph"
+
+    Returns:
+        List of chunk texts
+    """
+    if not text:
+        return []
+    chunker = ChunkingService(max_tokens, overlap_tokens, mode)
+    return [chunk.text for chunk in chunker.iter_chunks(text)]
@@ -0,0 +1,289 @@
+"""
+Document ingestion: extract, chunk, embed and index one stored document
+
+Runs in ingestion workers (app.workers.ingestion_worker), which take jobs from
+the durable ingestion queue. Progress is written to the document record as
+the document moves through the stages, so clients can poll it.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.config import settings
+from app.database.extracted_texts import ExtractedTextStore
+from app.database.mongodb import get_documents_collection
+from app.database.vector_db import VectorDatabase
+from app.models.document import ProcessingStatus
+from app.services.chunking_service import ChunkingService
+from app.services.document_processor import DocumentProcessor
+from app.services.document_text_service import TextRecorder, open_stored_document
+from app.services.embedding_service import EmbeddingService
+from app.services.incremental_indexing import IndexingStats, index_document_chunks
+from app.services.ocr_service import OCRService
+from app.utils.logger import logger
+
+
+class DocumentDeletedError(Exception):
+    """The document was deleted while it was being ingested"""
+
+
+async def existing_documents(documents: AsyncIOMotorCollection, document_ids: List[str]) -> Set[str]:
+    """IDs of the given documents whose records still exist"""
+    cursor = documents.find({"document_id": {"$in": document_ids}}, {"_id": 0, "document_id": 1})
+    return {doc["document_id"] for doc in await cursor.to_list(length=None)}
+
+
+async def report_progress(document_id: str, stage: str, **fields: Any) -> None:
+    """
+    Record the ingestion stage (and any counters) on the document
+
+    Args:
+        document_id: Document identifier
+        stage: Current stage (queued, extracting, indexing, retrying, ...)
+        **fields: Extra progress fields such as attempt or chunk counts
+    """
+    await get_documents_collection().update_one(
+        {"document_id": document_id},
+        {"$set": {"progress": {"stage": stage, **fields, "updated_at": datetime.utcnow()}}},
+    )
+
+
+async def reuse_shared_embeddings(
+    file_hash: str,
+    user_id: str,
+    embedding_service: EmbeddingService,
+    documents: AsyncIOMotorCollection = None
+) -> int:
+    """
+    Seed the embedding cache with the vectors of another user's copy of a file
+
+    Identical bytes chunk identically, so when BLOB_SHARE_EMBEDDINGS is on the
+    chunks of a shared blob are embedded once. Only copies indexed with the
+    current embedding model are used.
+
+    Args:
+        file_hash: SHA-256 hash of the file
+        user_id: User about to index the file
+        embedding_service: Service whose cache is seeded
+        documents: Optional documents collection
+
+    Returns:
+        Number of vectors seeded
+    """
+    if not settings.blob_share_embeddings or embedding_service.cache is None:
+        return 0
+    documents = documents if documents is not None else get_documents_collection()
+    donor = await documents.find_one(
+        {
+            "file_hash": file_hash,
+            "user_id": {"$ne": user_id},
+            "status": ProcessingStatus.COMPLETED,
+            "embedding_model": embedding_service._resolve_model_name("huggingface"),
+        },
+        {"_id": 0, "user_id": 1, "document_id": 1},
+    )
+    if donor is None:
+        return 0
+    try:
+        chunks = await VectorDatabase(donor["user_id"]).get_document_chunks(
+            donor["document_id"], include_embeddings=True
+        )
+    except Exception as e:
+        logger.warning(f"Could not read shared embeddings of document {donor['document_id']}: {e}")
+        return 0
+    chunks = [chunk for chunk in chunks if chunk.get("embedding") is not None]
+    seeded = await embedding_service.seed_cache(
+        [chunk["text"] for chunk in chunks], [chunk["embedding"] for chunk in chunks]
+    )
+    if seeded:
+        logger.info(f"Reusing {seeded} embeddings of shared file {file_hash[:12]}")
+    return seeded
+
+
+async def ingest_document(
+    storage_backend: str,
+    file_path: Optional[str],
+    gridfs_id: Optional[str],
+    file_hash: str,
+    document_id: str,
+    tracking_id: str,
+    user_id: str,
+    filename: str,
+    file_type: str,
+    tags: List[str],
+    attempt: int = 1,
+) -> IndexingStats:
+    """
+    Process a stored document and mark it completed
+
+    Errors propagate so the queue can retry; the caller marks the document
+    failed once no attempts are left.
+
+    Args:
+        storage_backend: 'gridfs' or 'disk'
+        file_path: Path to stored file (disk backend)
+        gridfs_id: GridFS file id (gridfs backend)
+        file_hash: SHA-256 hash of file
+        document_id: Document identifier
+        tracking_id: Tracking identifier
+        user_id: User identifier
+        filename: Original filename
+        file_type: Type of file
+        tags: Document tags
+        attempt: Attempt number, for progress reporting
+
+    Returns:
+        IndexingStats of the run
+    """
+    logger.info(f"Processing document {document_id} (attempt {attempt})")
+
+    # Initialize services
+    doc_processor = DocumentProcessor()
+    ocr_service = OCRService()
+    chunking_service = ChunkingService()
+    embedding_service = EmbeddingService()
+    vector_db = VectorDatabase(user_id)
+    docs_collection = get_documents_collection()
+
+    async def ensure_exists() -> None:
+        # Checked before every insert, so a deleted document leaves no chunks behind
+        if not await existing_documents(docs_collection, [document_id]):
+            raise DocumentDeletedError(document_id)
+
+    await ensure_exists()
+    await docs_collection.update_one(
+        {"document_id": document_id},
+        {"$set": {"status": ProcessingStatus.PROCESSING}},
+    )
+    await report_progress(document_id, "extracting", attempt=attempt)
+
+    async def indexed_batch(stats: IndexingStats) -> None:
+        await report_progress(
+            document_id,
+            "indexing",
+            attempt=attempt,
+            chunks_processed=stats.total,
+            chunks_embedded=stats.embedded,
+            chunks_skipped=stats.skipped,
+        )
+
+    # Identical bytes (this user's or anyone's) are extracted only once
+    text_store = ExtractedTextStore()
+    cached = await text_store.get(file_hash)
+    await reuse_shared_embeddings(file_hash, user_id, embedding_service, docs_collection)
+
+    async def index(chunks) -> IndexingStats:
+        # Chunk lazily and diff against the stored version: only new or changed
+        # chunks are embedded, one batch at a time
+        return await index_document_chunks(
+            vector_db,
+            embedding_service,
+            chunks,
+            document_id=document_id,
+            tracking_id=tracking_id,
+            metadata={"filename": filename, "tags": tags},
+            on_batch=indexed_batch,
+            before_insert=ensure_exists,
+        )
+
+    if cached is not None:
+        if not doc_processor.validate_extracted_text(cached["text"]):
+            raise ValueError("Extracted text is too short or empty")
+        stats = await index(chunking_service.iter_chunks(cached["text"]))
+    else:
+        # Keep the extracted text so SOP/LOR/analysis can reuse it without re-parsing
+        recorder = TextRecorder()
+
+        # Read straight from storage; GridFS content is spooled in memory
+        async with open_stored_document(
+            storage_backend, file_path=file_path, gridfs_id=gridfs_id
+        ) as source:
+            # Extract text based on file type
+            if file_type == 'image':
+                ocr_result = await ocr_service.extract_text_from_image(source)
+                if not doc_processor.validate_extracted_text(ocr_result["text"]):
+                    raise ValueError("Extracted text is too short or empty")
+                recorder.segments.append(ocr_result["text"])
+                chunks = chunking_service.iter_chunks(ocr_result["text"])
+            else:
+                # PDF pages stream into the chunker as they are extracted; too
+                # little text fails at the end and rolls back what was indexed
+                segments = recorder.record(doc_processor.iter_document_text(source, filename=filename))
+                chunks = chunking_service.aiter_chunks(doc_processor.require_text(segments))
+
+            stats = await index(chunks)
+
+        try:
+            await text_store.put(
+                file_hash,
+                recorder.text,
+                file_type=file_type,
+                page_offsets=recorder.page_offsets if file_type == "pdf" else None,
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache extracted text for document {document_id}: {e}")
+    total_chunks = stats.total
+
+    try:
+        await ensure_exists()
+    except DocumentDeletedError:
+        # Deleted while the last batch was being inserted
+        await vector_db.delete_document_chunks(document_id)
+        raise
+
+    # Create text index for keyword search
+    await vector_db.create_text_index()
+
+    # Update document status to completed
+    await docs_collection.update_one(
+        {"document_id": document_id},
+        {
+            "$set": {
+                "status": ProcessingStatus.COMPLETED,
+                "total_chunks": total_chunks,
+                "index_stats": stats.to_dict(),
+                "embedding_model": embedding_service._resolve_model_name("huggingface"),
+                "indexed_at": datetime.utcnow(),
+                "progress": {
+                    "stage": "completed",
+                    "attempt": attempt,
+                    "chunks_processed": stats.total,
+                    "chunks_embedded": stats.embedded,
+                    "chunks_skipped": stats.skipped,
+                    "updated_at": datetime.utcnow(),
+                },
+            }
+        }
+    )
+
+    logger.info(
+        f"Successfully processed document {document_id} with {total_chunks} chunks "
+        f"({stats.skipped} embeddings skipped)"
+    )
+    return stats
+
+
+async def handle_ingestion_job(job: Dict[str, Any]) -> None:
+    """Queue handler: run ingest_document (or the bulk pipeline) with a job's payload"""
+    if "documents" in job["payload"]:
+        from app.services.bulk_ingestion import BulkIngestionPipeline
+        documents = job["payload"]["documents"]
+        pipeline = BulkIngestionPipeline(job["user_id"], attempt=job["attempts"])
+        failed = await pipeline.run(documents)
+        if failed:
+            # Retried attempts skip the documents that completed
+            raise RuntimeError(
+                f"{len(failed)} of {len(documents)} documents failed: "
+                + "; ".join(f"{document_id}: {error}" for document_id, error in failed.items())
+            )
+        return
+
+    try:
+        await ingest_document(
+            **job["payload"],
+            document_id=job["document_id"],
+            user_id=job["user_id"],
+            attempt=job["attempts"],
+        )
+    except DocumentDeletedError:
+        logger.info(f"Document {job['document_id']} was deleted during ingestion; job dropped")
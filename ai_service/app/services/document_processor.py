@@ -2,58 +2,52 @@
 Document processing service for extracting text from various file formats
 """
 
-import io
-from typing import Tuple
+import os
+from typing import AsyncIterable, AsyncIterator, Optional, Tuple
 from pathlib import Path
-from PyPDF2 import PdfReader
 from docx import Document
+from app.services.pdf_extraction import pdf_extractor
 from app.utils.logger import logger
-from app.utils.file_utils import get_file_extension
+from app.utils.file_utils import DocumentSource, describe_source, get_file_extension
 
 
 class DocumentProcessor:
     """Process documents and extract text content"""
 
     @staticmethod
-    async def extract_text_from_pdf(file_path: str) -> str:
+    async def extract_text_from_pdf(source: DocumentSource) -> str:
         """
         Extract text from PDF file
 
         Args:
-            file_path: Path to PDF file
+            source: Path to PDF file or binary stream
 
         Returns:
             Extracted text content
         """
         try:
-            reader = PdfReader(file_path)
-            text = ""
-
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
+            text = await pdf_extractor.extract_text(source)
 
-            logger.info(f"Extracted {len(text)} characters from PDF: {file_path}")
-            return text.strip()
+            logger.info(f"Extracted {len(text)} characters from PDF: {describe_source(source)}")
+            return text
 
         except Exception as e:
-            logger.error(f"Error extracting text from PDF {file_path}: {e}")
+            logger.error(f"Error extracting text from PDF {describe_source(source)}: {e}")
             raise
 
     @staticmethod
-    async def extract_text_from_docx(file_path: str) -> str:
+    async def extract_text_from_docx(source: DocumentSource) -> str:
         """
         Extract text from DOCX file
 
         Args:
-            file_path: Path to DOCX file
+            source: Path to DOCX file or binary stream
 
         Returns:
             Extracted text content
         """
         try:
-            doc = Document(file_path)
+            doc = Document(source)
             text = ""
 
             for paragraph in doc.paragraphs:
@@ -66,62 +60,122 @@ class DocumentProcessor:
                         text += cell.text + " "
                     text += "\n"
 
-            logger.info(f"Extracted {len(text)} characters from DOCX: {file_path}")
+            logger.info(f"Extracted {len(text)} characters from DOCX: {describe_source(source)}")
             return text.strip()
 
         except Exception as e:
-            logger.error(f"Error extracting text from DOCX {file_path}: {e}")
+            logger.error(f"Error extracting text from DOCX {describe_source(source)}: {e}")
             raise
 
     @staticmethod
-    async def extract_text_from_txt(file_path: str) -> str:
+    async def extract_text_from_txt(source: DocumentSource) -> str:
         """
         Extract text from TXT file
 
         Args:
-            file_path: Path to TXT file
+            source: Path to TXT file or binary stream
 
         Returns:
             Extracted text content
         """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                text = f.read()
+            if isinstance(source, (str, os.PathLike)):
+                with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read()
+            else:
+                text = source.read().decode('utf-8', errors='ignore')
 
-            logger.info(f"Extracted {len(text)} characters from TXT: {file_path}")
+            logger.info(f"Extracted {len(text)} characters from TXT: {describe_source(source)}")
             return text.strip()
 
         except Exception as e:
-            logger.error(f"Error extracting text from TXT {file_path}: {e}")
+            logger.error(f"Error extracting text from TXT {describe_source(source)}: {e}")
             raise
 
-    async def process_document(self, file_path: str) -> Tuple[str, str]:
+    async def process_document(
+        self,
+        source: DocumentSource,
+        filename: Optional[str] = None
+    ) -> Tuple[str, str]:
         """
         Process document and extract text based on file type
 
         Args:
-            file_path: Path to document file
+            source: Path to document file, or a seekable binary stream
+            filename: Name used to detect the file type (default: the path's name;
+                required for streams without a name)
 
         Returns:
             Tuple of (extracted_text, file_type)
         """
-        file_path_obj = Path(file_path)
-        extension = get_file_extension(file_path_obj.name)
+        if filename is None:
+            if not isinstance(source, (str, os.PathLike)):
+                raise ValueError("filename is required to process a stream")
+            filename = Path(source).name
+        extension = get_file_extension(filename)
 
         if extension == 'pdf':
-            text = await self.extract_text_from_pdf(file_path)
+            text = await self.extract_text_from_pdf(source)
             file_type = 'pdf'
         elif extension in ['doc', 'docx']:
-            text = await self.extract_text_from_docx(file_path)
+            text = await self.extract_text_from_docx(source)
             file_type = 'docx'
         elif extension == 'txt':
-            text = await self.extract_text_from_txt(file_path)
+            text = await self.extract_text_from_txt(source)
             file_type = 'txt'
         else:
             raise ValueError(f"Unsupported file type: {extension}")
 
         return text, file_type
 
+    async def iter_document_text(
+        self,
+        source: DocumentSource,
+        filename: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a document's text in segments as it is extracted
+
+        PDFs yield one segment per page as pages finish; other formats yield
+        their whole text at once. Segments concatenate to the same text as
+        process_document (before stripping), so they can feed the chunker directly.
+
+        Args:
+            source: Path to document file, or a seekable binary stream
+            filename: Name used to detect the file type (see process_document)
+
+        Yields:
+            Text segments in document order
+        """
+        if filename is None and isinstance(source, (str, os.PathLike)):
+            filename = Path(source).name
+        if filename and get_file_extension(filename) == 'pdf':
+            async for page in pdf_extractor.iter_pages(source):
+                yield page
+            return
+
+        text, _ = await self.process_document(source, filename)
+        yield text
+
+    @staticmethod
+    async def require_text(segments: AsyncIterable[str], min_length: int = 10) -> AsyncIterator[str]:
+        """
+        Pass segments through, failing at the end if they held too little text
+
+        Streaming counterpart of validate_extracted_text: the error surfaces
+        after the last segment, so consumers can roll back what they indexed.
+
+        Raises:
+            ValueError: If the stripped text is shorter than min_length
+        """
+        length = 0
+        async for segment in segments:
+            length += len(segment.strip())
+            yield segment
+        if length < min_length:
+            logger.warning(f"Extracted text too short: {length} characters")
+            raise ValueError("Extracted text is too short or empty")
+
     @staticmethod
     def validate_extracted_text(text: str, min_length: int = 10) -> bool:
         """
@@ -9,9 +9,9 @@ from typing import Tuple, List, Dict, Optional
 from pathlib import Path
 from PyPDF2 import PdfReader
 from docx import Document as DocxDocument
-from pdf2image import convert_from_bytes
-import pytesseract
 from app.core.chroma_client import chroma_manager
+from app.services.chunking_service import ChunkingService
+from app.services.ocr_service import OCRService
 from app.utils.logger import logger
 
 
@@ -122,16 +122,9 @@ class ComprehensiveDocumentProcessor:
             Extracted text from OCR
         """
         try:
-            # Convert PDF pages to images
-            images = convert_from_bytes(content, dpi=300)
-            text = ""
-            
-            for i, image in enumerate(images):
-                page_text = pytesseract.image_to_string(image, lang=language)
-                text += f"\n--- Page {i+1} ---\n{page_text}"
-            
-            logger.info(f"OCR extracted {len(text)} characters from {len(images)} pages")
-            return text.strip()
+            # Rasterized and OCRed page-parallel, one Tesseract pass per page
+            result = await OCRService().extract_text_from_pdf(io.BytesIO(content), language)
+            return result["text"]
             
         except Exception as e:
             logger.error(f"Error performing OCR on PDF: {e}")
@@ -149,39 +142,26 @@ class ComprehensiveDocumentProcessor:
             Extracted text from OCR
         """
         try:
-            from PIL import Image
-            image = Image.open(io.BytesIO(content))
-            text = pytesseract.image_to_string(image, lang=language)
-            
-            logger.info(f"OCR extracted {len(text)} characters from image")
-            return text.strip()
+            result = await OCRService().extract_text_from_image(io.BytesIO(content), language)
+            return result["text"]
             
         except Exception as e:
             logger.error(f"Error performing OCR on image: {e}")
             raise
     
-    def chunk_text(self, text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[str]:
+    def chunk_text(self, text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
         """
-        Split text into overlapping chunks
+        Split text into overlapping, token-bounded chunks
         
         Args:
             text: Text to chunk
-            chunk_size: Number of words per chunk
-            chunk_overlap: Number of words to overlap
+            chunk_size: Maximum tokens per chunk (default from settings)
+            chunk_overlap: Tokens to overlap (default from settings)
             
         Returns:
             List of text chunks
         """
-        words = text.split()
-        chunks = []
-        
-        i = 0
-        while i < len(words):
-            chunk_words = words[i:i + chunk_size]
-            chunk_text = ' '.join(chunk_words)
-            chunks.append(chunk_text)
-            i += chunk_size - chunk_overlap
-        
+        chunks = [chunk.text for chunk in ChunkingService(chunk_size, chunk_overlap).iter_chunks(text)]
         logger.info(f"Split text into {len(chunks)} chunks")
         return chunks
     
@@ -191,8 +171,8 @@ class ComprehensiveDocumentProcessor:
         user_id: str,
         text: str,
         metadata: Dict,
-        chunk_size: int = 500,
-        chunk_overlap: int = 50
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None
     ) -> Dict:
         """
         Generate embeddings and store in ChromaDB
@@ -202,8 +182,8 @@ class ComprehensiveDocumentProcessor:
             user_id: User identifier
             text: Text to embed
             metadata: Additional metadata
-            chunk_size: Words per chunk
-            chunk_overlap: Overlap between chunks
+            chunk_size: Maximum tokens per chunk
+            chunk_overlap: Overlap between chunks in tokens
             
         Returns:
             Dict with embedding IDs and chunk count
@@ -1,59 +1,150 @@
 """Helpers to load/extract text for a stored document.
 
 This is the shared bridge that lets SOP/LOR/Analyze reuse documents consistently
-by canonical `document_id`, regardless of storage backend.
+by canonical `document_id`, regardless of storage backend. Extracted text is
+cached per file hash (see ``app.database.extracted_texts``), so a document is
+parsed once and later references cost a single Mongo read.
 """
 
 from __future__ import annotations
 
-import os
-from pathlib import Path
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
 
-from app.database.mongodb import get_documents_collection
+from app.database.extracted_texts import ExtractedTextStore
 from app.services import DocumentProcessor
-from app.services.gridfs_tempfile import gridfs_to_tempfile
+from app.utils.file_utils import DocumentSource, get_file_extension
+from app.utils.logger import logger
+from app.services.gridfs_tempfile import open_gridfs_file
 
 
-async def extract_document_text_for_user(
+@asynccontextmanager
+async def open_stored_document(
+    storage_backend: str,
+    *,
+    file_path: Optional[str] = None,
+    gridfs_id: Optional[str] = None,
+) -> AsyncIterator[DocumentSource]:
+    """Yield something the processors can read: a disk path or a GridFS-backed stream.
+
+    GridFS content is spooled in memory (spilling to disk only above
+    ``EXTRACTION_SPOOL_THRESHOLD_MB``) and released on exit.
+    """
+    if storage_backend == "gridfs":
+        if not gridfs_id:
+            raise ValueError("Missing gridfs_id")
+        async with open_gridfs_file(gridfs_id) as stream:
+            yield stream
+        return
+
+    if not file_path:
+        raise ValueError("Missing file_path")
+    yield file_path
+
+
+class TextRecorder:
+    """Keep a copy of streamed text segments for the extracted-text cache.
+
+    Wrap the segments fed to the chunker with ``record``; afterwards ``text``
+    matches ``DocumentProcessor.process_document`` and ``page_offsets`` holds
+    where each segment (PDF page with text) starts in it.
+    """
+
+    def __init__(self) -> None:
+        self.segments: List[str] = []
+
+    async def record(self, segments: AsyncIterable[str]) -> AsyncIterator[str]:
+        async for segment in segments:
+            self.segments.append(segment)
+            yield segment
+
+    @property
+    def text(self) -> str:
+        return "".join(self.segments).strip()
+
+    @property
+    def page_offsets(self) -> List[int]:
+        raw = "".join(self.segments)
+        lead = len(raw) - len(raw.lstrip())
+        offsets, position = [], 0
+        for segment in self.segments:
+            offsets.append(max(0, position - lead))
+            position += len(segment)
+        return offsets
+
+
+async def extract_and_cache_text(
+    source: DocumentSource,
+    *,
+    file_hash: str,
+    filename: str,
+    file_type: Optional[str] = None,
+    store: Optional[ExtractedTextStore] = None,
+) -> Dict[str, Any]:
+    """Extract a document's text and store it under its file hash."""
+    processor = DocumentProcessor()
+    recorder = TextRecorder()
+    async for _ in recorder.record(processor.iter_document_text(source, filename=filename)):
+        pass
+
+    is_pdf = get_file_extension(filename) == "pdf"
+    extracted = {
+        "file_hash": file_hash,
+        "text": recorder.text,
+        "file_type": file_type or ("pdf" if is_pdf else None),
+        "page_offsets": recorder.page_offsets if is_pdf else None,
+    }
+    if file_hash:
+        try:
+            await (store or ExtractedTextStore()).put(**extracted)
+        except Exception as e:
+            logger.warning(f"Could not cache extracted text for {filename}: {e}")
+    return extracted
+
+
+async def load_document_text_for_user(
     *,
     user_id: str,
     document_id: str,
-) -> str:
-    """Return extracted text for a document owned by user.
+    store: Optional[ExtractedTextStore] = None,
+) -> Dict[str, Any]:
+    """Return the cached extraction (text, page_offsets) of a user's document.
 
-    Raises ValueError if the document is missing or cannot be read.
+    Extracts and caches it on a miss. Raises ValueError if the document is
+    missing or cannot be read.
     """
-    docs_collection = get_documents_collection()
-    doc = await docs_collection.find_one({"document_id": document_id, "user_id": user_id})
+    store = store or ExtractedTextStore()
+    doc = await store.get_for_document(user_id, document_id)
     if not doc:
         raise ValueError("Document not found")
-
-    processor = DocumentProcessor()
+    if doc.get("extracted"):
+        return doc["extracted"]
 
     storage_backend = doc.get("storage_backend") or ("gridfs" if doc.get("gridfs_id") else "disk")
-    tmp_path: Optional[str] = None
-
-    try:
-        if storage_backend == "gridfs":
-            gridfs_id = doc.get("gridfs_id")
-            if not gridfs_id:
-                raise ValueError("Missing gridfs_id")
-            suffix = Path(doc.get("filename") or "").suffix
-            tmp = await gridfs_to_tempfile(gridfs_id, suffix=suffix)
-            tmp_path = tmp.path
-            text, _ = await processor.process_document(tmp_path)
-            return text or ""
-
-        file_path = doc.get("file_path")
-        if not file_path:
-            raise ValueError("Missing file_path")
-        text, _ = await processor.process_document(file_path)
-        return text or ""
-
-    finally:
-        if tmp_path:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+    filename = doc.get("filename") or doc.get("file_path") or ""
+
+    async with open_stored_document(
+        storage_backend,
+        file_path=doc.get("file_path"),
+        gridfs_id=doc.get("gridfs_id"),
+    ) as source:
+        return await extract_and_cache_text(
+            source,
+            file_hash=doc.get("file_hash") or "",
+            filename=filename,
+            file_type=doc.get("file_type"),
+            store=store,
+        )
+
+
+async def extract_document_text_for_user(
+    *,
+    user_id: str,
+    document_id: str,
+) -> str:
+    """Return extracted text for a document owned by user.
+
+    Raises ValueError if the document is missing or cannot be read.
+    """
+    extracted = await load_document_text_for_user(user_id=user_id, document_id=document_id)
+    return extracted.get("text") or ""
@@ -0,0 +1,171 @@
+"""
+Dynamic micro-batching for concurrent query embeddings.
+
+Concurrent `generate_query_embedding` calls for the same encoder scope,
+provider and model are collected for a short window (or until the batch is full), encoded with one
+`generate_embeddings` call, and each caller gets back its own vector.
+"""
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+import numpy as np
+from app.config import settings
+from app.utils.logger import logger
+
+
+EncodeFn = Callable[[List[str], str, Optional[str]], Awaitable[Tuple[np.ndarray, int]]]
+# Encoder scope, provider and model. Services are created per request, so the
+# scope is the state that determines the encoding (e.g. EmbeddingService's
+# registry, cache and executor), not the bound encode method
+BatchKey = Tuple[Hashable, str, str]
+
+
+@dataclass
+class _PendingBatch:
+    """Requests collected for one scope/provider/model within the current window"""
+    encode_fn: EncodeFn
+    texts: List[str] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class QueryEmbeddingBatcher:
+    """Coalesces concurrent single-query embedding requests into batches"""
+
+    def __init__(
+        self,
+        window_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        latency_samples: int = 1000
+    ):
+        """
+        Initialize micro-batcher
+
+        Args:
+            window_ms: How long to wait for more requests after the first one
+            max_batch_size: Flush immediately once this many requests are queued
+            latency_samples: Number of recent per-request latencies kept for percentiles
+        """
+        self.window_ms = window_ms if window_ms is not None else settings.embedding_micro_batch_window_ms
+        self.max_batch_size = max_batch_size or settings.embedding_micro_batch_max_size
+
+        # Pending batches per event loop (futures and timers are loop-bound)
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[BatchKey, _PendingBatch]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # The loop only keeps weak references to tasks; hold running batches here
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self._latencies_ms: Deque[float] = deque(maxlen=latency_samples)
+
+    async def submit(
+        self,
+        text: str,
+        provider: str,
+        model: Optional[str],
+        encode_fn: EncodeFn,
+        scope: Optional[Hashable] = None
+    ) -> np.ndarray:
+        """
+        Queue a single text and wait for its embedding
+
+        Args:
+            text: Query text
+            provider: Embedding provider
+            model: Optional model name
+            encode_fn: Batch encoder, e.g. EmbeddingService.generate_embeddings
+            scope: Requests with equal scopes may be encoded by any of their
+                encode_fns (default: the encode_fn itself)
+
+        Returns:
+            Embedding vector for this text (a row of the batch result)
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(loop, {})
+        key = (encode_fn if scope is None else scope, provider, model or "")
+        start_time = time.time()
+
+        batch = pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(encode_fn=encode_fn)
+            pending[key] = batch
+            batch.timer = loop.call_later(self.window_ms / 1000, self._flush, loop, key, batch)
+
+        future = loop.create_future()
+        batch.texts.append(text)
+        batch.futures.append(future)
+        self.requests += 1
+
+        if len(batch.texts) >= self.max_batch_size:
+            self._flush(loop, key, batch)
+
+        try:
+            return await future
+        finally:
+            self._latencies_ms.append((time.time() - start_time) * 1000)
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, key: BatchKey, batch: _PendingBatch) -> None:
+        """Detach a batch from the pending map and start encoding it"""
+        pending = self._pending.get(loop, {})
+        if pending.get(key) is not batch:
+            return  # Already flushed by size
+
+        del pending[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch.texts))
+        task = loop.create_task(self._run(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: BatchKey, batch: _PendingBatch) -> None:
+        """Encode a detached batch and resolve every caller's future"""
+        _, provider, model = key
+        try:
+            embeddings, _ = await batch.encode_fn(batch.texts, provider, model or None)
+            for future, embedding in zip(batch.futures, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        except Exception as e:
+            logger.error(f"Micro-batched embedding of {len(batch.texts)} queries failed: {e}")
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching and latency statistics
+
+        Returns:
+            Dictionary with configuration, batch sizes and latency percentiles
+        """
+        latencies = sorted(self._latencies_ms)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "latency_p50_ms": percentile(0.50),
+            "latency_p95_ms": percentile(0.95),
+        }
+
+
+# Global instance
+query_embedding_batcher = QueryEmbeddingBatcher()
@@ -0,0 +1,281 @@
+"""
+Content-addressed embedding cache.
+
+Vectors are keyed by sha256(provider, model, text) and kept in two tiers:
+a bounded in-memory LRU and an optional SQLite file that survives restarts.
+Vectors are stored as raw float32 bytes in both tiers. Async callers use
+``aget_many``/``aput_many``, which run SQLite work in a worker thread so disk
+I/O never blocks the event loop; memory hits are served inline.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from app.config import settings
+from app.utils.logger import logger
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + SQLite) cache of embedding vectors"""
+
+    def __init__(
+        self,
+        max_items: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        disk_enabled: Optional[bool] = None
+    ):
+        """
+        Initialize embedding cache
+
+        Args:
+            max_items: Maximum vectors held in the in-memory LRU
+            disk_path: Path of the SQLite file for the persistent tier
+            disk_enabled: Whether to use the persistent tier
+        """
+        self.max_items = max_items if max_items is not None else settings.embedding_cache_max_items
+        self.disk_path = disk_path or settings.embedding_cache_path
+        self.disk_enabled = (
+            disk_enabled if disk_enabled is not None else settings.embedding_cache_disk_enabled
+        )
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # _lock guards the LRU and counters and is only held briefly;
+        # _disk_lock serialises the SQLite connection
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> str:
+        """
+        Build the content address for a text
+
+        Args:
+            provider: Embedding provider
+            model: Model name
+            text: Input text
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        for part in (provider, model, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _get_connection(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite tier lazily (caller holds the disk lock)"""
+        if not self.disk_enabled:
+            return None
+
+        if self._conn is None:
+            try:
+                directory = os.path.dirname(self.disk_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(self.disk_path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.error(f"Embedding disk cache unavailable, using memory only: {e}")
+                self.disk_enabled = False
+                self._conn = None
+
+        return self._conn
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        """Insert into the memory LRU, evicting the oldest entries (caller holds the lock)"""
+        if self.max_items <= 0:
+            return
+
+        existing = self._memory.pop(key, None)
+        if existing is not None:
+            self._memory_bytes -= len(existing)
+
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+
+        while len(self._memory) > self.max_items:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _lookup_memory(self, keys: Sequence[str], results: List[Optional[np.ndarray]]) -> Dict[str, List[int]]:
+        """Fill memory hits into results; return the positions of keys still missing"""
+        lookups: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                blob = self._memory.get(key)
+                if blob is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = np.frombuffer(blob, dtype=np.float32)
+                    self.memory_hits += 1
+                else:
+                    lookups.setdefault(key, []).append(i)
+        return lookups
+
+    def _lookup_disk(self, lookups: Dict[str, List[int]], results: List[Optional[np.ndarray]]) -> None:
+        """Fill disk hits into results, promoting them to memory, and count misses"""
+        rows: List[Any] = []
+        if lookups:
+            with self._disk_lock:
+                conn = self._get_connection()
+                if conn is not None:
+                    lookup_keys = list(lookups)
+                    # Stay well below SQLite's bound-parameter limit
+                    for start in range(0, len(lookup_keys), 500):
+                        batch = lookup_keys[start:start + 500]
+                        placeholders = ",".join("?" * len(batch))
+                        rows.extend(conn.execute(
+                            f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                            batch
+                        ).fetchall())
+
+        with self._lock:
+            for key, blob in rows:
+                blob = bytes(blob)
+                self._remember(key, blob)
+                for i in lookups.pop(key):
+                    results[i] = np.frombuffer(blob, dtype=np.float32)
+                    self.disk_hits += 1
+
+            self.misses += sum(len(positions) for positions in lookups.values())
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up vectors for a batch of keys
+
+        Args:
+            keys: Cache keys (see make_key)
+
+        Returns:
+            List aligned with keys; None marks a miss
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        self._lookup_disk(self._lookup_memory(keys, results), results)
+        return results
+
+    async def aget_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Like get_many, with the SQLite lookup run off the event loop"""
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        lookups = self._lookup_memory(keys, results)
+        if lookups and self.disk_enabled:
+            await asyncio.to_thread(self._lookup_disk, lookups, results)
+        else:
+            self._lookup_disk(lookups, results)
+        return results
+
+    @staticmethod
+    def _to_blobs(vectors: Sequence[Any]) -> List[bytes]:
+        return [np.asarray(vector, dtype=np.float32).tobytes() for vector in vectors]
+
+    def _store_memory(self, keys: Sequence[str], blobs: List[bytes]) -> None:
+        with self._lock:
+            for key, blob in zip(keys, blobs):
+                self._remember(key, blob)
+
+    def _store_disk(self, keys: Sequence[str], blobs: List[bytes]) -> None:
+        with self._disk_lock:
+            conn = self._get_connection()
+            if conn is not None:
+                try:
+                    now = time.time()
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                        [(key, blob, now) for key, blob in zip(keys, blobs)]
+                    )
+                    conn.commit()
+                except Exception as e:
+                    logger.error(f"Error writing embeddings to disk cache: {e}")
+
+    def put_many(self, keys: Sequence[str], vectors: Sequence[Any]) -> None:
+        """
+        Store vectors for a batch of keys in both tiers
+
+        Args:
+            keys: Cache keys
+            vectors: Vectors aligned with keys
+        """
+        if not keys:
+            return
+        blobs = self._to_blobs(vectors)
+        self._store_memory(keys, blobs)
+        self._store_disk(keys, blobs)
+
+    async def aput_many(self, keys: Sequence[str], vectors: Sequence[Any]) -> None:
+        """Like put_many, with the SQLite write run off the event loop"""
+        if not keys:
+            return
+        blobs = self._to_blobs(vectors)
+        self._store_memory(keys, blobs)
+        if self.disk_enabled:
+            await asyncio.to_thread(self._store_disk, keys, blobs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit ratio and size
+
+        Returns:
+            Dictionary with hit/miss counters and bytes used per tier
+        """
+        disk_bytes = 0
+        disk_items = 0
+        with self._disk_lock:
+            if self.disk_enabled and self._conn is not None:
+                disk_items, disk_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+                ).fetchone()
+
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": disk_items,
+                "disk_bytes": disk_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop every cached vector from both tiers and reset counters"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+        with self._disk_lock:
+            conn = self._get_connection()
+            if conn is not None:
+                conn.execute("DELETE FROM embeddings")
+                conn.commit()
+
+    def close(self) -> None:
+        """Close the SQLite connection"""
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global instance
+embedding_cache = EmbeddingCache()
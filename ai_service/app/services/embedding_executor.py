@@ -0,0 +1,217 @@
+"""
+Bounded worker pool for running SentenceTransformer encoding off the event loop.
+
+Encoding is CPU-bound and synchronous, so it runs on a dedicated executor:
+either a thread pool sharing the process-wide model, or a process pool where
+every worker process loads and holds its own copy of the model. Admission is
+bounded; once `max_pending` encode jobs are in flight, callers wait up to
+`queue_timeout` seconds and then get EmbeddingBackpressureError (HTTP 429).
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.config import settings
+from app.services.embedding_model_registry import (
+    EmbeddingModelRegistry,
+    embedding_model_registry,
+)
+from app.utils.logger import logger
+
+
+class EmbeddingBackpressureError(RuntimeError):
+    """Raised when the embedding queue is full and the caller should back off"""
+
+
+def _encode(
+    model_name: str,
+    texts: List[str],
+    registry: Optional[EmbeddingModelRegistry] = None,
+    backend: str = "torch"
+) -> np.ndarray:
+    """Encode texts with the registry model of the current process"""
+    registry = registry or embedding_model_registry
+    if backend == "onnx":
+        model = registry.get_onnx_encoder(model_name)
+    else:
+        model = registry.get_sentence_transformer(model_name)
+    return model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+
+def _init_process_worker(model_name: str) -> None:
+    """Load the model once when a process-pool worker starts"""
+    embedding_model_registry.get_sentence_transformer(model_name)
+
+
+class EmbeddingExecutor:
+    """Dedicated, bounded executor for embedding encode calls"""
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        queue_timeout: Optional[float] = None
+    ):
+        """
+        Initialize embedding executor
+
+        Args:
+            mode: "thread" or "process"
+            max_workers: Number of pool workers
+            max_pending: Maximum encode jobs admitted at once (running + queued)
+            queue_timeout: Seconds to wait for a slot before rejecting (0 = reject immediately)
+        """
+        self.mode = (mode or settings.embedding_executor_mode).lower()
+        if self.mode not in ("thread", "process"):
+            raise ValueError(f"Unsupported embedding executor mode: {self.mode}")
+
+        self.max_workers = max_workers or settings.embedding_executor_workers
+        self.max_pending = max_pending or settings.embedding_max_pending
+        self.queue_timeout = (
+            queue_timeout if queue_timeout is not None else settings.embedding_queue_timeout_seconds
+        )
+
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        # One admission semaphore per event loop (asyncio primitives are loop-bound)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        self.submitted = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.total_wait_ms = 0.0
+        self.total_encode_ms = 0.0
+
+    def _get_pool(self) -> Executor:
+        with self._pool_lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    # Spawn avoids forking a parent that may already hold torch threads
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_process_worker,
+                        initargs=(settings.huggingface_model,),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="embedding",
+                    )
+                logger.info(
+                    f"Embedding executor started: mode={self.mode}, workers={self.max_workers}, "
+                    f"max_pending={self.max_pending}"
+                )
+            return self._pool
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_pending)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _acquire_slot(self, semaphore: asyncio.Semaphore) -> None:
+        if self.queue_timeout <= 0:
+            if semaphore.locked():
+                raise EmbeddingBackpressureError("Embedding queue is full")
+            await semaphore.acquire()
+            return
+
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise EmbeddingBackpressureError(
+                f"Embedding queue is full (waited {self.queue_timeout:.1f}s)"
+            )
+
+    async def encode(
+        self,
+        model_name: str,
+        texts: List[str],
+        registry: Optional[EmbeddingModelRegistry] = None,
+        backend: str = "torch"
+    ) -> np.ndarray:
+        """
+        Encode texts on the worker pool without blocking the event loop
+
+        Args:
+            model_name: HuggingFace model name
+            texts: Texts to encode
+            registry: Model registry for thread mode (process workers use their own)
+            backend: "torch" (SentenceTransformer) or "onnx" (onnxruntime)
+
+        Returns:
+            2-D numpy array of embeddings
+
+        Raises:
+            EmbeddingBackpressureError: If no slot frees up within queue_timeout
+        """
+        semaphore = self._get_semaphore()
+        wait_start = time.time()
+
+        try:
+            await self._acquire_slot(semaphore)
+        except EmbeddingBackpressureError:
+            self.rejected += 1
+            logger.warning(f"Rejected embedding request for {len(texts)} texts: queue full")
+            raise
+
+        self.submitted += 1
+        self.in_flight += 1
+        self.total_wait_ms += (time.time() - wait_start) * 1000
+
+        try:
+            encode_start = time.time()
+            loop = asyncio.get_running_loop()
+            if self.mode == "process":
+                embeddings = await loop.run_in_executor(
+                    self._get_pool(), _encode, model_name, texts, None, backend
+                )
+            else:
+                embeddings = await loop.run_in_executor(
+                    self._get_pool(), _encode, model_name, texts, registry, backend
+                )
+            self.total_encode_ms += (time.time() - encode_start) * 1000
+            return embeddings
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get executor queue statistics
+
+        Returns:
+            Dictionary with configuration and counters
+        """
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait_ms / self.submitted if self.submitted else 0.0,
+            "avg_encode_ms": self.total_encode_ms / self.submitted if self.submitted else 0.0,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+# Global instance
+embedding_executor = EmbeddingExecutor()
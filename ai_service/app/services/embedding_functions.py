@@ -1,8 +1,16 @@
 """Embedding function utilities.
 
 Provides a GeminiEmbeddingFunction suitable for ChromaDB collections.
-Falls back to existing Ollama EmbeddingsClient when Gemini API key is
-unavailable or errors occur.
+Uses the existing Ollama EmbeddingsClient mock when the Gemini API key is
+unavailable.
+
+Texts are sent to Gemini's ``batchEmbedContents`` REST endpoint in batches
+(up to 100 texts per request) with bounded parallelism over a keep-alive
+session. Rate-limit and transient server errors are retried with exponential
+backoff per batch; if they persist the call raises GeminiRequestError rather
+than multiplying the load or storing mock vectors, so callers must handle it.
+A batch the API rejects (e.g. one bad item) is retried per item, and only
+items Gemini still rejects get a mock embedding.
 
 Usage:
     from app.services.embedding_functions import gemini_embedding_function
@@ -12,8 +20,12 @@ Usage:
     )
 
 Environment:
-    GOOGLE_API_KEY - Gemini API key (required for real embeddings)
-    USE_MOCK_EMB   - if true, forces deterministic mock embeddings.
+    GOOGLE_API_KEY             - Gemini API key (required for real embeddings)
+    USE_MOCK_EMB               - if true, forces deterministic mock embeddings.
+    GEMINI_API_BASE            - REST base URL (override to target a fake endpoint)
+    GEMINI_EMBED_BATCH_SIZE    - texts per batch request (max 100)
+    GEMINI_EMBED_CONCURRENCY   - batch requests in flight at once
+    GEMINI_EMBED_MAX_RETRIES   - retries on 429/5xx before giving up
 
 The mock embeddings delegate to the Ollama EmbeddingsClient mock logic
 for consistency of vector size.
@@ -21,13 +33,14 @@ for consistency of vector size.
 from __future__ import annotations
 
 import os
+import random
+import threading
+import time
 import logging
-from typing import List, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
 
-try:
-    import google.generativeai as genai  # type: ignore
-except ImportError:  # pragma: no cover - dependency guaranteed by pyproject
-    genai = None  # type: ignore
+import requests
 
 try:
     from chromadb import EmbeddingFunction  # type: ignore
@@ -43,36 +56,200 @@ logger = logging.getLogger(__name__)
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "").strip()
 USE_MOCK_EMB = os.getenv("USE_MOCK_EMB", "false").strip().lower() in ("1", "true", "yes", "y")
 GEMINI_MODEL = os.getenv("GEMINI_EMBED_MODEL", "models/text-embedding-004")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_EMBED_BATCH_SIZE = int(os.getenv("GEMINI_EMBED_BATCH_SIZE", "100"))
+GEMINI_EMBED_CONCURRENCY = int(os.getenv("GEMINI_EMBED_CONCURRENCY", "4"))
+GEMINI_EMBED_MAX_RETRIES = int(os.getenv("GEMINI_EMBED_MAX_RETRIES", "5"))
+
+# Gemini rejects batchEmbedContents requests with more than 100 texts
+MAX_GEMINI_BATCH_SIZE = 100
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
 
 # Singleton Ollama client (used for fallback & mock)
 _ollama_client = OllamaEmbeddingsClient()
 
 
+class GeminiRequestError(Exception):
+    """A Gemini request failed after all retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def transient(self) -> bool:
+        """Rate limit, server or network error (as opposed to a rejected request)."""
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS_CODES
+
+
 class GeminiEmbeddingFunction(EmbeddingFunction):
     """Custom Embedding Function for ChromaDB using Google Gemini API.
 
-    Falls back to Ollama mock embeddings if Gemini is unavailable.
+    Uses Ollama mock embeddings when no API key is configured. Raises
+    GeminiRequestError when rate limits or outages outlast the retries.
     """
 
-    def __init__(self, model: str = GEMINI_MODEL, task_type: str = "retrieval_document") -> None:
-        self.model = model
+    def __init__(
+        self,
+        model: str = GEMINI_MODEL,
+        task_type: str = "retrieval_document",
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        batch_size: int = GEMINI_EMBED_BATCH_SIZE,
+        max_concurrency: int = GEMINI_EMBED_CONCURRENCY,
+        max_retries: int = GEMINI_EMBED_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        timeout: float = 30.0,
+    ) -> None:
+        self.model = model if model.startswith("models/") else f"models/{model}"
         self.task_type = task_type
-        self.use_gemini = bool(GOOGLE_API_KEY) and not USE_MOCK_EMB and genai is not None
+        self.api_key = (api_key if api_key is not None else GOOGLE_API_KEY).strip()
+        self.base_url = (base_url or GEMINI_API_BASE).rstrip("/")
+        self.batch_size = max(1, min(batch_size, MAX_GEMINI_BATCH_SIZE))
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.use_gemini = bool(self.api_key) and not USE_MOCK_EMB
+
+        # Shared keep-alive session and worker pool, created on first use
+        self._session: Optional[requests.Session] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
 
         if self.use_gemini:
-            try:
-                genai.configure(api_key=GOOGLE_API_KEY)
-                logger.info("Gemini embedding function initialized (model=%s)", model)
-            except Exception as e:  # pragma: no cover - defensive
-                logger.warning("Failed to configure Gemini; falling back to mock embeddings: %s", e)
-                self.use_gemini = False
+            logger.info(
+                "Gemini embedding function initialized (model=%s, batch_size=%d, concurrency=%d)",
+                self.model, self.batch_size, self.max_concurrency,
+            )
         else:
-            if not GOOGLE_API_KEY:
+            if not self.api_key:
                 logger.warning("GOOGLE_API_KEY not set; using mock embeddings (Ollama fallback).")
             if USE_MOCK_EMB:
                 logger.info("USE_MOCK_EMB=true; forcing mock embeddings.")
-            if genai is None:
-                logger.warning("google-generativeai package not available; using mock embeddings.")
+
+    # ------------------------------------------------------------------
+    # HTTP plumbing
+    # ------------------------------------------------------------------
+
+    def _get_session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=self.max_concurrency,
+                    pool_maxsize=self.max_concurrency,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"x-goog-api-key": self.api_key})
+                self._session = session
+            return self._session
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="gemini-embed"
+                )
+            return self._executor
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = self.backoff_base * (2 ** attempt)
+        return min(delay, self.backoff_max) * (0.5 + random.random() / 2)
+
+    def _post(self, method: str, payload: dict) -> dict:
+        """POST to a model method, retrying rate limits and transient errors."""
+        url = f"{self.base_url}/{self.model}:{method}"
+        session = self._get_session()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = session.post(url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt >= self.max_retries:
+                    raise GeminiRequestError(f"Gemini {method} network error: {e}") from e
+                time.sleep(self._backoff_delay(attempt, None))
+                continue
+
+            if resp.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                delay = self._backoff_delay(attempt, resp.headers.get("Retry-After"))
+                logger.warning(
+                    "Gemini %s returned %d; retrying in %.2fs (attempt %d/%d)",
+                    method, resp.status_code, delay, attempt + 1, self.max_retries,
+                )
+                time.sleep(delay)
+                continue
+
+            if resp.status_code >= 400:
+                raise GeminiRequestError(
+                    f"Gemini {method} failed with HTTP {resp.status_code}: {resp.text[:200]}",
+                    status_code=resp.status_code,
+                )
+
+            try:
+                return resp.json()
+            except ValueError as e:
+                raise GeminiRequestError(f"Invalid JSON from Gemini {method}: {e}", status_code=resp.status_code) from e
+
+        raise GeminiRequestError(f"Gemini {method} retries exhausted")  # pragma: no cover
+
+    def _content_request(self, text: str) -> dict:
+        return {
+            "model": self.model,
+            "content": {"parts": [{"text": text}]},
+            "taskType": self.task_type.upper(),
+        }
+
+    # ------------------------------------------------------------------
+    # Embedding
+    # ------------------------------------------------------------------
+
+    def _embed_single(self, text: str) -> List[float]:
+        """Embed one text; on failure, fall back to the mock for this text only."""
+        try:
+            data = self._post("embedContent", self._content_request(text))
+            values = (data.get("embedding") or {}).get("values")
+            if values:
+                return values
+            logger.warning("Gemini returned no embedding; using mock fallback for this text.")
+        except GeminiRequestError as e:
+            logger.error("Gemini embedding error; using mock for current text: %s", e)
+        return _ollama_client.embed_text(text)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch with a single request, falling back per item if it is rejected."""
+        try:
+            data = self._post(
+                "batchEmbedContents",
+                {"requests": [self._content_request(text) for text in texts]},
+            )
+            items = data.get("embeddings") or []
+        except GeminiRequestError as e:
+            if e.transient:
+                # Rate limits and outages already had the batch-level backoff;
+                # one request per item would only multiply the load
+                raise
+            # The API rejected the batch (e.g. one bad item); isolate it per item
+            logger.error("Gemini batch of %d failed; embedding items individually: %s", len(texts), e)
+            return [self._embed_single(text) for text in texts]
+
+        embeddings: List[List[float]] = []
+        for i, text in enumerate(texts):
+            values = items[i].get("values") if i < len(items) and isinstance(items[i], dict) else None
+            if values:
+                embeddings.append(values)
+            else:
+                logger.warning("Gemini returned no embedding for batch item %d; using mock fallback.", i)
+                embeddings.append(_ollama_client.embed_text(text))
+        return embeddings
 
     def __call__(self, input: Sequence[str]) -> List[List[float]]:  # type: ignore[override]
         # Normalize input to list of strings
@@ -84,26 +261,28 @@ class GeminiEmbeddingFunction(EmbeddingFunction):
             # Use Ollama client's embedding (which may itself be mock)
             return _ollama_client.embed_batch(texts, parallel=False)
 
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+
+        # map() keeps batch order, so results line up with the input
         embeddings: List[List[float]] = []
-        for text in texts:
-            try:
-                result = genai.embed_content(
-                    model=self.model,
-                    content=text,
-                    task_type=self.task_type,
-                )
-                emb = result.get("embedding") if isinstance(result, dict) else None
-                if not emb:
-                    logger.warning("Gemini returned no embedding; using mock fallback for this text.")
-                    emb = _ollama_client.embed_text(text)
-                embeddings.append(emb)
-            except Exception as e:  # pragma: no cover - network/runtime
-                logger.error("Gemini embedding error; using mock for current text: %s", e)
-                embeddings.append(_ollama_client.embed_text(text))
+        for batch_embeddings in self._get_executor().map(self._embed_batch, batches):
+            embeddings.extend(batch_embeddings)
         return embeddings
 
+    def close(self) -> None:
+        """Release the HTTP session and worker threads."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
 
 # Public singleton instance
 gemini_embedding_function = GeminiEmbeddingFunction()
 
-__all__ = ["GeminiEmbeddingFunction", "gemini_embedding_function"]
+__all__ = ["GeminiEmbeddingFunction", "GeminiRequestError", "gemini_embedding_function"]
@@ -0,0 +1,220 @@
+"""
+Process-wide registry of loaded embedding models.
+
+Every EmbeddingService instance resolves its models through the shared
+registry, so a model is loaded from disk once per process no matter how many
+service instances the request handlers create.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import settings
+from app.utils.logger import logger
+
+
+ModelKey = Tuple[str, str]
+
+
+class EmbeddingModelRegistry:
+    """Thread-safe cache of embedding models keyed by (provider, model name)"""
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._models: Dict[ModelKey, Any] = {}
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._loads: Dict[ModelKey, int] = {}
+        self._hits: Dict[ModelKey, int] = {}
+        self._load_time_ms: Dict[ModelKey, float] = {}
+
+    def _get_key_lock(self, key: ModelKey) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def get_or_load(
+        self,
+        provider: str,
+        model_name: str,
+        loader: Callable[[], Any]
+    ) -> Any:
+        """
+        Return the cached model for a key, loading it exactly once
+
+        Args:
+            provider: Embedding provider name (huggingface, cohere, ...)
+            model_name: Model identifier within the provider
+            loader: Zero-argument callable that builds the model
+
+        Returns:
+            The loaded model object
+        """
+        key = (provider, model_name)
+
+        # Fast path without taking any lock
+        model = self._models.get(key)
+        if model is not None:
+            with self._lock:
+                self._hits[key] = self._hits.get(key, 0) + 1
+            return model
+
+        # Per-key lock so loading one model never blocks lookups of another
+        with self._get_key_lock(key):
+            model = self._models.get(key)
+            if model is not None:
+                with self._lock:
+                    self._hits[key] = self._hits.get(key, 0) + 1
+                return model
+
+            logger.info(f"Loading embedding model: {provider}/{model_name}")
+            start_time = time.time()
+            model = loader()
+            load_time = (time.time() - start_time) * 1000
+
+            with self._lock:
+                self._models[key] = model
+                self._loads[key] = self._loads.get(key, 0) + 1
+                self._load_time_ms[key] = load_time
+
+            logger.info(f"Loaded embedding model {provider}/{model_name} in {load_time:.2f}ms")
+            return model
+
+    def get_sentence_transformer(self, model_name: Optional[str] = None) -> Any:
+        """
+        Get a shared SentenceTransformer instance
+
+        Args:
+            model_name: HuggingFace model name (default from settings)
+
+        Returns:
+            SentenceTransformer model
+        """
+        model_name = model_name or settings.huggingface_model
+
+        def _load():
+            # Import lazily to keep process startup memory low (important on Render/free tiers).
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name)
+
+        return self.get_or_load("huggingface", model_name, _load)
+
+    def get_onnx_encoder(
+        self,
+        model_name: Optional[str] = None,
+        quantize: Optional[bool] = None
+    ) -> Any:
+        """
+        Get a shared ONNX Runtime encoder, exporting the model on first use
+
+        Args:
+            model_name: HuggingFace model name (default from settings)
+            quantize: Use the dynamically int8-quantized graph (default from settings)
+
+        Returns:
+            OnnxSentenceEncoder instance
+        """
+        model_name = model_name or settings.huggingface_model
+        quantize = settings.onnx_quantize if quantize is None else quantize
+
+        def _load():
+            from app.services.onnx_embedding import load_onnx_encoder
+            return load_onnx_encoder(model_name, quantize=quantize)
+
+        key = f"{model_name}#int8" if quantize else model_name
+        return self.get_or_load("huggingface-onnx", key, _load)
+
+    def get_tokenizer(self, model_name: Optional[str] = None) -> Tuple[Any, Optional[int]]:
+        """
+        Get the tokenizer of a HuggingFace embedding model
+
+        Reuses the tokenizer of an already loaded SentenceTransformer; otherwise
+        loads only the tokenizer, which is far cheaper than the model.
+
+        Args:
+            model_name: HuggingFace model name (default from settings)
+
+        Returns:
+            Tuple of (tokenizer, model max_seq_length or None if unknown)
+        """
+        model_name = model_name or settings.huggingface_model
+
+        if self.is_loaded("huggingface", model_name):
+            model = self._models[("huggingface", model_name)]
+            return model.tokenizer, getattr(model, "max_seq_length", None)
+
+        def _load():
+            from transformers import AutoTokenizer
+            return AutoTokenizer.from_pretrained(model_name)
+
+        return self.get_or_load("tokenizer", model_name, _load), None
+
+    def get_cohere_client(self) -> Any:
+        """
+        Get a shared Cohere client
+
+        Returns:
+            cohere.Client instance
+        """
+        if not settings.cohere_api_key:
+            raise ValueError("Cohere API key not configured")
+
+        def _load():
+            import cohere
+            return cohere.Client(settings.cohere_api_key)
+
+        return self.get_or_load("cohere", "client", _load)
+
+    def prewarm(self, model_names: Optional[List[str]] = None) -> None:
+        """
+        Load HuggingFace models ahead of the first request
+
+        Args:
+            model_names: Models to load (default: configured HuggingFace model)
+        """
+        for model_name in model_names or [settings.huggingface_model]:
+            self.get_sentence_transformer(model_name)
+
+    def is_loaded(self, provider: str, model_name: str) -> bool:
+        """Check whether a model is already resident in this process"""
+        return (provider, model_name) in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get load and hit counters
+
+        Returns:
+            Dictionary with totals and per-model counters
+        """
+        with self._lock:
+            models = {
+                f"{provider}/{model_name}": {
+                    "loaded": (provider, model_name) in self._models,
+                    "loads": self._loads.get((provider, model_name), 0),
+                    "hits": self._hits.get((provider, model_name), 0),
+                    "load_time_ms": self._load_time_ms.get((provider, model_name), 0.0),
+                }
+                for provider, model_name in set(self._loads) | set(self._hits)
+            }
+            return {
+                "loaded_models": len(self._models),
+                "total_loads": sum(self._loads.values()),
+                "total_hits": sum(self._hits.values()),
+                "models": models,
+            }
+
+    def clear(self) -> None:
+        """Drop all cached models and reset counters"""
+        with self._lock:
+            self._models.clear()
+            self._key_locks.clear()
+            self._loads.clear()
+            self._hits.clear()
+            self._load_time_ms.clear()
+
+
+# Global instance
+embedding_model_registry = EmbeddingModelRegistry()
@@ -3,31 +3,80 @@ Embedding generation service (OpenAI disabled).
 
 Supported providers:
 - HuggingFace (sentence-transformers)
+- HuggingFace on ONNX Runtime ("huggingface-onnx", CPU-optimized, optional int8)
 - Cohere
+
+Embeddings are returned as float32 numpy arrays (one row per text) and stay
+that way through storage and scoring; convert to lists only when
+serializing to JSON.
 """
 
-from typing import List, Optional, Tuple
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, List, Optional, Tuple, Union
+import numpy as np
 from app.config import settings
+from app.services.embedding_batcher import QueryEmbeddingBatcher, query_embedding_batcher
+from app.services.embedding_cache import EmbeddingCache, embedding_cache
+from app.services.embedding_executor import (
+    EmbeddingBackpressureError,
+    EmbeddingExecutor,
+    embedding_executor,
+)
+from app.services.embedding_model_registry import (
+    EmbeddingModelRegistry,
+    embedding_model_registry,
+)
 from app.utils.logger import logger
 
 
+async def iterate_async(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    """Iterate a sync or async iterable with ``async for``"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
 class EmbeddingService:
     """Service for generating text embeddings"""
 
-    def __init__(self):
-        """Initialize embedding service"""
-        self.sentence_transformer = None
-        self._sentence_transformer_model_name: Optional[str] = None
-        self.cohere_client = None
+    def __init__(
+        self,
+        registry: Optional[EmbeddingModelRegistry] = None,
+        cache: Optional[EmbeddingCache] = None,
+        executor: Optional[EmbeddingExecutor] = None,
+        batcher: Optional[QueryEmbeddingBatcher] = None
+    ):
+        """
+        Initialize embedding service
 
-        logger.info("Embedding service initialized (OpenAI disabled)")
+        Args:
+            registry: Optional model registry (defaults to the process-wide one)
+            cache: Optional embedding cache (defaults to the process-wide one when enabled)
+            executor: Optional encode executor (defaults to the process-wide one)
+            batcher: Optional query micro-batcher (defaults to the process-wide one when enabled)
+        """
+        # Models live in the shared registry, so creating a service is cheap
+        self.registry = registry or embedding_model_registry
+        self.cache = cache or (embedding_cache if settings.embedding_cache_enabled else None)
+        self.executor = executor or embedding_executor
+        self.batcher = batcher or (
+            query_embedding_batcher if settings.embedding_micro_batch_enabled else None
+        )
+
+    @property
+    def batch_scope(self) -> Tuple[Any, ...]:
+        """Services sharing this state encode identically, so their queries may share a batch"""
+        return (self.registry, self.cache, self.executor)
 
     async def generate_embeddings(
         self,
         texts: List[str],
         provider: str = "huggingface",
         model: Optional[str] = None
-    ) -> Tuple[List[List[float]], int]:
+    ) -> Tuple[np.ndarray, int]:
         """
         Generate embeddings for a list of texts
 
@@ -37,38 +86,172 @@ class EmbeddingService:
             model: Optional specific model to use
 
         Returns:
-            Tuple of (embeddings list, dimension count)
+            Tuple of (float32 array of shape (len(texts), dimensions), dimension count)
         """
         if not texts:
-            return [], 0
+            return np.empty((0, 0), dtype=np.float32), 0
+
+        if provider not in self.get_supported_providers():
+            raise ValueError(f"Unsupported embedding provider: {provider}")
+
+        if self.cache is None:
+            embeddings, _ = await self._generate_provider_embeddings(texts, provider, model)
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            return embeddings, embeddings.shape[1]
+
+        # Look every text up by content address; only misses reach the provider
+        model_name = self._resolve_model_name(provider, model)
+        cache_namespace = self._cache_namespace(provider)
+        keys = [self.cache.make_key(cache_namespace, model_name, text) for text in texts]
+        vectors = await self.cache.aget_many(keys)
+        miss_positions = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if miss_positions:
+            # Encode each distinct missing text once, even if repeated in the batch
+            missing = {}
+            for i in miss_positions:
+                missing.setdefault(keys[i], texts[i])
+
+            miss_keys = list(missing)
+            new_embeddings, _ = await self._generate_provider_embeddings(
+                list(missing.values()), provider, model_name
+            )
+            new_embeddings = np.asarray(new_embeddings, dtype=np.float32)
+            await self.cache.aput_many(miss_keys, new_embeddings)
+
+            by_key = dict(zip(miss_keys, new_embeddings))
+            for i in miss_positions:
+                vectors[i] = by_key[keys[i]]
+
+        if len(miss_positions) < len(texts):
+            logger.info(
+                f"Embedding cache served {len(texts) - len(miss_positions)}/{len(texts)} "
+                f"{provider} embeddings"
+            )
+
+        # Cached rows are already float32, so stacking is a single contiguous copy
+        embeddings = np.stack(vectors).astype(np.float32, copy=False)
+
+        return embeddings, embeddings.shape[1]
+
+    async def seed_cache(
+        self,
+        texts: List[str],
+        embeddings: Any,
+        provider: str = "huggingface",
+        model: Optional[str] = None
+    ) -> int:
+        """
+        Pre-load known vectors into the cache, e.g. those of an identical document
+
+        Args:
+            texts: Texts the vectors belong to
+            embeddings: One vector per text, produced by this provider/model
+            provider: Provider the vectors came from
+            model: Optional specific model
+
+        Returns:
+            Number of vectors cached (0 when caching is disabled)
+        """
+        if self.cache is None or not texts:
+            return 0
+        model_name = self._resolve_model_name(provider, model)
+        cache_namespace = self._cache_namespace(provider)
+        keys = [self.cache.make_key(cache_namespace, model_name, text) for text in texts]
+        await self.cache.aput_many(keys, np.asarray(embeddings, dtype=np.float32))
+        return len(keys)
+
+    async def embed_chunk_stream(
+        self,
+        chunks: Union[Iterable[Any], AsyncIterable[Any]],
+        batch_size: Optional[int] = None,
+        provider: str = "huggingface",
+        model: Optional[str] = None
+    ) -> AsyncIterator[Tuple[List[Any], np.ndarray]]:
+        """
+        Embed a lazily produced stream of chunks batch by batch
+
+        Only one batch of chunks is held at a time, so a chunk generator
+        (ChunkingService.iter_chunks or aiter_chunks) can feed embedding
+        without building the full chunk list first.
 
+        Args:
+            chunks: Sync or async iterable of objects with a ``text`` attribute (e.g. TextChunk)
+            batch_size: Chunks per embedding call (default from settings)
+            provider: Provider to use
+            model: Optional specific model to use
+
+        Yields:
+            Tuples of (chunk batch, float32 array with one row per chunk)
+        """
+        batch_size = batch_size or settings.chunk_embed_batch_size
+        batch: List[Any] = []
+        async for chunk in iterate_async(chunks):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                embeddings, _ = await self.generate_embeddings([c.text for c in batch], provider, model)
+                yield batch, embeddings
+                batch = []
+        if batch:
+            embeddings, _ = await self.generate_embeddings([c.text for c in batch], provider, model)
+            yield batch, embeddings
+
+    async def _generate_provider_embeddings(
+        self,
+        texts: List[str],
+        provider: str,
+        model: Optional[str] = None
+    ) -> Tuple[np.ndarray, int]:
+        """Dispatch an uncached batch to the provider implementation"""
         if provider == "huggingface":
             return await self._generate_huggingface_embeddings(texts, model)
+        elif provider == "huggingface-onnx":
+            return await self._generate_huggingface_embeddings(texts, model, backend="onnx")
         elif provider == "cohere":
             return await self._generate_cohere_embeddings(texts, model)
         else:
             raise ValueError(f"Unsupported embedding provider: {provider}")
 
+    @staticmethod
+    def _resolve_model_name(provider: str, model: Optional[str] = None) -> str:
+        """Resolve the concrete model name a provider will use"""
+        if model:
+            return model
+        if provider in ("huggingface", "huggingface-onnx"):
+            return settings.huggingface_model
+        if provider == "cohere":
+            return "embed-english-v3.0"
+        return ""
+
+    @staticmethod
+    def _cache_namespace(provider: str) -> str:
+        """Cache namespace for a provider; int8 ONNX vectors differ slightly, so keep them apart"""
+        if provider == "huggingface-onnx" and settings.onnx_quantize:
+            return "huggingface-onnx-int8"
+        return provider
+
     # OpenAI embeddings are intentionally disabled to eradicate OpenAI usage.
     # Leaving a stub for clarity.
     async def _generate_openai_embeddings(
         self,
         texts: List[str],
         model: Optional[str] = None
-    ) -> Tuple[List[List[float]], int]:
+    ) -> Tuple[np.ndarray, int]:
         raise NotImplementedError("OpenAI embeddings are disabled in this deployment")
 
     async def _generate_huggingface_embeddings(
         self,
         texts: List[str],
-        model: Optional[str] = None
-    ) -> Tuple[List[List[float]], int]:
+        model: Optional[str] = None,
+        backend: str = "torch"
+    ) -> Tuple[np.ndarray, int]:
         """
         Generate embeddings using HuggingFace sentence-transformers
 
         Args:
             texts: List of texts
             model: HuggingFace model to use
+            backend: "torch" (SentenceTransformer) or "onnx" (onnxruntime)
 
         Returns:
             Tuple of (embeddings, dimensions)
@@ -76,33 +259,25 @@ class EmbeddingService:
         try:
             model_name = model or settings.huggingface_model
 
-            # Import lazily to keep process startup memory low (important on Render/free tiers).
-            from sentence_transformers import SentenceTransformer
-
-            # Load model (cached after first load)
-            if self.sentence_transformer is None or self._sentence_transformer_model_name != model_name:
-                logger.info(f"Loading HuggingFace model: {model_name}")
-                self.sentence_transformer = SentenceTransformer(model_name)
-                self._sentence_transformer_model_name = model_name
-
-            # Generate embeddings
-            embeddings = self.sentence_transformer.encode(
-                texts,
-                show_progress_bar=False,
-                convert_to_numpy=True
+            # Encode on the bounded worker pool; the model is resolved through the
+            # registry there, so neither loading nor encoding blocks the event loop
+            embeddings = await self.executor.encode(
+                model_name, texts, registry=self.registry, backend=backend
             )
 
-            # Convert to list format
-            embeddings_list = embeddings.tolist()
-            dimensions = len(embeddings_list[0]) if embeddings_list else 0
+            # Keep the encoder's float32 matrix as-is (no per-float Python objects)
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            dimensions = embeddings.shape[1] if embeddings.ndim == 2 else 0
 
             logger.info(
-                f"Generated {len(embeddings_list)} HuggingFace embeddings "
+                f"Generated {len(embeddings)} HuggingFace ({backend}) embeddings "
                 f"with dimension {dimensions}"
             )
 
-            return embeddings_list, dimensions
+            return embeddings, dimensions
 
+        except EmbeddingBackpressureError:
+            raise
         except Exception as e:
             logger.error(f"Error generating HuggingFace embeddings: {e}")
             raise
@@ -111,7 +286,7 @@ class EmbeddingService:
         self,
         texts: List[str],
         model: Optional[str] = None
-    ) -> Tuple[List[List[float]], int]:
+    ) -> Tuple[np.ndarray, int]:
         """
         Generate embeddings using Cohere
 
@@ -126,10 +301,7 @@ class EmbeddingService:
             raise ValueError("Cohere API key not configured")
 
         try:
-            import cohere
-
-            if self.cohere_client is None:
-                self.cohere_client = cohere.Client(settings.cohere_api_key)
+            cohere_client = await asyncio.to_thread(self.registry.get_cohere_client)
 
             model_name = model or "embed-english-v3.0"
 
@@ -140,7 +312,9 @@ class EmbeddingService:
             for i in range(0, len(texts), batch_size):
                 batch = texts[i:i + batch_size]
 
-                response = self.cohere_client.embed(
+                # The Cohere SDK is synchronous; keep the HTTP round-trip off the event loop
+                response = await asyncio.to_thread(
+                    cohere_client.embed,
                     texts=batch,
                     model=model_name,
                     input_type="search_document"
@@ -148,14 +322,16 @@ class EmbeddingService:
 
                 all_embeddings.extend(response.embeddings)
 
-            dimensions = len(all_embeddings[0]) if all_embeddings else 0
+            # Cohere returns JSON lists; convert once at the API boundary
+            embeddings = np.asarray(all_embeddings, dtype=np.float32)
+            dimensions = embeddings.shape[1] if embeddings.ndim == 2 else 0
 
             logger.info(
-                f"Generated {len(all_embeddings)} Cohere embeddings "
+                f"Generated {len(embeddings)} Cohere embeddings "
                 f"with dimension {dimensions}"
             )
 
-            return all_embeddings, dimensions
+            return embeddings, dimensions
 
         except Exception as e:
             logger.error(f"Error generating Cohere embeddings: {e}")
@@ -166,7 +342,7 @@ class EmbeddingService:
         query: str,
         provider: str = "huggingface",
         model: Optional[str] = None
-    ) -> List[float]:
+    ) -> np.ndarray:
         """
         Generate embedding for a single query
 
@@ -176,15 +352,21 @@ class EmbeddingService:
             model: Optional model
 
         Returns:
-            Query embedding vector
+            Query embedding vector (1-D float32 array)
         """
+        if self.batcher is not None and query:
+            # Coalesce with concurrent queries into a single encode call
+            return await self.batcher.submit(
+                query, provider, model, self.generate_embeddings, scope=self.batch_scope
+            )
+
         embeddings, _ = await self.generate_embeddings([query], provider, model)
-        return embeddings[0] if embeddings else []
+        return embeddings[0] if len(embeddings) else np.empty(0, dtype=np.float32)
 
     @staticmethod
     def get_supported_providers() -> List[str]:
         """Get list of supported embedding providers"""
-        return ["huggingface", "cohere"]
+        return ["huggingface", "huggingface-onnx", "cohere"]
 
 
 # Global instance
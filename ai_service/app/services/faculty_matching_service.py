@@ -3,7 +3,6 @@ Faculty matching service using embedding-based and keyword-based matching
 """
 
 import time
-import numpy as np
 from typing import List, Optional, Dict, Any, Tuple
 from collections import defaultdict
 
@@ -17,6 +16,7 @@ from app.models.faculty import (
     FacultyStatus
 )
 from app.services.embedding_service import EmbeddingService
+from app.services.vector_quantization import VectorCodec, vector_codec
 from app.database.mongodb import get_database
 from app.utils.logger import logger
 
@@ -24,14 +24,20 @@ from app.utils.logger import logger
 class FacultyMatchingService:
     """Service for matching students with faculty based on research interests"""
 
-    def __init__(self, embedding_service: Optional[EmbeddingService] = None):
+    def __init__(
+        self,
+        embedding_service: Optional[EmbeddingService] = None,
+        codec: Optional[VectorCodec] = None
+    ):
         """
         Initialize faculty matching service
 
         Args:
             embedding_service: Optional embedding service instance
+            codec: Optional vector codec controlling stored precision and rerank
         """
         self.embedding_service = embedding_service or EmbeddingService()
+        self.codec = codec or vector_codec
         self._db = None
         self._faculty_collection = None
         self._faculty_embeddings_collection = None
@@ -154,29 +160,29 @@ class FacultyMatchingService:
         """
         # Generate query embedding
         query_embedding = await self.embedding_service.generate_query_embedding(
-            request.research_interests,
-            provider="openai"
+            request.research_interests
         )
 
         # Get all faculty matching filters with embeddings
         cursor = self.faculty_embeddings_collection.find(filters)
         faculty_embeddings = await cursor.to_list(length=None)
+        faculty_embeddings = [doc for doc in faculty_embeddings if "embedding" in doc]
 
         if not faculty_embeddings:
             logger.warning(f"No faculty found matching filters: {filters}")
             return []
 
+        # Score every candidate in one pass over the stored (possibly quantized) codes
+        similarities = self.codec.score(
+            query_embedding,
+            faculty_embeddings,
+            top_k=request.top_k * 10
+        )
+
         # Calculate similarities
         matches = []
-        for faculty_emb in faculty_embeddings:
-            if "embedding" not in faculty_emb:
-                continue
-
-            # Calculate cosine similarity
-            similarity = self._cosine_similarity(
-                query_embedding,
-                faculty_emb["embedding"]
-            )
+        for faculty_emb, similarity in zip(faculty_embeddings, similarities):
+            similarity = float(similarity)
 
             # Get full faculty info
             faculty_info = await self._get_faculty_info(
@@ -620,31 +626,6 @@ class FacultyMatchingService:
 
         return final_score
 
-    @staticmethod
-    def _cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-        """
-        Calculate cosine similarity between two vectors
-
-        Args:
-            vec1: First vector
-            vec2: Second vector
-
-        Returns:
-            Similarity score (0-1)
-        """
-        v1 = np.array(vec1)
-        v2 = np.array(vec2)
-
-        dot_product = np.dot(v1, v2)
-        norm1 = np.linalg.norm(v1)
-        norm2 = np.linalg.norm(v2)
-
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-
-        similarity = dot_product / (norm1 * norm2)
-        return max(0.0, min(1.0, similarity))  # Clamp to [0, 1]
-
     async def add_faculty(
         self,
         faculty: FacultyInfo,
@@ -699,10 +680,7 @@ class FacultyMatchingService:
         text = ". ".join(text_parts)
 
         # Generate embedding
-        embedding = await self.embedding_service.generate_query_embedding(
-            text,
-            provider="openai"
-        )
+        embedding = await self.embedding_service.generate_query_embedding(text)
 
         # Store embedding
         await self.faculty_embeddings_collection.update_one(
@@ -713,7 +691,7 @@ class FacultyMatchingService:
                     "university": faculty.university,
                     "department": faculty.department,
                     "accepting_students": faculty.accepting_students.value,
-                    "embedding": embedding,
+                    **self.codec.encode(embedding),
                     "embedding_text": text
                 }
             },
@@ -1,51 +1,73 @@
 """GridFS helpers.
 
-We keep processors (PDF/Doc/OCR) working by materializing GridFS content into a
-temporary file path.
+Processors (PDF/Doc/OCR) read from any seekable binary stream, so GridFS
+content is copied chunk by chunk into a ``SpooledTemporaryFile``: uploads below
+the spool threshold stay in memory and never touch disk, larger ones spill to
+an anonymous temp file instead of being held in RAM a second time.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from pathlib import Path
+from contextlib import asynccontextmanager
 import tempfile
 import inspect
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 from bson import ObjectId
 
+from app.config import settings
 from app.database.mongodb import get_gridfs_bucket
 
+# Size of each read from the GridFS download stream
+COPY_CHUNK_BYTES = 256 * 1024
 
-@dataclass
-class TempFileResult:
-    path: str
 
-
-async def gridfs_to_tempfile(
+async def gridfs_to_spooled(
     gridfs_id: str,
     *,
     bucket_name: str = "user_uploads",
-    suffix: Optional[str] = None,
-) -> TempFileResult:
-    """Download a GridFS file to a temporary file and return its path."""
-    bucket = get_gridfs_bucket(bucket_name=bucket_name)
+    max_memory_bytes: Optional[int] = None,
+    bucket=None,
+) -> tempfile.SpooledTemporaryFile:
+    """Copy a GridFS file into a spooled temporary file, rewound to the start.
+
+    The caller owns the returned file and must close it.
+    """
+    if max_memory_bytes is None:
+        max_memory_bytes = settings.extraction_spool_threshold_bytes
+    if bucket is None:
+        bucket = get_gridfs_bucket(bucket_name=bucket_name)
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+    try:
+        stream = await bucket.open_download_stream(ObjectId(gridfs_id))
+        try:
+            while chunk := await stream.read(COPY_CHUNK_BYTES):
+                spooled.write(chunk)
+        finally:
+            close_result = stream.close()
+            if inspect.isawaitable(close_result):
+                await close_result
+    except BaseException:
+        spooled.close()
+        raise
 
-    # Normalize suffix
-    if suffix and not suffix.startswith("."):
-        suffix = "." + suffix
+    spooled.seek(0)
+    return spooled
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix or "")
-    tmp_path = tmp.name
-    tmp.close()
 
-    stream = await bucket.open_download_stream(ObjectId(gridfs_id))
+@asynccontextmanager
+async def open_gridfs_file(
+    gridfs_id: str,
+    *,
+    bucket_name: str = "user_uploads",
+    max_memory_bytes: Optional[int] = None,
+) -> AsyncIterator[tempfile.SpooledTemporaryFile]:
+    """Context manager around :func:`gridfs_to_spooled` that closes the file."""
+    spooled = await gridfs_to_spooled(
+        gridfs_id, bucket_name=bucket_name, max_memory_bytes=max_memory_bytes
+    )
     try:
-        data = await stream.read()  # bounded by upload size limits
-        Path(tmp_path).write_bytes(data)
+        yield spooled
     finally:
-        close_result = stream.close()
-        if inspect.isawaitable(close_result):
-            await close_result
-
-    return TempFileResult(path=tmp_path)
+        spooled.close()
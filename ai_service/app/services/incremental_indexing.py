@@ -0,0 +1,178 @@
+"""
+Incremental (re-)indexing of a document's chunks
+
+Chunk IDs are derived from the chunk's content hash, so when an edited
+document is ingested again an unchanged chunk maps onto the chunk already in
+the vector store. Only new or changed chunks are embedded and inserted, only
+chunks that disappeared are deleted, and unchanged chunks whose position or
+filename/tags changed get their metadata rewritten without re-embedding.
+"""
+
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+from app.database.vector_db import VectorDatabase
+from app.models.document import DocumentChunk
+from app.services.chunking_service import TextChunk
+from app.services.embedding_service import EmbeddingService, iterate_async
+from app.utils.logger import logger
+
+
+@dataclass
+class IndexingStats:
+    """Chunk counts from one (re-)index of a document"""
+    total: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def make_chunk_id(document_id: str, content_hash: str, occurrence: int = 0) -> str:
+    """
+    Content-addressed chunk ID
+
+    Args:
+        document_id: Parent document ID
+        content_hash: SHA-256 hex digest of the chunk text
+        occurrence: How many identical chunks precede this one in the document
+
+    Returns:
+        Chunk ID that stays stable while the chunk text is unchanged
+    """
+    chunk_id = f"{document_id}_{content_hash[:32]}"
+    return f"{chunk_id}_{occurrence}" if occurrence else chunk_id
+
+
+def to_document_chunk(
+    chunk: TextChunk,
+    chunk_id: str,
+    document_id: str,
+    tracking_id: str,
+    user_id: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    content_hash: Optional[str] = None
+) -> DocumentChunk:
+    """
+    Wrap a chunker TextChunk as the DocumentChunk stored in the vector store
+
+    Args:
+        chunk: Chunk from ChunkingService
+        chunk_id: Content-addressed ID (see make_chunk_id)
+        document_id: Parent document ID
+        tracking_id: Tracking identifier
+        user_id: Owner of the document
+        metadata: Extra chunk metadata (filename, tags)
+        content_hash: The chunk's content hash, if already computed
+
+    Returns:
+        DocumentChunk with word/char/token counts and content hash in its metadata
+    """
+    return DocumentChunk(
+        chunk_id=chunk_id,
+        document_id=document_id,
+        tracking_id=tracking_id,
+        user_id=user_id,
+        text=chunk.text,
+        chunk_index=chunk.index,
+        metadata={
+            **(metadata or {}),
+            "word_count": chunk.word_count,
+            "char_count": chunk.char_count,
+            "token_count": chunk.token_count,
+            "content_hash": content_hash or chunk.content_hash,
+        },
+    )
+
+
+async def index_document_chunks(
+    vector_db: VectorDatabase,
+    embedding_service: EmbeddingService,
+    chunks: Union[Iterable[TextChunk], AsyncIterable[TextChunk]],
+    document_id: str,
+    tracking_id: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    batch_size: Optional[int] = None,
+    on_batch: Optional[Callable[[IndexingStats], Awaitable[None]]] = None,
+    before_insert: Optional[Callable[[], Awaitable[None]]] = None
+) -> IndexingStats:
+    """
+    Bring a document's stored chunks in line with a freshly chunked version
+
+    Args:
+        vector_db: The user's vector database
+        embedding_service: Service used for chunks that need embedding
+        chunks: The document's new chunks (may be a lazy sync or async generator)
+        document_id: Document identifier
+        tracking_id: Tracking identifier
+        metadata: Extra chunk metadata (filename, tags)
+        batch_size: Chunks per embedding call (default from settings)
+        on_batch: Awaited with the running stats after each embedded batch
+        before_insert: Awaited before each batch is inserted; raising aborts
+            and rolls back the chunks inserted so far
+
+    Returns:
+        IndexingStats with embedded/skipped/updated/deleted counts
+    """
+    metadata = metadata or {}
+    stored = await vector_db.get_chunk_fingerprints(document_id)
+    stats = IndexingStats()
+    kept: Set[str] = set()
+    updated: Dict[str, Dict[str, Any]] = {}
+    inserted: List[str] = []
+    occurrences: Dict[str, int] = {}
+
+    async def pending() -> AsyncIterator[DocumentChunk]:
+        # Runs lazily between embedding batches, so the diff streams too
+        async for chunk in iterate_async(chunks):
+            content_hash = chunk.content_hash
+            occurrence = occurrences.get(content_hash, 0)
+            occurrences[content_hash] = occurrence + 1
+            chunk_id = make_chunk_id(document_id, content_hash, occurrence)
+            stats.total += 1
+
+            document_chunk = to_document_chunk(
+                chunk, chunk_id, document_id, tracking_id, vector_db.user_id, metadata, content_hash
+            )
+
+            previous = stored.get(chunk_id)
+            if previous is None:
+                yield document_chunk
+                continue
+
+            # Same content, already embedded: at most its position or labels changed
+            kept.add(chunk_id)
+            stats.skipped += 1
+            wanted = vector_db.chunk_metadata(document_chunk)
+            if any(previous.get(key) != value for key, value in wanted.items()):
+                updated[chunk_id] = wanted
+
+    try:
+        async for batch, embeddings in embedding_service.embed_chunk_stream(pending(), batch_size):
+            if before_insert is not None:
+                await before_insert()
+            await vector_db.insert_chunks(batch, embeddings=embeddings)
+            inserted.extend(chunk.chunk_id for chunk in batch)
+            stats.embedded += len(batch)
+            if on_batch is not None:
+                await on_batch(stats)
+    except Exception:
+        # Leave the previously indexed version intact rather than a mix of both
+        try:
+            await vector_db.delete_chunks(inserted)
+        except Exception as cleanup_error:
+            logger.error(f"Could not roll back chunks of document {document_id}: {cleanup_error}")
+        raise
+
+    stats.updated = await vector_db.update_chunk_metadata(updated)
+    removed = [chunk_id for chunk_id in stored if chunk_id not in kept]
+    stats.deleted = await vector_db.delete_chunks(removed)
+
+    logger.info(
+        f"Indexed document {document_id}: {stats.embedded} embedded, "
+        f"{stats.skipped} unchanged (embedding skipped), {stats.updated} relabelled, "
+        f"{stats.deleted} deleted"
+    )
+    return stats
@@ -1,13 +1,66 @@
 """
 OCR service for extracting text from images using pytesseract
+
+Every image is recognized in a single Tesseract pass: text and confidence are
+both rebuilt from ``image_to_data`` output. Decoded grayscale (optionally
+binarized) images are cached by content hash, so plain and layout OCR of the
+same upload decode and preprocess it only once. Scanned PDFs are rasterized
+by parallel pdftoppm processes and their pages OCRed on a process pool.
 """
 
-from typing import Dict, Any
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
 from pathlib import Path
-import pytesseract
 from PIL import Image
+import pytesseract
 from app.config import settings
+from app.utils.file_utils import DocumentSource, describe_source
 from app.utils.logger import logger
+from app.utils.ocr_pages import (
+    init_ocr_worker,
+    ocr_image,
+    ocr_image_file,
+    ocr_image_with_layout,
+    prepare_image,
+)
+
+# Preprocessed images by content hash (shared by all OCRService instances)
+_image_cache: "OrderedDict[str, Image.Image]" = OrderedDict()
+_image_cache_lock = threading.Lock()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process pool that OCRs rasterized PDF pages"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawn avoids forking a parent that may already hold torch threads
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.ocr_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_ocr_worker,
+                initargs=(settings.tesseract_path,),
+            )
+            logger.info(f"OCR pool started: workers={settings.ocr_workers}")
+        return _pool
+
+
+def _read_bytes(source: DocumentSource) -> bytes:
+    if isinstance(source, (str, os.PathLike)):
+        return Path(source).read_bytes()
+    source.seek(0)
+    return source.read()
 
 
 class OCRService:
@@ -19,89 +72,163 @@ class OCRService:
         if settings.tesseract_path:
             pytesseract.pytesseract.tesseract_cmd = settings.tesseract_path
 
+    @staticmethod
+    def _load_prepared_image(source: DocumentSource) -> Image.Image:
+        """Decode and preprocess an image, or reuse the cached result"""
+        content = _read_bytes(source)
+        key = f"{hashlib.sha256(content).hexdigest()}:{int(settings.ocr_binarize)}"
+
+        with _image_cache_lock:
+            if key in _image_cache:
+                _image_cache.move_to_end(key)
+                return _image_cache[key]
+
+        with Image.open(io.BytesIO(content)) as image:
+            prepared = prepare_image(image, settings.ocr_binarize)
+
+        if settings.ocr_image_cache_size > 0:
+            with _image_cache_lock:
+                _image_cache[key] = prepared
+                while len(_image_cache) > settings.ocr_image_cache_size:
+                    _image_cache.popitem(last=False)
+        return prepared
+
     async def extract_text_from_image(
         self,
-        file_path: str,
+        source: DocumentSource,
         language: str = None
     ) -> Dict[str, Any]:
         """
         Extract text from image using OCR
 
         Args:
-            file_path: Path to image file
+            source: Path to image file or binary stream
             language: OCR language (default from settings)
 
         Returns:
             Dictionary with extracted text and metadata
         """
         try:
-            # Open image
-            image = Image.open(file_path)
-
             # Use configured language or default
             lang = language or settings.ocr_languages
 
-            # Extract text
-            text = pytesseract.image_to_string(image, lang=lang)
-
-            # Get detailed data with confidence scores
-            data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+            image = await asyncio.to_thread(self._load_prepared_image, source)
 
-            # Calculate average confidence
-            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            # One Tesseract pass yields both the text and the confidence scores
+            result = await asyncio.to_thread(ocr_image, image, lang)
 
             logger.info(
-                f"Extracted {len(text)} characters from image {file_path} "
-                f"with avg confidence {avg_confidence:.2f}%"
+                f"Extracted {len(result['text'])} characters from image {describe_source(source)} "
+                f"with avg confidence {result['confidence']:.2f}%"
             )
 
-            return {
-                "text": text.strip(),
-                "confidence": avg_confidence,
-                "language": lang,
-                "word_count": len(text.split()),
-            }
+            return {**result, "language": lang}
 
         except Exception as e:
-            logger.error(f"Error performing OCR on {file_path}: {e}")
+            logger.error(f"Error performing OCR on {describe_source(source)}: {e}")
             raise
 
     async def extract_text_with_layout(
         self,
-        file_path: str,
+        source: DocumentSource,
         language: str = None
     ) -> Dict[str, Any]:
         """
         Extract text from image preserving layout
 
         Args:
-            file_path: Path to image file
+            source: Path to image file or binary stream
             language: OCR language
 
         Returns:
             Dictionary with extracted text and layout information
         """
         try:
-            image = Image.open(file_path)
             lang = language or settings.ocr_languages
+            image = await asyncio.to_thread(self._load_prepared_image, source)
 
-            # Get hOCR output (preserves layout)
-            hocr = pytesseract.image_to_pdf_or_hocr(image, lang=lang, extension='hocr')
+            # hOCR (preserves layout) and TSV (text) come from the same run
+            result = await asyncio.to_thread(ocr_image_with_layout, image, lang)
 
-            # Get plain text
-            text = pytesseract.image_to_string(image, lang=lang)
+            logger.info(f"Extracted text with layout from {describe_source(source)}")
 
-            logger.info(f"Extracted text with layout from {file_path}")
+            return {
+                "text": result["text"],
+                "hocr": result["hocr"],
+                "confidence": result["confidence"],
+                "language": lang,
+            }
+
+        except Exception as e:
+            logger.error(f"Error performing layout OCR on {describe_source(source)}: {e}")
+            raise
+
+    async def extract_text_from_pdf(
+        self,
+        source: DocumentSource,
+        language: str = None,
+        dpi: int = None
+    ) -> Dict[str, Any]:
+        """
+        OCR a scanned PDF, pages in parallel
+
+        Pages are rasterized (grayscale) to a scratch directory by
+        ``ocr_raster_threads`` pdftoppm processes; workers then OCR them by
+        path, so page images are never pickled between processes.
+
+        Args:
+            source: Path to PDF file or binary stream
+            language: OCR language (default from settings)
+            dpi: Rasterization resolution (default from settings)
+
+        Returns:
+            Dictionary with text (pages marked "--- Page n ---"), per-page
+            results, average confidence, language and word count
+        """
+        from pdf2image import convert_from_bytes
+
+        lang = language or settings.ocr_languages
+        dpi = dpi or settings.ocr_pdf_dpi
+        try:
+            content = await asyncio.to_thread(_read_bytes, source)
+            with tempfile.TemporaryDirectory(prefix="ocr_") as scratch:
+                paths = await asyncio.to_thread(
+                    convert_from_bytes,
+                    content,
+                    dpi=dpi,
+                    thread_count=settings.ocr_raster_threads,
+                    grayscale=True,
+                    output_folder=scratch,
+                    paths_only=True,
+                    fmt="png",
+                )
+                loop = asyncio.get_running_loop()
+                pool = _get_pool()
+                pages = await asyncio.gather(*(
+                    loop.run_in_executor(pool, ocr_image_file, path, lang, settings.ocr_binarize)
+                    for path in paths
+                ))
+
+            text = "".join(
+                f"\n--- Page {number} ---\n{page['text']}" for number, page in enumerate(pages, start=1)
+            ).strip()
+            confidences = [page["confidence"] for page in pages if page["word_count"]]
+
+            logger.info(
+                f"OCR extracted {len(text)} characters from {len(pages)} pages of "
+                f"{describe_source(source)} at {dpi} dpi"
+            )
 
             return {
-                "text": text.strip(),
-                "hocr": hocr.decode('utf-8'),
+                "text": text,
+                "pages": pages,
+                "confidence": sum(confidences) / len(confidences) if confidences else 0,
                 "language": lang,
+                "word_count": sum(page["word_count"] for page in pages),
             }
 
         except Exception as e:
-            logger.error(f"Error performing layout OCR on {file_path}: {e}")
+            logger.error(f"Error performing OCR on PDF {describe_source(source)}: {e}")
             raise
 
     @staticmethod
@@ -118,20 +245,23 @@ class OCRService:
         image_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.tif'}
         return Path(file_path).suffix.lower() in image_extensions
 
-    async def validate_image(self, file_path: str) -> bool:
+    async def validate_image(self, source: DocumentSource) -> bool:
         """
         Validate that image can be processed
 
         Args:
-            file_path: Path to image file
+            source: Path to image file or binary stream (rewound afterwards)
 
         Returns:
             True if image is valid
         """
         try:
-            image = Image.open(file_path)
+            image = Image.open(source)
             image.verify()
             return True
         except Exception as e:
-            logger.error(f"Invalid image file {file_path}: {e}")
+            logger.error(f"Invalid image file {describe_source(source)}: {e}")
             return False
+        finally:
+            if hasattr(source, "seek"):
+                source.seek(0)
@@ -0,0 +1,337 @@
+"""
+ONNX Runtime inference backend for sentence-transformers models.
+
+The configured HuggingFace model is exported once to ONNX (optionally with
+dynamic int8 weight quantization) and cached on disk. Inference then runs on
+onnxruntime's CPU provider with the same tokenization, pooling and
+normalization as the SentenceTransformer pipeline, so vectors stay compatible
+with the PyTorch path. An export is only kept if its vectors match PyTorch
+within `onnx_min_cosine_similarity` on a set of probe sentences.
+
+Requires the optional ``onnx`` extra (onnxruntime, onnx); torch and
+sentence-transformers are only needed for the one-off export.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.config import settings
+from app.utils.logger import logger
+
+
+CONFIG_FILENAME = "onnx_config.json"
+MODEL_FILENAME = "model.onnx"
+QUANTIZED_MODEL_FILENAME = "model.int8.onnx"
+
+# Probe sentences used to check exported vectors against PyTorch
+VALIDATION_TEXTS = [
+    "Statement of purpose for a graduate program in computer science.",
+    "My research interests include machine learning and natural language processing.",
+    "I led a team of five students to build a low-cost water filtration prototype.",
+    "Transcript",
+    "The applicant has published two papers on reinforcement learning for robotics, "
+    "one of which received a best paper award at an international workshop.",
+]
+
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer-compatible encoder backed by onnxruntime"""
+
+    def __init__(
+        self,
+        session: Any,
+        tokenizer: Any,
+        pooling: str = "mean",
+        normalize: bool = True,
+        max_seq_length: int = 256
+    ):
+        """
+        Initialize encoder
+
+        Args:
+            session: onnxruntime InferenceSession producing token embeddings
+            tokenizer: HuggingFace tokenizer matching the exported model
+            pooling: "mean" or "cls"
+            normalize: L2-normalize sentence embeddings
+            max_seq_length: Truncation length in tokens
+        """
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unsupported pooling mode: {pooling}")
+        self.session = session
+        self.tokenizer = tokenizer
+        self.pooling = pooling
+        self.normalize = normalize
+        self.max_seq_length = max_seq_length
+        self._input_names = {i.name for i in session.get_inputs()}
+
+    def encode(
+        self,
+        sentences: List[str],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False
+    ) -> np.ndarray:
+        """
+        Encode sentences (same call shape as SentenceTransformer.encode)
+
+        Args:
+            sentences: Texts to encode
+            batch_size: Texts per inference call
+            show_progress_bar: Ignored; kept for signature compatibility
+            convert_to_numpy: Ignored; output is always a numpy array
+            normalize_embeddings: Force L2 normalization
+
+        Returns:
+            float32 array of shape (len(sentences), dimension)
+        """
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if not sentences:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Encode longest-first like SentenceTransformer so batches pad less
+        order = np.argsort([-len(text) for text in sentences], kind="stable")
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            batches.append(self._encode_batch(batch))
+
+        sorted_embeddings = np.concatenate(batches, axis=0)
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+
+        if self.normalize or normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        return embeddings.astype(np.float32, copy=False)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Tokenize, run the graph and pool one batch"""
+        features = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feeds = {
+            name: np.asarray(value, dtype=np.int64)
+            for name, value in features.items()
+            if name in self._input_names
+        }
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        if self.pooling == "cls":
+            return token_embeddings[:, 0].astype(np.float32)
+
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32)
+
+    @classmethod
+    def from_directory(cls, model_dir: str, quantized: bool = False, threads: int = 0) -> "OnnxSentenceEncoder":
+        """
+        Load an exported model directory
+
+        Args:
+            model_dir: Directory written by export_onnx_model
+            quantized: Load the int8 graph instead of the float32 one
+            threads: onnxruntime intra-op threads (0 = runtime default)
+
+        Returns:
+            OnnxSentenceEncoder instance
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILENAME)) as f:
+            config = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        filename = QUANTIZED_MODEL_FILENAME if quantized else MODEL_FILENAME
+        session = ort.InferenceSession(
+            os.path.join(model_dir, filename),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        return cls(
+            session=session,
+            tokenizer=tokenizer,
+            pooling=config.get("pooling", "mean"),
+            normalize=config.get("normalize", False),
+            max_seq_length=config.get("max_seq_length", 256),
+        )
+
+
+def model_cache_dir(model_name: str, cache_root: Optional[str] = None) -> str:
+    """Directory holding the ONNX export of a model"""
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+    return os.path.join(cache_root or settings.onnx_model_dir, safe_name)
+
+
+def _describe_pipeline(model: Any) -> Dict[str, Any]:
+    """Read pooling/normalization settings from a SentenceTransformer pipeline"""
+    from sentence_transformers import models as st_models
+
+    pooling = "mean"
+    normalize = False
+    for module in model:
+        if isinstance(module, st_models.Pooling):
+            if module.pooling_mode_cls_token:
+                pooling = "cls"
+            elif not module.pooling_mode_mean_tokens:
+                raise ValueError("Only mean or CLS pooling can be exported to ONNX")
+        elif isinstance(module, st_models.Normalize):
+            normalize = True
+        elif not isinstance(module, st_models.Transformer):
+            raise ValueError(f"Unsupported module for ONNX export: {type(module).__name__}")
+
+    return {
+        "pooling": pooling,
+        "normalize": normalize,
+        "max_seq_length": int(model.max_seq_length or 256),
+    }
+
+
+def min_cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Smallest row-wise cosine similarity between two embedding matrices"""
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return float(np.min(np.sum(a * b, axis=1)))
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> str:
+    """
+    Export a SentenceTransformer model to ONNX and validate it against PyTorch
+
+    Args:
+        model_name: HuggingFace model name
+        output_dir: Destination directory
+        quantize: Also write a dynamically int8-quantized graph
+
+    Returns:
+        Path to the output directory
+
+    Raises:
+        ValueError: If the exported vectors drift beyond the configured tolerance
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Exporting {model_name} to ONNX at {output_dir}")
+    st_model = SentenceTransformer(model_name, device="cpu")
+    config = _describe_pipeline(st_model)
+    transformer = st_model[0]
+    tokenizer = transformer.tokenizer
+    input_names = [
+        name for name in ("input_ids", "attention_mask", "token_type_ids")
+        if name in tokenizer.model_input_names
+    ]
+
+    class _TokenEmbeddings(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)))[0]
+
+    # Write into a temp dir first so a failed export never leaves a half-written cache
+    staging_dir = tempfile.mkdtemp(prefix="onnx-export-")
+    try:
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        with torch.no_grad():
+            torch.onnx.export(
+                _TokenEmbeddings(transformer.auto_model).eval(),
+                tuple(sample[name] for name in input_names),
+                os.path.join(staging_dir, MODEL_FILENAME),
+                input_names=input_names,
+                output_names=["token_embeddings"],
+                dynamic_axes={
+                    **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                    "token_embeddings": {0: "batch", 1: "sequence"},
+                },
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(staging_dir)
+        with open(os.path.join(staging_dir, CONFIG_FILENAME), "w") as f:
+            json.dump({**config, "model_name": model_name}, f, indent=2)
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(
+                os.path.join(staging_dir, MODEL_FILENAME),
+                os.path.join(staging_dir, QUANTIZED_MODEL_FILENAME),
+                weight_type=QuantType.QInt8,
+            )
+
+        reference = st_model.encode(VALIDATION_TEXTS, convert_to_numpy=True)
+        for quantized in ([False, True] if quantize else [False]):
+            encoder = OnnxSentenceEncoder.from_directory(staging_dir, quantized=quantized)
+            similarity = min_cosine_similarity(reference, encoder.encode(VALIDATION_TEXTS))
+            threshold = (
+                settings.onnx_min_cosine_similarity_int8 if quantized
+                else settings.onnx_min_cosine_similarity
+            )
+            logger.info(
+                f"ONNX {'int8' if quantized else 'float32'} export of {model_name}: "
+                f"min cosine vs PyTorch {similarity:.5f}"
+            )
+            if similarity < threshold:
+                raise ValueError(
+                    f"ONNX {'int8' if quantized else 'float32'} vectors for {model_name} "
+                    f"diverge from PyTorch (min cosine {similarity:.5f} < {threshold})"
+                )
+
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.makedirs(os.path.dirname(os.path.abspath(output_dir)), exist_ok=True)
+        shutil.move(staging_dir, output_dir)
+        return output_dir
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def load_onnx_encoder(
+    model_name: str,
+    quantize: Optional[bool] = None,
+    cache_root: Optional[str] = None,
+    threads: Optional[int] = None
+) -> OnnxSentenceEncoder:
+    """
+    Load an ONNX encoder for a model, exporting it first if needed
+
+    Args:
+        model_name: HuggingFace model name
+        quantize: Use the dynamically int8-quantized graph
+        cache_root: Export cache directory (default from settings)
+        threads: onnxruntime intra-op threads (default from settings)
+
+    Returns:
+        OnnxSentenceEncoder instance
+    """
+    quantize = settings.onnx_quantize if quantize is None else quantize
+    model_dir = model_cache_dir(model_name, cache_root)
+    filename = QUANTIZED_MODEL_FILENAME if quantize else MODEL_FILENAME
+
+    if not os.path.exists(os.path.join(model_dir, filename)):
+        export_onnx_model(model_name, model_dir, quantize=quantize)
+
+    return OnnxSentenceEncoder.from_directory(
+        model_dir,
+        quantized=quantize,
+        threads=settings.onnx_intra_op_threads if threads is None else threads,
+    )
@@ -0,0 +1,148 @@
+"""
+Parallel, page-level PDF text extraction.
+
+PyPDF2 text extraction is CPU-bound pure Python, so long PDFs (transcripts,
+theses) are split into contiguous page ranges that are extracted on a process
+pool. Pages are yielded in document order as soon as their range finishes,
+which lets the chunker start on the first pages while later ones are still
+being extracted. Short PDFs are extracted on a single thread, which is cheaper
+than shipping the file to worker processes. Either way the event loop is never
+blocked by parsing.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+from app.config import settings
+from app.utils.file_utils import DocumentSource, describe_source
+from app.utils.logger import logger
+from app.utils.pdf_pages import count_pages, extract_page_range
+
+# Separator appended to every page with text (matches the old "\n\n".join)
+PAGE_SEPARATOR = "\n\n"
+
+
+class PDFExtractor:
+    """Extract PDF text page by page, in parallel for long documents"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        pages_per_task: Optional[int] = None,
+        min_parallel_pages: Optional[int] = None
+    ):
+        """
+        Initialize PDF extractor
+
+        Args:
+            max_workers: Process pool size (1 disables the pool)
+            pages_per_task: Minimum pages per worker task
+            min_parallel_pages: PDFs shorter than this are extracted on one thread
+        """
+        self.max_workers = max_workers or settings.pdf_extraction_workers
+        self.pages_per_task = pages_per_task or settings.pdf_pages_per_task
+        self.min_parallel_pages = min_parallel_pages or settings.pdf_parallel_min_pages
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawn avoids forking a parent that may already hold torch threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"PDF extraction pool started: workers={self.max_workers}")
+            return self._pool
+
+    def page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """
+        Split pages into contiguous ranges for the pool
+
+        Ranges hold at least ``pages_per_task`` pages and there are at most two
+        per worker, which keeps per-task overhead (each task re-opens the PDF)
+        bounded while still letting early pages stream out first.
+        """
+        span = max(self.pages_per_task, math.ceil(page_count / (2 * self.max_workers)))
+        return [(start, min(start + span, page_count)) for start in range(0, page_count, span)]
+
+    async def iter_pages(self, source: DocumentSource) -> AsyncIterator[str]:
+        """
+        Yield the text of each page that has any, in document order
+
+        Args:
+            source: Path to PDF file or seekable binary stream
+
+        Yields:
+            Page text followed by a blank line
+        """
+        if not isinstance(source, (str, os.PathLike)):
+            source.seek(0)
+        page_count = await asyncio.to_thread(count_pages, source)
+
+        if self.max_workers <= 1 or page_count < self.min_parallel_pages:
+            if not isinstance(source, (str, os.PathLike)):
+                source.seek(0)
+            pages = await asyncio.to_thread(extract_page_range, source, 0, page_count)
+            for page in pages:
+                if page:
+                    yield page + PAGE_SEPARATOR
+            return
+
+        # Workers re-open the PDF themselves: by path when there is one,
+        # otherwise from the raw bytes
+        if isinstance(source, (str, os.PathLike)):
+            pdf = os.fspath(source)
+        else:
+            source.seek(0)
+            pdf = await asyncio.to_thread(source.read)
+
+        ranges = self.page_ranges(page_count)
+        logger.info(
+            f"Extracting {page_count} PDF pages from {describe_source(source)} "
+            f"in {len(ranges)} ranges on {self.max_workers} workers"
+        )
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        futures = [
+            loop.run_in_executor(pool, extract_page_range, pdf, start, stop)
+            for start, stop in ranges
+        ]
+        try:
+            for future in futures:
+                for page in await future:
+                    if page:
+                        yield page + PAGE_SEPARATOR
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def extract_text(self, source: DocumentSource) -> str:
+        """
+        Extract the full text of a PDF
+
+        Args:
+            source: Path to PDF file or seekable binary stream
+
+        Returns:
+            Page texts separated by blank lines
+        """
+        return "".join([page async for page in self.iter_pages(source)]).strip()
+
+    def shutdown(self) -> None:
+        """Stop the worker pool (it is recreated on next use)"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# Create singleton instance
+pdf_extractor = PDFExtractor()
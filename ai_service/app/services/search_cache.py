@@ -0,0 +1,125 @@
+"""
+Query-result cache for document search
+
+Results are keyed by sha256(user, collection version, normalized query,
+mode, filters, top_k, embedding provider) and held in a bounded in-memory
+LRU with a TTL. Writes to a user's chunks bump the collection version (see
+``app.database.collection_versions``), so stale entries are never served;
+they simply age out.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.models.search import SearchRequest, SearchResult
+
+
+class SearchResultCache:
+    """Bounded LRU + TTL cache of search results"""
+
+    def __init__(self, max_items: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        """
+        Initialize search result cache
+
+        Args:
+            max_items: Maximum result lists held
+            ttl_seconds: Seconds an entry stays valid
+        """
+        self.max_items = max_items if max_items is not None else settings.search_cache_max_items
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.search_cache_ttl_seconds
+
+        self._entries: "OrderedDict[str, tuple[float, List[SearchResult]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(user_id: str, version: int, request: SearchRequest, provider: str) -> str:
+        """
+        Build the cache key of a search
+
+        Args:
+            user_id: User identifier
+            version: Collection version the search runs against
+            request: Search request (query is case- and whitespace-normalized)
+            provider: Embedding provider used for the query
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        parts = {
+            "user_id": user_id,
+            "version": version,
+            "query": " ".join(request.query.lower().split()),
+            "mode": request.mode.value,
+            "top_k": request.top_k,
+            "document_id": request.document_id,
+            "tags": sorted(request.tags or []),
+            "tracking_ids": sorted(request.tracking_ids or []),
+            "min_score": request.min_score,
+            "fusion": request.fusion.value,
+            "weights": [request.semantic_weight, request.keyword_weight],
+            "provider": provider,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[SearchResult]]:
+        """
+        Look up the results of a search
+
+        Args:
+            key: Cache key (see make_key)
+
+        Returns:
+            Copies of the cached results, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Callers (e.g. rank fusion) mutate results, so hand out copies
+        return [result.model_copy(deep=True) for result in entry[1]]
+
+    def put(self, key: str, results: List[SearchResult]) -> None:
+        """Store the results of a search, evicting the least recently used entries"""
+        if self.max_items <= 0:
+            return
+        self._entries[key] = (
+            time.monotonic() + self.ttl_seconds,
+            [result.model_copy(deep=True) for result in results],
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit ratio and size
+
+        Returns:
+            Dictionary with hit/miss counters and entry count
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "items": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """Drop every cached result and reset counters"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Global instance
+search_result_cache = SearchResultCache()
@@ -2,28 +2,41 @@
 Search service for semantic and keyword-based document search
 """
 
+import asyncio
 import time
 from typing import List, Optional
-from app.models.search import SearchRequest, SearchResponse, SearchResult, SearchMode
+from app.config import settings
+from app.models.search import FusionMethod, SearchRequest, SearchResponse, SearchResult, SearchMode
 from app.database.vector_db import VectorDatabase
 from app.services.embedding_service import EmbeddingService
+from app.services.search_cache import SearchResultCache, search_result_cache
 from app.utils.logger import logger
 
 
 class SearchService:
     """Service for searching documents"""
 
-    def __init__(self, user_id: str, embedding_service: Optional[EmbeddingService] = None):
+    # Result caching is off unless enabled in __init__
+    cache: Optional[SearchResultCache] = None
+
+    def __init__(
+        self,
+        user_id: str,
+        embedding_service: Optional[EmbeddingService] = None,
+        cache: Optional[SearchResultCache] = None
+    ):
         """
         Initialize search service
 
         Args:
             user_id: User identifier
             embedding_service: Optional embedding service instance
+            cache: Optional result cache (defaults to the process-wide one when enabled)
         """
         self.user_id = user_id
         self.vector_db = VectorDatabase(user_id)
         self.embedding_service = embedding_service or EmbeddingService()
+        self.cache = cache or (search_result_cache if settings.search_cache_enabled else None)
 
     async def search(self, request: SearchRequest) -> SearchResponse:
         """
@@ -36,22 +49,43 @@ class SearchService:
             SearchResponse with results
         """
         start_time = time.time()
+        breakdown = {}
+
+        # Unchanged collection, same search: skip the embedding and the index
+        cache_key = None
+        results = None
+        if self.cache is not None and self.vector_db.versions is not None:
+            version = await self.vector_db.versions.current()
+            cache_key = self.cache.make_key(self.user_id, version, request, self._provider())
+            results = self.cache.get(cache_key)
+            breakdown["cache_lookup_ms"] = (time.time() - start_time) * 1000
+
+        breakdown["cache_hit"] = results is not None
+        if results is None:
+            search_start = time.time()
+
+            # Route to appropriate search method
+            if request.mode == SearchMode.SEMANTIC:
+                results = await self._semantic_search(request)
+            elif request.mode == SearchMode.KEYWORD:
+                results = await self._keyword_search(request)
+            elif request.mode == SearchMode.HYBRID:
+                results = await self._hybrid_search(request)
+            else:
+                raise ValueError(f"Unsupported search mode: {request.mode}")
 
-        # Route to appropriate search method
-        if request.mode == SearchMode.SEMANTIC:
-            results = await self._semantic_search(request)
-        elif request.mode == SearchMode.KEYWORD:
-            results = await self._keyword_search(request)
-        elif request.mode == SearchMode.HYBRID:
-            results = await self._hybrid_search(request)
-        else:
-            raise ValueError(f"Unsupported search mode: {request.mode}")
+            breakdown["search_ms"] = (time.time() - search_start) * 1000
+            if cache_key is not None:
+                self.cache.put(cache_key, results)
+
+        if self.cache is not None:
+            breakdown["cache_hit_rate"] = self.cache.stats()["hit_ratio"]
 
         processing_time = (time.time() - start_time) * 1000  # Convert to ms
 
         logger.info(
-            f"Search completed: mode={request.mode}, "
-            f"results={len(results)}, time={processing_time:.2f}ms"
+            f"Search completed: mode={request.mode}, results={len(results)}, "
+            f"time={processing_time:.2f}ms, cache_hit={breakdown['cache_hit']}"
         )
 
         return SearchResponse(
@@ -59,62 +93,61 @@ class SearchService:
             total=len(results),
             query=request.query,
             mode=request.mode,
-            processing_time_ms=processing_time
+            processing_time_ms=processing_time,
+            processing_breakdown=breakdown
         )
 
-    async def _semantic_search(self, request: SearchRequest) -> List[SearchResult]:
+    @staticmethod
+    def _provider() -> str:
+        """Query embedding provider (prefer OpenAI if available, else HuggingFace)"""
+        return "openai" if getattr(settings, "openai_api_key", None) else "huggingface"
+
+    async def _query_embedding(self, query: str):
+        """Embed a query with the preferred provider"""
+        return await self.embedding_service.generate_query_embedding(query, provider=self._provider())
+
+    async def _semantic_search(self, request: SearchRequest, top_k: Optional[int] = None) -> List[SearchResult]:
         """
         Perform semantic (vector similarity) search
 
         Args:
             request: SearchRequest object
+            top_k: Number of results to fetch (default: request.top_k)
 
         Returns:
             List of SearchResult objects
         """
-        # Generate query embedding (prefer OpenAI if available, else HuggingFace)
-        from app.config import settings
-        provider = "openai" if getattr(settings, "openai_api_key", None) else "huggingface"
-        query_embedding = await self.embedding_service.generate_query_embedding(
-            request.query,
-            provider=provider
-        )
+        query_embedding = await self._query_embedding(request.query)
 
         # Perform vector search
         results = await self.vector_db.search_by_vector(
             query_embedding=query_embedding,
-            top_k=request.top_k,
+            top_k=top_k or request.top_k,
             document_id=request.document_id,
             tags=request.tags,
-            min_score=request.min_score
+            min_score=request.min_score,
+            tracking_ids=request.tracking_ids
         )
 
         return results
 
-    async def _keyword_search(self, request: SearchRequest) -> List[SearchResult]:
+    async def _keyword_search(self, request: SearchRequest, top_k: Optional[int] = None) -> List[SearchResult]:
         """
-        Perform keyword-based text search
+        Perform BM25 keyword search (no query embedding)
 
         Args:
             request: SearchRequest object
+            top_k: Number of results to fetch (default: request.top_k)
 
         Returns:
             List of SearchResult objects
         """
-        # Generate query embedding to ensure dimension consistency
-        from app.config import settings
-        provider = "openai" if getattr(settings, "openai_api_key", None) else "huggingface"
-        query_embedding = await self.embedding_service.generate_query_embedding(
-            request.query,
-            provider=provider
-        )
-        
         results = await self.vector_db.search_by_keyword(
             query=request.query,
-            top_k=request.top_k,
+            top_k=top_k or request.top_k,
             document_id=request.document_id,
             tags=request.tags,
-            query_embedding=query_embedding
+            tracking_ids=request.tracking_ids
         )
 
         return results
@@ -123,24 +156,90 @@ class SearchService:
         """
         Perform hybrid search combining semantic and keyword search
 
+        The query is embedded once. The vector leg and the BM25 leg run
+        concurrently, each fetching a deeper candidate list, and their
+        rankings are fused as the request asks.
+
         Args:
             request: SearchRequest object
 
         Returns:
             List of SearchResult objects (merged and re-ranked)
         """
-        # Perform both searches
-        semantic_results = await self._semantic_search(request)
-        keyword_results = await self._keyword_search(request)
+        candidates = request.top_k * settings.hybrid_candidate_multiplier
+        semantic_results, keyword_results = await asyncio.gather(
+            self._semantic_search(request, top_k=candidates),
+            self._keyword_search(request, top_k=candidates),
+        )
 
-        # Merge results and re-rank
-        merged_results = self._merge_and_rerank(
+        if request.fusion == FusionMethod.WEIGHTED:
+            return self._merge_and_rerank(
+                semantic_results,
+                keyword_results,
+                request.top_k,
+                semantic_weight=request.semantic_weight,
+                keyword_weight=request.keyword_weight
+            )
+        return self._reciprocal_rank_fusion(
             semantic_results,
             keyword_results,
-            request.top_k
+            request.top_k,
+            semantic_weight=request.semantic_weight,
+            keyword_weight=request.keyword_weight
         )
 
-        return merged_results
+    @staticmethod
+    def _reciprocal_rank_fusion(
+        semantic_results: List[SearchResult],
+        keyword_results: List[SearchResult],
+        top_k: int,
+        semantic_weight: float = 0.7,
+        keyword_weight: float = 0.3,
+        rrf_k: Optional[int] = None
+    ) -> List[SearchResult]:
+        """
+        Fuse semantic and keyword rankings with weighted reciprocal rank fusion
+
+        Each list contributes ``weight / (rrf_k + rank)`` per result, so only
+        ranks matter and BM25 and cosine scores need not be comparable. The
+        fused score is scaled so a result ranked first in both lists gets 1.0;
+        the leg scores and ranks are kept in the result metadata.
+
+        Args:
+            semantic_results: Results from semantic search, best first
+            keyword_results: Results from keyword search, best first
+            top_k: Number of results to return
+            semantic_weight: Weight of the semantic ranking
+            keyword_weight: Weight of the keyword ranking
+            rrf_k: Rank constant (default from settings)
+
+        Returns:
+            Fused results, best first
+        """
+        rrf_k = rrf_k or settings.hybrid_rrf_k
+        best = (semantic_weight + keyword_weight) / (rrf_k + 1)
+        if best <= 0:
+            return []
+
+        fused = {}
+        for leg, weight, results in (
+            ("semantic", semantic_weight, semantic_results),
+            ("keyword", keyword_weight, keyword_results),
+        ):
+            for rank, result in enumerate(results, start=1):
+                entry = fused.setdefault(result.chunk_id, {"result": result, "score": 0.0})
+                entry["score"] += weight / (rrf_k + rank)
+                entry["result"].metadata[f"{leg}_score"] = result.score
+                entry["result"].metadata[f"{leg}_rank"] = rank
+
+        ranked_results = []
+        for entry in fused.values():
+            result = entry["result"]
+            result.score = entry["score"] / best
+            ranked_results.append(result)
+
+        ranked_results.sort(key=lambda x: x.score, reverse=True)
+        return ranked_results[:top_k]
 
     @staticmethod
     def _merge_and_rerank(
@@ -195,6 +294,8 @@ class SearchService:
 
             result = data["result"]
             result.score = combined_score
+            result.metadata["semantic_score"] = data["semantic_score"]
+            result.metadata["keyword_score"] = data["keyword_score"]
             ranked_results.append(result)
 
         # Sort by combined score
@@ -231,7 +332,7 @@ class SearchService:
                 reference_chunk = chunk
                 break
 
-        if not reference_chunk or not reference_chunk.get("embedding"):
+        if not reference_chunk or reference_chunk.get("embedding") is None:
             logger.warning(f"Chunk not found or has no embedding: {document_id}:{chunk_index}")
             return []
 
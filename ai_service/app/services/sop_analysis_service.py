@@ -953,7 +953,7 @@ class SOPAnalysisService:
                 provider="openai"
             )
 
-            if not embeddings:
+            if len(embeddings) == 0:
                 logger.warning("Could not generate embeddings for uniqueness check")
                 return 85.0  # Default score
 
@@ -0,0 +1,258 @@
+"""
+Compact storage and quantization-aware scoring for vectors we persist ourselves.
+
+Vectors are stored as raw bytes in one of three precisions:
+
+- ``float32``: exact, 4 bytes per dimension
+- ``float16``: half precision, 2 bytes per dimension
+- ``int8``: symmetric scalar quantization with a per-vector scale, 1 byte per dimension
+
+Each stored document carries the fields produced by ``VectorCodec.encode``
+(``embedding``, ``embedding_dtype``, ``embedding_dim``, ``embedding_norm`` and,
+for int8, ``embedding_scale``). Optionally a float32 copy is kept in
+``embedding_full`` so the top candidates can be re-scored at full precision.
+Documents written before this module (a plain list of floats) still decode.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from bson.binary import Binary
+from app.config import settings
+
+
+SUPPORTED_PRECISIONS = ("float32", "float16", "int8")
+
+_NUMPY_DTYPES = {
+    "float32": np.float32,
+    "float16": np.float16,
+    "int8": np.int8,
+}
+
+
+class VectorCodec:
+    """Encodes vectors for storage and scores queries against stored vectors"""
+
+    def __init__(
+        self,
+        precision: Optional[str] = None,
+        keep_full: Optional[bool] = None,
+        rerank_candidates: Optional[int] = None
+    ):
+        """
+        Initialize vector codec
+
+        Args:
+            precision: Storage precision (float32, float16 or int8)
+            keep_full: Also store a float32 copy for full-precision rerank
+            rerank_candidates: How many top candidates to re-score at full
+                precision (0 disables rerank)
+        """
+        self.precision = precision or settings.embedding_storage_precision
+        if self.precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(
+                f"Unsupported storage precision: {self.precision} "
+                f"(expected one of {', '.join(SUPPORTED_PRECISIONS)})"
+            )
+        self.keep_full = settings.embedding_storage_keep_full if keep_full is None else keep_full
+        self.rerank_candidates = (
+            settings.embedding_rerank_candidates if rerank_candidates is None else rerank_candidates
+        )
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def encode(self, vector: Sequence[float]) -> Dict[str, Any]:
+        """
+        Encode a vector into MongoDB fields
+
+        Args:
+            vector: Embedding vector
+
+        Returns:
+            Dictionary of fields to ``$set`` on the stored document
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        fields: Dict[str, Any] = {
+            "embedding_dtype": self.precision,
+            "embedding_dim": int(vector.shape[0]),
+            "embedding_norm": float(np.linalg.norm(vector)),
+        }
+
+        if self.precision == "int8":
+            codes, scale = quantize_int8(vector)
+            fields["embedding"] = Binary(codes.tobytes())
+            fields["embedding_scale"] = scale
+        else:
+            fields["embedding"] = Binary(vector.astype(_NUMPY_DTYPES[self.precision]).tobytes())
+
+        fields["embedding_full"] = Binary(vector.tobytes()) if self.keep_full else None
+        return fields
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def score(
+        self,
+        query: Sequence[float],
+        docs: List[Dict[str, Any]],
+        top_k: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Cosine similarity of a query against stored documents
+
+        Scores are computed on the stored (possibly quantized) codes. When
+        rerank is enabled, the best ``rerank_candidates`` documents that carry
+        a full-precision copy are re-scored exactly.
+
+        Args:
+            query: Query vector
+            docs: Stored documents (as returned by MongoDB)
+            top_k: Number of results the caller needs; rerank covers at least this many
+
+        Returns:
+            Similarity scores aligned with ``docs``, clamped to [0, 1]
+        """
+        if not docs:
+            return np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0:
+            return np.zeros(len(docs), dtype=np.float32)
+
+        matrix, scales, norms = self._stack(docs)
+
+        # Quantized dot products: int8 codes are rescaled per row after the product
+        dots = (matrix @ query) * scales
+        denom = norms * query_norm
+        scores = np.divide(dots, denom, out=np.zeros_like(dots), where=denom != 0)
+
+        if self.rerank_candidates > 0:
+            candidates = max(self.rerank_candidates, top_k or 0)
+            scores = self._rerank(query, query_norm, docs, scores, candidates)
+
+        return np.clip(scores, 0.0, 1.0)
+
+    def _stack(self, docs: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Build a float32 code matrix plus per-row scales and original norms"""
+        dim = None
+        rows = []
+        scales = np.ones(len(docs), dtype=np.float32)
+        norms = np.empty(len(docs), dtype=np.float32)
+
+        for i, doc in enumerate(docs):
+            codes, scale = decode_codes(doc)
+            if dim is None:
+                dim = codes.shape[0]
+            elif codes.shape[0] != dim:
+                raise ValueError(
+                    f"Stored vector dimension {codes.shape[0]} does not match {dim}"
+                )
+            rows.append(codes)
+            scales[i] = scale
+            norm = doc.get("embedding_norm")
+            norms[i] = norm if norm is not None else np.linalg.norm(codes) * scale
+
+        return np.stack(rows).astype(np.float32, copy=False), scales, norms
+
+    @staticmethod
+    def _rerank(
+        query: np.ndarray,
+        query_norm: float,
+        docs: List[Dict[str, Any]],
+        scores: np.ndarray,
+        candidates: int
+    ) -> np.ndarray:
+        """Re-score the top candidates from their float32 copies"""
+        if candidates >= len(scores):
+            top = np.arange(len(scores))
+        else:
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+
+        scores = scores.copy()
+        for i in top:
+            full = docs[i].get("embedding_full")
+            if not full:
+                continue
+            vector = np.frombuffer(full, dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            if norm:
+                scores[i] = float(vector @ query) / (norm * query_norm)
+        return scores
+
+
+def quantize_int8(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Symmetric per-vector int8 quantization
+
+    Args:
+        vector: float32 vector
+
+    Returns:
+        Tuple of (int8 codes, scale) with ``vector ~= codes * scale``
+    """
+    max_abs = float(np.max(np.abs(vector))) if vector.size else 0.0
+    if max_abs == 0:
+        return np.zeros(vector.shape, dtype=np.int8), 1.0
+    scale = max_abs / 127.0
+    codes = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def decode_codes(doc: Dict[str, Any]) -> Tuple[np.ndarray, float]:
+    """
+    Read the stored codes of a document without rescaling
+
+    Args:
+        doc: Stored document
+
+    Returns:
+        Tuple of (codes, scale); multiply to recover the vector
+    """
+    stored = doc["embedding"]
+    if not isinstance(stored, (bytes, bytearray)):
+        # Legacy documents store a plain list of floats
+        return np.asarray(stored, dtype=np.float32), 1.0
+
+    dtype = doc.get("embedding_dtype", "float32")
+    if dtype not in _NUMPY_DTYPES:
+        raise ValueError(f"Unsupported stored embedding dtype: {dtype}")
+    codes = np.frombuffer(stored, dtype=_NUMPY_DTYPES[dtype])
+    return codes, float(doc.get("embedding_scale") or 1.0)
+
+
+def decode_vector(doc: Dict[str, Any], prefer_full: bool = True) -> np.ndarray:
+    """
+    Recover a float32 vector from a stored document
+
+    Args:
+        doc: Stored document
+        prefer_full: Use the full-precision copy when present
+
+    Returns:
+        float32 vector
+    """
+    full = doc.get("embedding_full")
+    if prefer_full and full:
+        return np.frombuffer(full, dtype=np.float32)
+    codes, scale = decode_codes(doc)
+    return codes.astype(np.float32) * np.float32(scale)
+
+
+def stored_size_bytes(doc: Dict[str, Any]) -> int:
+    """Bytes used by the vector fields of a stored document"""
+    size = 0
+    for field in ("embedding", "embedding_full"):
+        value = doc.get(field)
+        if isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, list):
+            # BSON doubles: 8 bytes each plus per-element key and type overhead
+            size += sum(8 + 2 + len(str(i)) for i in range(len(value)))
+    return size
+
+
+# Global instance
+vector_codec = VectorCodec()
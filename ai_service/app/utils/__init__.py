@@ -10,6 +10,7 @@ from .file_utils import (
     get_file_extension,
     get_file_type_from_extension,
 )
+from .minhash import MinHasher
 
 __all__ = [
     "logger",
@@ -20,4 +21,5 @@ __all__ = [
     "delete_file",
     "get_file_extension",
     "get_file_type_from_extension",
+    "MinHasher",
 ]
@@ -6,11 +6,22 @@ import hashlib
 import os
 import aiofiles
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 from fastapi import UploadFile, HTTPException
 from app.config import settings
 from app.utils.logger import logger
 
+# A file path, or a seekable binary stream (BytesIO, SpooledTemporaryFile, ...)
+DocumentSource = Union[str, os.PathLike, BinaryIO]
+
+
+def describe_source(source: DocumentSource) -> str:
+    """Readable name of a document source for log messages"""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    name = getattr(source, "name", None)
+    return name if isinstance(name, str) else f"<{type(source).__name__}>"
+
 
 async def calculate_file_hash(file: UploadFile) -> str:
     """
@@ -24,8 +35,8 @@ async def calculate_file_hash(file: UploadFile) -> str:
     """
     sha256_hash = hashlib.sha256()
 
-    # Read file in chunks to handle large files
-    chunk_size = 8192
+    # Read file in large chunks: each UploadFile read is a threadpool round trip
+    chunk_size = 1024 * 1024
     await file.seek(0)
 
     while chunk := await file.read(chunk_size):
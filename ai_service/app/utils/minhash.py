@@ -0,0 +1,109 @@
+"""
+MinHash signatures for near-duplicate chunk detection
+
+A chunk's signature estimates the Jaccard similarity of its word shingles
+with any other chunk's. Signatures are split into bands, and each band is
+hashed to an integer key. Chunks that share at least one band key are
+candidate near-duplicates (locality-sensitive hashing), so candidates can be
+looked up with a plain metadata equality filter.
+"""
+
+import hashlib
+import re
+from typing import List
+import numpy as np
+
+
+WORD = re.compile(r"\w+")
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+class MinHasher:
+    """MinHash over k-word shingles with LSH band keys"""
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1
+    ):
+        """
+        Initialize the hasher
+
+        Args:
+            num_perm: Signature length (number of hash permutations)
+            bands: LSH bands; num_perm must be divisible by bands
+            shingle_size: Words per shingle
+            seed: Seed for the permutation coefficients (must be stable across processes)
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        # Odd multipliers keep (a * x + b) mod 2^32 a permutation of 32-bit values
+        self._a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = WORD.findall(text.lower())
+        k = self.shingle_size
+        if len(words) <= k:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        return np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of a text
+
+        Args:
+            text: Text to sign
+
+        Returns:
+            uint32 array of length num_perm
+        """
+        shingles = self._shingles(text)
+        # (n_shingles, num_perm) permuted hashes; uint64 arithmetic wraps, the mask keeps mod 2^32
+        hashed = (shingles[:, None] * self._a[None, :] + self._b[None, :]) & _MASK32
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """
+        LSH key of every band of a signature
+
+        Args:
+            signature: Signature from signature()
+
+        Returns:
+            One non-negative int64-safe key per band
+        """
+        rows = np.ascontiguousarray(signature, dtype=np.uint32).reshape(self.bands, self.rows)
+        return [
+            int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=7).digest(), "little")
+            for band in rows
+        ]
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(a == b))
+
+    @staticmethod
+    def encode(signature: np.ndarray) -> str:
+        """Compact string form for metadata storage"""
+        return np.ascontiguousarray(signature, dtype="<u4").tobytes().hex()
+
+    @staticmethod
+    def decode(value: str) -> np.ndarray:
+        """Inverse of encode()"""
+        return np.frombuffer(bytes.fromhex(value), dtype="<u4").astype(np.uint32)
@@ -0,0 +1,147 @@
+"""
+Single-pass Tesseract OCR
+
+One TSV (``image_to_data``) run yields both the text and the per-word
+confidences, so an image is never recognized twice. These functions also run
+inside OCR pool workers, so this module only depends on pytesseract and PIL.
+"""
+
+import os
+from typing import Any, Dict, List, Tuple
+import pytesseract
+from PIL import Image, ImageOps
+
+# Tesseract TSV level of a single word
+WORD_LEVEL = 5
+
+# Gray level above which a pixel becomes white when binarizing
+BINARIZE_THRESHOLD = 128
+
+
+def init_ocr_worker(tesseract_cmd: str = None) -> None:
+    """Configure a pool worker: one Tesseract thread per process, pool does the rest"""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def prepare_image(image: Image.Image, binarize: bool = False) -> Image.Image:
+    """
+    Convert an image to grayscale (and optionally black and white) for OCR
+
+    Args:
+        image: Source image
+        binarize: Also threshold to pure black and white
+
+    Returns:
+        A fully loaded "L" mode image
+    """
+    image = ImageOps.exif_transpose(image).convert("L")
+    if binarize:
+        image = ImageOps.autocontrast(image).point(lambda p: 255 if p > BINARIZE_THRESHOLD else 0)
+    image.load()
+    return image
+
+
+def text_from_data(data: Dict[str, List[Any]]) -> Tuple[str, float, int]:
+    """
+    Rebuild text and average confidence from Tesseract TSV output
+
+    Words on a line are joined by spaces, lines by newlines and paragraphs or
+    blocks by a blank line, like ``image_to_string``.
+
+    Args:
+        data: ``image_to_data`` output as a dict of columns
+
+    Returns:
+        Tuple of (text, average word confidence, word count)
+    """
+    parts: List[str] = []
+    confidences: List[float] = []
+    line_key = par_key = None
+    words = 0
+
+    for i, word in enumerate(data["text"]):
+        if int(data["level"][i]) != WORD_LEVEL or not str(word).strip():
+            continue
+        current_par = (data["page_num"][i], data["block_num"][i], data["par_num"][i])
+        current_line = (*current_par, data["line_num"][i])
+        if parts:
+            if current_par != par_key:
+                parts.append("\n\n")
+            elif current_line != line_key:
+                parts.append("\n")
+            else:
+                parts.append(" ")
+        parts.append(str(word).strip())
+        par_key, line_key = current_par, current_line
+        words += 1
+
+        confidence = float(data["conf"][i])
+        if confidence > 0:
+            confidences.append(confidence)
+
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+    return "".join(parts), avg_confidence, words
+
+
+def ocr_image(image: Image.Image, lang: str) -> Dict[str, Any]:
+    """
+    Recognize an image in a single Tesseract pass
+
+    Returns:
+        Dictionary with text, confidence and word_count
+    """
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    text, confidence, word_count = text_from_data(data)
+    return {"text": text, "confidence": confidence, "word_count": word_count}
+
+
+def run_hocr_and_tsv(image: Image.Image, lang: str) -> Tuple[str, str]:
+    """
+    Run Tesseract once with both the hocr and tsv output configs
+
+    pytesseract 0.3.10 has no multi-output helper, so this drives its
+    ``save``/``run_tesseract`` primitives directly.
+
+    Returns:
+        Tuple of (hOCR document, TSV table)
+    """
+    tesseract = pytesseract.pytesseract
+    with tesseract.save(image) as (output_base, input_filename):
+        tesseract.run_tesseract(
+            input_filename=input_filename,
+            output_filename_base=output_base,
+            extension="hocr",
+            lang=lang,
+            config="tsv",
+        )
+        outputs = []
+        for extension in ("hocr", "tsv"):
+            with open(f"{output_base}.{extension}", "rb") as output_file:
+                outputs.append(output_file.read().decode("utf-8"))
+    return outputs[0], outputs[1]
+
+
+def ocr_image_with_layout(image: Image.Image, lang: str) -> Dict[str, Any]:
+    """
+    Recognize an image once, producing hOCR and TSV from the same run
+
+    Returns:
+        Dictionary with text, hocr, confidence and word_count
+    """
+    hocr, tsv = run_hocr_and_tsv(image, lang)
+    data = pytesseract.pytesseract.file_to_dict(tsv, "\t", -1)
+    text, confidence, word_count = text_from_data(data)
+    return {
+        "text": text,
+        "hocr": hocr,
+        "confidence": confidence,
+        "word_count": word_count,
+    }
+
+
+def ocr_image_file(path: str, lang: str, binarize: bool = False) -> Dict[str, Any]:
+    """Prepare and recognize one rasterized page (runs in a pool worker)"""
+    with Image.open(path) as image:
+        return ocr_image(prepare_image(image, binarize), lang)
@@ -0,0 +1,41 @@
+"""
+Page-level PDF text extraction
+
+These functions run inside PDF extraction pool workers, so this module only
+depends on PyPDF2 and stays cheap to import in a freshly spawned process.
+"""
+
+import io
+from typing import BinaryIO, List, Union
+from PyPDF2 import PdfReader
+
+# A file path, the raw PDF bytes, or a seekable binary stream
+PdfInput = Union[str, bytes, BinaryIO]
+
+
+def open_pdf(pdf: PdfInput) -> PdfReader:
+    """Open a PDF from a path, bytes or a binary stream"""
+    if isinstance(pdf, (bytes, bytearray)):
+        pdf = io.BytesIO(pdf)
+    return PdfReader(pdf)
+
+
+def count_pages(pdf: PdfInput) -> int:
+    """Number of pages in a PDF"""
+    return len(open_pdf(pdf).pages)
+
+
+def extract_page_range(pdf: PdfInput, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages ``start`` (inclusive) to ``stop`` (exclusive)
+
+    Args:
+        pdf: PDF path, bytes or binary stream
+        start: First page index
+        stop: Page index to stop before
+
+    Returns:
+        One string per page ("" for pages without a text layer)
+    """
+    reader = open_pdf(pdf)
+    return [reader.pages[number].extract_text() or "" for number in range(start, stop)]
@@ -0,0 +1,9 @@
+"""
+Long-running worker processes
+"""
+
+from .ingestion_worker import IngestionWorker
+
+__all__ = [
+    "IngestionWorker",
+]
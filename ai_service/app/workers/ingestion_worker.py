@@ -0,0 +1,218 @@
+"""
+Document ingestion worker
+
+Claims jobs from the durable ingestion queue and runs the ingestion pipeline
+(extract, chunk, embed, index). Run one or more as a separate process type:
+
+    python -m app.workers.ingestion_worker
+
+Each worker runs up to INGESTION_WORKER_CONCURRENCY jobs at once; the queue
+enforces the global (MAX_CONCURRENT_UPLOADS) and per-user caps across all
+workers. SIGTERM stops claiming and lets in-flight jobs finish; a job whose
+worker is killed is requeued once its lease expires.
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.config import settings
+from app.database.ingestion_queue import IngestionQueue
+from app.database.mongodb import get_documents_collection
+from app.models.document import ProcessingStatus
+from app.utils.logger import logger
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class IngestionWorker:
+    """Runs queued ingestion jobs"""
+
+    def __init__(
+        self,
+        queue: IngestionQueue = None,
+        handler: Optional[JobHandler] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        worker_id: Optional[str] = None,
+        documents: AsyncIOMotorCollection = None
+    ):
+        """
+        Initialize the worker
+
+        Args:
+            queue: Ingestion queue (default: the ingestion_jobs collection)
+            handler: Coroutine run for each job (default: document ingestion)
+            concurrency: Jobs this worker runs at once
+            poll_interval: Seconds to wait when no job can be claimed
+            worker_id: Identifier recorded on claimed jobs
+            documents: Documents collection for status updates
+        """
+        self.queue = queue or IngestionQueue()
+        self.handler = handler
+        self.concurrency = concurrency or settings.ingestion_worker_concurrency
+        self.poll_interval = poll_interval or settings.ingestion_poll_interval_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.documents = documents if documents is not None else get_documents_collection()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; in-flight jobs run to completion"""
+        self._stopping.set()
+
+    async def _idle(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _set_document(self, document_id: str, fields: Dict[str, Any]) -> None:
+        await self.documents.update_one({"document_id": document_id}, {"$set": fields})
+
+    async def _heartbeat(self, job_id: str, work: asyncio.Task) -> None:
+        """Renew the job's lease until cancelled; stop the work once the lease is lost"""
+        expires = time.monotonic() + self.queue.lease_seconds
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                held = await self.queue.renew(job_id, self.worker_id)
+            except Exception as e:
+                logger.error(f"Error renewing lease on ingestion job {job_id}: {e}")
+                held = None
+            if held:
+                expires = time.monotonic() + self.queue.lease_seconds
+                continue
+            if held is None and time.monotonic() + self.queue.lease_seconds / 3 < expires:
+                continue  # Retry while the lease is still ours
+            # Another worker may take the job over now; it must not run twice at once
+            logger.warning(f"Lost lease on ingestion job {job_id}; stopping it")
+            work.cancel()
+            return
+
+    async def process(self, job: Dict[str, Any]) -> bool:
+        """
+        Run one claimed job and record the outcome
+
+        The job is cancelled if its lease is lost (reclaimed after expiry or
+        cancelled because the document was deleted).
+
+        Returns:
+            True if the job succeeded
+        """
+        work = asyncio.create_task(self.handler(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job["job_id"], work))
+        try:
+            await work
+        except asyncio.CancelledError:
+            if not heartbeat.done():
+                raise  # The worker itself is being cancelled
+            logger.warning(f"Ingestion job {job['job_id']} stopped after losing its lease")
+            return False
+        except Exception as e:
+            logger.exception(f"Ingestion job {job['job_id']} for document {job['document_id']} failed: {e}")
+            retrying = await self.queue.fail(job, str(e))
+            if retrying is None:
+                logger.warning(f"Ingestion job {job['job_id']} was reclaimed; not recording its failure")
+                return False
+            await self._set_document(job["document_id"], {
+                "status": ProcessingStatus.PENDING if retrying else ProcessingStatus.FAILED,
+                "progress": {
+                    "stage": "retrying" if retrying else "failed",
+                    "attempt": job["attempts"],
+                    "error": str(e),
+                    "updated_at": datetime.utcnow(),
+                },
+            })
+            return False
+        else:
+            if not await self.queue.complete(job["job_id"], self.worker_id):
+                logger.warning(f"Ingestion job {job['job_id']} was reclaimed; not marking it completed")
+                return False
+            return True
+        finally:
+            heartbeat.cancel()
+
+    async def _slot(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Error claiming ingestion job: {e}")
+                job = None
+            if job is None:
+                await self._idle(self.poll_interval)
+                continue
+            await self.process(job)
+
+    async def _recover(self) -> None:
+        """Requeue jobs of dead workers; fail documents that ran out of attempts"""
+        while not self._stopping.is_set():
+            try:
+                for job in await self.queue.recover_expired():
+                    await self._set_document(job["document_id"], {
+                        "status": ProcessingStatus.FAILED,
+                        "progress": {
+                            "stage": "failed",
+                            "attempt": job["attempts"],
+                            "error": job.get("last_error") or "Worker lease expired",
+                            "updated_at": datetime.utcnow(),
+                        },
+                    })
+            except Exception as e:
+                logger.error(f"Error recovering expired ingestion jobs: {e}")
+            await self._idle(self.queue.lease_seconds / 3)
+
+    async def run(self) -> None:
+        """Process jobs until stop() is called"""
+        if self.handler is None:
+            from app.services.document_ingestion import handle_ingestion_job
+            self.handler = handle_ingestion_job
+
+        logger.info(f"Ingestion worker {self.worker_id} started: concurrency={self.concurrency}")
+        await asyncio.gather(self._recover(), *(self._slot() for _ in range(self.concurrency)))
+        logger.info(f"Ingestion worker {self.worker_id} stopped")
+
+
+async def main() -> None:
+    """Run a standalone ingestion worker until SIGTERM/SIGINT"""
+    from app.core.chroma_client import chroma_manager
+    from app.core.config import settings as app_settings
+    from app.database.mongodb import connect_to_mongodb, close_mongodb_connection, create_indexes
+    from app.services.embedding_executor import embedding_executor
+    from app.services.pdf_extraction import pdf_extractor
+
+    # Same storage setup as the API's startup, which this process does not run
+    if app_settings.ENABLE_CHROMA and app_settings.CHROMA_CLIENT_MODE == "embedded":
+        logger.warning(
+            "Standalone ingestion worker is using embedded Chroma; the API must not "
+            "open the same store. Use CHROMA_CLIENT_MODE=http with a shared server"
+        )
+    if app_settings.ENABLE_CHROMA:
+        chroma_manager.initialize()
+    await connect_to_mongodb()
+    await create_indexes()
+    worker = IngestionWorker()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(sig)
+        pdf_extractor.shutdown()
+        embedding_executor.shutdown(wait=False)
+        if app_settings.ENABLE_CHROMA:
+            chroma_manager.close()
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
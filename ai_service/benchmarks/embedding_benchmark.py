@@ -0,0 +1,407 @@
+"""
+Embedding throughput and latency benchmark.
+
+Drives the embedding entry points with a sweep of batch sizes, text lengths
+and concurrency levels, and reports texts/sec, p50/p95 request latency and
+peak RSS per case as JSON:
+
+- ``embedding_service``: EmbeddingService (huggingface or huggingface-onnx
+  provider; ``--fake-model`` swaps in a numpy encoder so the executor/cache
+  path can be measured without torch)
+- ``ollama_mock``: SOP EmbeddingsClient with deterministic mock vectors
+- ``ollama_server``: SOP EmbeddingsClient against a local fake Ollama server
+  (or a real one via ``--ollama-url``)
+- ``ollama_server_async``: the same server through ``aembed_batch``
+- ``gemini_fake``: GeminiEmbeddingFunction against a local fake Gemini endpoint
+
+Every request embeds unique texts, so caches never short-circuit the work
+unless ``--with-cache`` is given. Pass ``--baseline`` with an earlier report to
+add before/after deltas.
+
+Usage:
+    python -m benchmarks.embedding_benchmark --targets ollama_server gemini_fake \\
+        --batch-sizes 1 16 64 --text-lengths 16 128 --concurrency 1 8 --output after.json
+    python -m benchmarks.embedding_benchmark --fake-model --baseline before.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fake_servers import FakeGeminiServer, FakeOllamaServer
+
+
+TARGETS = ("embedding_service", "ollama_mock", "ollama_server", "ollama_server_async", "gemini_fake")
+
+WORDS = (
+    "research statement purpose graduate university program learning model data "
+    "analysis experiment thesis laboratory project publication student professor "
+    "engineering science design system network language robotics biology chemistry "
+    "scholarship internship leadership community mentor transcript recommendation"
+).split()
+
+
+@dataclass
+class Target:
+    """One embedding entry point under test"""
+    name: str
+    embed: Callable[[List[str]], Any]
+    is_async: bool = False
+    close: Callable[[], Any] = lambda: None
+    info: Dict[str, Any] = field(default_factory=dict)
+
+
+class FakeSentenceModel:
+    """numpy stand-in for SentenceTransformer with a length-proportional cost"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+        self.projection = np.random.default_rng(0).standard_normal((64, dimension)).astype(np.float32)
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True, **kwargs):
+        rows = []
+        for text in texts:
+            codes = np.frombuffer(text.encode("utf-8")[:4096].ljust(64, b" "), dtype=np.uint8)
+            features = codes[: (len(codes) // 64) * 64].reshape(-1, 64).astype(np.float32)
+            rows.append((features @ self.projection).mean(axis=0))
+        return np.stack(rows)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    return float(np.percentile(np.asarray(values), p))
+
+
+class TextFactory:
+    """Produces unique texts of a given word count"""
+
+    def __init__(self, seed: int = 0):
+        self._rng = np.random.default_rng(seed)
+        self._counter = itertools.count()
+
+    def batch(self, size: int, words: int) -> List[str]:
+        texts = []
+        for _ in range(size):
+            body = " ".join(self._rng.choice(WORDS, size=max(1, words - 1)))
+            texts.append(f"{next(self._counter)} {body}")
+        return texts
+
+
+# ----------------------------------------------------------------------
+# Targets
+# ----------------------------------------------------------------------
+
+def build_targets(args: argparse.Namespace) -> List[Target]:
+    targets = []
+    for name in args.targets:
+        if name == "embedding_service":
+            targets.append(_embedding_service_target(args))
+        elif name == "ollama_mock":
+            targets.append(_ollama_target(args, mock=True))
+        elif name == "ollama_server":
+            targets.append(_ollama_target(args, mock=False))
+        elif name == "ollama_server_async":
+            targets.append(_ollama_target(args, mock=False, use_async=True))
+        elif name == "gemini_fake":
+            targets.append(_gemini_target(args))
+    return targets
+
+
+def _embedding_service_target(args: argparse.Namespace) -> Target:
+    from app.services.embedding_cache import EmbeddingCache
+    from app.services.embedding_executor import EmbeddingExecutor
+    from app.services.embedding_model_registry import EmbeddingModelRegistry
+    from app.services.embedding_service import EmbeddingService
+
+    registry = EmbeddingModelRegistry()
+    model = None
+    if args.fake_model:
+        model = "benchmark-fake"
+        provider = "huggingface-onnx" if args.provider == "huggingface-onnx" else "huggingface"
+        registry.get_or_load(provider, model, lambda: FakeSentenceModel(args.dimension))
+
+    executor = EmbeddingExecutor(
+        mode=args.executor_mode,
+        max_workers=args.executor_workers,
+        max_pending=max(args.concurrency) * 2,
+        queue_timeout=300,
+    )
+    cache = EmbeddingCache(max_items=100_000, disk_enabled=False) if args.with_cache else None
+    service = EmbeddingService(registry=registry, executor=executor, cache=cache)
+    service.cache = cache  # None disables caching even when enabled in settings
+
+    async def embed(texts: List[str]):
+        return await service.generate_embeddings(texts, provider=args.provider, model=model)
+
+    return Target(
+        name="embedding_service",
+        embed=embed,
+        is_async=True,
+        close=lambda: executor.shutdown(wait=False),
+        info={
+            "provider": args.provider,
+            "model": model or "settings.huggingface_model",
+            "executor_mode": args.executor_mode,
+            "executor_workers": args.executor_workers,
+            "cache": args.with_cache,
+        },
+    )
+
+
+def _ollama_target(args: argparse.Namespace, mock: bool, use_async: bool = False) -> Target:
+    from app.SOP_Generator.services.embeddings import EmbeddingsClient
+
+    server = None
+    base_url = args.ollama_url
+    if not mock and not base_url:
+        server = FakeOllamaServer(args.dimension, args.server_latency_ms, args.per_text_latency_ms).start()
+        base_url = server.base_url
+
+    client = EmbeddingsClient(base_url=base_url, max_workers=max(args.concurrency))
+    client.use_mock = mock
+    if mock:
+        client.dimension = args.dimension
+
+    async def close():
+        client.close()
+        await client.aclose()
+        if server is not None:
+            server.stop()
+
+    name = "ollama_mock" if mock else ("ollama_server_async" if use_async else "ollama_server")
+    return Target(
+        name=name,
+        embed=client.aembed_batch if use_async else client.embed_batch,
+        is_async=use_async,
+        close=close,
+        info={"base_url": None if mock else base_url, "fake_server": server is not None},
+    )
+
+
+def _gemini_target(args: argparse.Namespace) -> Target:
+    from app.services.embedding_functions import GeminiEmbeddingFunction
+
+    server = FakeGeminiServer(args.dimension, args.server_latency_ms, args.per_text_latency_ms).start()
+    function = GeminiEmbeddingFunction(api_key="benchmark-key", base_url=server.base_url)
+    function.use_gemini = True  # ignore USE_MOCK_EMB; the endpoint is local
+
+    def close():
+        function.close()
+        server.stop()
+
+    return Target(
+        name="gemini_fake",
+        embed=function,
+        close=close,
+        info={
+            "batch_size": function.batch_size,
+            "max_concurrency": function.max_concurrency,
+        },
+    )
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+
+async def run_case(
+    target: Target,
+    texts: TextFactory,
+    batch_size: int,
+    text_length: int,
+    concurrency: int,
+    requests: int,
+    warmup: int
+) -> Dict[str, Any]:
+    """Issue `requests` embed calls with `concurrency` in flight and time them"""
+    loop = asyncio.get_running_loop()
+    pool = None if target.is_async else ThreadPoolExecutor(max_workers=concurrency)
+
+    async def call(batch: List[str]) -> None:
+        if target.is_async:
+            await target.embed(batch)
+        else:
+            await loop.run_in_executor(pool, target.embed, batch)
+
+    try:
+        for _ in range(warmup):
+            await call(texts.batch(batch_size, text_length))
+
+        latencies: List[float] = []
+        errors = 0
+        remaining = itertools.count()
+
+        async def worker():
+            nonlocal errors
+            while next(remaining) < requests:
+                batch = texts.batch(batch_size, text_length)
+                start = time.perf_counter()
+                try:
+                    await call(batch)
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        wall = time.perf_counter() - wall_start
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    completed = len(latencies) - errors
+    return {
+        "target": target.name,
+        "batch_size": batch_size,
+        "text_length_words": text_length,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "texts": completed * batch_size,
+        "wall_seconds": round(wall, 4),
+        "texts_per_sec": round(completed * batch_size / wall, 2) if wall else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50), 3),
+        "latency_p95_ms": round(percentile(latencies, 95), 3),
+        "latency_max_ms": round(max(latencies), 3) if latencies else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the full sweep and return the JSON report"""
+    factory = TextFactory(args.seed)
+    results = []
+    target_info = {}
+
+    for target in build_targets(args):
+        target_info[target.name] = target.info
+        try:
+            for batch_size, text_length, concurrency in itertools.product(
+                args.batch_sizes, args.text_lengths, args.concurrency
+            ):
+                result = await run_case(
+                    target, factory, batch_size, text_length, concurrency,
+                    args.requests, args.warmup,
+                )
+                results.append(result)
+                if not args.quiet:
+                    print(
+                        f"{result['target']:<20} batch={batch_size:<4} words={text_length:<5} "
+                        f"conc={concurrency:<3} {result['texts_per_sec']:>10.1f} texts/s "
+                        f"p50={result['latency_p50_ms']:.1f}ms p95={result['latency_p95_ms']:.1f}ms",
+                        file=sys.stderr,
+                    )
+        finally:
+            close_result = target.close()
+            if asyncio.iscoroutine(close_result):
+                await close_result
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "config": {
+            "targets": target_info,
+            "batch_sizes": args.batch_sizes,
+            "text_lengths_words": args.text_lengths,
+            "concurrency": args.concurrency,
+            "requests_per_case": args.requests,
+            "warmup_requests": args.warmup,
+            "dimension": args.dimension,
+            "server_latency_ms": args.server_latency_ms,
+            "per_text_latency_ms": args.per_text_latency_ms,
+        },
+        "results": results,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Annotate results with changes relative to a baseline report"""
+    def key(row):
+        return (row["target"], row["batch_size"], row["text_length_words"], row["concurrency"])
+
+    previous = {key(row): row for row in baseline.get("results", [])}
+    for row in report["results"]:
+        old = previous.get(key(row))
+        if not old:
+            continue
+        row["baseline"] = {
+            metric: old.get(metric)
+            for metric in ("texts_per_sec", "latency_p50_ms", "latency_p95_ms", "peak_rss_mb")
+        }
+        if old.get("texts_per_sec"):
+            row["texts_per_sec_change_pct"] = round(
+                (row["texts_per_sec"] - old["texts_per_sec"]) / old["texts_per_sec"] * 100, 1
+            )
+        if old.get("latency_p95_ms"):
+            row["latency_p95_change_pct"] = round(
+                (row["latency_p95_ms"] - old["latency_p95_ms"]) / old["latency_p95_ms"] * 100, 1
+            )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 16, 64])
+    parser.add_argument("--text-lengths", nargs="+", type=int, default=[16, 128, 512], help="Words per text")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--requests", type=int, default=20, help="Timed requests per case")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per case")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--provider", choices=["huggingface", "huggingface-onnx"], default="huggingface")
+    parser.add_argument("--fake-model", action="store_true", help="Use a numpy encoder for embedding_service")
+    parser.add_argument("--executor-mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--executor-workers", type=int, default=2)
+    parser.add_argument("--with-cache", action="store_true", help="Enable the in-memory embedding cache")
+    parser.add_argument("--ollama-url", help="Benchmark a real Ollama server instead of the fake one")
+    parser.add_argument("--server-latency-ms", type=float, default=5.0, help="Fake server per-request latency")
+    parser.add_argument("--per-text-latency-ms", type=float, default=0.05, help="Fake server per-text latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--quiet", action="store_true", help="No per-case progress on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare_with_baseline(report, json.load(f))
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    main()
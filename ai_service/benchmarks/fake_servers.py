@@ -0,0 +1,177 @@
+"""
+In-process HTTP stand-ins for the Ollama and Gemini embedding APIs.
+
+They answer with deterministic vectors after a configurable delay, so client
+overhead (connection reuse, batching, concurrency) can be measured without
+network access or API keys. The Gemini server can also rate limit and reject
+chosen texts, which the embedding function tests rely on.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Set
+
+
+def _vector(text: str, dimension: int) -> List[float]:
+    base = float(len(text) % 97) / 97.0
+    return [base + i / dimension for i in range(dimension)]
+
+
+class Reply(NamedTuple):
+    body: dict
+    status: int = 200
+    headers: Optional[Dict[str, str]] = None
+
+
+class FakeEmbeddingServer:
+    """Threaded HTTP server with simulated per-request and per-text latency"""
+
+    def __init__(
+        self,
+        dimension: int = 384,
+        request_latency_ms: float = 5.0,
+        per_text_latency_ms: float = 0.05
+    ):
+        self.dimension = dimension
+        self.request_latency_ms = request_latency_ms
+        self.per_text_latency_ms = per_text_latency_ms
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def _simulate(self, texts: int) -> None:
+        with self._lock:
+            self.requests += 1
+        time.sleep((self.request_latency_ms + self.per_text_latency_ms * texts) / 1000)
+
+    def vector_for(self, text: str) -> List[float]:
+        """The vector served for a text"""
+        return _vector(text, self.dimension)
+
+    def route(self, path: str, body: dict, headers: Mapping[str, str]) -> Optional[Reply]:
+        """Return the response for a request, or None for 404"""
+        raise NotImplementedError
+
+    def _respond(self, path: str, body: dict, headers: Mapping[str, str]) -> Reply:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            reply = self.route(path, body, headers)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return reply if reply is not None else Reply({"error": "not found"}, 404)
+
+    def _handler(self) -> Callable:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without TCP_NODELAY,
+            # keep-alive clients stall ~40ms per request on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                reply = server._respond(self.path, body, self.headers)
+                payload = json.dumps(reply.body).encode()
+                self.send_response(reply.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (reply.headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self) -> "FakeEmbeddingServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class FakeOllamaServer(FakeEmbeddingServer):
+    """Serves /api/embed (batch) and /api/embeddings (single)"""
+
+    def route(self, path: str, body: dict, headers: Mapping[str, str]) -> Optional[Reply]:
+        if path == "/api/embed":
+            texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            self._simulate(len(texts))
+            return Reply({"model": body.get("model"), "embeddings": [self.vector_for(t) for t in texts]})
+        if path == "/api/embeddings":
+            self._simulate(1)
+            return Reply({"embedding": self.vector_for(body["prompt"])})
+        return None
+
+
+class FakeGeminiServer(FakeEmbeddingServer):
+    """
+    Serves :batchEmbedContents and :embedContent under /v1beta
+
+    Set rate_limit_remaining to answer that many requests with 429, and
+    rejected_texts/empty_texts to fail a request containing a text or leave
+    a text's vector out of a batch response.
+    """
+
+    def __init__(self, *args, api_key: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.api_key = api_key
+        self.rate_limit_remaining = 0
+        self.rejected_texts: Set[str] = set()
+        self.empty_texts: Set[str] = set()
+        self.batch_sizes: List[int] = []
+        self.single_calls = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"{super().base_url}/v1beta"
+
+    def route(self, path: str, body: dict, headers: Mapping[str, str]) -> Optional[Reply]:
+        if self.api_key is not None and headers.get("x-goog-api-key") != self.api_key:
+            return Reply({"error": {"code": 403}}, 403)
+        with self._lock:
+            if self.rate_limit_remaining > 0:
+                self.rate_limit_remaining -= 1
+                return Reply({"error": {"code": 429}}, 429, {"Retry-After": "0"})
+
+        if path.endswith(":batchEmbedContents"):
+            texts = [r["content"]["parts"][0]["text"] for r in body["requests"]]
+            with self._lock:
+                self.batch_sizes.append(len(texts))
+            self._simulate(len(texts))
+            if self.rejected_texts.intersection(texts):
+                return Reply({"error": {"code": 400}}, 400)
+            return Reply({"embeddings": [
+                {} if t in self.empty_texts else {"values": self.vector_for(t)} for t in texts
+            ]})
+        if path.endswith(":embedContent"):
+            text = body["content"]["parts"][0]["text"]
+            with self._lock:
+                self.single_calls += 1
+            self._simulate(1)
+            if text in self.rejected_texts:
+                return Reply({"error": {"code": 400}}, 400)
+            return Reply({"embedding": {"values": self.vector_for(text)}})
+        return None
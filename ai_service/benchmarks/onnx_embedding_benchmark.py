@@ -0,0 +1,141 @@
+"""
+Compare SentenceTransformer (PyTorch) and ONNX Runtime embedding backends
+
+Each backend runs in its own subprocess so peak RSS is measured in isolation.
+Reports load time, throughput (texts/sec), peak RSS and the minimum cosine
+similarity of each ONNX variant against the PyTorch vectors as JSON.
+
+Usage:
+    python -m benchmarks.onnx_embedding_benchmark [--texts 2000] [--batch-size 32] [--threads 0]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+WORDS = (
+    "research statement purpose graduate university program learning model data "
+    "analysis experiment thesis laboratory project publication student professor "
+    "engineering science design system network language robotics biology chemistry"
+).split()
+
+
+def make_texts(count: int, seed: int = 0) -> list:
+    """Chunk-like texts of varied length (roughly 20-250 words)"""
+    rng = np.random.default_rng(seed)
+    return [
+        " ".join(rng.choice(WORDS, size=int(rng.integers(20, 250))))
+        for _ in range(count)
+    ]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(backend: str, count: int, batch_size: int, threads: int, output: str) -> None:
+    """Load one backend, encode the corpus and save vectors plus metrics"""
+    from app.config import settings
+
+    texts = make_texts(count)
+    baseline_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    if backend == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads > 0:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(settings.huggingface_model, device="cpu")
+    else:
+        from app.services.onnx_embedding import load_onnx_encoder
+        model = load_onnx_encoder(
+            settings.huggingface_model,
+            quantize=backend == "onnx-int8",
+            threads=threads,
+        )
+    load_seconds = time.perf_counter() - start
+
+    # Warm up so one-off graph/kernel setup is not counted as throughput
+    model.encode(texts[:batch_size], batch_size=batch_size)
+
+    start = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    encode_seconds = time.perf_counter() - start
+
+    np.save(output, np.asarray(embeddings, dtype=np.float32))
+    print(json.dumps({
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "texts_per_second": round(len(texts) / encode_seconds, 1),
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = library default)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.texts, args.batch_size, args.threads, args.output)
+        return
+
+    results = []
+    vectors = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            output = str(Path(tmp) / f"{backend}.npy")
+            proc = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.onnx_embedding_benchmark",
+                    "--worker", backend,
+                    "--texts", str(args.texts),
+                    "--batch-size", str(args.batch_size),
+                    "--threads", str(args.threads),
+                    "--output", output,
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                results.append({"backend": backend, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            vectors[backend] = np.load(output)
+
+    if "torch" in vectors:
+        from app.services.onnx_embedding import min_cosine_similarity
+        for row in results:
+            if row["backend"] in vectors and row["backend"] != "torch":
+                reference, candidate = vectors["torch"], vectors[row["backend"]]
+                row["min_cosine_vs_torch"] = round(min_cosine_similarity(reference, candidate), 6)
+                row["max_abs_diff_vs_torch"] = float(np.max(np.abs(reference - candidate)))
+
+    print(json.dumps({
+        "texts": args.texts,
+        "batch_size": args.batch_size,
+        "threads": args.threads,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+PDF text extraction benchmark.
+
+Generates transcript/thesis-sized text PDFs (100-500 pages by default) and
+times each extraction strategy on them, reporting pages/sec, time to the
+first page, the longest event-loop stall and peak RSS per case as JSON:
+
+- ``legacy``: the previous DocumentProcessor loop (``text +=`` per page, on
+  the event loop thread)
+- ``thread``: PDFExtractor with one worker (whole PDF on a helper thread)
+- ``pool``: PDFExtractor splitting page ranges across a process pool
+
+``--source bytes`` feeds the PDF as an in-memory stream (as GridFS uploads
+are), ``--source path`` as a file on disk. Pass ``--baseline`` with an
+earlier report to add before/after deltas.
+
+Usage:
+    python -m benchmarks.pdf_extraction_benchmark --pages 100 250 500 --workers 4
+    python -m benchmarks.pdf_extraction_benchmark --source path --output after.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+from PyPDF2 import PdfReader
+
+from benchmarks.embedding_benchmark import WORDS, peak_rss_mb
+
+
+STRATEGIES = ("legacy", "thread", "pool")
+
+
+def make_pdf(pages: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    """Build a text-only PDF with ``pages`` pages of pseudo-random prose"""
+    rng = np.random.default_rng(seed)
+    # Objects 1-3 are catalog, page tree and font; each page adds (content, page)
+    bodies: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for number in range(pages):
+        lines = [
+            f"Page {number + 1}, line {line + 1}: " + " ".join(rng.choice(WORDS, size=10))
+            for line in range(lines_per_page)
+        ]
+        text = " ".join(f"({line}) '" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {text} ET".encode("latin-1")
+        bodies.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(bodies)
+        bodies.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(b"%d 0 R" % len(bodies))
+    bodies[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    bodies[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for ref, body in enumerate(bodies, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (ref, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(bodies) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(bodies) + 1, xref))
+    return out.getvalue()
+
+
+async def legacy_pages(source) -> AsyncIterator[str]:
+    """The pre-PDFExtractor loop, kept for comparison"""
+    reader = PdfReader(source)
+    text = ""
+    for page in reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            text += page_text + "\n\n"
+    yield text
+
+
+async def measure_stalls(stop: asyncio.Event, stalls: List[float], interval: float = 0.005) -> None:
+    """Record how late a periodic timer fires, i.e. how long the loop was blocked"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        stalls.append(max(0.0, loop.time() - expected))
+
+
+async def run_case(
+    strategy: str, page_count: int, pdf: bytes, path: Optional[str], args: argparse.Namespace
+) -> Dict[str, Any]:
+    from app.services.pdf_extraction import PDFExtractor
+    from app.utils.pdf_pages import count_pages
+
+    if strategy == "thread":
+        extractor = PDFExtractor(max_workers=1)
+    elif strategy == "pool":
+        extractor = PDFExtractor(max_workers=args.workers, min_parallel_pages=1)
+    else:
+        extractor = None
+
+    durations, first_page, stalls_max = [], [], []
+    characters = 0
+    try:
+        if strategy == "pool":
+            # Spawn every worker process outside the timed runs
+            loop, warmup = asyncio.get_running_loop(), make_pdf(1)
+            await asyncio.gather(*(
+                loop.run_in_executor(extractor._get_pool(), count_pages, warmup)
+                for _ in range(args.workers)
+            ))
+
+        for _ in range(args.repeat):
+            source = path if args.source == "path" else io.BytesIO(pdf)
+            pages = legacy_pages(source) if extractor is None else extractor.iter_pages(source)
+
+            stop, stalls = asyncio.Event(), []
+            ticker = asyncio.create_task(measure_stalls(stop, stalls))
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            first = None
+            characters = 0
+            async for page in pages:
+                if first is None:
+                    first = time.perf_counter() - start
+                characters += len(page)
+            durations.append(time.perf_counter() - start)
+            stop.set()
+            await ticker
+
+            first_page.append(first or 0.0)
+            stalls_max.append(max(stalls, default=0.0))
+    finally:
+        if extractor is not None:
+            extractor.shutdown()
+
+    seconds = float(np.median(durations))
+    return {
+        "strategy": strategy,
+        "pages": page_count,
+        "source": args.source,
+        "workers": args.workers if strategy == "pool" else 1,
+        "characters": characters,
+        "seconds": round(seconds, 4),
+        "pages_per_sec": round(page_count / seconds, 1) if seconds else 0.0,
+        "first_page_ms": round(float(np.median(first_page)) * 1000, 1),
+        "max_loop_stall_ms": round(max(stalls_max) * 1000, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    results = []
+    for pages in args.pages:
+        pdf = make_pdf(pages, args.lines_per_page, args.seed)
+        path = None
+        if args.source == "path":
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                f.write(pdf)
+                path = f.name
+        try:
+            for strategy in args.strategies:
+                result = await run_case(strategy, pages, pdf, path, args)
+                result["pdf_mb"] = round(len(pdf) / (1024 * 1024), 2)
+                results.append(result)
+                if not args.quiet:
+                    print(
+                        f"{strategy:<8} pages={pages:<5} {result['pages_per_sec']:>9.1f} pages/s "
+                        f"first={result['first_page_ms']:.1f}ms stall={result['max_loop_stall_ms']:.1f}ms",
+                        file=sys.stderr,
+                    )
+        finally:
+            if path:
+                os.remove(path)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "config": {
+            "strategies": args.strategies,
+            "pages": args.pages,
+            "lines_per_page": args.lines_per_page,
+            "workers": args.workers,
+            "source": args.source,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Annotate results with changes relative to a baseline report"""
+    def key(row):
+        return (row["strategy"], row["pages"], row["source"])
+
+    previous = {key(row): row for row in baseline.get("results", [])}
+    for row in report["results"]:
+        old = previous.get(key(row))
+        if not old:
+            continue
+        row["baseline"] = {
+            metric: old.get(metric)
+            for metric in ("pages_per_sec", "first_page_ms", "max_loop_stall_ms", "peak_rss_mb")
+        }
+        if old.get("pages_per_sec"):
+            row["pages_per_sec_change_pct"] = round(
+                (row["pages_per_sec"] - old["pages_per_sec"]) / old["pages_per_sec"] * 100, 1
+            )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--pages", nargs="+", type=int, default=[100, 250, 500])
+    parser.add_argument("--lines-per-page", type=int, default=45)
+    parser.add_argument("--workers", type=int, default=4, help="Process pool size for the pool strategy")
+    parser.add_argument("--source", choices=["bytes", "path"], default="bytes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (median reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--quiet", action="store_true", help="No per-case progress on stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare_with_baseline(report, json.load(f))
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Recall-vs-size benchmark for stored embedding precisions
+
+Compares float16 and int8 storage (with and without full-precision rerank)
+against exact float32 search. Vectors come from the ``faculty_embeddings``
+collection; queries are held-out corpus vectors with a little noise, or real
+queries encoded with the configured HuggingFace model when ``--queries-file``
+is given. Use ``--synthetic N`` to run without MongoDB.
+
+Prints a JSON report with bytes per vector and recall@k for each setting.
+
+Usage:
+    python -m benchmarks.vector_quantization_benchmark [--top-k 10] [--queries 200]
+    python -m benchmarks.vector_quantization_benchmark --synthetic 5000 --dim 384
+    python -m benchmarks.vector_quantization_benchmark --queries-file queries.txt
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from app.config import settings
+from app.services.vector_quantization import (
+    VectorCodec,
+    decode_vector,
+    stored_size_bytes,
+)
+
+
+async def load_corpus() -> np.ndarray:
+    """Load faculty vectors from MongoDB as a float32 matrix"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+    try:
+        collection = client[settings.mongodb_db_name]["faculty_embeddings"]
+        docs = await collection.find({"embedding": {"$exists": True}}).to_list(length=None)
+    finally:
+        client.close()
+    if not docs:
+        raise SystemExit("faculty_embeddings is empty; use --synthetic N")
+    return np.stack([decode_vector(doc) for doc in docs])
+
+
+async def encode_queries(path: str) -> np.ndarray:
+    """Encode newline-separated query texts with the configured model"""
+    from app.services.embedding_service import EmbeddingService
+
+    texts = [line.strip() for line in Path(path).read_text().splitlines() if line.strip()]
+    embeddings, _ = await EmbeddingService().generate_embeddings(texts)
+    return embeddings
+
+
+def top_k(scores: np.ndarray, k: int) -> set:
+    k = min(k, len(scores))
+    return set(np.argpartition(-scores, k - 1)[:k].tolist())
+
+
+def evaluate(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[Dict[str, Any]]:
+    """Measure recall@k and storage size for each precision/rerank setting"""
+    exact = VectorCodec(precision="float32", keep_full=False, rerank_candidates=0)
+    exact_docs = [exact.encode(v) for v in corpus]
+    truth = [top_k(exact.score(q, exact_docs), k) for q in queries]
+
+    settings_grid = [
+        ("float32", False, 0),
+        ("float16", False, 0),
+        ("int8", False, 0),
+        ("int8", True, max(k * 5, 50)),
+    ]
+
+    report = []
+    for precision, keep_full, rerank in settings_grid:
+        codec = VectorCodec(precision=precision, keep_full=keep_full, rerank_candidates=rerank)
+        docs = [codec.encode(v) for v in corpus]
+
+        recalls = []
+        start = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            found = top_k(codec.score(query, docs, top_k=k), k)
+            recalls.append(len(found & expected) / len(expected))
+        elapsed = time.perf_counter() - start
+
+        report.append({
+            "precision": precision,
+            "full_precision_rerank": bool(keep_full and rerank),
+            "rerank_candidates": rerank,
+            "bytes_per_vector": stored_size_bytes(docs[0]),
+            "total_mb": round(sum(stored_size_bytes(d) for d in docs) / 1e6, 3),
+            f"recall_at_{k}": round(float(np.mean(recalls)), 4),
+            "avg_query_ms": round(elapsed / len(queries) * 1000, 3),
+        })
+
+    legacy = stored_size_bytes({"embedding": corpus[0].tolist()})
+    for row in report:
+        row["size_vs_float_list"] = round(row["bytes_per_vector"] / legacy, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="Number of held-out corpus queries")
+    parser.add_argument("--queries-file", help="Newline-separated query texts to encode")
+    parser.add_argument("--noise", type=float, default=0.05, help="Relative noise added to held-out queries")
+    parser.add_argument("--synthetic", type=int, help="Use N random vectors instead of MongoDB")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension for --synthetic")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.synthetic:
+        corpus = rng.standard_normal((args.synthetic, args.dim)).astype(np.float32)
+    else:
+        corpus = asyncio.run(load_corpus())
+
+    if args.queries_file:
+        queries = asyncio.run(encode_queries(args.queries_file))
+    else:
+        picks = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+        base = corpus[picks]
+        noise = rng.standard_normal(base.shape).astype(np.float32)
+        noise *= args.noise * np.linalg.norm(base, axis=1, keepdims=True) / np.sqrt(base.shape[1])
+        queries = base + noise
+
+    report = {
+        "corpus_size": int(len(corpus)),
+        "dimension": int(corpus.shape[1]),
+        "queries": int(len(queries)),
+        "top_k": args.top_k,
+        "results": evaluate(corpus, queries, args.top_k),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
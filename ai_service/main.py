@@ -89,6 +89,20 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Roadmap initialization disabled (ENABLE_ROADMAP=false)")
 
+    # Pre-load embedding models into the process-wide registry
+    if settings.ENABLE_EMBEDDING_PREWARM:
+        try:
+            import asyncio
+            from app.services.embedding_model_registry import embedding_model_registry
+            logger.info("Pre-warming embedding models...")
+            await asyncio.to_thread(embedding_model_registry.prewarm)
+            logger.info(f"Embedding models ready: {embedding_model_registry.stats()['loaded_models']} loaded")
+        except Exception as e:
+            logger.error(f"Failed to pre-warm embedding models: {e}")
+            logger.warning("Embedding models will be loaded on first use")
+    else:
+        logger.info("Embedding model pre-warm disabled (ENABLE_EMBEDDING_PREWARM=false)")
+
     # Initialize Multi-Agent System
     if settings.ENABLE_MULTI_AGENT:
         try:
@@ -123,10 +137,32 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Multi-Agent initialization disabled (ENABLE_MULTI_AGENT=false)")
 
+    # Run an ingestion worker in-process unless a standalone one is deployed
+    ingestion_worker = ingestion_task = None
+    if settings.inline_ingestion_worker and settings.ENABLE_MONGODB:
+        import asyncio
+        from app.workers.ingestion_worker import IngestionWorker
+        ingestion_worker = IngestionWorker()
+        ingestion_task = asyncio.create_task(ingestion_worker.run())
+        logger.info("Inline ingestion worker started")
+    elif settings.ENABLE_MONGODB:
+        if settings.ENABLE_CHROMA and settings.CHROMA_CLIENT_MODE == "embedded":
+            logger.error(
+                "ENABLE_INLINE_INGESTION_WORKER=false with embedded Chroma: a standalone "
+                "ingestion worker cannot open this process's store, so uploads will stay "
+                "pending. Set CHROMA_CLIENT_MODE=http or enable the inline worker"
+            )
+        else:
+            logger.info("Uploads are processed by a standalone ingestion worker")
+
     yield
 
     # Cleanup on shutdown
     logger.info("Shutting down EduLen AI Service...")
+    if ingestion_worker is not None:
+        ingestion_worker.stop()
+        await ingestion_task
+
     if settings.ENABLE_CHROMA:
         chroma_manager.close()
 
@@ -134,6 +170,10 @@ async def lifespan(app: FastAPI):
     if settings.ENABLE_MONGODB:
         await close_mongodb_connection()
 
+    # Stop embedding worker pool
+    from app.services.embedding_executor import embedding_executor
+    embedding_executor.shutdown(wait=False)
+
     # Shutdown multi-agent system
     if multi_agent.session_manager:
         await multi_agent.session_manager.shutdown()
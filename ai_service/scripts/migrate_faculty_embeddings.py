@@ -0,0 +1,104 @@
+"""
+Re-encode stored faculty embeddings at a new storage precision
+
+Reads every document in ``faculty_embeddings`` (legacy float lists included),
+recovers the float32 vector and rewrites it as float32, float16 or int8 bytes.
+Lossy documents without a full-precision copy are re-encoded from their
+dequantized values, so migrating "up" in precision cannot restore accuracy;
+re-run ``add_faculty`` for those if exact vectors are needed.
+
+Usage:
+    python scripts/migrate_faculty_embeddings.py --precision int8 [--keep-full] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from app.config import settings
+from app.services.vector_quantization import (
+    SUPPORTED_PRECISIONS,
+    VectorCodec,
+    decode_vector,
+    stored_size_bytes,
+)
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def migrate(precision: str, keep_full: bool, batch_size: int, dry_run: bool):
+    """Re-encode all faculty embeddings with the requested precision"""
+    codec = VectorCodec(precision=precision, keep_full=keep_full)
+
+    logger.info("Connecting to MongoDB...")
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+    collection = client[settings.mongodb_db_name]["faculty_embeddings"]
+
+    migrated = 0
+    bytes_before = 0
+    bytes_after = 0
+    lossy_sources = 0
+    updates = []
+
+    try:
+        cursor = collection.find({"embedding": {"$exists": True}})
+        async for doc in cursor:
+            source_dtype = doc.get("embedding_dtype", "float32")
+            if source_dtype != "float32" and not doc.get("embedding_full"):
+                lossy_sources += 1
+
+            vector = decode_vector(doc)
+            fields = codec.encode(vector)
+
+            bytes_before += stored_size_bytes(doc)
+            bytes_after += stored_size_bytes(fields)
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+
+            if len(updates) >= batch_size:
+                if not dry_run:
+                    await collection.bulk_write(updates, ordered=False)
+                migrated += len(updates)
+                updates = []
+
+        if updates:
+            if not dry_run:
+                await collection.bulk_write(updates, ordered=False)
+            migrated += len(updates)
+
+        action = "Would migrate" if dry_run else "Migrated"
+        logger.info(
+            f"{action} {migrated} faculty embeddings to {precision}"
+            f"{' (+float32 copy)' if keep_full else ''}: "
+            f"{bytes_before / 1024:.1f} KiB -> {bytes_after / 1024:.1f} KiB of vector data"
+        )
+        if lossy_sources:
+            logger.warning(
+                f"{lossy_sources} documents were already quantized without a full copy; "
+                f"they were re-encoded from dequantized values"
+            )
+
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--precision", choices=SUPPORTED_PRECISIONS, default=settings.embedding_storage_precision)
+    parser.add_argument("--keep-full", action="store_true", help="Also store a float32 copy for rerank")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report size changes without writing")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.precision, args.keep_full, args.batch_size, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Tests for the content-addressed, reference-counted blob store
+"""
+
+import hashlib
+import io
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.database.blob_store import BlobStore
+
+
+class FakeUpload:
+    """Async read/seek over bytes, like FastAPI's UploadFile"""
+
+    def __init__(self, data):
+        self.buffer = io.BytesIO(data)
+        self.reads = 0
+
+    async def read(self, size=-1):
+        self.reads += 1
+        return self.buffer.read(size)
+
+    async def seek(self, offset):
+        self.buffer.seek(offset)
+
+
+class FakeGridIn:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self._id = ObjectId()
+        self.data = b""
+        self.metadata = None
+
+    async def write(self, data):
+        self.bucket.writes += 1
+        self.data += data
+
+    async def set(self, name, value):
+        setattr(self, name, value)
+
+    def abort(self):
+        pass
+
+    def close(self):
+        self.bucket.files[str(self._id)] = self.data
+
+
+class FakeBucket:
+    def __init__(self):
+        self.files = {}
+        self.writes = 0
+
+    def open_upload_stream(self, filename, metadata=None):
+        return FakeGridIn(self)
+
+    async def delete(self, file_id):
+        del self.files[str(file_id)]
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if isinstance(condition, dict):
+            if not doc.get(key, 0) <= condition["$lte"]:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class FakeBlobs:
+    def __init__(self):
+        self.docs = []
+        self.on_insert = None
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        for doc in self.docs:
+            if matches(doc, query):
+                for key, value in update.get("$inc", {}).items():
+                    doc[key] += value
+                doc.update(update.get("$set", {}))
+                return dict(doc)
+        return None
+
+    async def insert_one(self, doc):
+        if self.on_insert:
+            self.on_insert()
+        if any(d["file_hash"] == doc["file_hash"] for d in self.docs):
+            raise DuplicateKeyError("file_hash")
+        self.docs.append(dict(doc))
+        return SimpleNamespace(inserted_id=doc["file_hash"])
+
+    async def find_one_and_delete(self, query):
+        for doc in self.docs:
+            if matches(doc, query):
+                self.docs.remove(doc)
+                return doc
+        return None
+
+
+def make_store():
+    return BlobStore(collection=FakeBlobs(), bucket=FakeBucket())
+
+
+@pytest.mark.asyncio
+async def test_upload_is_hashed_while_stored_in_one_pass():
+    """Test the hash comes from the same reads that write the GridFS file"""
+    store = make_store()
+    data = b"x" * (2 * 1024 * 1024 + 10)
+    upload = FakeUpload(data)
+
+    file_hash, gridfs_id = await store.put(upload, "scan.pdf")
+
+    assert file_hash == hashlib.sha256(data).hexdigest()
+    assert store.bucket.files[gridfs_id] == data
+    # Three 1 MB reads with data plus the final empty read
+    assert upload.reads == 4
+    assert store.collection.docs[0]["file_hash"] == file_hash
+
+
+@pytest.mark.asyncio
+async def test_identical_bytes_are_stored_once_and_released_by_the_last_reference():
+    """Test users uploading the same file share one GridFS file until the last one lets go"""
+    store = make_store()
+    first_hash, first = await store.put(FakeUpload(b"brochure"), "brochure.pdf")
+    second_hash, second = await store.put(FakeUpload(b"brochure"), "copy.pdf")
+
+    assert first_hash == second_hash
+    assert first == second
+    # The second copy was written, then collected once its hash matched
+    assert list(store.bucket.files.values()) == [b"brochure"]
+    assert store.collection.docs[0]["ref_count"] == 2
+
+    assert await store.release(first) is False
+    assert store.bucket.files
+    assert await store.release(first) is True
+    assert store.bucket.files == {}
+    assert store.collection.docs == []
+
+
+@pytest.mark.asyncio
+async def test_losing_a_store_race_keeps_the_winning_blob():
+    """Test a concurrent upload of the same bytes discards its own copy"""
+    store = make_store()
+    winner = str(ObjectId())
+    file_hash = hashlib.sha256(b"brochure").hexdigest()
+
+    def concurrent_insert():
+        store.collection.on_insert = None
+        store.collection.docs.append({"file_hash": file_hash, "gridfs_id": winner, "ref_count": 1})
+        store.bucket.files[winner] = b"brochure"
+
+    store.collection.on_insert = concurrent_insert
+    _, gridfs_id = await store.put(FakeUpload(b"brochure"), "brochure.pdf")
+
+    assert gridfs_id == winner
+    assert list(store.bucket.files) == [winner]
+    assert store.collection.docs[0]["ref_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_files_stored_before_sharing_are_deleted_directly():
+    """Test releasing a GridFS file with no blob record deletes it"""
+    store = make_store()
+    legacy = str(ObjectId())
+    store.bucket.files[legacy] = b"old upload"
+
+    assert await store.release(legacy) is True
+    assert store.bucket.files == {}
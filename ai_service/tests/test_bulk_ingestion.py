@@ -0,0 +1,194 @@
+"""
+Tests for the pipelined bulk ingestion of many documents
+"""
+
+import numpy as np
+import pytest
+
+from app.models.document import ProcessingStatus
+from app.services.bulk_ingestion import BulkIngestionPipeline
+from app.services.chunking_service import ChunkingService, RegexTokenCounter
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeDocuments:
+    """Document records keyed by document_id"""
+
+    def __init__(self, document_ids):
+        self.docs = {d: {"document_id": d, "status": ProcessingStatus.PENDING} for d in document_ids}
+        self.stages = {d: [] for d in document_ids}
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["document_id"])
+        if doc is None:
+            return
+        doc.update(update["$set"])
+        if "progress" in update["$set"]:
+            self.stages[doc["document_id"]].append(update["$set"]["progress"]["stage"])
+
+    def find(self, query, projection=None):
+        ids = query["document_id"]["$in"]
+        return FakeCursor([
+            {"document_id": d} for d in ids
+            if d in self.docs and ("status" not in query or self.docs[d]["status"] == query["status"])
+        ])
+
+
+class FakeVectorDB:
+    def __init__(self, fail_on=None):
+        self.chunks = {}
+        self.fail_on = fail_on
+
+    async def insert_chunks(self, chunks, embeddings=None):
+        assert len(chunks) == len(embeddings)
+        if any(chunk.document_id == self.fail_on for chunk in chunks):
+            raise RuntimeError("insert failed")
+        for chunk in chunks:
+            self.chunks[chunk.chunk_id] = chunk
+        return len(chunks)
+
+    async def delete_chunks(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            self.chunks.pop(chunk_id, None)
+        return len(chunk_ids)
+
+    async def delete_document_chunks(self, document_id):
+        return 0
+
+    async def create_text_index(self):
+        pass
+
+
+class RecordingEmbedder:
+    def __init__(self):
+        self.batches = []
+        self.cache = None
+
+    @staticmethod
+    def _resolve_model_name(provider, model=None):
+        return "test-model"
+
+    async def generate_embeddings(self, texts, provider="huggingface", model=None):
+        self.batches.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32), 4
+
+
+class FakeTextStore:
+    def __init__(self):
+        self.texts = {}
+
+    async def get(self, file_hash):
+        return {"text": self.texts[file_hash]} if file_hash in self.texts else None
+
+    async def put(self, file_hash, text, file_type=None, page_offsets=None):
+        self.texts[file_hash] = text
+
+
+def write_documents(tmp_path, texts):
+    documents = []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"doc-{i}.txt"
+        path.write_text(text)
+        documents.append({
+            "document_id": f"doc-{i}",
+            "tracking_id": f"track-{i}",
+            "filename": path.name,
+            "file_type": "txt",
+            "file_hash": f"hash-{i}",
+            "storage_backend": "disk",
+            "file_path": str(path),
+            "tags": ["onboarding"],
+        })
+    return documents
+
+
+def make_pipeline(documents, vector_db=None, **kwargs):
+    return BulkIngestionPipeline(
+        "user-1",
+        vector_db=vector_db or FakeVectorDB(),
+        embedding_service=RecordingEmbedder(),
+        chunking_service=ChunkingService(
+            chunk_size=8, chunk_overlap=0, mode="paragraph", token_counter=RegexTokenCounter()
+        ),
+        documents=FakeDocuments([d["document_id"] for d in documents]),
+        text_store=FakeTextStore(),
+        **kwargs,
+    )
+
+
+def paragraphs(prefix, count):
+    return "\n\n".join(f"{prefix} paragraph number {i} here." for i in range(count))
+
+
+@pytest.mark.asyncio
+async def test_documents_flow_through_shared_embedding_batches(tmp_path):
+    """Test every file is indexed and embedding batches span document boundaries"""
+    documents = write_documents(tmp_path, [paragraphs("Transcript", 3), paragraphs("CV", 3), paragraphs("IELTS", 3)])
+    pipeline = make_pipeline(documents, batch_size=4)
+
+    failed = await pipeline.run(documents)
+
+    assert failed == {}
+    for doc in pipeline.documents.docs.values():
+        assert doc["status"] == ProcessingStatus.COMPLETED
+        assert doc["total_chunks"] == 3
+        assert doc["progress"]["stage"] == "completed"
+    assert len(pipeline.vector_db.chunks) == 9
+    assert all(len(batch) <= 4 for batch in pipeline.embedding_service.batches)
+    assert len(pipeline.embedding_service.batches) < 3 * 2
+    assert set(pipeline.text_store.texts) == {"hash-0", "hash-1", "hash-2"}
+    assert pipeline.documents.stages["doc-0"][:2] == ["extracting", "chunking"]
+
+
+@pytest.mark.asyncio
+async def test_failed_file_does_not_stop_the_others(tmp_path):
+    """Test an empty file and an insert failure fail only their own documents"""
+    documents = write_documents(tmp_path, [paragraphs("Transcript", 3), "", paragraphs("CV", 3)])
+    pipeline = make_pipeline(documents, vector_db=FakeVectorDB(fail_on="doc-2"), batch_size=1)
+
+    failed = await pipeline.run(documents)
+
+    assert set(failed) == {"doc-1", "doc-2"}
+    statuses = {d: doc["status"] for d, doc in pipeline.documents.docs.items()}
+    assert statuses == {
+        "doc-0": ProcessingStatus.COMPLETED,
+        "doc-1": ProcessingStatus.FAILED,
+        "doc-2": ProcessingStatus.FAILED,
+    }
+    # No partial document left behind
+    assert {chunk.document_id for chunk in pipeline.vector_db.chunks.values()} == {"doc-0"}
+
+    # A retry only processes what failed
+    pipeline.vector_db.fail_on = None
+    retry = make_pipeline(documents, vector_db=pipeline.vector_db, attempt=2)
+    retry.documents = pipeline.documents
+    assert set(await retry.run(documents)) == {"doc-1"}
+    assert pipeline.documents.docs["doc-2"]["status"] == ProcessingStatus.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_document_deleted_mid_pipeline_leaves_no_chunks(tmp_path):
+    """Test a file deleted while the job runs is dropped, rolled back and not retried"""
+    documents = write_documents(tmp_path, [paragraphs("Transcript", 3), paragraphs("CV", 3)])
+    pipeline = make_pipeline(documents, batch_size=1)
+    embed = pipeline.embedding_service.generate_embeddings
+
+    async def deleting_embed(texts, provider="huggingface", model=None):
+        # The user deletes doc-1 while its chunks are being embedded
+        if any(text.startswith("CV paragraph number 1") for text in texts):
+            pipeline.documents.docs.pop("doc-1", None)
+        return await embed(texts, provider, model)
+
+    pipeline.embedding_service.generate_embeddings = deleting_embed
+
+    assert await pipeline.run(documents) == {}
+    assert "doc-1" not in pipeline.documents.docs
+    assert {chunk.document_id for chunk in pipeline.vector_db.chunks.values()} == {"doc-0"}
+    assert pipeline.documents.docs["doc-0"]["status"] == ProcessingStatus.COMPLETED
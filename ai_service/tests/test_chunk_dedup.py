@@ -0,0 +1,174 @@
+"""
+Tests for cross-document chunk deduplication
+"""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from app.database.vector_db import VectorDatabase
+from app.models.document import DocumentChunk
+from app.utils.minhash import MinHasher
+
+
+class InMemoryReferences:
+    """Dict-backed stand-in for ChunkReferenceStore"""
+
+    def __init__(self):
+        self.records = {}
+
+    async def add(self, references):
+        for ref in references:
+            self.records[ref["chunk_id"]] = dict(ref)
+        return len(references)
+
+    async def by_ids(self, chunk_ids):
+        return [dict(self.records[i]) for i in chunk_ids if i in self.records]
+
+    async def by_canonical(self, canonical_ids):
+        return [dict(r) for r in self.records.values() if r["canonical_id"] in canonical_ids]
+
+    async def by_document(self, document_id):
+        return [dict(r) for r in self.records.values() if r["document_id"] == document_id]
+
+    async def all(self):
+        return [dict(r) for r in self.records.values()]
+
+    async def update_metadata(self, updates):
+        for chunk_id, fields in updates.items():
+            self.records[chunk_id].update(fields)
+        return len(updates)
+
+    async def repoint(self, old_canonical_id, new_canonical_id):
+        moved = [r for r in self.records.values() if r["canonical_id"] == old_canonical_id]
+        for r in moved:
+            r["canonical_id"] = new_canonical_id
+        return len(moved)
+
+    async def delete(self, chunk_ids):
+        return sum(self.records.pop(i, None) is not None for i in chunk_ids)
+
+
+def make_vector_db(mode):
+    db = VectorDatabase.__new__(VectorDatabase)
+    db.user_id = "user-1"
+    db.collection = chromadb.EphemeralClient().create_collection(
+        f"test_{uuid.uuid4().hex}", metadata={"hnsw:space": "cosine"}
+    )
+    db.dedup_mode = mode
+    db.references = InMemoryReferences()
+    db.minhasher = MinHasher() if mode == "near" else None
+    return db
+
+
+def chunk(document_id, index, text):
+    return DocumentChunk(
+        chunk_id=f"{document_id}_{index}",
+        document_id=document_id,
+        tracking_id=f"track-{document_id}",
+        user_id="user-1",
+        text=text,
+        chunk_index=index,
+        metadata={"filename": f"{document_id}.pdf", "tags": ["cv"]},
+    )
+
+
+def vectors(*rows):
+    return np.asarray(rows, dtype=np.float32)
+
+
+SHARED = (
+    "Completed a bachelor's degree in computer science with a focus on distributed "
+    "systems, operating systems and compilers, graduating with first class honours "
+    "after a final year project on consensus protocols for replicated databases."
+)
+UNIQUE = "Volunteered as a mentor for first year students in an introductory programming course."
+
+
+@pytest.mark.asyncio
+async def test_exact_duplicate_is_stored_as_reference():
+    """Test an identical chunk in another document gets no vector but is still found"""
+    db = make_vector_db("exact")
+    await db.insert_chunks([chunk("a", 0, SHARED), chunk("a", 1, UNIQUE)], vectors([1, 0], [0, 1]))
+    await db.insert_chunks([chunk("b", 0, SHARED)], vectors([1, 0]))
+
+    assert db.collection.count() == 2
+    assert db.references.records["b_0"]["canonical_id"] == "a_0"
+
+    results = await db.search_by_vector(np.array([1, 0], dtype=np.float32), top_k=5)
+    hits = [(r.document_id, r.chunk_id) for r in results]
+    assert hits[:2] == [("a", "a_0"), ("b", "b_0")]
+    assert results[0].score == results[1].score
+    assert results[1].metadata["canonical_chunk_id"] == "a_0"
+
+    # Scoped to the referencing document, the shared chunk is still returned
+    scoped = await db.search_by_vector(np.array([1, 0], dtype=np.float32), top_k=5, document_id="b")
+    assert [r.chunk_id for r in scoped] == ["b_0"]
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_detected_by_minhash():
+    """Test a lightly edited chunk is deduplicated but an unrelated one is not"""
+    db = make_vector_db("near")
+    await db.insert_chunks([chunk("a", 0, SHARED)], vectors([1, 0]))
+
+    edited = SHARED.replace("replicated databases.", "replicated key-value stores.")
+    await db.insert_chunks([chunk("b", 0, edited), chunk("b", 1, UNIQUE)], vectors([1, 0], [0, 1]))
+
+    assert db.references.records["b_0"]["canonical_id"] == "a_0"
+    assert db.references.records["b_0"]["text"] == edited
+    assert "b_1" not in db.references.records
+    assert db.collection.count() == 2
+
+
+@pytest.mark.asyncio
+async def test_deleting_canonical_promotes_reference():
+    """Test deleting the owning document hands the vector to a referencing document"""
+    db = make_vector_db("exact")
+    await db.insert_chunks([chunk("a", 0, SHARED)], vectors([1, 0]))
+    await db.insert_chunks([chunk("b", 0, SHARED)], vectors([1, 0]))
+    await db.insert_chunks([chunk("c", 0, SHARED)], vectors([1, 0]))
+
+    assert await db.delete_document_chunks("a") == 1
+
+    assert db.collection.get()["ids"] == ["b_0"]
+    assert db.references.records["c_0"]["canonical_id"] == "b_0"
+    results = await db.search_by_vector(np.array([1, 0], dtype=np.float32), top_k=5)
+    assert [r.chunk_id for r in results] == ["b_0", "c_0"]
+
+    chunks = await db.get_document_chunks("c", include_embeddings=True)
+    assert chunks[0]["text"] == SHARED
+    assert np.allclose(chunks[0]["embedding"], [1, 0])
+
+
+@pytest.mark.asyncio
+async def test_selective_filters_still_fill_top_k():
+    """Test a tracking ID filter past the first over-fetch keeps fetching"""
+    db = make_vector_db("exact")
+    # Ten closer chunks from other documents outrank the three wanted ones
+    for i in range(10):
+        await db.insert_chunks([chunk(f"other{i}", 0, f"{UNIQUE} {i}")], vectors([1, 0.01 * i]))
+    for i in range(3):
+        await db.insert_chunks([chunk(f"want{i}", 0, f"{SHARED} {i}")], vectors([0.2, 1 + i]))
+    # A duplicate of another document's chunk matches only through its reference
+    await db.insert_chunks([chunk("want3", 0, f"{UNIQUE} 0")], vectors([1, 0]))
+
+    wanted = [f"track-want{i}" for i in range(4)]
+    results = await db.search_by_vector(np.array([1, 0], dtype=np.float32), top_k=4, tracking_ids=wanted)
+
+    assert [r.chunk_id for r in results] == ["want3_0", "want0_0", "want1_0", "want2_0"]
+    assert results[0].metadata["canonical_chunk_id"] == "other0_0"
+
+
+def test_minhash_similarity_tracks_overlap():
+    """Test signatures separate near-identical from unrelated text"""
+    hasher = MinHasher()
+    a = hasher.signature(SHARED)
+
+    assert MinHasher.similarity(a, hasher.signature(SHARED)) == 1.0
+    assert MinHasher.similarity(a, hasher.signature(SHARED + " Also fluent in French.")) > 0.8
+    assert MinHasher.similarity(a, hasher.signature(UNIQUE)) < 0.2
+    assert np.array_equal(MinHasher.decode(MinHasher.encode(a)), a)
+    assert len(hasher.band_keys(a)) == hasher.bands
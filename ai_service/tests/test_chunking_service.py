@@ -0,0 +1,150 @@
+"""
+Tests for the streaming, token-aware chunker
+"""
+
+import numpy as np
+import pytest
+
+from app.services.chunking_service import (
+    ChunkingService,
+    HuggingFaceTokenCounter,
+    RegexTokenCounter,
+)
+from app.services.embedding_service import EmbeddingService
+
+
+def make_document(paragraphs=12, sentences=6):
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa".split()
+    rng = np.random.default_rng(0)
+    return "\n\n".join(
+        " ".join(
+            " ".join(rng.choice(words, size=int(rng.integers(3, 9)))).capitalize() + "."
+            for _ in range(sentences)
+        )
+        for _ in range(paragraphs)
+    )
+
+
+class WordTokenizer:
+    """HuggingFace-style tokenizer where every word is one token"""
+
+    model_max_length = 32
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        import re
+        if isinstance(text, list):
+            return {"input_ids": [self(t)["input_ids"] for t in text]}
+        spans = [m.span() for m in re.finditer(r"\S+", text)]
+        encoded = {"input_ids": list(range(len(spans)))}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = spans
+        return encoded
+
+
+class TestChunkingService:
+    """Test chunk sizing, boundaries, overlap and streaming"""
+
+    def test_chunks_respect_token_limit_and_cover_text(self):
+        """Test no chunk exceeds the limit and every sentence is kept"""
+        text = make_document()
+        chunker = ChunkingService(chunk_size=40, chunk_overlap=16, token_counter=RegexTokenCounter())
+
+        chunks = list(chunker.iter_chunks(text))
+
+        assert len(chunks) > 1
+        assert [c.index for c in chunks] == list(range(len(chunks)))
+        assert all(c.token_count <= 40 for c in chunks)
+        joined = " ".join(c.text for c in chunks)
+        for sentence in text.replace("\n\n", " ").split(". "):
+            assert sentence.strip(".") in joined
+        # Consecutive chunks share trailing/leading context
+        assert chunks[1].start_char < chunks[0].end_char
+
+    def test_paragraph_mode_keeps_paragraphs_whole(self):
+        """Test paragraphs that fit are never split"""
+        text = "First short paragraph.\n\nSecond one here.\n\n\nThird and last."
+        chunker = ChunkingService(chunk_size=10, chunk_overlap=0, mode="paragraph", token_counter=RegexTokenCounter())
+
+        chunks = [c.text for c in chunker.iter_chunks(text)]
+
+        assert chunks == ["First short paragraph.\n\nSecond one here.", "Third and last."]
+
+    def test_overlong_sentence_is_split_at_token_boundaries(self):
+        """Test a sentence longer than the window is cut without losing text"""
+        text = "word " * 99 + "end"
+        counter = HuggingFaceTokenCounter(WordTokenizer())
+        chunker = ChunkingService(chunk_size=64, chunk_overlap=0, token_counter=counter)
+
+        chunks = list(chunker.iter_chunks(text))
+
+        # The tokenizer window (32 - 2 special tokens) caps the chunk size
+        assert chunker.max_tokens == 30
+        assert [c.token_count for c in chunks] == [30, 30, 30, 10]
+        assert " ".join(c.text for c in chunks) == text
+
+    def test_streams_segments_lazily(self):
+        """Test chunks are yielded before the whole source is consumed"""
+        consumed = []
+
+        def pages():
+            # Long pages without any paragraph break
+            for i in range(50):
+                consumed.append(i)
+                yield f"Page {i} has a sentence about {i}. " * 100
+
+        chunker = ChunkingService(chunk_size=20, chunk_overlap=0, token_counter=RegexTokenCounter())
+        first = next(chunker.iter_chunks(pages()))
+
+        assert first.text.startswith("Page 0 has")
+        assert len(consumed) < 50
+
+    def test_segments_join_across_boundaries(self):
+        """Test a sentence split across segments is reassembled"""
+        chunker = ChunkingService(chunk_size=50, chunk_overlap=0, token_counter=RegexTokenCounter())
+
+        chunks = list(chunker.iter_chunks(["Ends mid", " sentence. Next\n", "\nparagraph."]))
+
+        assert [c.text for c in chunks] == ["Ends mid sentence. Next\n\nparagraph."]
+
+    def test_chunk_text_returns_plain_chunk_dicts(self):
+        """Test the list API keeps its dictionary shape without per-chunk metadata copies"""
+        chunker = ChunkingService(chunk_size=50, token_counter=RegexTokenCounter())
+
+        chunks = chunker.chunk_text("One sentence. Two sentences.")
+
+        assert chunks[0]["text"] == "One sentence. Two sentences."
+        assert set(chunks[0]) == {
+            "text", "chunk_index", "start_index", "end_index",
+            "char_count", "word_count", "token_count", "content_hash",
+        }
+
+
+class FakeEmbeddingService(EmbeddingService):
+    """Embeds each text as [len(text)] and records batch sizes"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def generate_embeddings(self, texts, provider="huggingface", model=None):
+        self.batches.append(len(texts))
+        return np.array([[len(t)] for t in texts], dtype=np.float32), 1
+
+
+@pytest.mark.asyncio
+async def test_embed_chunk_stream_batches_chunks():
+    """Test a chunk generator feeds embedding in fixed-size batches"""
+    service = FakeEmbeddingService()
+    chunker = ChunkingService(chunk_size=20, chunk_overlap=0, token_counter=RegexTokenCounter())
+    chunks = chunker.iter_chunks(make_document(paragraphs=4))
+
+    seen = []
+    async for batch, embeddings in service.embed_chunk_stream(chunks, batch_size=3):
+        assert embeddings.shape == (len(batch), 1)
+        assert embeddings[:, 0].tolist() == [len(c.text) for c in batch]
+        seen.extend(c.index for c in batch)
+
+    assert seen == list(range(len(seen)))
+    assert all(size == 3 for size in service.batches[:-1])
@@ -0,0 +1,99 @@
+"""
+Tests for extracting document text from in-memory and spooled streams
+"""
+
+import io
+
+import pytest
+from bson import ObjectId
+from docx import Document
+
+from app.services.document_processor import DocumentProcessor
+from app.services.gridfs_tempfile import gridfs_to_spooled
+
+
+class FakeDownloadStream:
+    def __init__(self, data):
+        self.buffer = io.BytesIO(data)
+        self.reads = 0
+        self.closed = False
+
+    async def read(self, size=-1):
+        self.reads += 1
+        return self.buffer.read(size)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBucket:
+    """Stand-in for AsyncIOMotorGridFSBucket holding one file"""
+
+    def __init__(self, data):
+        self.data = data
+        self.streams = []
+
+    async def open_download_stream(self, file_id):
+        stream = FakeDownloadStream(self.data)
+        self.streams.append(stream)
+        return stream
+
+
+def docx_bytes(*paragraphs):
+    doc = Document()
+    for paragraph in paragraphs:
+        doc.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_process_document_reads_streams():
+    """Test TXT and DOCX are extracted from BytesIO without a file on disk"""
+    processor = DocumentProcessor()
+
+    text, file_type = await processor.process_document(
+        io.BytesIO("Statement of purpose\n".encode()), filename="sop.txt"
+    )
+    assert (text, file_type) == ("Statement of purpose", "txt")
+
+    data = docx_bytes("Research experience", "Teaching experience")
+    text, file_type = await processor.process_document(io.BytesIO(data), filename="cv.DOCX")
+    assert file_type == "docx"
+    assert text.splitlines() == ["Research experience", "Teaching experience"]
+
+    with pytest.raises(ValueError):
+        await processor.process_document(io.BytesIO(data))
+
+
+@pytest.mark.asyncio
+async def test_small_gridfs_file_stays_in_memory():
+    """Test a file below the threshold is never written to disk"""
+    data = docx_bytes("Publications")
+    bucket = FakeBucket(data)
+
+    spooled = await gridfs_to_spooled(str(ObjectId()), max_memory_bytes=len(data) + 1, bucket=bucket)
+    try:
+        assert not spooled._rolled
+        assert bucket.streams[0].closed
+        text, _ = await DocumentProcessor().process_document(spooled, filename="cv.docx")
+        assert text == "Publications"
+    finally:
+        spooled.close()
+
+
+@pytest.mark.asyncio
+async def test_large_gridfs_file_spills_to_disk_in_chunks():
+    """Test a file above the threshold is copied chunk by chunk into a temp file"""
+    data = b"x" * (600 * 1024)
+    bucket = FakeBucket(data)
+
+    spooled = await gridfs_to_spooled(str(ObjectId()), max_memory_bytes=64 * 1024, bucket=bucket)
+    try:
+        assert spooled._rolled
+        assert bucket.streams[0].reads > 2
+        assert spooled.tell() == 0
+        assert spooled.read() == data
+    finally:
+        spooled.close()
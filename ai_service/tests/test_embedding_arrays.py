@@ -0,0 +1,123 @@
+"""
+Tests for the float32 ndarray embedding path
+"""
+
+import numpy as np
+import pytest
+
+from app.database.vector_db import VectorDatabase
+from app.models.document import DocumentChunk
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_executor import EmbeddingExecutor
+from app.services.embedding_model_registry import EmbeddingModelRegistry
+from app.services.embedding_service import EmbeddingService
+from app.services.vector_quantization import VectorCodec
+
+
+class FakeModel:
+    """Fake SentenceTransformer returning a float32 matrix"""
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+        return np.array([[float(len(text)), 1.0, 0.0] for text in texts], dtype=np.float32)
+
+
+class RecordingCollection:
+    """Fake Chroma collection that keeps what it was given"""
+
+    def __init__(self):
+        self.added = None
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.added = {"ids": ids, "embeddings": embeddings, "documents": documents}
+
+
+def make_service(tmp_path, cached: bool) -> EmbeddingService:
+    registry = EmbeddingModelRegistry()
+    registry.get_or_load("huggingface", "fake", lambda: FakeModel())
+    cache = EmbeddingCache(max_items=100, disk_path=str(tmp_path / "e.sqlite3"), disk_enabled=False)
+    service = EmbeddingService(
+        registry=registry,
+        cache=cache,
+        executor=EmbeddingExecutor(mode="thread", max_workers=1, max_pending=4, queue_timeout=1),
+    )
+    if not cached:
+        service.cache = None
+    return service
+
+
+def make_chunk(idx: int) -> DocumentChunk:
+    return DocumentChunk(
+        chunk_id=f"doc_chunk_{idx}",
+        document_id="doc",
+        tracking_id="track",
+        user_id="user",
+        text=f"text {idx}",
+        chunk_index=idx,
+        total_chunks=3,
+        metadata={"tags": ["a"]},
+    )
+
+
+class TestEmbeddingArrays:
+    """Test embeddings stay float32 arrays from encoder to storage"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cached", [False, True])
+    async def test_generate_embeddings_returns_float32_matrix(self, tmp_path, cached):
+        """Test batch results are a 2-D float32 array with or without the cache"""
+        service = make_service(tmp_path, cached)
+
+        embeddings, dimensions = await service.generate_embeddings(["a", "bb"], model="fake")
+        again, _ = await service.generate_embeddings(["bb", "a"], model="fake")
+
+        assert isinstance(embeddings, np.ndarray)
+        assert embeddings.dtype == np.float32
+        assert embeddings.shape == (2, 3) and dimensions == 3
+        assert again.tolist() == [[2.0, 1.0, 0.0], [1.0, 1.0, 0.0]]
+
+    @pytest.mark.asyncio
+    async def test_query_embedding_is_a_vector(self, tmp_path):
+        """Test single-query embeddings are 1-D float32 arrays"""
+        service = make_service(tmp_path, cached=False)
+
+        vector = await service.generate_query_embedding("abc", model="fake")
+
+        assert vector.dtype == np.float32
+        assert vector.shape == (3,)
+
+    @pytest.mark.asyncio
+    async def test_insert_chunks_passes_matrix_through(self):
+        """Test insert_chunks hands the array to Chroma without list copies"""
+        db = VectorDatabase.__new__(VectorDatabase)
+        db.user_id = "user"
+        db.collection = RecordingCollection()
+        embeddings = np.arange(9, dtype=np.float32).reshape(3, 3)
+
+        count = await db.insert_chunks([make_chunk(i) for i in range(3)], embeddings=embeddings)
+
+        assert count == 3
+        assert db.collection.added["embeddings"] is embeddings
+
+    @pytest.mark.asyncio
+    async def test_insert_chunks_rejects_mismatched_embeddings(self):
+        """Test a row count that does not match the chunks is rejected"""
+        db = VectorDatabase.__new__(VectorDatabase)
+        db.user_id = "user"
+        db.collection = RecordingCollection()
+
+        with pytest.raises(ValueError):
+            await db.insert_chunks([make_chunk(0)], embeddings=np.zeros((2, 3), dtype=np.float32))
+
+    def test_faculty_vectors_are_stored_as_bytes(self):
+        """Test faculty vectors are stored as float32 bytes and scored in bulk"""
+        codec = VectorCodec(precision="float32", keep_full=False, rerank_candidates=0)
+        docs = [
+            codec.encode(np.array([1.0, 0.0], dtype=np.float32)),
+            {"embedding": [0.0, 1.0]},
+            {"embedding": [0.0, 0.0]},
+        ]
+
+        scores = codec.score(np.array([1.0, 1.0], dtype=np.float32), docs)
+
+        assert isinstance(docs[0]["embedding"], bytes)
+        assert np.allclose(scores, [np.sqrt(0.5), np.sqrt(0.5), 0.0])
@@ -0,0 +1,136 @@
+"""
+Tests for query embedding micro-batching
+"""
+
+import asyncio
+import pytest
+
+from app.services.embedding_batcher import QueryEmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import EmbeddingService
+
+
+class RecordingEncoder:
+    """Fake batch encoder that records every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, texts, provider, model=None):
+        self.calls.append(list(texts))
+        return [[float(len(text))] for text in texts], 1
+
+
+class TestQueryEmbeddingBatcher:
+    """Test batching window, size limit and result routing"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_share_one_call(self):
+        """Test concurrent queries inside the window are encoded together"""
+        batcher = QueryEmbeddingBatcher(window_ms=20, max_batch_size=100)
+        encoder = RecordingEncoder()
+        queries = ["a", "bb", "ccc", "dddd"]
+
+        results = await asyncio.gather(
+            *[batcher.submit(query, "huggingface", None, encoder) for query in queries]
+        )
+
+        assert encoder.calls == [queries]
+        assert results == [[1.0], [2.0], [3.0], [4.0]]
+        stats = batcher.stats()
+        assert stats["batches"] == 1
+        assert stats["avg_batch_size"] == 4
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_flushes_early(self):
+        """Test a full batch is flushed without waiting for the window"""
+        batcher = QueryEmbeddingBatcher(window_ms=10_000, max_batch_size=2)
+        encoder = RecordingEncoder()
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*[batcher.submit(q, "huggingface", None, encoder) for q in ["a", "b", "c", "d"]]),
+            timeout=1,
+        )
+
+        assert encoder.calls == [["a", "b"], ["c", "d"]]
+        assert len(results) == 4
+
+    @pytest.mark.asyncio
+    async def test_models_are_batched_separately(self):
+        """Test requests for different models never share a batch"""
+        batcher = QueryEmbeddingBatcher(window_ms=10, max_batch_size=100)
+        encoder = RecordingEncoder()
+
+        await asyncio.gather(
+            batcher.submit("a", "huggingface", "m1", encoder),
+            batcher.submit("b", "huggingface", "m2", encoder),
+        )
+
+        assert sorted(encoder.calls) == [["a"], ["b"]]
+
+    @pytest.mark.asyncio
+    async def test_encoders_are_batched_separately(self):
+        """Test requests from different encoders never share a batch, even for the same model"""
+        batcher = QueryEmbeddingBatcher(window_ms=10, max_batch_size=100)
+        first, second = RecordingEncoder(), RecordingEncoder()
+
+        await asyncio.gather(
+            batcher.submit("a", "huggingface", None, first),
+            batcher.submit("b", "huggingface", None, second),
+            batcher.submit("c", "huggingface", None, first),
+        )
+
+        assert first.calls == [["a", "c"]]
+        assert second.calls == [["b"]]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test an encoder failure is raised to all batched callers"""
+        batcher = QueryEmbeddingBatcher(window_ms=10, max_batch_size=100)
+
+        async def failing(texts, provider, model=None):
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            batcher.submit("a", "huggingface", None, failing),
+            batcher.submit("b", "huggingface", None, failing),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_embedding_service_routes_through_batcher(self, monkeypatch):
+        """Test generate_query_embedding uses the batcher when configured"""
+        batcher = QueryEmbeddingBatcher(window_ms=10, max_batch_size=100)
+        service = EmbeddingService(batcher=batcher)
+        encoder = RecordingEncoder()
+        monkeypatch.setattr(service, "generate_embeddings", encoder)
+
+        results = await asyncio.gather(
+            service.generate_query_embedding("x"),
+            service.generate_query_embedding("yy"),
+        )
+
+        assert encoder.calls == [["x", "yy"]]
+        assert results == [[1.0], [2.0]]
+        assert batcher.stats()["latency_p95_ms"] > 0
+
+    @pytest.mark.asyncio
+    async def test_per_request_services_share_batches(self, monkeypatch):
+        """Test queries from separate service instances over the same models share one call"""
+        batcher = QueryEmbeddingBatcher(window_ms=20, max_batch_size=100)
+        cache = EmbeddingCache(disk_enabled=False)
+        encoder = RecordingEncoder()
+        monkeypatch.setattr(EmbeddingService, "_generate_provider_embeddings", lambda self, *args: encoder(*args))
+
+        # One service per request, as the API routes do; a service with other
+        # state (here its own cache) is batched on its own
+        other = EmbeddingService(batcher=batcher, cache=EmbeddingCache(disk_enabled=False))
+        results = await asyncio.gather(
+            *[EmbeddingService(batcher=batcher, cache=cache).generate_query_embedding(f"q{i}") for i in range(5)],
+            other.generate_query_embedding("z"),
+        )
+
+        assert sorted(encoder.calls) == [["q0", "q1", "q2", "q3", "q4"], ["z"]]
+        assert [list(result) for result in results] == [[2.0]] * 5 + [[1.0]]
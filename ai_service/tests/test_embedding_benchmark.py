@@ -0,0 +1,52 @@
+"""
+Tests for the embedding benchmark harness
+"""
+
+import json
+
+from benchmarks.embedding_benchmark import compare_with_baseline, main
+
+
+class TestEmbeddingBenchmark:
+    """Test the sweep runs end to end and reports the expected metrics"""
+
+    def test_sweep_reports_every_case(self, tmp_path):
+        """Test every target x batch x length x concurrency case is reported"""
+        output = tmp_path / "report.json"
+
+        main([
+            "--targets", "embedding_service", "ollama_mock", "ollama_server", "gemini_fake",
+            "--fake-model",
+            "--batch-sizes", "1", "4",
+            "--text-lengths", "8",
+            "--concurrency", "1", "2",
+            "--requests", "3",
+            "--warmup", "0",
+            "--dimension", "16",
+            "--server-latency-ms", "0",
+            "--quiet",
+            "--output", str(output),
+        ])
+        report = json.loads(output.read_text())
+
+        assert len(report["results"]) == 4 * 2 * 2
+        for row in report["results"]:
+            assert row["errors"] == 0
+            assert row["requests"] == 3
+            assert row["texts"] == 3 * row["batch_size"]
+            assert row["texts_per_sec"] > 0
+            assert row["latency_p95_ms"] >= row["latency_p50_ms"] > 0
+            assert row["peak_rss_mb"] > 0
+
+    def test_baseline_comparison(self):
+        """Test before/after deltas are attached to matching cases"""
+        row = {"target": "t", "batch_size": 1, "text_length_words": 8, "concurrency": 1,
+               "texts_per_sec": 150.0, "latency_p50_ms": 1.0, "latency_p95_ms": 2.0, "peak_rss_mb": 10.0}
+        baseline = {"results": [dict(row, texts_per_sec=100.0, latency_p95_ms=4.0)]}
+        report = {"results": [row]}
+
+        compare_with_baseline(report, baseline)
+
+        assert row["texts_per_sec_change_pct"] == 50.0
+        assert row["latency_p95_change_pct"] == -50.0
+        assert row["baseline"]["texts_per_sec"] == 100.0
@@ -0,0 +1,135 @@
+"""
+Tests for the content-addressed embedding cache
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import EmbeddingService
+
+
+def make_cache(tmp_path, max_items: int = 100, disk_enabled: bool = True) -> EmbeddingCache:
+    return EmbeddingCache(
+        max_items=max_items,
+        disk_path=str(tmp_path / "embeddings.sqlite3"),
+        disk_enabled=disk_enabled,
+    )
+
+
+class TestEmbeddingCache:
+    """Test cache tiers and accounting"""
+
+    def test_key_depends_on_provider_model_and_text(self):
+        """Test content address covers provider, model and text"""
+        base = EmbeddingCache.make_key("huggingface", "mini", "hello")
+
+        assert base == EmbeddingCache.make_key("huggingface", "mini", "hello")
+        assert base != EmbeddingCache.make_key("cohere", "mini", "hello")
+        assert base != EmbeddingCache.make_key("huggingface", "large", "hello")
+        assert base != EmbeddingCache.make_key("huggingface", "mini", "hello!")
+
+    def test_memory_lru_evicts_oldest(self, tmp_path):
+        """Test the in-memory tier is bounded"""
+        cache = make_cache(tmp_path, max_items=2, disk_enabled=False)
+        cache.put_many(["a", "b"], [[1.0], [2.0]])
+        cache.get_many(["a"])  # touch "a" so "b" becomes the oldest
+        cache.put_many(["c"], [[3.0]])
+
+        results = cache.get_many(["a", "b", "c"])
+
+        assert results[0] is not None
+        assert results[1] is None
+        assert results[2] is not None
+        assert cache.stats()["memory_items"] == 2
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test vectors persist across cache instances"""
+        cache = make_cache(tmp_path)
+        cache.put_many(["k"], [[0.5, 0.25]])
+        cache.close()
+
+        reopened = make_cache(tmp_path)
+        (vector,) = reopened.get_many(["k"])
+
+        assert np.allclose(vector, [0.5, 0.25])
+        stats = reopened.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["disk_bytes"] == 8
+
+    def test_stats_report_hit_ratio(self, tmp_path):
+        """Test hit ratio and byte accounting"""
+        cache = make_cache(tmp_path, disk_enabled=False)
+        cache.put_many(["a"], [[1.0, 2.0, 3.0]])
+        cache.get_many(["a", "missing"])
+
+        stats = cache.stats()
+        assert stats["hit_ratio"] == 0.5
+        assert stats["memory_bytes"] == 12
+
+    @pytest.mark.asyncio
+    async def test_async_disk_tier_runs_off_the_event_loop(self, tmp_path, monkeypatch):
+        """Test SQLite reads and writes run in a worker thread and memory hits do not"""
+        cache = make_cache(tmp_path)
+        offloaded = []
+        to_thread = asyncio.to_thread
+
+        async def recording_to_thread(func, *args):
+            offloaded.append(func.__name__)
+            return await to_thread(func, *args)
+
+        monkeypatch.setattr(asyncio, "to_thread", recording_to_thread)
+
+        await cache.aput_many(["k"], [[0.5, 0.25]])
+        cache._memory.clear()
+        (from_disk,) = await cache.aget_many(["k"])
+        (from_memory,) = await cache.aget_many(["k"])
+
+        assert offloaded == ["_store_disk", "_lookup_disk"]
+        assert np.allclose(from_disk, [0.5, 0.25]) and np.allclose(from_memory, [0.5, 0.25])
+        stats = cache.stats()
+        assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+    def test_memory_hits_do_not_wait_for_disk_writes(self, tmp_path):
+        """Test the LRU stays readable while the SQLite tier is busy"""
+        cache = make_cache(tmp_path)
+        cache.put_many(["k"], [[1.0]])
+        results = []
+
+        with cache._disk_lock:  # A slow disk write in progress
+            reader = threading.Thread(target=lambda: results.extend(cache.get_many(["k"])))
+            reader.start()
+            reader.join(timeout=1)
+            finished = not reader.is_alive()
+
+        reader.join()
+        assert finished and np.allclose(results[0], [1.0])
+
+
+class TestEmbeddingServiceCaching:
+    """Test EmbeddingService only encodes cache misses"""
+
+    @pytest.mark.asyncio
+    async def test_batch_encodes_only_misses_in_order(self, tmp_path, monkeypatch):
+        """Test misses are encoded once and merged back in input order"""
+        service = EmbeddingService(cache=make_cache(tmp_path))
+        encoded = []
+
+        async def fake_provider(texts, provider, model=None):
+            encoded.append(list(texts))
+            return [[float(len(text)), 1.0] for text in texts], 2
+
+        monkeypatch.setattr(service, "_generate_provider_embeddings", fake_provider)
+
+        first, _ = await service.generate_embeddings(["aa", "bbb"], model="mini")
+        second, dimensions = await service.generate_embeddings(
+            ["bbb", "c", "aa", "c"], model="mini"
+        )
+
+        assert encoded == [["aa", "bbb"], ["c"]]
+        assert first.tolist() == [[2.0, 1.0], [3.0, 1.0]]
+        assert second.tolist() == [[3.0, 1.0], [1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+        assert dimensions == 2
@@ -0,0 +1,98 @@
+"""
+Tests for the bounded embedding executor
+"""
+
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+
+from app.services.embedding_executor import EmbeddingBackpressureError, EmbeddingExecutor
+from app.services.embedding_model_registry import EmbeddingModelRegistry
+
+
+class SlowModel:
+    """Fake SentenceTransformer whose encode blocks its thread"""
+
+    def __init__(self, delay: float = 0.2, release: threading.Event = None):
+        self.delay = delay
+        self.release = release
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True):
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        else:
+            time.sleep(self.delay)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def make_registry(model) -> EmbeddingModelRegistry:
+    registry = EmbeddingModelRegistry()
+    registry.get_or_load("huggingface", "slow", lambda: model)
+    return registry
+
+
+class TestEmbeddingExecutor:
+    """Test off-loop encoding and backpressure"""
+
+    @pytest.mark.asyncio
+    async def test_encode_does_not_block_event_loop(self):
+        """Test the loop keeps ticking while encode runs"""
+        executor = EmbeddingExecutor(mode="thread", max_workers=1, max_pending=2, queue_timeout=1)
+        registry = make_registry(SlowModel(delay=0.2))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        embeddings = await executor.encode("slow", ["a", "b"], registry=registry)
+        task.cancel()
+        executor.shutdown()
+
+        assert embeddings.shape == (2, 4)
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_immediately(self):
+        """Test queue_timeout=0 turns a full queue into backpressure errors"""
+        release = threading.Event()
+        executor = EmbeddingExecutor(mode="thread", max_workers=1, max_pending=1, queue_timeout=0)
+        registry = make_registry(SlowModel(release=release))
+
+        first = asyncio.create_task(executor.encode("slow", ["a"], registry=registry))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(EmbeddingBackpressureError):
+            await executor.encode("slow", ["b"], registry=registry)
+
+        release.set()
+        await first
+        executor.shutdown()
+
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["submitted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_waiters_get_slot_within_timeout(self):
+        """Test callers wait for a free slot instead of failing"""
+        executor = EmbeddingExecutor(mode="thread", max_workers=1, max_pending=1, queue_timeout=2)
+        registry = make_registry(SlowModel(delay=0.05))
+
+        results = await asyncio.gather(
+            *[executor.encode("slow", [str(i)], registry=registry) for i in range(3)]
+        )
+        executor.shutdown()
+
+        assert len(results) == 3
+        assert executor.stats()["rejected"] == 0
+
+    def test_rejects_unknown_mode(self):
+        """Test invalid executor modes are refused"""
+        with pytest.raises(ValueError):
+            EmbeddingExecutor(mode="gpu")
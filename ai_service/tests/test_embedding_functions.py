@@ -0,0 +1,103 @@
+"""
+Tests for the batched Gemini embedding function against a local fake endpoint
+"""
+
+import numpy as np
+import pytest
+
+from app.services.embedding_functions import GeminiEmbeddingFunction, GeminiRequestError, _ollama_client
+from benchmarks.fake_servers import FakeGeminiServer
+
+
+@pytest.fixture
+def fake_gemini():
+    fake = FakeGeminiServer(dimension=3, request_latency_ms=1, per_text_latency_ms=0, api_key="test-key")
+    fake.rejected_texts = {"poison"}
+    fake.empty_texts = {"empty"}
+    yield fake.start()
+    fake.stop()
+
+
+def as_lists(embeddings):
+    """Chroma normalizes embedding function output to numpy arrays"""
+    return [np.asarray(embedding, dtype=float).tolist() for embedding in embeddings]
+
+
+def make_function(fake, **kwargs) -> GeminiEmbeddingFunction:
+    options = {"api_key": "test-key", "base_url": fake.base_url, "backoff_base": 0.01}
+    options.update(kwargs)
+    return GeminiEmbeddingFunction(**options)
+
+
+class TestGeminiEmbeddingFunction:
+    """Test batching, concurrency, retries and per-item fallback"""
+
+    def test_texts_are_sent_in_batches_in_order(self, fake_gemini):
+        """Test one request per batch and order-preserving results"""
+        texts = [f"text {'x' * i}" for i in range(25)]
+        function = make_function(fake_gemini, batch_size=10, max_concurrency=3)
+
+        embeddings = as_lists(function(texts))
+        function.close()
+
+        assert sorted(fake_gemini.batch_sizes) == [5, 10, 10]
+        assert np.allclose(embeddings, [fake_gemini.vector_for(text) for text in texts])
+        assert fake_gemini.single_calls == 0
+
+    def test_parallelism_is_bounded(self, fake_gemini):
+        """Test no more than max_concurrency requests run at once"""
+        function = make_function(fake_gemini, batch_size=1, max_concurrency=2)
+
+        function([f"t{i}" for i in range(12)])
+        function.close()
+
+        assert 1 <= fake_gemini.max_in_flight <= 2
+
+    def test_rate_limits_are_retried(self, fake_gemini):
+        """Test 429 responses are retried instead of falling back"""
+        fake_gemini.rate_limit_remaining = 2
+        function = make_function(fake_gemini, max_retries=3)
+
+        embeddings = as_lists(function(["hello", "world!"]))
+
+        assert np.allclose(embeddings, [fake_gemini.vector_for("hello"), fake_gemini.vector_for("world!")])
+        assert fake_gemini.batch_sizes == [2]
+
+    def test_missing_item_falls_back_alone(self, fake_gemini):
+        """Test a missing vector only replaces that item with the fallback"""
+        function = make_function(fake_gemini)
+
+        embeddings = as_lists(function(["good", "empty", "fine"]))
+
+        assert np.allclose(embeddings[0], fake_gemini.vector_for("good"))
+        assert np.allclose(embeddings[1], _ollama_client.embed_text("empty"))
+        assert np.allclose(embeddings[2], fake_gemini.vector_for("fine"))
+
+    def test_failed_batch_is_retried_per_item(self, fake_gemini):
+        """Test a rejected batch degrades to per-item requests"""
+        function = make_function(fake_gemini, max_retries=0)
+
+        embeddings = as_lists(function(["alpha", "poison", "gamma"]))
+
+        assert fake_gemini.single_calls == 3
+        assert np.allclose(embeddings[0], fake_gemini.vector_for("alpha"))
+        assert np.allclose(embeddings[1], _ollama_client.embed_text("poison"))
+        assert np.allclose(embeddings[2], fake_gemini.vector_for("gamma"))
+
+    def test_persistent_rate_limit_fails_without_fanning_out(self, fake_gemini):
+        """Test a batch still rate limited after its retries is not split into single requests"""
+        fake_gemini.rate_limit_remaining = 100
+        function = make_function(fake_gemini, max_retries=1)
+
+        with pytest.raises(GeminiRequestError) as error:
+            function(["alpha", "beta", "gamma"])
+
+        assert error.value.status_code == 429
+        assert fake_gemini.rate_limit_remaining == 98
+        assert fake_gemini.single_calls == 0
+
+    def test_without_api_key_uses_mock(self):
+        """Test the mock path is used when no key is configured"""
+        function = GeminiEmbeddingFunction(api_key="")
+
+        assert np.allclose(as_lists(function(["abc"])), [_ollama_client.embed_text("abc")])
@@ -0,0 +1,87 @@
+"""
+Tests for the process-wide embedding model registry
+"""
+
+import threading
+
+from app.services.embedding_model_registry import EmbeddingModelRegistry
+from app.services.embedding_service import EmbeddingService
+
+
+class FakeModel:
+    """Stand-in for a loaded SentenceTransformer"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class TestEmbeddingModelRegistry:
+    """Test model loading, sharing and counters"""
+
+    def test_loads_once_and_counts_hits(self):
+        """Test a model is loaded once and later lookups are hits"""
+        registry = EmbeddingModelRegistry()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return FakeModel("mini")
+
+        first = registry.get_or_load("huggingface", "mini", loader)
+        second = registry.get_or_load("huggingface", "mini", loader)
+
+        assert first is second
+        assert len(calls) == 1
+
+        stats = registry.stats()
+        assert stats["loaded_models"] == 1
+        assert stats["total_loads"] == 1
+        assert stats["total_hits"] == 1
+        assert stats["models"]["huggingface/mini"]["hits"] == 1
+
+    def test_keys_are_provider_and_model(self):
+        """Test different provider/model pairs get separate entries"""
+        registry = EmbeddingModelRegistry()
+
+        a = registry.get_or_load("huggingface", "a", lambda: FakeModel("a"))
+        b = registry.get_or_load("huggingface", "b", lambda: FakeModel("b"))
+        c = registry.get_or_load("cohere", "a", lambda: FakeModel("c"))
+
+        assert len({id(a), id(b), id(c)}) == 3
+        assert registry.stats()["loaded_models"] == 3
+
+    def test_concurrent_loads_are_deduplicated(self):
+        """Test concurrent first requests trigger a single load"""
+        registry = EmbeddingModelRegistry()
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def loader():
+            calls.append(1)
+            return FakeModel("mini")
+
+        def worker():
+            barrier.wait()
+            results.append(registry.get_or_load("huggingface", "mini", loader))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert registry.stats()["total_hits"] == 7
+
+    def test_services_share_registry_models(self):
+        """Test separate EmbeddingService instances resolve the same model"""
+        registry = EmbeddingModelRegistry()
+        registry.get_or_load("huggingface", "mini", lambda: FakeModel("mini"))
+
+        first = EmbeddingService(registry=registry)
+        second = EmbeddingService(registry=registry)
+
+        assert first.registry.get_sentence_transformer("mini") is second.registry.get_sentence_transformer("mini")
+        assert registry.stats()["total_loads"] == 1
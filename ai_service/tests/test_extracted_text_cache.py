@@ -0,0 +1,79 @@
+"""
+Tests for reusing extracted document text by file hash
+"""
+
+import pytest
+
+from app.services import document_text_service
+from app.services.document_text_service import TextRecorder, load_document_text_for_user
+
+
+async def aiter(items):
+    for item in items:
+        yield item
+
+
+class FakeStore:
+    """In-memory stand-in for ExtractedTextStore"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.texts = {}
+        self.lookups = 0
+
+    async def get_for_document(self, user_id, document_id):
+        self.lookups += 1
+        doc = next((dict(d) for d in self.documents
+                    if d["document_id"] == document_id and d["user_id"] == user_id), None)
+        if doc:
+            doc["extracted"] = self.texts.get(doc["file_hash"])
+        return doc
+
+    async def put(self, file_hash, text, file_type=None, page_offsets=None):
+        self.texts[file_hash] = {
+            "file_hash": file_hash, "text": text, "file_type": file_type, "page_offsets": page_offsets,
+        }
+
+
+@pytest.mark.asyncio
+async def test_recorder_tracks_page_offsets_in_stripped_text():
+    """Test offsets point at each page's start after the text is stripped"""
+    recorder = TextRecorder()
+    pages = ["\n  First page\n\n", "Second page\n\n", "Third\n\n"]
+
+    assert [page async for page in recorder.record(aiter(pages))] == pages
+    assert recorder.text == "First page\n\nSecond page\n\nThird"
+    for offset, start in zip(recorder.page_offsets, ["First", "Second", "Third"]):
+        assert recorder.text[offset:].startswith(start)
+
+
+@pytest.mark.asyncio
+async def test_text_is_extracted_once_per_file_hash(tmp_path, monkeypatch):
+    """Test a miss parses and caches the file; later loads (any document with the hash) do not"""
+    path = tmp_path / "sop.txt"
+    path.write_text("Statement of purpose for a PhD in robotics\n")
+    store = FakeStore([
+        {"document_id": "doc-1", "user_id": "user-1", "file_hash": "h1",
+         "file_path": str(path), "filename": "sop.txt", "file_type": "txt"},
+        {"document_id": "doc-2", "user_id": "user-1", "file_hash": "h1",
+         "file_path": str(path), "filename": "copy.txt", "file_type": "txt"},
+    ])
+    parsed = []
+    original = document_text_service.DocumentProcessor.process_document
+
+    async def counting_process_document(self, source, filename=None):
+        parsed.append(filename)
+        return await original(self, source, filename)
+
+    monkeypatch.setattr(document_text_service.DocumentProcessor, "process_document", counting_process_document)
+
+    first = await load_document_text_for_user(user_id="user-1", document_id="doc-1", store=store)
+    second = await load_document_text_for_user(user_id="user-1", document_id="doc-2", store=store)
+
+    assert first["text"] == second["text"] == "Statement of purpose for a PhD in robotics"
+    assert store.texts["h1"]["file_type"] == "txt"
+    assert parsed == ["sop.txt"]
+    assert store.lookups == 2
+
+    with pytest.raises(ValueError):
+        await load_document_text_for_user(user_id="user-2", document_id="doc-1", store=store)
@@ -0,0 +1,128 @@
+"""
+Tests for hybrid search: one query embedding, concurrent legs, rank fusion
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.search import FusionMethod, SearchMode, SearchRequest, SearchResult
+from app.services.search_service import SearchService
+
+
+def result(chunk_id, score):
+    return SearchResult(
+        chunk_id=chunk_id,
+        document_id=f"doc-{chunk_id}",
+        tracking_id=f"track-{chunk_id}",
+        text=f"text {chunk_id}",
+        score=score,
+        chunk_index=0,
+        filename=f"{chunk_id}.pdf",
+    )
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_query_embedding(self, query, provider="huggingface", model=None):
+        self.calls += 1
+        return [1.0, 0.0]
+
+
+class FakeVectorDB:
+    """Vector and keyword legs that each wait until the other has started"""
+
+    def __init__(self, semantic, keyword):
+        self.semantic = semantic
+        self.keyword = keyword
+        self.vector_started = asyncio.Event()
+        self.keyword_started = asyncio.Event()
+        self.fetched = {}
+
+    async def search_by_vector(
+        self, query_embedding, top_k=5, document_id=None, tags=None, min_score=None, tracking_ids=None
+    ):
+        self.vector_started.set()
+        await asyncio.wait_for(self.keyword_started.wait(), timeout=1)
+        self.fetched["semantic"] = top_k
+        return [result(chunk_id, score) for chunk_id, score in self.semantic][:top_k]
+
+    async def search_by_keyword(self, query, top_k=5, document_id=None, tags=None, tracking_ids=None):
+        self.keyword_started.set()
+        await asyncio.wait_for(self.vector_started.wait(), timeout=1)
+        self.fetched["keyword"] = top_k
+        return [result(chunk_id, score) for chunk_id, score in self.keyword][:top_k]
+
+
+def make_service(semantic, keyword):
+    service = SearchService.__new__(SearchService)
+    service.user_id = "user-1"
+    service.vector_db = FakeVectorDB(semantic, keyword)
+    service.embedding_service = CountingEmbedder()
+    return service
+
+
+SEMANTIC = [("a", 0.9), ("c", 0.8), ("b", 0.7)]
+KEYWORD = [("c", 1.0), ("d", 0.6), ("a", 0.5)]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_embeds_once_and_runs_both_legs_concurrently():
+    """Test one query embedding and overlapping legs with deeper candidate lists"""
+    service = make_service(SEMANTIC, KEYWORD)
+
+    response = await service.search(SearchRequest(query="CS-101 grade", mode=SearchMode.HYBRID, top_k=2))
+
+    assert service.embedding_service.calls == 1
+    assert service.vector_db.fetched == {"semantic": 4, "keyword": 4}
+    assert response.total == 2
+
+
+@pytest.mark.asyncio
+async def test_reciprocal_rank_fusion_rewards_agreement():
+    """Test results found by both legs rank first, with leg scores kept"""
+    service = make_service(SEMANTIC, KEYWORD)
+
+    response = await service.search(
+        SearchRequest(query="q", mode=SearchMode.HYBRID, top_k=4, semantic_weight=1.0, keyword_weight=1.0)
+    )
+
+    ids = [r.chunk_id for r in response.results]
+    assert ids[:2] == ["c", "a"]
+    assert set(ids) == {"a", "b", "c", "d"}
+    assert all(0.0 < r.score <= 1.0 for r in response.results)
+    top = response.results[0]
+    assert top.metadata["semantic_rank"] == 2
+    assert top.metadata["keyword_rank"] == 1
+    assert top.metadata["keyword_score"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_fusion_weights_are_per_request():
+    """Test weights steer the fused ranking and weighted-score fusion is available"""
+    keyword_only = await make_service(SEMANTIC, KEYWORD).search(
+        SearchRequest(query="q", mode=SearchMode.HYBRID, top_k=1, semantic_weight=0.0, keyword_weight=1.0)
+    )
+    assert keyword_only.results[0].chunk_id == "c"
+
+    semantic_only = await make_service(SEMANTIC, KEYWORD).search(
+        SearchRequest(query="q", mode=SearchMode.HYBRID, top_k=1, semantic_weight=1.0, keyword_weight=0.0)
+    )
+    assert semantic_only.results[0].chunk_id == "a"
+
+    weighted = await make_service(SEMANTIC, KEYWORD).search(
+        SearchRequest(
+            query="q",
+            mode=SearchMode.HYBRID,
+            top_k=4,
+            fusion=FusionMethod.WEIGHTED,
+            semantic_weight=0.5,
+            keyword_weight=0.5,
+        )
+    )
+    scores = {r.chunk_id: r.score for r in weighted.results}
+    assert scores["c"] == pytest.approx(0.9)
+    assert scores["a"] == pytest.approx(0.7)
+    assert scores["d"] == pytest.approx(0.3)
@@ -0,0 +1,134 @@
+"""
+Tests for incremental re-indexing by chunk content hash
+"""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from app.database.vector_db import VectorDatabase
+from app.services.chunking_service import ChunkingService, RegexTokenCounter
+from app.services.embedding_service import EmbeddingService
+from app.services.incremental_indexing import index_document_chunks
+
+
+class CountingEmbeddingService(EmbeddingService):
+    """Deterministic 4-d embeddings; remembers every text it embedded"""
+
+    def __init__(self):
+        self.embedded = []
+
+    async def generate_embeddings(self, texts, provider="huggingface", model=None):
+        self.embedded.extend(texts)
+        rng = np.random.default_rng(len(self.embedded))
+        return rng.random((len(texts), 4), dtype=np.float32), 4
+
+
+def make_vector_db():
+    db = VectorDatabase.__new__(VectorDatabase)
+    db.user_id = "user-1"
+    db.collection = chromadb.EphemeralClient().create_collection(f"test_{uuid.uuid4().hex}")
+    return db
+
+
+PARAGRAPHS = [
+    "Research interests in distributed systems and consensus.",
+    "Worked on compilers for three years at a startup.",
+    "Published two papers on program synthesis.",
+    "Teaching assistant for operating systems courses.",
+]
+
+
+async def index(db, service, paragraphs, tags=("cv",)):
+    # Each paragraph fits a chunk on its own, two never do
+    chunker = ChunkingService(chunk_size=14, chunk_overlap=0, mode="paragraph", token_counter=RegexTokenCounter())
+    return await index_document_chunks(
+        db,
+        service,
+        chunker.iter_chunks("\n\n".join(paragraphs)),
+        document_id="doc-1",
+        tracking_id="track-1",
+        metadata={"filename": "cv.pdf", "tags": list(tags)},
+    )
+
+
+@pytest.mark.asyncio
+async def test_first_index_embeds_everything():
+    """Test a new document embeds and stores every chunk with its hash"""
+    db, service = make_vector_db(), CountingEmbeddingService()
+
+    stats = await index(db, service, PARAGRAPHS)
+
+    assert (stats.total, stats.embedded, stats.skipped, stats.deleted) == (4, 4, 0, 0)
+    stored = await db.get_chunk_fingerprints("doc-1")
+    assert len(stored) == 4
+    assert all(len(meta["content_hash"]) == 64 for meta in stored.values())
+
+
+@pytest.mark.asyncio
+async def test_reindex_embeds_only_changed_chunks():
+    """Test an edit re-embeds the changed chunk, drops the removed one, keeps the rest"""
+    db, service = make_vector_db(), CountingEmbeddingService()
+    await index(db, service, PARAGRAPHS)
+    service.embedded.clear()
+
+    edited = [
+        "A new opening paragraph about motivation.",
+        PARAGRAPHS[0],
+        "Worked on compilers for four years at a startup.",
+        PARAGRAPHS[3],
+    ]
+    stats = await index(db, service, edited)
+
+    assert service.embedded == [edited[0], edited[2]]
+    assert (stats.total, stats.embedded, stats.skipped, stats.deleted) == (4, 2, 2, 2)
+    # The first paragraph moved down one position without being re-embedded
+    assert stats.updated == 1
+
+    chunks = await db.get_document_chunks("doc-1")
+    assert [c["text"] for c in chunks] == edited
+    assert [c["metadata"]["chunk_index"] for c in chunks] == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_reindex_skips_all_embeddings():
+    """Test re-indexing identical text embeds nothing and only relabels tags"""
+    db, service = make_vector_db(), CountingEmbeddingService()
+    await index(db, service, PARAGRAPHS)
+    service.embedded.clear()
+
+    stats = await index(db, service, PARAGRAPHS, tags=("cv", "2026"))
+
+    assert service.embedded == []
+    assert (stats.embedded, stats.skipped, stats.updated, stats.deleted) == (0, 4, 4, 0)
+    stored = await db.get_chunk_fingerprints("doc-1")
+    assert {meta["tags"] for meta in stored.values()} == {"cv,2026"}
+
+
+@pytest.mark.asyncio
+async def test_before_insert_abort_rolls_back_inserted_batches():
+    """Test a failing pre-insert check (e.g. the document was deleted) leaves no chunks"""
+    db, service = make_vector_db(), CountingEmbeddingService()
+    chunker = ChunkingService(chunk_size=14, chunk_overlap=0, mode="paragraph", token_counter=RegexTokenCounter())
+    checks = []
+
+    async def deleted_after_first_batch():
+        checks.append(len(checks))
+        if len(checks) > 1:
+            raise LookupError("deleted")
+
+    with pytest.raises(LookupError):
+        await index_document_chunks(
+            db,
+            service,
+            chunker.iter_chunks("\n\n".join(PARAGRAPHS)),
+            document_id="doc-1",
+            tracking_id="track-1",
+            batch_size=2,
+            before_insert=deleted_after_first_batch,
+        )
+
+    assert len(checks) == 2
+    assert await db.get_chunk_fingerprints("doc-1") == {}
@@ -0,0 +1,367 @@
+"""
+Tests for the durable ingestion queue and worker
+"""
+
+import asyncio
+import copy
+import os
+import signal
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.ingestion_queue import IngestionJobStatus, IngestionQueue
+from app.models.document import IngestionPriority, ProcessingStatus
+import app.database.mongodb as mongodb
+import app.services.document_ingestion as document_ingestion
+import app.workers.ingestion_worker as ingestion_worker
+from app.core.chroma_client import chroma_manager
+from app.core.config import settings as app_settings
+from app.workers.ingestion_worker import IngestionWorker
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, operand in condition.items():
+            if op == "$lte" and not (value is not None and value <= operand):
+                return False
+            if op == "$gt" and not (value is not None and value > operand):
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+    return True
+
+
+def apply(doc, update):
+    for key, value in update.get("$set", {}).items():
+        doc[key] = value
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    """Just enough of a motor collection for the queue; yields like a real round trip"""
+
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(0)
+        self.docs.append(copy.deepcopy(doc))
+
+    def find(self, query, projection=None):
+        return FakeCursor([
+            {k: v for k, v in copy.deepcopy(d).items() if k != "_id"}
+            for d in self.docs if matches(d, query)
+        ])
+
+    async def find_one(self, query):
+        return next((copy.deepcopy(d) for d in self.docs if matches(d, query)), None)
+
+    async def find_one_and_update(self, query, update, sort=None, projection=None, return_document=None):
+        await asyncio.sleep(0)
+        candidates = [d for d in self.docs if matches(d, query)]
+        for key, direction in reversed(sort or []):
+            candidates.sort(key=lambda d: d[key], reverse=direction < 0)
+        if not candidates:
+            return None
+        apply(candidates[0], update)
+        return copy.deepcopy(candidates[0])
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(0)
+        for doc in self.docs:
+            if matches(doc, query):
+                apply(doc, update)
+                return SimpleNamespace(matched_count=1, modified_count=1)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+    async def update_many(self, query, update):
+        await asyncio.sleep(0)
+        hits = [d for d in self.docs if matches(d, query)]
+        for doc in hits:
+            apply(doc, update)
+        return SimpleNamespace(matched_count=len(hits), modified_count=len(hits))
+
+
+def make_queue(**kwargs):
+    options = dict(global_limit=3, per_user_limit=2, max_attempts=3, lease_seconds=60, retry_backoff_seconds=0)
+    options.update(kwargs)
+    return IngestionQueue(collection=FakeCollection(), **options)
+
+
+@pytest.mark.asyncio
+async def test_claims_by_priority_then_fifo():
+    queue = make_queue(global_limit=10, per_user_limit=10)
+    for name, priority in [("a", IngestionPriority.LOW), ("b", IngestionPriority.NORMAL),
+                           ("c", IngestionPriority.HIGH), ("d", IngestionPriority.NORMAL)]:
+        await queue.enqueue(name, "user-1", {}, priority=priority)
+
+    claimed = [(await queue.claim("w"))["document_id"] for _ in range(4)]
+
+    assert claimed == ["c", "b", "d", "a"]
+    assert await queue.claim("w") is None
+
+
+@pytest.mark.asyncio
+async def test_enforces_global_and_per_user_caps():
+    queue = make_queue()
+    for i in range(3):
+        await queue.enqueue(f"u1-{i}", "user-1", {})
+    for i in range(3):
+        await queue.enqueue(f"u2-{i}", "user-2", {})
+
+    claimed = [await queue.claim("w") for _ in range(4)]
+    running = [job for job in claimed if job]
+
+    # Two for user-1 (per-user cap), then one for user-2 (global cap of 3)
+    assert [job["document_id"] for job in running] == ["u1-0", "u1-1", "u2-0"]
+
+    # Finishing a user-1 job frees a slot for user-1's next upload
+    assert await queue.complete(running[0]["job_id"], "w")
+    assert (await queue.claim("w"))["document_id"] == "u1-2"
+    assert await queue.claim("w") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_never_exceed_caps():
+    queue = make_queue(global_limit=2, per_user_limit=2)
+    for i in range(6):
+        await queue.enqueue(f"doc-{i}", f"user-{i % 3}", {})
+
+    results = await asyncio.gather(*(queue.claim(f"w{i}") for i in range(6)))
+
+    running = await queue._running(datetime.utcnow())
+    assert len([job for job in results if job]) == len(running) <= 2
+
+
+@pytest.mark.asyncio
+async def test_enqueue_supersedes_waiting_job_for_same_document():
+    queue = make_queue()
+    first = await queue.enqueue("doc", "user-1", {"version": 1})
+    await queue.enqueue("doc", "user-1", {"version": 2})
+
+    job = await queue.claim("w")
+
+    assert job["payload"] == {"version": 2}
+    assert (await queue.collection.find_one({"job_id": first}))["status"] == IngestionJobStatus.CANCELLED.value
+
+
+@pytest.mark.asyncio
+async def test_failures_back_off_then_fail_for_good():
+    queue = make_queue(max_attempts=2, retry_backoff_seconds=30)
+    await queue.enqueue("doc", "user-1", {})
+
+    job = await queue.claim("w")
+    assert await queue.fail(job, "boom") is True
+    # Not available again until the backoff has passed
+    assert await queue.claim("w") is None
+
+    stored = await queue.collection.find_one({"job_id": job["job_id"]})
+    stored["available_at"] = datetime.utcnow()
+    queue.collection.docs = [stored]
+
+    job = await queue.claim("w")
+    assert job["attempts"] == 2
+    assert await queue.fail(job, "boom again") is False
+    stored = await queue.collection.find_one({"job_id": job["job_id"]})
+    assert stored["status"] == IngestionJobStatus.FAILED.value
+    assert stored["last_error"] == "boom again"
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_requeued():
+    queue = make_queue(max_attempts=2)
+    await queue.enqueue("doc", "user-1", {})
+    job = await queue.claim("dead-worker")
+    queue.collection.docs[0]["lease_until"] = datetime.utcnow() - timedelta(seconds=1)
+
+    assert await queue.recover_expired() == []
+    assert (await queue.claim("w"))["attempts"] == 2
+
+    queue.collection.docs[0]["lease_until"] = datetime.utcnow() - timedelta(seconds=1)
+    failed = await queue.recover_expired()
+    assert [j["job_id"] for j in failed] == [job["job_id"]]
+
+
+@pytest.mark.asyncio
+async def test_reclaimed_job_is_not_completed_or_failed_by_its_old_worker():
+    queue = make_queue()
+    await queue.enqueue("doc", "user-1", {})
+    stale = await queue.claim("slow-worker")
+    queue.collection.docs[0]["lease_until"] = datetime.utcnow() - timedelta(seconds=1)
+    await queue.recover_expired()
+    assert (await queue.claim("w"))["worker_id"] == "w"
+
+    assert await queue.complete(stale["job_id"], "slow-worker") is False
+    assert await queue.fail(stale, "late error") is None
+    stored = queue.collection.docs[0]
+    assert (stored["status"], stored["worker_id"]) == (IngestionJobStatus.RUNNING.value, "w")
+    assert stored["last_error"] != "late error"
+
+    # The old worker leaves the document alone too
+    documents = FakeCollection()
+    await documents.insert_one({"document_id": "doc", "status": ProcessingStatus.PROCESSING})
+
+    async def handler(job):
+        raise RuntimeError("late error")
+
+    worker = IngestionWorker(queue, handler, worker_id="slow-worker", documents=documents)
+    assert await worker.process(stale) is False
+    assert (await documents.find_one({"document_id": "doc"}))["status"] == ProcessingStatus.PROCESSING
+
+
+@pytest.mark.asyncio
+async def test_cancel_document_stops_waiting_and_running_jobs():
+    queue = make_queue()
+    await queue.enqueue("doc", "user-1", {})
+    running = await queue.claim("w")
+    await queue.enqueue("doc", "user-1", {"version": 2})
+    await queue.enqueue("other", "user-1", {})
+
+    assert await queue.cancel_document("doc") == 2
+
+    statuses = {(job["document_id"], job["status"]) for job in queue.collection.docs}
+    assert ("doc", IngestionJobStatus.QUEUED.value) not in statuses
+    assert ("other", IngestionJobStatus.QUEUED.value) in statuses
+    # The running job's worker can no longer renew, so it stops
+    assert await queue.renew(running["job_id"], "w") is False
+
+
+@pytest.mark.asyncio
+async def test_worker_stops_handler_when_lease_is_lost():
+    queue = make_queue(lease_seconds=0.03)
+    await queue.enqueue("doc", "user-1", {})
+    job = await queue.claim("w")
+    documents = FakeCollection()
+    await documents.insert_one({"document_id": "doc", "status": ProcessingStatus.PROCESSING})
+    started, stopped = asyncio.Event(), asyncio.Event()
+
+    async def handler(job):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            stopped.set()
+            raise
+
+    async def reclaim():
+        await started.wait()
+        queue.collection.docs[0]["lease_until"] = datetime.utcnow() - timedelta(seconds=1)
+        await queue.recover_expired()
+
+    worker = IngestionWorker(queue, handler, worker_id="w", documents=documents)
+    result, _ = await asyncio.wait_for(asyncio.gather(worker.process(job), reclaim()), timeout=1)
+
+    assert result is False
+    assert stopped.is_set()
+    stored = queue.collection.docs[0]
+    assert stored["status"] == IngestionJobStatus.QUEUED.value
+    assert (await documents.find_one({"document_id": "doc"}))["status"] == ProcessingStatus.PROCESSING
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_jobs_within_caps_and_retries():
+    queue = make_queue(global_limit=2, per_user_limit=1)
+    documents = FakeCollection()
+    for i in range(4):
+        await documents.insert_one({"document_id": f"doc-{i}", "status": ProcessingStatus.PENDING})
+        await queue.enqueue(f"doc-{i}", f"user-{i % 2}", {})
+
+    active, peak, done, calls = set(), [0], [], {}
+
+    async def handler(job):
+        calls[job["document_id"]] = calls.get(job["document_id"], 0) + 1
+        active.add(job["user_id"])
+        peak[0] = max(peak[0], len(active))
+        await asyncio.sleep(0.01)
+        active.discard(job["user_id"])
+        if job["document_id"] == "doc-0" and job["attempts"] == 1:
+            raise RuntimeError("transient")
+        done.append(job["document_id"])
+
+    worker = IngestionWorker(queue, handler, concurrency=4, poll_interval=0.005, documents=documents)
+    runner = asyncio.create_task(worker.run())
+    for _ in range(200):
+        if len(done) == 4:
+            break
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await runner
+
+    assert sorted(done) == ["doc-0", "doc-1", "doc-2", "doc-3"]
+    assert calls["doc-0"] == 2
+    # One job per user at a time
+    assert peak[0] <= 2
+    assert {d["status"] for d in queue.collection.docs} == {IngestionJobStatus.COMPLETED.value}
+    retried = await documents.find_one({"document_id": "doc-0"})
+    assert retried["progress"]["stage"] == "retrying"
+
+
+@pytest.mark.asyncio
+async def test_standalone_worker_sets_up_storage_and_runs_jobs(monkeypatch, tmp_path):
+    """Test the worker process initializes Chroma and Mongo indexes like the API does"""
+    queue = make_queue()
+    documents = FakeCollection()
+    await documents.insert_one({"document_id": "doc", "status": ProcessingStatus.PENDING})
+    await queue.enqueue("doc", "user-1", {})
+    setup, collections = [], []
+
+    async def connect():
+        setup.append("connect")
+
+    async def create_indexes():
+        setup.append("indexes")
+
+    async def close():
+        setup.append("close")
+
+    async def handler(job):
+        # Fails unless the process initialized its Chroma client
+        collections.append(chroma_manager.create_user_collection(job["user_id"]).name)
+
+    monkeypatch.setattr(app_settings, "ENABLE_CHROMA", True)
+    monkeypatch.setattr(app_settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(mongodb, "connect_to_mongodb", connect)
+    monkeypatch.setattr(mongodb, "create_indexes", create_indexes)
+    monkeypatch.setattr(mongodb, "close_mongodb_connection", close)
+    monkeypatch.setattr(document_ingestion, "handle_ingestion_job", handler)
+    monkeypatch.setattr(ingestion_worker, "IngestionQueue", lambda: queue)
+    monkeypatch.setattr(ingestion_worker, "get_documents_collection", lambda: documents)
+
+    runner = asyncio.create_task(ingestion_worker.main())
+    for _ in range(200):
+        if queue.collection.docs[0]["status"] == IngestionJobStatus.COMPLETED.value:
+            break
+        await asyncio.sleep(0.01)
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.wait_for(runner, timeout=5)
+
+    assert collections == [chroma_manager.get_user_collection_name("user-1")]
+    assert queue.collection.docs[0]["status"] == IngestionJobStatus.COMPLETED.value
+    assert setup == ["connect", "indexes", "close"]
+    assert chroma_manager._client is None
+
+
+def test_inline_worker_defaults_to_running_with_embedded_chroma():
+    from app.core.config import Settings
+
+    assert Settings(CHROMA_CLIENT_MODE="embedded").inline_ingestion_worker is True
+    assert Settings(CHROMA_CLIENT_MODE="http").inline_ingestion_worker is False
+    assert Settings(CHROMA_CLIENT_MODE="http", ENABLE_INLINE_INGESTION_WORKER=True).inline_ingestion_worker is True
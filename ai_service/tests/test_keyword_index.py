@@ -0,0 +1,218 @@
+"""
+Tests for the per-user BM25 keyword index
+"""
+
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.keyword_index import KeywordIndex, tokenize
+from app.database.vector_db import VectorDatabase
+from app.models.document import DocumentChunk
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(condition, dict):
+            if not any(v in condition["$in"] for v in values):
+                return False
+        elif condition not in values:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the keyword index"""
+
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(d) for d in self.docs if matches(d, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+
+    async def count_documents(self, query):
+        return sum(matches(d, query) for d in self.docs)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((d for d in self.docs if matches(d, query)), None)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0)
+            doc = dict(query)
+            self.docs.append(doc)
+        for key, value in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + value
+        doc.update(update.get("$set", {}))
+        return SimpleNamespace(matched_count=1)
+
+    async def bulk_write(self, operations, ordered=True):
+        matched = 0
+        for op in operations:
+            result = await self.update_one(op._filter, op._doc, upsert=op._upsert)
+            matched += result.matched_count
+        return SimpleNamespace(matched_count=matched)
+
+    async def delete_many(self, query):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not matches(d, query)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+
+def make_index():
+    return KeywordIndex(f"user-{uuid.uuid4().hex}", collection=FakeCollection(), stats=FakeCollection())
+
+
+def entry(chunk_id, text, document_id="doc-1", tags=("transcript",), tracking_id="track-1"):
+    return {
+        "chunk_id": chunk_id,
+        "text": text,
+        "document_id": document_id,
+        "tracking_id": tracking_id,
+        "chunk_index": 0,
+        "filename": f"{document_id}.pdf",
+        "tags": list(tags),
+    }
+
+
+def test_tokenize_keeps_codes_and_drops_stopwords():
+    """Test course codes split into searchable terms and stopwords are dropped"""
+    assert tokenize("The CS-101 course of Prof. Okafor") == ["cs", "101", "course", "prof", "okafor"]
+
+
+@pytest.mark.asyncio
+async def test_exact_terms_rank_first_and_rare_terms_weigh_more():
+    """Test BM25 ranks the chunk with the rare query term above common-term matches"""
+    index = make_index()
+    await index.add([
+        entry("a", "Grade A in CS-101 taught by Professor Okafor"),
+        entry("b", "Grade A in mathematics and grade B in physics"),
+        entry("c", "Grade B in chemistry"),
+    ])
+
+    hits = await index.search("Okafor grade", top_k=3)
+
+    assert [posting["chunk_id"] for posting, _ in hits][0] == "a"
+    assert {posting["chunk_id"] for posting, _ in hits} == {"a", "b", "c"}
+    assert hits[0][0]["text"].startswith("Grade A in CS-101")
+    assert await index.search("thermodynamics") == []
+
+
+@pytest.mark.asyncio
+async def test_filters_restrict_results_and_removal_updates_stats():
+    """Test document, tag and tracking filters, and that removed chunks vanish"""
+    index = make_index()
+    await index.add([
+        entry("a", "Research statement on robotics", document_id="sop", tags=["sop"], tracking_id="t-sop"),
+        entry("b", "Robotics club president", document_id="cv", tags=["cv"], tracking_id="t-cv"),
+    ])
+
+    assert [p["chunk_id"] for p, _ in await index.search("robotics", document_id="cv")] == ["b"]
+    assert [p["chunk_id"] for p, _ in await index.search("robotics", tags=["sop"])] == ["a"]
+    assert [p["chunk_id"] for p, _ in await index.search("robotics", tracking_ids=["t-cv"])] == ["b"]
+
+    await index.update_metadata({"b": {"tags": ["cv", "sop"]}})
+    assert {p["chunk_id"] for p, _ in await index.search("robotics", tags=["sop"])} == {"a", "b"}
+
+    assert await index.remove(["a", "missing"]) == 1
+    assert [p["chunk_id"] for p, _ in await index.search("robotics")] == ["b"]
+    stats = index.stats.docs[0]
+    assert stats["chunk_count"] == 1
+    assert stats["total_length"] == len(tokenize("Robotics club president"))
+
+
+@pytest.mark.asyncio
+async def test_reindexing_a_chunk_replaces_its_postings():
+    """Test re-adding a chunk updates its terms without double counting it"""
+    index = make_index()
+    await index.add([entry("a", "IELTS band 7")])
+    await index.add([entry("a", "TOEFL score 110")])
+
+    assert await index.search("ielts") == []
+    assert [p["chunk_id"] for p, _ in await index.search("toefl")] == ["a"]
+    assert index.stats.docs[0]["chunk_count"] == 1
+
+
+class FakeChroma:
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for chunk_id, text, metadata in zip(ids, documents, metadatas):
+            self.rows[chunk_id] = (text, metadata)
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.rows.pop(chunk_id, None)
+
+    def update(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            text, stored = self.rows[chunk_id]
+            self.rows[chunk_id] = (text, {**stored, **metadata})
+
+    def get(self, include=None, **kwargs):
+        return {
+            "ids": list(self.rows),
+            "documents": [text for text, _ in self.rows.values()],
+            "metadatas": [metadata for _, metadata in self.rows.values()],
+        }
+
+
+def make_vector_db():
+    db = VectorDatabase.__new__(VectorDatabase)
+    db.user_id = "user-1"
+    db.collection = FakeChroma()
+    db.keyword_index = make_index()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_vector_database_keeps_the_keyword_index_in_step():
+    """Test inserts and deletes maintain the index and keyword search needs no embedding"""
+    db = make_vector_db()
+    chunk = DocumentChunk(
+        chunk_id="doc-1_0",
+        document_id="doc-1",
+        tracking_id="track-1",
+        user_id="user-1",
+        text="Teaching assistant for COMP3020 under Dr. Lindqvist",
+        chunk_index=0,
+        metadata={"filename": "cv.pdf", "tags": ["cv"]},
+    )
+    await db.insert_chunks([chunk], embeddings=[[1.0, 0.0]])
+
+    results = await db.search_by_keyword("lindqvist comp3020", tags=["cv"])
+    assert [r.chunk_id for r in results] == ["doc-1_0"]
+    assert results[0].score == 1.0
+    assert results[0].tags == ["cv"]
+
+    await db.delete_chunks(["doc-1_0"])
+    assert await db.search_by_keyword("lindqvist") == []
+
+
+@pytest.mark.asyncio
+async def test_existing_collection_is_indexed_on_first_keyword_search():
+    """Test chunks stored before the keyword index existed are backfilled once"""
+    db = make_vector_db()
+    db.collection.rows["old_0"] = (
+        "Statement of purpose for the MSc in Data Science",
+        {"document_id": "old", "tracking_id": "t-old", "chunk_index": 0, "filename": "sop.pdf", "tags": "sop,draft"},
+    )
+
+    results = await db.search_by_keyword("msc data science", tags=["draft"])
+
+    assert [r.chunk_id for r in results] == ["old_0"]
+    assert await db.keyword_index.is_built()
@@ -0,0 +1,114 @@
+"""
+Tests for single-pass OCR and the preprocessed image cache
+"""
+
+import io
+
+import pytest
+import pytesseract
+from PIL import Image
+
+import app.services.ocr_service as ocr_module
+from app.services.ocr_service import OCRService
+from app.utils.ocr_pages import text_from_data
+
+
+def tsv(*words):
+    """Tesseract-style TSV columns for (block, par, line, text, conf) words"""
+    data = {key: [] for key in ("level", "page_num", "block_num", "par_num", "line_num", "text", "conf")}
+    # A non-word row, as Tesseract emits for every block/paragraph/line
+    for key, value in zip(data, (1, 1, 0, 0, 0, "", "-1")):
+        data[key].append(value)
+    for block, par, line, text, conf in words:
+        for key, value in zip(data, (5, 1, block, par, line, text, conf)):
+            data[key].append(value)
+    return data
+
+
+SAMPLE = tsv(
+    (1, 1, 1, "Statement", "96.5"),
+    (1, 1, 1, "of", "91"),
+    (1, 1, 2, "Purpose", "88.5"),
+    (1, 2, 1, "Research", "-1"),
+    (2, 1, 1, "Thanks", "90"),
+)
+
+
+def png_bytes(color=200):
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 20), (color, color, color)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_text_rebuilt_from_tsv():
+    """Test words, lines and paragraphs are laid out like image_to_string"""
+    text, confidence, word_count = text_from_data(SAMPLE)
+
+    assert text == "Statement of\nPurpose\n\nResearch\n\nThanks"
+    assert word_count == 5
+    assert confidence == pytest.approx((96.5 + 91 + 88.5 + 90) / 4)
+
+
+@pytest.mark.asyncio
+async def test_plain_and_layout_ocr_run_tesseract_once_each(monkeypatch):
+    """Test one Tesseract pass per call and a shared preprocessed image"""
+    ocr_module._image_cache.clear()
+    seen = []
+    prepared = []
+
+    def image_to_data(image, lang=None, output_type=None, **kwargs):
+        seen.append(("data", image))
+        return SAMPLE
+
+    def run_tesseract(input_filename, output_filename_base, extension, lang, config="", **kwargs):
+        seen.append(("layout", layout_inputs[-1]))
+        assert (extension, config) == ("hocr", "tsv")
+        header = "level\tpage_num\tblock_num\tpar_num\tline_num\tconf\ttext"
+        rows = "\n".join(
+            "\t".join(str(SAMPLE[key][i]) for key in ("level", "page_num", "block_num", "par_num", "line_num", "conf", "text"))
+            for i in range(len(SAMPLE["text"]))
+        )
+        with open(f"{output_filename_base}.hocr", "w") as hocr_file:
+            hocr_file.write("<html>hocr</html>")
+        with open(f"{output_filename_base}.tsv", "w") as tsv_file:
+            tsv_file.write(f"{header}\n{rows}")
+
+    layout_inputs = []
+    original_save = pytesseract.pytesseract.save
+
+    def recording_save(image):
+        layout_inputs.append(image)
+        return original_save(image)
+
+    def image_to_string(*args, **kwargs):
+        raise AssertionError("image_to_string should not be called")
+
+    original_prepare = ocr_module.prepare_image
+
+    def counting_prepare(image, binarize=False):
+        prepared.append(image)
+        return original_prepare(image, binarize)
+
+    monkeypatch.setattr(pytesseract, "image_to_data", image_to_data)
+    monkeypatch.setattr(pytesseract, "image_to_string", image_to_string)
+    monkeypatch.setattr(pytesseract.pytesseract, "run_tesseract", run_tesseract)
+    monkeypatch.setattr(pytesseract.pytesseract, "save", recording_save)
+    monkeypatch.setattr(ocr_module, "prepare_image", counting_prepare)
+
+    service = OCRService()
+    content = png_bytes()
+    plain = await service.extract_text_from_image(io.BytesIO(content), language="eng")
+    layout = await service.extract_text_with_layout(io.BytesIO(content), language="eng")
+
+    assert plain["text"] == layout["text"] == "Statement of\nPurpose\n\nResearch\n\nThanks"
+    assert plain["word_count"] == 5 and plain["language"] == "eng"
+    assert layout["hocr"] == "<html>hocr</html>"
+    assert [kind for kind, _ in seen] == ["data", "layout"]
+    # Decoded and converted to grayscale once, then reused for layout mode
+    assert len(prepared) == 1
+    assert seen[0][1] is seen[1][1]
+    assert seen[0][1].mode == "L"
+
+    # A different image is preprocessed on its own
+    await service.extract_text_from_image(io.BytesIO(png_bytes(10)))
+    assert len(prepared) == 2
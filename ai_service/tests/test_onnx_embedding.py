@@ -0,0 +1,116 @@
+"""
+Tests for the ONNX Runtime embedding backend
+"""
+
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_executor import EmbeddingExecutor
+from app.services.embedding_model_registry import EmbeddingModelRegistry
+from app.services.embedding_service import EmbeddingService
+from app.services.onnx_embedding import OnnxSentenceEncoder, min_cosine_similarity
+
+
+class FakeTokenizer:
+    """Whitespace tokenizer returning padded numpy features"""
+
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        tokens = [[len(word) for word in text.split()][:max_length] for text in texts]
+        width = max(len(t) for t in tokens)
+        ids = np.zeros((len(texts), width), dtype=np.int64)
+        mask = np.zeros((len(texts), width), dtype=np.int64)
+        for i, row in enumerate(tokens):
+            ids[i, :len(row)] = row
+            mask[i, :len(row)] = 1
+        return {"input_ids": ids, "attention_mask": mask, "token_type_ids": np.zeros_like(ids)}
+
+
+class FakeSession:
+    """Graph stand-in: token embedding = [word length, 1]; padding positions are noise"""
+
+    def __init__(self):
+        self.batch_shapes = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names, feeds):
+        assert set(feeds) == {"input_ids", "attention_mask"}
+        ids = feeds["input_ids"].astype(np.float32)
+        self.batch_shapes.append(ids.shape)
+        out = np.stack([ids, np.ones_like(ids)], axis=-1)
+        out[feeds["attention_mask"] == 0] = 99.0
+        return [out]
+
+
+class TestOnnxSentenceEncoder:
+    """Test tokenization feeds, pooling, normalization and ordering"""
+
+    def test_mean_pooling_ignores_padding_and_keeps_order(self):
+        """Test masked mean pooling and input-order results across batches"""
+        session = FakeSession()
+        encoder = OnnxSentenceEncoder(session, FakeTokenizer(), pooling="mean", normalize=False)
+
+        embeddings = encoder.encode(["aa", "b cccc dddddd", "eee fff"], batch_size=2)
+
+        assert embeddings.dtype == np.float32
+        assert np.allclose(embeddings, [[2.0, 1.0], [11 / 3, 1.0], [3.0, 1.0]])
+        # Longest texts are batched together first
+        assert session.batch_shapes == [(2, 3), (1, 1)]
+
+    def test_normalization_and_cls_pooling(self):
+        """Test CLS pooling and L2 normalization"""
+        encoder = OnnxSentenceEncoder(FakeSession(), FakeTokenizer(), pooling="cls", normalize=True)
+
+        embeddings = encoder.encode(["xxx yy"])
+
+        assert np.allclose(embeddings, [[3 / np.sqrt(10), 1 / np.sqrt(10)]])
+
+    def test_min_cosine_similarity(self):
+        """Test the compatibility metric used to validate exports"""
+        a = np.array([[1.0, 0.0], [0.0, 2.0]], dtype=np.float32)
+        b = np.array([[2.0, 0.0], [1.0, 1.0]], dtype=np.float32)
+
+        assert min_cosine_similarity(a, b) == pytest.approx(np.sqrt(0.5))
+
+
+class TestOnnxProvider:
+    """Test the huggingface-onnx provider is routed to the ONNX encoder"""
+
+    @pytest.mark.asyncio
+    async def test_provider_uses_onnx_encoder(self, tmp_path):
+        """Test huggingface-onnx encodes through the registry's ONNX model"""
+        registry = EmbeddingModelRegistry()
+        encoder = OnnxSentenceEncoder(FakeSession(), FakeTokenizer(), normalize=False)
+        registry.get_or_load("huggingface-onnx", "fake", lambda: encoder)
+        service = EmbeddingService(
+            registry=registry,
+            cache=EmbeddingCache(max_items=10, disk_path=str(tmp_path / "e.sqlite3"), disk_enabled=False),
+            executor=EmbeddingExecutor(mode="thread", max_workers=1, max_pending=2, queue_timeout=1),
+        )
+
+        embeddings, dimensions = await service.generate_embeddings(
+            ["abc de"], provider="huggingface-onnx", model="fake"
+        )
+
+        assert dimensions == 2
+        assert embeddings.tolist() == [[2.5, 1.0]]
+        assert "huggingface-onnx" in EmbeddingService.get_supported_providers()
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+def test_onnx_export_matches_pytorch(tmp_path):
+    """Test exported ONNX vectors match SentenceTransformer within tolerance"""
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("onnx")
+    from sentence_transformers import SentenceTransformer
+    from app.config import settings
+    from app.services.onnx_embedding import VALIDATION_TEXTS, load_onnx_encoder
+
+    reference = SentenceTransformer(settings.huggingface_model, device="cpu").encode(VALIDATION_TEXTS)
+    for quantize, tolerance in ((False, 0.999), (True, 0.98)):
+        encoder = load_onnx_encoder(settings.huggingface_model, quantize=quantize, cache_root=str(tmp_path))
+        assert min_cosine_similarity(reference, encoder.encode(VALIDATION_TEXTS)) >= tolerance
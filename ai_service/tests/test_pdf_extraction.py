@@ -0,0 +1,87 @@
+"""
+Tests for page-level PDF extraction and streaming pages into the chunker
+"""
+
+import io
+
+import pytest
+
+from benchmarks.pdf_extraction_benchmark import legacy_pages, main, make_pdf
+from app.services.chunking_service import ChunkingService, RegexTokenCounter
+from app.services.document_processor import DocumentProcessor
+from app.services.pdf_extraction import PDFExtractor
+
+
+async def collect(pages):
+    return [page async for page in pages]
+
+
+def test_page_ranges_cover_every_page():
+    """Test ranges are contiguous, respect the minimum span and cap tasks per worker"""
+    extractor = PDFExtractor(max_workers=2, pages_per_task=3)
+
+    assert extractor.page_ranges(7) == [(0, 3), (3, 6), (6, 7)]
+    ranges = extractor.page_ranges(100)
+    assert len(ranges) == 4
+    assert ranges[0][0] == 0 and ranges[-1][1] == 100
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+@pytest.mark.asyncio
+async def test_pool_matches_sequential_extraction():
+    """Test the process pool yields the same pages in order as the old loop"""
+    pdf = make_pdf(9, lines_per_page=5)
+    expected = "".join(await collect(legacy_pages(io.BytesIO(pdf))))
+
+    pool = PDFExtractor(max_workers=2, pages_per_task=2, min_parallel_pages=1)
+    try:
+        pages = await collect(pool.iter_pages(io.BytesIO(pdf)))
+    finally:
+        pool.shutdown()
+    thread = await collect(PDFExtractor(max_workers=1).iter_pages(io.BytesIO(pdf)))
+
+    assert len(pages) == 9
+    assert pages[0].startswith("Page 1, line 1:")
+    assert "".join(pages) == "".join(thread) == expected
+
+
+@pytest.mark.asyncio
+async def test_pages_stream_into_chunker():
+    """Test chunking a page stream matches chunking the joined text"""
+    pdf = make_pdf(6, lines_per_page=8)
+    processor = DocumentProcessor()
+    chunker = ChunkingService(chunk_size=60, chunk_overlap=10, token_counter=RegexTokenCounter())
+
+    pages = processor.iter_document_text(io.BytesIO(pdf), filename="thesis.pdf")
+    streamed = await collect(chunker.aiter_chunks(processor.require_text(pages)))
+    text = await processor.extract_text_from_pdf(io.BytesIO(pdf))
+
+    assert [c.text for c in streamed] == [c.text for c in chunker.iter_chunks(text)]
+
+
+@pytest.mark.asyncio
+async def test_too_little_text_fails_after_stream():
+    """Test require_text raises once the stream ends short, through the chunker"""
+    async def pages():
+        yield "Hi.\n\n"
+
+    chunker = ChunkingService(token_counter=RegexTokenCounter())
+    with pytest.raises(ValueError, match="too short"):
+        await collect(chunker.aiter_chunks(DocumentProcessor.require_text(pages())))
+
+
+def test_benchmark_reports_each_strategy(tmp_path):
+    """Test the benchmark runs end to end"""
+    output = tmp_path / "report.json"
+    report = main([
+        "--strategies", "legacy", "thread",
+        "--pages", "5",
+        "--lines-per-page", "5",
+        "--repeat", "1",
+        "--quiet",
+        "--output", str(output),
+    ])
+
+    assert [row["strategy"] for row in report["results"]] == ["legacy", "thread"]
+    assert report["results"][0]["characters"] == report["results"][1]["characters"] > 0
+    assert all(row["pages_per_sec"] > 0 for row in report["results"])
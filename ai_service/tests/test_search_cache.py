@@ -0,0 +1,115 @@
+"""
+Tests for the versioned search result cache
+"""
+
+import pytest
+
+from app.models.search import SearchMode, SearchRequest, SearchResult
+from app.services.search_cache import SearchResultCache
+from app.services.search_service import SearchService
+
+
+class FakeVersions:
+    def __init__(self):
+        self.version = 0
+
+    async def current(self):
+        return self.version
+
+    async def bump(self):
+        self.version += 1
+
+
+class CountingVectorDB:
+    def __init__(self):
+        self.versions = FakeVersions()
+        self.vector_queries = 0
+
+    async def search_by_vector(
+        self, query_embedding, top_k=5, document_id=None, tags=None, min_score=None, tracking_ids=None
+    ):
+        self.vector_queries += 1
+        return [
+            SearchResult(
+                chunk_id="cv_0",
+                document_id="cv",
+                tracking_id="track-cv",
+                text="Robotics club president",
+                score=0.8,
+                chunk_index=0,
+                filename="cv.pdf",
+            )
+        ]
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_query_embedding(self, query, provider="huggingface", model=None):
+        self.calls += 1
+        return [1.0, 0.0]
+
+
+def make_service(cache):
+    service = SearchService.__new__(SearchService)
+    service.user_id = "user-1"
+    service.vector_db = CountingVectorDB()
+    service.embedding_service = CountingEmbedder()
+    service.cache = cache
+    return service
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_skips_embedding_and_index():
+    """Test an identical (normalized) query is served from the cache"""
+    service = make_service(SearchResultCache(max_items=10, ttl_seconds=60))
+
+    first = await service.search(SearchRequest(query="Robotics  experience", mode=SearchMode.SEMANTIC))
+    second = await service.search(SearchRequest(query="robotics experience", mode=SearchMode.SEMANTIC))
+
+    assert service.embedding_service.calls == 1
+    assert service.vector_db.vector_queries == 1
+    assert first.processing_breakdown["cache_hit"] is False
+    assert second.processing_breakdown["cache_hit"] is True
+    assert second.processing_breakdown["cache_hit_rate"] == 0.5
+    assert [r.chunk_id for r in second.results] == ["cv_0"]
+
+    # Cached results are copies; mutating a response does not leak into the cache
+    second.results[0].score = 0.0
+    third = await service.search(SearchRequest(query="robotics experience", mode=SearchMode.SEMANTIC))
+    assert third.results[0].score == 0.8
+
+
+@pytest.mark.asyncio
+async def test_collection_write_or_other_filters_miss_the_cache():
+    """Test a version bump or a different filter or top_k runs the search again"""
+    service = make_service(SearchResultCache(max_items=10, ttl_seconds=60))
+    request = SearchRequest(query="robotics", mode=SearchMode.SEMANTIC, tags=["cv"])
+
+    await service.search(request)
+    await service.search(SearchRequest(query="robotics", mode=SearchMode.SEMANTIC, tags=["sop"]))
+    await service.search(SearchRequest(query="robotics", mode=SearchMode.SEMANTIC, tags=["cv"], top_k=3))
+    assert service.vector_db.vector_queries == 3
+
+    await service.vector_db.versions.bump()
+    await service.search(request)
+    assert service.vector_db.vector_queries == 4
+
+
+def test_cache_is_bounded_and_expires(monkeypatch):
+    """Test least recently used entries are evicted and old ones expire"""
+    now = [1000.0]
+    monkeypatch.setattr("app.services.search_cache.time.monotonic", lambda: now[0])
+    cache = SearchResultCache(max_items=2, ttl_seconds=10)
+
+    cache.put("a", [])
+    cache.put("b", [])
+    assert cache.get("a") == []
+    cache.put("c", [])
+    assert cache.get("b") is None
+    assert cache.stats()["items"] == 2
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["items"] == 1
@@ -0,0 +1,164 @@
+"""
+Tests for tag and tracking ID filters evaluated inside ChromaDB
+"""
+
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from app.database.vector_db import VectorDatabase, build_where
+from app.models.document import DocumentChunk
+
+
+class RecordingKeywordIndex:
+    """Keyword index stand-in that only records a rebuild"""
+
+    def __init__(self):
+        self.built = False
+
+    async def is_built(self):
+        return self.built
+
+    async def rebuild(self, entries):
+        self.built = True
+        return len(entries)
+
+    async def add(self, entries):
+        return len(entries)
+
+    async def update_metadata(self, updates):
+        return len(updates)
+
+
+class RecordingVersions:
+    """Collection version stand-in that records bumps and migrations"""
+
+    def __init__(self):
+        self.version = 0
+        self.migrations = set()
+
+    async def bump(self):
+        self.version += 1
+
+    async def is_migrated(self, name):
+        return name in self.migrations
+
+    async def mark_migrated(self, name):
+        self.migrations.add(name)
+
+
+def make_vector_db(keyword_index=None):
+    db = VectorDatabase.__new__(VectorDatabase)
+    # Tag flag migration is remembered per user, so each test gets its own
+    db.user_id = f"user-{uuid.uuid4().hex}"
+    db.collection = chromadb.EphemeralClient().create_collection(
+        f"test_{uuid.uuid4().hex}", metadata={"hnsw:space": "cosine"}
+    )
+    db.keyword_index = keyword_index
+    return db
+
+
+def chunk(document_id, index, tags):
+    return DocumentChunk(
+        chunk_id=f"{document_id}_{index}",
+        document_id=document_id,
+        tracking_id=f"track-{document_id}",
+        user_id="user-1",
+        text=f"Chunk {index} of {document_id}",
+        chunk_index=index,
+        metadata={"filename": f"{document_id}.pdf", "tags": tags},
+    )
+
+
+QUERY = np.array([1.0, 0.0], dtype=np.float32)
+
+
+async def populate(db):
+    # Ten close CV chunks outrank the one transcript chunk by far
+    cv = [chunk("cv", i, ["cv"]) for i in range(10)]
+    transcript = [chunk("transcript", 0, ["transcript", "official"])]
+    await db.insert_chunks(cv, np.asarray([[1.0, 0.01 * i] for i in range(10)], dtype=np.float32))
+    await db.insert_chunks(transcript, np.asarray([[0.0, 1.0]], dtype=np.float32))
+
+
+def test_where_clause_combines_filters():
+    """Test filters become native Chroma predicates, one key per clause"""
+    assert build_where() is None
+    assert build_where(tags=["cv"]) == {"tag:cv": True}
+    assert build_where(document_id="d", tags=["cv", "sop"], tracking_ids=["t1", "t2"]) == {
+        "$and": [
+            {"document_id": "d"},
+            {"$or": [{"tag:cv": True}, {"tag:sop": True}]},
+            {"tracking_id": {"$in": ["t1", "t2"]}},
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_selective_filters_return_full_results():
+    """Test a rare tag or tracking ID still finds its chunk behind many better matches"""
+    db = make_vector_db()
+    await populate(db)
+
+    by_tag = await db.search_by_vector(QUERY, top_k=3, tags=["official"])
+    assert [r.chunk_id for r in by_tag] == ["transcript_0"]
+    assert by_tag[0].tags == ["transcript", "official"]
+
+    by_tracking = await db.search_by_vector(QUERY, top_k=3, tracking_ids=["track-transcript"])
+    assert [r.chunk_id for r in by_tracking] == ["transcript_0"]
+
+    either = await db.search_by_vector(QUERY, top_k=20, tags=["cv", "official"])
+    assert len(either) == 11
+
+
+@pytest.mark.asyncio
+async def test_retagging_a_document_drops_its_old_tag_flags():
+    """Test set_document_tags relabels chunks and clears the flags of removed tags"""
+    db = make_vector_db()
+    await populate(db)
+
+    await db.set_document_tags("transcript", ["sop"])
+
+    assert await db.search_by_vector(QUERY, top_k=3, tags=["official"]) == []
+    relabelled = await db.search_by_vector(QUERY, top_k=3, tags=["sop"])
+    assert [r.chunk_id for r in relabelled] == ["transcript_0"]
+    assert relabelled[0].tags == ["sop"]
+
+
+@pytest.mark.asyncio
+async def test_chunks_without_tag_flags_are_backfilled():
+    """Test chunks stored with only the comma-joined tags get flags on first filtered search"""
+    # A keyword index built before tag flags existed does not skip the migration
+    keyword_index = RecordingKeywordIndex()
+    keyword_index.built = True
+    db = make_vector_db(keyword_index=keyword_index)
+    db.versions = RecordingVersions()
+    db.collection.add(
+        ids=["old_0"],
+        embeddings=[[1.0, 0.0]],
+        documents=["Legacy chunk"],
+        metadatas=[{"document_id": "old", "tracking_id": "t-old", "chunk_index": 0, "tags": "lor,draft"}],
+    )
+
+    results = await db.search_by_vector(QUERY, top_k=3, tags=["draft"])
+
+    assert [r.chunk_id for r in results] == ["old_0"]
+    stored = db.collection.get(ids=["old_0"], include=["metadatas"])
+    assert stored["metadatas"][0]["tag:lor"] is True
+    assert db.versions.migrations == {"tag_flags"}
+    assert db.versions.version == 1
+
+    # Another process sees the marker and does not scan the collection again
+    VectorDatabase._tag_flag_users.discard(db.user_id)
+    db.collection.add(
+        ids=["old_1"],
+        embeddings=[[1.0, 0.0]],
+        documents=["Another legacy chunk"],
+        metadatas=[{"document_id": "old", "tracking_id": "t-old", "chunk_index": 1, "tags": "lor"}],
+    )
+    await db.search_by_vector(QUERY, top_k=3, tags=["lor"])
+    assert db.versions.version == 1
+    stored = db.collection.get(ids=["old_1"], include=["metadatas"])
+    assert "tag:lor" not in stored["metadatas"][0]
@@ -0,0 +1,179 @@
+"""
+Tests for the pooled, batched Ollama embeddings client against a local fake server
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+from app.SOP_Generator.services.embeddings import EmbeddingsClient
+
+
+class FakeOllama:
+    """In-process stand-in for the Ollama embeddings API"""
+
+    def __init__(self, supports_batch: bool = True):
+        self.supports_batch = supports_batch
+        self.embed_calls = []
+        self.legacy_calls = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def vector_for(text: str):
+        return [float(len(text)), 1.0, 0.5, 0.25]
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._lock:
+                    fake.connections.add(self.client_address)
+
+                if self.path == "/api/embed" and fake.supports_batch:
+                    texts = body["input"]
+                    fake.embed_calls.append(len(texts))
+                    vectors = [[] if text == "empty" else fake.vector_for(text) for text in texts]
+                    self._send(200, {"model": body["model"], "embeddings": vectors})
+                elif self.path == "/api/embeddings":
+                    fake.legacy_calls += 1
+                    self._send(200, {"embedding": fake.vector_for(body["prompt"])})
+                else:
+                    self._send(404, {"error": "not found"})
+
+        return Handler
+
+
+def start_server(fake: FakeOllama):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), fake.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    fake.base_url = f"http://127.0.0.1:{server.server_port}"
+    return server
+
+
+@pytest.fixture
+def fake_ollama():
+    fake = FakeOllama()
+    server = start_server(fake)
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def legacy_ollama():
+    fake = FakeOllama(supports_batch=False)
+    server = start_server(fake)
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(fake, **kwargs) -> EmbeddingsClient:
+    client = EmbeddingsClient(base_url=fake.base_url, **kwargs)
+    client.use_mock = False
+    return client
+
+
+class TestEmbeddingsClient:
+    """Test batching, connection reuse, fallbacks and the async path"""
+
+    def test_batch_uses_multi_input_endpoint(self, fake_ollama):
+        """Test texts go out batch_size at a time, in order"""
+        client = make_client(fake_ollama, batch_size=4)
+        texts = [f"text {'x' * i}" for i in range(10)]
+
+        embeddings = client.embed_batch(texts)
+        client.close()
+
+        assert fake_ollama.embed_calls == [4, 4, 2]
+        assert embeddings == [FakeOllama.vector_for(text) for text in texts]
+        assert fake_ollama.legacy_calls == 0
+
+    def test_connection_is_reused(self, fake_ollama):
+        """Test repeated calls share one keep-alive connection"""
+        client = make_client(fake_ollama, batch_size=1)
+
+        for i in range(5):
+            client.embed_text(f"query {i}")
+        client.close()
+
+        assert len(fake_ollama.connections) == 1
+
+    def test_dimension_is_detected_once(self, fake_ollama):
+        """Test the dimension probe runs once and is cached"""
+        client = make_client(fake_ollama)
+
+        assert client.detect_dimension() == 4
+        assert client.detect_dimension() == 4
+        assert fake_ollama.embed_calls == [1]
+
+    def test_missing_vector_falls_back_alone(self, fake_ollama):
+        """Test an empty vector only replaces that item with the mock"""
+        client = make_client(fake_ollama)
+
+        embeddings = client.embed_batch(["good", "empty", "fine"])
+
+        assert embeddings[0] == FakeOllama.vector_for("good")
+        assert embeddings[1] == client._mock_embedding("empty")
+        assert embeddings[2] == FakeOllama.vector_for("fine")
+
+    def test_legacy_server_falls_back_to_single_endpoint(self, legacy_ollama):
+        """Test servers without /api/embed use /api/embeddings"""
+        client = make_client(legacy_ollama)
+
+        embeddings = client.embed_batch(["a", "bb", "ccc"])
+        client.embed_batch(["dddd"])
+
+        assert embeddings == [FakeOllama.vector_for(t) for t in ["a", "bb", "ccc"]]
+        assert legacy_ollama.legacy_calls == 4
+
+    def test_unreachable_server_uses_mock(self):
+        """Test network errors degrade to mock embeddings"""
+        client = EmbeddingsClient(base_url="http://127.0.0.1:9", timeout=1)
+        client.use_mock = False
+
+        assert client.embed_text("abc") == client._mock_embedding("abc")
+
+    @pytest.mark.asyncio
+    async def test_async_batch(self, fake_ollama):
+        """Test aembed_batch batches over the async client"""
+        client = make_client(fake_ollama, batch_size=3)
+        texts = ["one", "two", "three", "four"]
+
+        embeddings = await client.aembed_batch(texts)
+        await client.aclose()
+
+        assert fake_ollama.embed_calls == [3, 1]
+        assert embeddings == [FakeOllama.vector_for(text) for text in texts]
+
+    def test_async_client_per_event_loop(self, fake_ollama):
+        """Test each event loop gets its own async client, so a client outlives its first loop"""
+        client = make_client(fake_ollama)
+
+        async def embed():
+            return await client.aembed_batch(["one", "two"]), client._get_async_client()
+
+        first_embeddings, first = asyncio.run(embed())
+        second_embeddings, second = asyncio.run(embed())
+
+        assert first is not second
+        assert first_embeddings == second_embeddings == [FakeOllama.vector_for(t) for t in ["one", "two"]]
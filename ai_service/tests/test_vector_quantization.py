@@ -0,0 +1,82 @@
+"""
+Tests for quantized vector storage and quantization-aware scoring
+"""
+
+import numpy as np
+import pytest
+
+from app.services.vector_quantization import (
+    VectorCodec,
+    decode_vector,
+    quantize_int8,
+    stored_size_bytes,
+)
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((300, 64)).astype(np.float32)
+
+
+def top(scores, k):
+    return set(np.argsort(-scores)[:k].tolist())
+
+
+class TestVectorCodec:
+    """Test storage size, round-trips and scoring"""
+
+    @pytest.mark.parametrize("precision,bytes_per_dim", [("float32", 4), ("float16", 2), ("int8", 1)])
+    def test_encoded_size(self, corpus, precision, bytes_per_dim):
+        """Test each precision stores the expected number of bytes"""
+        fields = VectorCodec(precision=precision, keep_full=False).encode(corpus[0])
+
+        assert stored_size_bytes(fields) == 64 * bytes_per_dim
+        assert fields["embedding_dim"] == 64
+        assert fields["embedding_full"] is None
+
+    def test_int8_round_trip_error_is_bounded(self, corpus):
+        """Test int8 codes recover the vector within half a quantization step"""
+        codes, scale = quantize_int8(corpus[0])
+        fields = VectorCodec(precision="int8", keep_full=False).encode(corpus[0])
+
+        assert codes.dtype == np.int8
+        assert np.max(np.abs(decode_vector(fields) - corpus[0])) <= scale / 2 + 1e-6
+
+    def test_legacy_float_lists_still_score(self, corpus):
+        """Test documents stored as float lists are scored like float32"""
+        codec = VectorCodec(precision="float32", rerank_candidates=0)
+        encoded = [codec.encode(v) for v in corpus[:10]]
+        legacy = [{"embedding": v.tolist()} for v in corpus[:10]]
+
+        assert np.allclose(codec.score(corpus[0], encoded), codec.score(corpus[0], legacy), atol=1e-6)
+
+    def test_quantized_scores_keep_neighbours(self, corpus):
+        """Test int8 scoring finds nearly the same top results as exact search"""
+        exact = VectorCodec(precision="float32", rerank_candidates=0)
+        quantized = VectorCodec(precision="int8", keep_full=False, rerank_candidates=0)
+        exact_docs = [exact.encode(v) for v in corpus]
+        quantized_docs = [quantized.encode(v) for v in corpus]
+
+        query = corpus[5] + 0.1 * corpus[7]
+        overlap = top(exact.score(query, exact_docs), 10) & top(quantized.score(query, quantized_docs), 10)
+
+        assert len(overlap) >= 8
+
+    def test_full_precision_rerank_matches_exact_scores(self, corpus):
+        """Test reranked candidates get their exact float32 score"""
+        exact = VectorCodec(precision="float32", rerank_candidates=0)
+        reranked = VectorCodec(precision="int8", keep_full=True, rerank_candidates=20)
+        query = corpus[3]
+
+        exact_scores = exact.score(query, [exact.encode(v) for v in corpus])
+        scores = reranked.score(query, [reranked.encode(v) for v in corpus])
+
+        best = np.argsort(-scores)[:10]
+        assert np.allclose(scores[best], exact_scores[best], atol=1e-6)
+        assert top(scores, 10) == top(exact_scores, 10)
+
+    def test_rejects_unknown_precision(self):
+        """Test unsupported precisions fail fast"""
+        with pytest.raises(ValueError):
+            VectorCodec(precision="int4")